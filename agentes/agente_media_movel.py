@@ -8,6 +8,7 @@ import pandas as pd
 from datetime import datetime
 import torch
 
+from analise_tecnica.cache_indicadores import memoizar
 from .agente_padrao import AgentePadrao
 
 class AgenteMediaMovel(AgentePadrao):
@@ -203,6 +204,7 @@ class AgenteMediaMovel(AgentePadrao):
             }
         }
     
+    @memoizar('rsi_media_simples')
     def _calcular_rsi(
         self,
         precos: pd.Series,
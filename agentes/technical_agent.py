@@ -62,6 +62,10 @@ class TechnicalAgent(AbstractAgent):
             self.model = torch.compile(self.model)
             self.scaler = torch.cuda.amp.GradScaler()
             
+        # Dtype do modelo: a entrada OHLCV é convertida antes do cálculo e a
+        # pilha de indicadores é entregue ao tensor já nesse dtype
+        self.dtype = np.float32
+        
         # Indicadores técnicos utilizados
         self.indicators = [
             'close', 'volume', 'rsi', 'macd', 'bollinger_upper',
@@ -75,7 +79,8 @@ class TechnicalAgent(AbstractAgent):
         
     def calculate_indicators(self, data: Dict[str, Any]) -> np.ndarray:
         """Calcula indicadores técnicos."""
-        df = data['ohlcv']  # Assume DataFrame com OHLCV
+        # Assume DataFrame com OHLCV; convertido para o dtype do modelo
+        df = data['ohlcv'][['high', 'low', 'close', 'volume']].astype(self.dtype)
         
         indicators = []
         
@@ -126,7 +131,9 @@ class TechnicalAgent(AbstractAgent):
             ind = (ind - np.mean(ind)) / np.std(ind)
             indicators.append(ind)
             
-        return np.stack(indicators, axis=0)
+        # Janelas do pandas podem devolver float64; a conversão final não
+        # copia o que já estiver no dtype do modelo
+        return np.stack(indicators, axis=0).astype(self.dtype, copy=False)
         
     def prepare_batch(self, data: List[Dict]) -> torch.Tensor:
         """Prepara batch de dados técnicos."""
@@ -136,7 +143,8 @@ class TechnicalAgent(AbstractAgent):
             # Pega últimos sequence_length pontos
             indicators = indicators[:, -self.sequence_length:]
             batch.append(indicators)
-        return torch.FloatTensor(np.stack(batch)).to(self.device)
+        # Arrays já em float32: from_numpy compartilha a memória sem conversão
+        return torch.from_numpy(np.stack(batch)).to(self.device)
         
     def _model_forward(self, batch: torch.Tensor) -> torch.Tensor:
         """Executa forward pass do modelo."""
@@ -8,8 +8,18 @@ import pandas as pd
 from datetime import datetime
 import logging
 import talib
+from analise_tecnica.cache_indicadores import memoizar
 from .expert_base_agent import ExpertBaseAgent
 
+# Indicadores talib memoizados: chamadas repetidas no mesmo tick sobre a mesma
+# série (outras instâncias do agente, reavaliações das regras) calculam uma vez
+_SMA = memoizar('talib.SMA')(talib.SMA)
+_MACD = memoizar('talib.MACD')(talib.MACD)
+_RSI = memoizar('talib.RSI')(talib.RSI)
+_STOCH = memoizar('talib.STOCH')(talib.STOCH)
+_BBANDS = memoizar('talib.BBANDS')(talib.BBANDS)
+_ATR = memoizar('talib.ATR')(talib.ATR)
+
 class TechnicalExpertAgent(ExpertBaseAgent):
     def __init__(self, name: str = "TechnicalExpertAgent", gpu_device: Optional[torch.device] = None):
         super().__init__(name, gpu_device)
@@ -45,8 +55,8 @@ class TechnicalExpertAgent(ExpertBaseAgent):
         """Regra de cruzamento de médias móveis."""
         try:
             close = data['close']
-            sma_20 = talib.SMA(close, timeperiod=20)
-            sma_50 = talib.SMA(close, timeperiod=50)
+            sma_20 = _SMA(close, timeperiod=20)
+            sma_50 = _SMA(close, timeperiod=50)
             
             # Verifica cruzamento
             if sma_20[-1] > sma_50[-1] and sma_20[-2] <= sma_50[-2]:
@@ -86,7 +96,7 @@ class TechnicalExpertAgent(ExpertBaseAgent):
         """Regra baseada no MACD."""
         try:
             close = data['close']
-            macd, signal, hist = talib.MACD(close)
+            macd, signal, hist = _MACD(close)
             
             threshold = knowledge['macd_threshold']
             
@@ -131,7 +141,7 @@ class TechnicalExpertAgent(ExpertBaseAgent):
         """Regra baseada no RSI."""
         try:
             close = data['close']
-            rsi = talib.RSI(close)
+            rsi = _RSI(close)
             
             oversold = knowledge['rsi_oversold']
             overbought = knowledge['rsi_overbought']
@@ -173,7 +183,7 @@ class TechnicalExpertAgent(ExpertBaseAgent):
             low = data['low']
             close = data['close']
             
-            slowk, slowd = talib.STOCH(high, low, close)
+            slowk, slowd = _STOCH(high, low, close)
             
             if slowk[-1] < 20 and slowd[-1] < 20:
                 return {
@@ -212,7 +222,7 @@ class TechnicalExpertAgent(ExpertBaseAgent):
         """Regra baseada nas Bandas de Bollinger."""
         try:
             close = data['close']
-            upper, middle, lower = talib.BBANDS(close)
+            upper, middle, lower = _BBANDS(close)
             
             # Calcula a largura das bandas
             bandwidth = (upper[-1] - lower[-1]) / middle[-1]
@@ -301,7 +311,7 @@ class TechnicalExpertAgent(ExpertBaseAgent):
             close = data['close']
             
             # Calcula média móvel do volume
-            vol_sma = talib.SMA(volume, timeperiod=20)
+            vol_sma = _SMA(volume, timeperiod=20)
             vol_ratio = volume[-1] / vol_sma[-1]
             
             price_change = (close[-1] - close[-2]) / close[-2]
@@ -346,8 +356,8 @@ class TechnicalExpertAgent(ExpertBaseAgent):
             low = data['low']
             close = data['close']
             
-            atr = talib.ATR(high, low, close)
-            atr_ma = talib.SMA(atr, timeperiod=20)
+            atr = _ATR(high, low, close)
+            atr_ma = _SMA(atr, timeperiod=20)
             
             # Calcula razão ATR atual / média
             atr_ratio = atr[-1] / atr_ma[-1]
@@ -3,15 +3,56 @@ Módulo de Análise Técnica - Sistema Neural Trading
 """
 
 from .indicadores_tecnicos import AnalisisTecnica, IndicadorResult
-from .detector_padroes import DetectorPadroes, PadraoDetectado, TipoPadrao
+from .grafo_calculo import GrafoCalculo
+from .cache_indicadores import CacheIndicadores, CACHE_GLOBAL, memoizar
+from .indicadores_streaming import (
+    IndicadorStreaming, RSIStreaming, MACDStreaming, BollingerStreaming, MediaMovelStreaming,
+    EstocasticoStreaming, WilliamsRStreaming, CCIStreaming
+)
+from .indicadores_lote import (
+    IndicadorMatriz, analisar_matriz, estocastico_lote, williams_r_lote, cci_lote
+)
+from .varredura import varredura_sma, varredura_rsi, varredura_cruzamento_medias
+from .detector_padroes import (
+    DetectorPadroes, PadraoDetectado, TipoPadrao, ScannerPadroesIncremental, PivotTracker, PivoConfirmado
+)
+from .indice_padroes import IndicePadroes, PadraoIndexado
+from .modelos_geometricos import ModelosGeometricos, ajustar_retas
 from .backtest_engine import BacktestEngine, HistoricoBacktest, Posicao
 
 __all__ = [
     'AnalisisTecnica', 
     'IndicadorResult',
+    'GrafoCalculo',
+    'CacheIndicadores',
+    'CACHE_GLOBAL',
+    'memoizar',
+    'IndicadorStreaming',
+    'RSIStreaming',
+    'MACDStreaming',
+    'BollingerStreaming',
+    'MediaMovelStreaming',
+    'EstocasticoStreaming',
+    'WilliamsRStreaming',
+    'CCIStreaming',
+    'IndicadorMatriz',
+    'analisar_matriz',
+    'estocastico_lote',
+    'williams_r_lote',
+    'cci_lote',
+    'varredura_sma',
+    'varredura_rsi',
+    'varredura_cruzamento_medias',
     'DetectorPadroes', 
     'PadraoDetectado', 
     'TipoPadrao',
+    'ScannerPadroesIncremental',
+    'PivotTracker',
+    'PivoConfirmado',
+    'IndicePadroes',
+    'PadraoIndexado',
+    'ModelosGeometricos',
+    'ajustar_retas',
     'BacktestEngine', 
     'HistoricoBacktest', 
     'Posicao'
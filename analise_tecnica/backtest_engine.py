@@ -10,8 +10,26 @@ from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 import logging
 
-from .indicadores_tecnicos import AnalisisTecnica, IndicadorResult
-from .detector_padroes import DetectorPadroes, PadraoDetectado
+from .indicadores_tecnicos import AnalisisTecnica, IndicadorResult, SINAL_COMPRA, SINAL_VENDA, SINAL_NEUTRO
+from .detector_padroes import DetectorPadroes, PadraoDetectado, ScannerPadroesIncremental
+from .indice_padroes import IndicePadroes
+from .precisao import resolver_dtype
+from utilitarios import metrics
+from utilitarios.first_touch import first_touch, EXIT_NONE
+
+
+def _proxima_ocorrencia(mascara: np.ndarray) -> np.ndarray:
+    """
+    Para cada barra, índice da primeira ocorrência em [i, n) (n se não houver)
+
+    O array tem n + 1 posições para que `resultado[i + 1]` seja válido na
+    última barra.
+    """
+    n = len(mascara)
+    indices = np.where(mascara, np.arange(n), n)
+    proxima = np.minimum.accumulate(indices[::-1])[::-1]
+    return np.append(proxima, n)
+
 
 @dataclass
 class Posicao:
@@ -47,21 +65,27 @@ class HistoricoBacktest:
 class BacktestEngine:
     """
     Engine de backtesting para estratégias de análise técnica
+    
+    O `dtype` (float64 por padrão, ou float32) é repassado à análise técnica
+    e ao detector de padrões; capital e resultados dos trades continuam em
+    float64.
     """
     
-    def __init__(self, capital_inicial: float = 100000.0):
+    def __init__(self, capital_inicial: float = 100000.0, dtype=None):
         self.capital_inicial = capital_inicial
         self.capital_atual = capital_inicial
         self.logger = logging.getLogger(__name__)
-        self.analise_tecnica = AnalisisTecnica()
-        self.detector_padroes = DetectorPadroes()
+        self.dtype = resolver_dtype(dtype)
+        self.analise_tecnica = AnalisisTecnica(dtype=self.dtype)
+        self.detector_padroes = DetectorPadroes(dtype=self.dtype)
         
     def executar_backtest_indicador(self, 
                                   dados: pd.DataFrame,
                                   indicador: str,
                                   parametros: Dict,
                                   stop_loss_pct: float = 0.02,
-                                  take_profit_pct: float = 0.04) -> HistoricoBacktest:
+                                  take_profit_pct: float = 0.04,
+                                  vetorizado: bool = True) -> HistoricoBacktest:
         """
         Executa backtest baseado em um indicador específico
         
@@ -71,17 +95,14 @@ class BacktestEngine:
             parametros: Parâmetros do indicador
             stop_loss_pct: Percentual de stop loss
             take_profit_pct: Percentual de take profit
+            vetorizado: Simulação por eventos sobre arrays (padrão); False usa
+                o laço barra a barra, que produz o mesmo histórico
             
         Returns:
             HistoricoBacktest com resultados
         """
-        self.capital_atual = self.capital_inicial
-        posicoes = []
-        equity_curve = []
-        posicao_atual = None
-        
         # Calcular indicador
-        precos = dados['close'].tolist()
+        precos = dados['close'].to_numpy(dtype=self.dtype)
         
         if indicador == 'RSI':
             resultado_indicador = self.analise_tecnica.calcular_rsi(
@@ -101,11 +122,31 @@ class BacktestEngine:
         else:
             raise ValueError(f"Indicador {indicador} não suportado")
         
+        self.capital_atual = self.capital_inicial
+        if vetorizado:
+            posicoes, equity_curve = self._simular_sinais_vetorizado(
+                dados, resultado_indicador.codigos_sinais, stop_loss_pct, take_profit_pct
+            )
+        else:
+            posicoes, equity_curve = self._simular_sinais_laco(
+                dados, resultado_indicador.sinais, stop_loss_pct, take_profit_pct
+            )
+        
+        # Calcular métricas
+        return self._calcular_metricas(posicoes, equity_curve)
+    
+    def _simular_sinais_laco(self, dados: pd.DataFrame, sinais: List[str],
+                             stop_loss_pct: float, take_profit_pct: float):
+        """Simulação barra a barra (implementação de referência)"""
+        posicoes = []
+        equity_curve = []
+        posicao_atual = None
+        
         # Executar backtest
-        for i in range(len(resultado_indicador.sinais)):
-            data_atual = dados.iloc[i + len(dados) - len(resultado_indicador.sinais)]['data']
-            preco_atual = dados.iloc[i + len(dados) - len(resultado_indicador.sinais)]['close']
-            sinal = resultado_indicador.sinais[i]
+        for i in range(len(sinais)):
+            data_atual = dados.iloc[i + len(dados) - len(sinais)]['data']
+            preco_atual = dados.iloc[i + len(dados) - len(sinais)]['close']
+            sinal = sinais[i]
             
             # Verificar se há posição aberta
             if posicao_atual:
@@ -160,14 +201,100 @@ class BacktestEngine:
                                                "Fim do período")
             posicoes.append(posicao_atual)
         
-        # Calcular métricas
-        return self._calcular_metricas(posicoes, equity_curve)
+        return posicoes, equity_curve
+    
+    def _simular_sinais_vetorizado(self, dados: pd.DataFrame, codigos: np.ndarray,
+                                   stop_loss_pct: float, take_profit_pct: float):
+        """
+        Simulação por eventos, equivalente a `_simular_sinais_laco`
+        
+        O laço percorre trades, não barras. A saída de cada barra com sinal,
+        caso ela vire uma entrada, é resolvida de uma vez para todas as
+        candidatas: sinal contrário pelo índice do próximo sinal oposto e
+        stop/take pelo núcleo de primeiro toque. O laço só encadeia entradas
+        e saídas e dimensiona as posições com o capital corrente.
+        Os resultados são acumulados nas barras de saída e a curva de capital
+        sai de uma soma acumulada (mesma ordem de somas do laço).
+        """
+        n = len(codigos)
+        deslocamento = len(dados) - n
+        precos = dados['close'].to_numpy()[deslocamento:]
+        datas = dados['data'].iloc[deslocamento:].tolist()
+        codigos = np.asarray(codigos)
+        
+        proximo_sinal = _proxima_ocorrencia(codigos != SINAL_NEUTRO)
+        proxima_compra = _proxima_ocorrencia(codigos == SINAL_COMPRA)
+        proxima_venda = _proxima_ocorrencia(codigos == SINAL_VENDA)
+        
+        # Saída de cada entrada candidata (mesmos níveis de _abrir_posicao)
+        candidatas = np.flatnonzero(codigos != SINAL_NEUTRO)
+        compra = codigos[candidatas] == SINAL_COMPRA
+        oposto = np.where(compra, proxima_venda[candidatas + 1], proxima_compra[candidatas + 1])
+        entrada = precos[candidatas]
+        toques = first_touch(
+            precos, precos, candidatas, np.where(compra, 1, -1),
+            np.where(compra, entrada * (1 - stop_loss_pct), entrada * (1 + stop_loss_pct)),
+            np.where(compra, entrada * (1 + take_profit_pct), entrada * (1 - take_profit_pct)),
+            end_idx=np.minimum(oposto + 1, n), close=precos, fill='close'
+        )
+        candidata = np.full(n, -1)
+        candidata[candidatas] = np.arange(len(candidatas))
+        
+        posicoes = []
+        resultados = np.zeros(n)
+        posicao_atual = None
+        i = proximo_sinal[0] if n else 0
+        
+        while i < n:
+            k = candidata[i]
+            comprado = bool(compra[k])
+            posicao_atual = self._abrir_posicao('LONG' if comprado else 'SHORT', precos[i], datas[i],
+                                                stop_loss_pct, take_profit_pct)
+            
+            if toques.reason[k] != EXIT_NONE:
+                j, motivo = int(toques.exit_idx[k]), "Stop/Take Profit"
+            elif oposto[k] < n:
+                j, motivo = int(oposto[k]), "Sinal de venda" if comprado else "Sinal de compra"
+            else:
+                break
+            
+            posicoes.append(self._fechar_posicao(posicao_atual, precos[j], datas[j], motivo))
+            resultados[j] = posicao_atual.resultado
+            posicao_atual = None
+            
+            # Um sinal na barra de saída abre a próxima posição imediatamente
+            i = j if codigos[j] != SINAL_NEUTRO else proximo_sinal[j + 1]
+        
+        capital = np.cumsum(np.concatenate([[self.capital_inicial], resultados]))[1:]
+        equity_curve = list(zip(datas, capital.tolist()))
+        
+        # Fechar posição final se ainda aberta
+        if posicao_atual:
+            ultima_data = dados.iloc[-1]['data']
+            ultimo_preco = dados.iloc[-1]['close']
+            posicoes.append(self._fechar_posicao(posicao_atual, ultimo_preco, ultima_data,
+                                                 "Fim do período"))
+        
+        return posicoes, equity_curve
     
     def executar_backtest_padroes(self, 
                                 dados: pd.DataFrame,
-                                min_confianca: float = 70.0) -> HistoricoBacktest:
+                                min_confianca: float = 70.0,
+                                incremental: bool = True,
+                                indice: Optional[IndicePadroes] = None,
+                                simbolo: str = "TESTE") -> HistoricoBacktest:
         """
         Executa backtest baseado em padrões gráficos
+        
+        Args:
+            dados: DataFrame com colunas ['data', 'close', ...]
+            min_confianca: Confiança mínima do padrão para operar
+            incremental: Mantém os pivôs da janela deslizante e só reavalia os
+                modelos quando eles mudam (padrão); False redetecta tudo a
+                cada barra, com o mesmo resultado
+            indice: IndicePadroes já atualizado com `dados` (mesma janela e
+                detector); os padrões são lidos do índice, sem redetecção
+            simbolo: Ativo de `dados` no índice e nas posições
         """
         self.capital_atual = self.capital_inicial
         posicoes = []
@@ -175,13 +302,26 @@ class BacktestEngine:
         
         # Detectar padrões em janela deslizante
         janela = 50  # Janela de análise
+        scanner = ScannerPadroesIncremental(
+            self.detector_padroes, dados['close'].to_numpy(dtype=self.dtype), janela
+        ) if incremental and indice is None else None
+        # Padrões visíveis ao fim de cada barra, lidos do índice
+        por_barra = indice.padroes_por_barra(simbolo, dados['data']) if indice is not None else None
         
+        # Entradas: barra, padrão e direção
+        entradas = []
         for i in range(janela, len(dados) - 10):  # Deixar margem para trades
-            dados_janela = dados.iloc[i-janela:i]
-            precos_janela = dados_janela['close'].tolist()
-            
-            # Detectar padrões
-            padroes = self.detector_padroes.detectar_todos_padroes(precos_janela)
+            if por_barra is not None:
+                padroes = por_barra[i - 1]
+                fim_recente = i - 10
+            elif scanner is not None:
+                # Padrões em índices da série completa
+                padroes = scanner.padroes_em(i)
+                fim_recente = i - 10
+            else:
+                precos_janela = dados.iloc[i-janela:i]['close'].to_numpy(dtype=self.dtype)
+                padroes = self.detector_padroes.detectar_todos_padroes(precos_janela)
+                fim_recente = len(precos_janela) - 10
             padroes_validos = [p for p in padroes if p.confianca >= min_confianca]
             
             if padroes_validos:
@@ -189,43 +329,50 @@ class BacktestEngine:
                 padrao = padroes_validos[0]
                 
                 # Verificar se ainda é válido (padrão recente)
-                if padrao.fim >= len(precos_janela) - 10:
-                    data_entrada = dados.iloc[i]['data']
-                    
-                    if padrao.sinal == 'COMPRA' and padrao.preco_entrada:
-                        posicao = Posicao(
-                            simbolo="TESTE",
-                            entrada_preco=padrao.preco_entrada,
-                            entrada_data=data_entrada,
-                            quantidade=int(self.capital_atual * 0.1 / padrao.preco_entrada),
-                            tipo='LONG',
-                            stop_loss=padrao.stop_loss,
-                            take_profit=padrao.take_profit
-                        )
-                        
-                        # Simular execução nos próximos períodos
-                        posicao_fechada = self._simular_execucao_padrao(posicao, dados.iloc[i:i+20])
-                        if posicao_fechada.resultado is not None:
-                            self.capital_atual += posicao_fechada.resultado
-                            posicoes.append(posicao_fechada)
-                    
-                    elif padrao.sinal == 'VENDA' and padrao.preco_entrada:
-                        posicao = Posicao(
-                            simbolo="TESTE",
-                            entrada_preco=padrao.preco_entrada,
-                            entrada_data=data_entrada,
-                            quantidade=int(self.capital_atual * 0.1 / padrao.preco_entrada),
-                            tipo='SHORT',
-                            stop_loss=padrao.stop_loss,
-                            take_profit=padrao.take_profit
-                        )
-                        
-                        posicao_fechada = self._simular_execucao_padrao(posicao, dados.iloc[i:i+20])
-                        if posicao_fechada.resultado is not None:
-                            self.capital_atual += posicao_fechada.resultado
-                            posicoes.append(posicao_fechada)
-            
-            equity_curve.append((dados.iloc[i]['data'], self.capital_atual))
+                if padrao.fim >= fim_recente and padrao.preco_entrada:
+                    if padrao.sinal == 'COMPRA':
+                        entradas.append((i, padrao, 'LONG'))
+                    elif padrao.sinal == 'VENDA':
+                        entradas.append((i, padrao, 'SHORT'))
+        
+        # Simular execução nos próximos 20 períodos de todas as entradas de uma vez
+        precos = dados['close'].to_numpy()
+        datas = dados['data']
+        saidas = first_touch(
+            precos, precos,
+            [i for i, _, _ in entradas],
+            [1 if tipo == 'LONG' else -1 for _, _, tipo in entradas],
+            [padrao.stop_loss for _, padrao, _ in entradas],
+            [padrao.take_profit for _, padrao, _ in entradas],
+            end_idx=[min(i + 20, len(dados)) for i, _, _ in entradas],
+            close=precos, fill='close', include_entry_bar=True
+        )
+        
+        # Tamanho das posições depende do capital, então o resultado é sequencial
+        capital_por_barra = {}
+        for k, (i, padrao, tipo) in enumerate(entradas):
+            posicao = Posicao(
+                simbolo=simbolo,
+                entrada_preco=padrao.preco_entrada,
+                entrada_data=datas.iloc[i],
+                quantidade=int(self.capital_atual * 0.1 / padrao.preco_entrada),
+                tipo=tipo,
+                stop_loss=padrao.stop_loss,
+                take_profit=padrao.take_profit
+            )
+            saida = saidas.exit_idx[k]
+            motivo = "Stop/Take Profit" if saidas.reason[k] != EXIT_NONE else "Fim do período"
+            posicao_fechada = self._fechar_posicao(posicao, precos[saida], datas.iloc[saida], motivo)
+            if posicao_fechada.resultado is not None:
+                self.capital_atual += posicao_fechada.resultado
+                posicoes.append(posicao_fechada)
+            capital_por_barra[i] = self.capital_atual
+        
+        capital = self.capital_inicial
+        barras = range(janela, len(dados) - 10)
+        for i, data in zip(barras, datas.iloc[janela:len(dados) - 10].tolist()):
+            capital = capital_por_barra.get(i, capital)
+            equity_curve.append((data, capital))
         
         return self._calcular_metricas(posicoes, equity_curve)
     
@@ -269,86 +416,46 @@ class BacktestEngine:
         
         return posicao
     
-    def _simular_execucao_padrao(self, posicao: Posicao, dados_futuros: pd.DataFrame) -> Posicao:
-        """Simula execução de uma posição baseada em padrão"""
-        for _, row in dados_futuros.iterrows():
-            preco = row['close']
-            data = row['data']
-            
-            # Verificar condições de saída
-            if posicao.tipo == 'LONG':
-                if (posicao.stop_loss and preco <= posicao.stop_loss) or \
-                   (posicao.take_profit and preco >= posicao.take_profit):
-                    return self._fechar_posicao(posicao, preco, data, "Stop/Take Profit")
-            else:  # SHORT
-                if (posicao.stop_loss and preco >= posicao.stop_loss) or \
-                   (posicao.take_profit and preco <= posicao.take_profit):
-                    return self._fechar_posicao(posicao, preco, data, "Stop/Take Profit")
-        
-        # Se não saiu, fechar na última data
-        ultimo_preco = dados_futuros.iloc[-1]['close']
-        ultima_data = dados_futuros.iloc[-1]['data']
-        return self._fechar_posicao(posicao, ultimo_preco, ultima_data, "Fim do período")
-    
     def _calcular_metricas(self, posicoes: List[Posicao], 
                           equity_curve: List[Tuple[str, float]]) -> HistoricoBacktest:
         """Calcula métricas do backtest"""
+        capital_inicial = float(self.capital_inicial)
+        capital_final = float(self.capital_atual)
         if not posicoes:
             return HistoricoBacktest(
-                capital_inicial=self.capital_inicial,
-                capital_final=self.capital_atual,
+                capital_inicial=capital_inicial,
+                capital_final=capital_final,
                 total_trades=0,
                 trades_vencedores=0,
                 trades_perdedores=0,
-                maior_ganho=0,
-                maior_perda=0,
-                drawdown_maximo=0,
-                retorno_total=0,
-                sharpe_ratio=0,
+                maior_ganho=0.0,
+                maior_perda=0.0,
+                drawdown_maximo=0.0,
+                retorno_total=0.0,
+                sharpe_ratio=0.0,
                 posicoes=[],
                 equity_curve=equity_curve
             )
         
-        resultados = [p.resultado for p in posicoes if p.resultado is not None]
+        resultados = np.array([p.resultado for p in posicoes if p.resultado is not None], dtype=np.float64)
         
-        trades_vencedores = len([r for r in resultados if r > 0])
-        trades_perdedores = len([r for r in resultados if r < 0])
-        maior_ganho = max(resultados) if resultados else 0
-        maior_perda = min(resultados) if resultados else 0
+        # Drawdown sobre a curva de capital, com o capital inicial como primeiro pico
+        capital = np.fromiter((valor for _, valor in equity_curve), dtype=np.float64, count=len(equity_curve))
+        drawdown_maximo = metrics.max_drawdown(capital, initial=capital_inicial)
         
-        # Calcular drawdown máximo
-        picos = []
-        drawdown_maximo = 0
-        pico_atual = self.capital_inicial
+        retorno_total = (capital_final - capital_inicial) / capital_inicial
         
-        for _, capital in equity_curve:
-            if capital > pico_atual:
-                pico_atual = capital
-            picos.append(pico_atual)
-            
-            drawdown = (pico_atual - capital) / pico_atual
-            if drawdown > drawdown_maximo:
-                drawdown_maximo = drawdown
-        
-        retorno_total = (self.capital_atual - self.capital_inicial) / self.capital_inicial
-        
-        # Calcular Sharpe ratio simplificado
-        if resultados:
-            retornos_pct = [r / self.capital_inicial for r in resultados]
-            media_retornos = np.mean(retornos_pct)
-            std_retornos = np.std(retornos_pct)
-            sharpe_ratio = media_retornos / std_retornos if std_retornos > 0 else 0
-        else:
-            sharpe_ratio = 0
+        # Sharpe ratio simplificado: retornos por trade, sem anualização
+        sharpe_ratio = metrics.sharpe_ratio(resultados / capital_inicial)
         
         return HistoricoBacktest(
-            capital_inicial=self.capital_inicial,
-            capital_final=self.capital_atual,
+            capital_inicial=capital_inicial,
+            capital_final=capital_final,
             total_trades=len(posicoes),
-            trades_vencedores=trades_vencedores,
-            trades_perdedores=trades_perdedores,
-            maior_ganho=maior_ganho,
-            maior_perda=maior_perda,
+            trades_vencedores=int(np.sum(resultados > 0)),
+            trades_perdedores=int(np.sum(resultados < 0)),
+            maior_ganho=float(resultados.max()) if resultados.size else 0.0,
+            maior_perda=float(resultados.min()) if resultados.size else 0.0,
             drawdown_maximo=drawdown_maximo * 100,  # Em percentual
             retorno_total=retorno_total * 100,  # Em percentual
             sharpe_ratio=sharpe_ratio,
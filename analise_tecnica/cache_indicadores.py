@@ -0,0 +1,290 @@
+"""
+Cache de Resultados de Indicadores
+Memoização por conteúdo, compartilhada por todo o processo e limitada em memória
+
+Indicadores participam explicitamente com o decorador `memoizar`. A chave é
+(nome do indicador, parâmetros, impressão digital da entrada), onde a
+impressão digital combina tipo, formato e um hash rápido dos bytes do buffer
+(xxhash quando instalado, blake2b caso contrário). Assim, o mesmo RSI sobre a
+mesma janela de fechamentos é calculado uma única vez por tick, mesmo quando
+pedido por componentes diferentes.
+
+Os buffers NumPy em cache são marcados como somente leitura e compartilhados
+entre chamadores. Cada acerto devolve contêineres novos: dicts e listas são
+copiados, Series e DataFrames são cópias profundas (sem depender do
+copy-on-write do pandas 3) e cada IndicadorResult é um objeto novo sobre os
+arrays congelados, de modo que alterar um resultado recebido não afeta o
+cache nem os demais chamadores.
+
+Exemplo:
+    @memoizar('rsi')
+    def calcular_rsi(precos, periodo=14): ...
+
+    CACHE_GLOBAL.estatisticas()  # {'acertos': ..., 'falhas': ..., 'despejos': ...}
+"""
+
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional, Sequence
+import copy
+import functools
+import hashlib
+import inspect
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+try:
+    import xxhash
+except ImportError:  # Dependência opcional; blake2b é mais lento, mas equivalente
+    xxhash = None
+
+
+def _hash_bytes(buffer) -> bytes:
+    """Hash de 64/128 bits dos bytes de um buffer contíguo"""
+    if xxhash is not None:
+        return xxhash.xxh3_64_digest(buffer)
+    return hashlib.blake2b(buffer, digest_size=16).digest()
+
+
+def _impressao_array(array: np.ndarray) -> tuple:
+    if array.dtype == object:
+        array = pd.util.hash_array(array.ravel())
+    array = np.ascontiguousarray(array)
+    return ('nd', array.dtype.str, array.shape, _hash_bytes(array.reshape(-1).view(np.uint8)))
+
+
+def _impressao_indice(indice: pd.Index) -> tuple:
+    if isinstance(indice, pd.RangeIndex):
+        return ('range', indice.start, indice.stop, indice.step)
+    return _impressao_array(np.asarray(indice))
+
+
+def impressao_digital(valor) -> Hashable:
+    """
+    Chave compacta e hashável para um argumento de indicador
+
+    Arrays, Series, DataFrames e listas são resumidos pelo tipo, formato e
+    hash do conteúdo (Series e DataFrames incluem o índice, que aparece nos
+    resultados); escalares e outros hashables são usados diretamente.
+
+    Raises:
+        TypeError: se o valor não puder compor uma chave
+    """
+    if isinstance(valor, np.ndarray):
+        return _impressao_array(valor)
+    if isinstance(valor, pd.Series):
+        return ('series', valor.name, _impressao_array(valor.to_numpy()), _impressao_indice(valor.index))
+    if isinstance(valor, pd.DataFrame):
+        colunas = tuple((coluna, _impressao_array(valor[coluna].to_numpy())) for coluna in valor.columns)
+        return ('frame', colunas, _impressao_indice(valor.index))
+    if isinstance(valor, list):
+        return ('list', _impressao_array(np.asarray(valor)))
+    if isinstance(valor, tuple):
+        return tuple(impressao_digital(item) for item in valor)
+    if isinstance(valor, dict):
+        return ('dict', tuple(sorted((chave, impressao_digital(item)) for chave, item in valor.items())))
+    hash(valor)
+    return valor
+
+
+def _tamanho(valor) -> int:
+    """Estimativa, em bytes, da memória ocupada por um resultado"""
+    if isinstance(valor, np.ndarray):
+        return valor.nbytes
+    if isinstance(valor, (pd.Series, pd.DataFrame)):
+        return int(np.sum(valor.memory_usage(index=True, deep=False)))
+    if isinstance(valor, dict):
+        return sum(_tamanho(item) for item in valor.values()) + sys.getsizeof(valor)
+    if isinstance(valor, (list, tuple)):
+        return sum(_tamanho(item) for item in valor) + sys.getsizeof(valor)
+    arrays = [getattr(valor, atributo, None) for atributo in ('valores_array', 'codigos_sinais', 'timestamps')]
+    if any(isinstance(array, np.ndarray) for array in arrays):
+        return sum(array.nbytes for array in arrays if isinstance(array, np.ndarray)) + 256
+    return sys.getsizeof(valor)
+
+
+def _congelar(valor):
+    """Marca os buffers NumPy do resultado como somente leitura"""
+    if isinstance(valor, np.ndarray):
+        valor.flags.writeable = False
+    elif isinstance(valor, dict):
+        for item in valor.values():
+            _congelar(item)
+    elif isinstance(valor, (list, tuple)):
+        for item in valor:
+            _congelar(item)
+    else:
+        for atributo in ('valores_array', 'codigos_sinais', 'timestamps'):
+            array = getattr(valor, atributo, None)
+            if isinstance(array, np.ndarray):
+                array.flags.writeable = False
+    return valor
+
+
+def _entregar(valor):
+    """Cópia dos contêineres mutáveis entregues a partir do cache"""
+    if isinstance(valor, dict):
+        return {chave: _entregar(item) for chave, item in valor.items()}
+    if isinstance(valor, list):
+        return [_entregar(item) for item in valor]
+    if isinstance(valor, tuple):
+        return tuple(_entregar(item) for item in valor)
+    if isinstance(valor, (pd.Series, pd.DataFrame)):
+        return valor.copy(deep=True)
+    if isinstance(getattr(valor, 'valores_array', None), np.ndarray):
+        # IndicadorResult: objeto novo sobre os arrays congelados
+        return copy.copy(valor)
+    return valor
+
+
+class CacheIndicadores:
+    """
+    Cache LRU limitado pelo total de bytes dos resultados armazenados
+
+    Seguro para uso entre threads; o cálculo de um resultado ausente é feito
+    fora da trava, de modo que chamadas concorrentes à mesma chave podem
+    calcular em duplicidade, mas nunca bloqueiam umas às outras.
+    """
+
+    def __init__(self, limite_bytes: int = 256 * 1024 * 1024):
+        self.limite_bytes = limite_bytes
+        self._entradas: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self._trava = threading.Lock()
+        self.bytes_em_uso = 0
+        self.acertos = 0
+        self.falhas = 0
+        self.despejos = 0
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    def obter(self, chave: Hashable, calcular: Callable[[], object]):
+        """
+        Retorna o resultado da chave, calculando-o em caso de falha
+
+        Args:
+            chave: Chave completa (indicador, parâmetros, impressão digital)
+            calcular: Função sem argumentos que produz o resultado
+        """
+        with self._trava:
+            entrada = self._entradas.get(chave)
+            if entrada is not None:
+                self._entradas.move_to_end(chave)
+                self.acertos += 1
+                return _entregar(entrada[0])
+            self.falhas += 1
+
+        valor = _congelar(calcular())
+        tamanho = _tamanho(valor)
+        if tamanho <= self.limite_bytes:
+            with self._trava:
+                if chave not in self._entradas:
+                    self._entradas[chave] = (valor, tamanho)
+                    self.bytes_em_uso += tamanho
+                    self._despejar()
+        return _entregar(valor)
+
+    def _despejar(self):
+        while self.bytes_em_uso > self.limite_bytes and self._entradas:
+            _, (_, tamanho) = self._entradas.popitem(last=False)
+            self.bytes_em_uso -= tamanho
+            self.despejos += 1
+
+    def redimensionar(self, limite_bytes: int):
+        """Altera o limite de memória, despejando entradas se necessário"""
+        with self._trava:
+            self.limite_bytes = limite_bytes
+            self._despejar()
+
+    def limpar(self):
+        """Remove todas as entradas e zera os contadores"""
+        with self._trava:
+            self._entradas.clear()
+            self.bytes_em_uso = 0
+            self.acertos = self.falhas = self.despejos = 0
+
+    def estatisticas(self) -> Dict[str, float]:
+        """Contadores para dimensionamento do cache"""
+        with self._trava:
+            consultas = self.acertos + self.falhas
+            return {
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'despejos': self.despejos,
+                'taxa_acerto': self.acertos / consultas if consultas else 0.0,
+                'entradas': len(self._entradas),
+                'bytes_em_uso': self.bytes_em_uso,
+                'limite_bytes': self.limite_bytes
+            }
+
+
+CACHE_GLOBAL = CacheIndicadores()
+
+
+def memoizar(nome: Optional[str] = None,
+             ignorar: Sequence[str] = ('grafo',),
+             atributos: Sequence[str] = (),
+             cache: Optional[CacheIndicadores] = None):
+    """
+    Decorador que inclui um indicador no cache por conteúdo
+
+    Args:
+        nome: Identificador do indicador na chave (padrão: nome qualificado
+            da função). Implementações equivalentes podem compartilhar um nome
+            para reaproveitar resultados entre si.
+        ignorar: Argumentos que não alteram o resultado e ficam fora da chave
+        atributos: Atributos de `self` que alteram o resultado (ex.: 'dtype')
+        cache: Instância a usar (padrão: CACHE_GLOBAL)
+
+    Chamadas com argumentos que não podem compor uma chave são executadas
+    diretamente, sem passar pelo cache. Em acertos, o `grafo` recebido (se
+    houver) registra o reuso do indicador.
+    """
+    def decorador(funcao):
+        try:
+            assinatura = inspect.signature(funcao)
+        except (TypeError, ValueError):
+            # Funções de extensão sem assinatura (ex.: talib): chave posicional
+            assinatura = None
+        identificador = nome or funcao.__qualname__
+
+        def _argumentos(args, kwargs) -> Dict:
+            if assinatura is None:
+                return dict(enumerate(args), **kwargs)
+            argumentos = assinatura.bind(*args, **kwargs)
+            argumentos.apply_defaults()
+            return dict(argumentos.arguments)
+
+        @functools.wraps(funcao)
+        def envoltorio(*args, **kwargs):
+            alvo = cache if cache is not None else CACHE_GLOBAL
+            try:
+                argumentos = _argumentos(args, kwargs)
+                instancia = argumentos.pop('self', None)
+                chave = (
+                    identificador,
+                    tuple(getattr(instancia, atributo, None) for atributo in atributos),
+                    tuple((argumento, impressao_digital(valor))
+                          for argumento, valor in argumentos.items()
+                          if argumento not in ignorar)
+                )
+            except TypeError:
+                return funcao(*args, **kwargs)
+            calculado = []
+
+            def calcular():
+                calculado.append(True)
+                return funcao(*args, **kwargs)
+
+            resultado = alvo.obter(chave, calcular)
+            registrar = getattr(argumentos.get('grafo'), 'registrar_acerto_cache', None)
+            if not calculado and registrar is not None:
+                registrar(identificador)
+            return resultado
+
+        envoltorio.sem_cache = funcao
+        return envoltorio
+
+    return decorador
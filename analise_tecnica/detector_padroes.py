@@ -3,13 +3,19 @@ Detector de Padrões de Análise Técnica
 Identifica padrões gráficos clássicos
 """
 
+from collections import deque
+from itertools import islice
+
 import numpy as np
 import pandas as pd
-from typing import List, Dict, Tuple, Optional
-from dataclasses import dataclass
+from typing import Iterable, List, Dict, NamedTuple, Tuple, Optional
+from dataclasses import dataclass, replace
 from enum import Enum
 import logging
 
+from .precisao import resolver_dtype
+from .primitivas import pivos
+
 class TipoPadrao(Enum):
     """Tipos de padrões detectáveis"""
     TRIANGULO_ASCENDENTE = "triangulo_ascendente"
@@ -41,11 +47,32 @@ class PadraoDetectado:
 class DetectorPadroes:
     """
     Classe para detecção de padrões técnicos
+    
+    Os preços são convertidos uma vez para o `dtype` configurado (float64 por
+    padrão, ou float32). Em float32, topos e fundos separados por menos que a
+    resolução do tipo (~1e-7 relativo) podem empatar e mudar a detecção.
+    
+    Com `geometrico=True`, `avaliar_padroes` (e portanto
+    `detectar_todos_padroes`, ScannerPadroesIncremental, IndicePadroes e o
+    PatternScanner) usa os modelos por mínimos quadrados de
+    ModelosGeometricos sobre os mesmos três últimos topos e fundos, no lugar
+    dos detectores individuais abaixo. Os modelos rendem quando avaliados
+    em lote: `avaliar_janelas` ajusta todas as janelas de uma vez, e é o
+    caminho usado por ScannerPadroesIncremental (logo IndicePadroes) e pelo
+    PatternScanner. Uma janela isolada (`avaliar_padroes`, PivotTracker)
+    paga sozinha o custo fixo das operações NumPy.
     """
     
-    def __init__(self, min_confianca: float = 60.0):
+    def __init__(self, min_confianca: float = 60.0, dtype=None, geometrico: bool = False):
         self.logger = logging.getLogger(__name__)
         self.min_confianca = min_confianca
+        self.dtype = resolver_dtype(dtype)
+        self.geometrico = geometrico
+        self.modelos = None
+        if geometrico:
+            # Import tardio: modelos_geometricos importa este módulo
+            from .modelos_geometricos import ModelosGeometricos
+            self.modelos = ModelosGeometricos(min_confianca, n_pivos=3, dtype=self.dtype)
         
     def detectar_topos_fundos(self, precos: List[float], janela: int = 5) -> Tuple[List[int], List[int]]:
         """
@@ -57,23 +84,12 @@ class DetectorPadroes:
             
         Returns:
             Tuple com índices dos topos e fundos
-        """
-        precos_array = np.array(precos)
-        topos = []
-        fundos = []
-        
-        for i in range(janela, len(precos) - janela):
-            # Verificar se é um topo
-            if all(precos_array[i] >= precos_array[i-j] for j in range(1, janela+1)) and \
-               all(precos_array[i] >= precos_array[i+j] for j in range(1, janela+1)):
-                topos.append(i)
-            
-            # Verificar se é um fundo
-            elif all(precos_array[i] <= precos_array[i-j] for j in range(1, janela+1)) and \
-                 all(precos_array[i] <= precos_array[i+j] for j in range(1, janela+1)):
-                fundos.append(i)
         
-        return topos, fundos
+        Um topo é >= às `janela` barras de cada lado; um fundo, <= a elas
+        (ver `primitivas.pivos`, O(n)).
+        """
+        topos, fundos = pivos(np.asarray(precos, dtype=self.dtype), janela)
+        return np.flatnonzero(topos).tolist(), np.flatnonzero(fundos).tolist()
     
     def detectar_triangulo_ascendente(self, precos: List[float], topos: List[int], fundos: List[int]) -> Optional[PadraoDetectado]:
         """
@@ -285,44 +301,96 @@ class DetectorPadroes:
             self.logger.warning("Poucos dados para detecção de padrões")
             return []
         
-        padroes_detectados = []
+        precos = np.asarray(precos, dtype=self.dtype)
         
         try:
             # Detectar topos e fundos
             topos, fundos = self.detectar_topos_fundos(precos)
-            
-            # Detectar diferentes padrões
-            padroes_detectores = [
-                self.detectar_triangulo_ascendente,
-                self.detectar_duplo_topo,
-                self.detectar_cabeca_ombros,
-                self.detectar_canal
-            ]
-            
-            for detector in padroes_detectores:
-                try:
-                    if detector == self.detectar_canal:
-                        padrao = detector(precos, topos, fundos)
-                    elif detector == self.detectar_triangulo_ascendente:
-                        padrao = detector(precos, topos, fundos)
-                    else:
-                        padrao = detector(precos, topos)
-                    
-                    if padrao and padrao.confianca >= self.min_confianca:
-                        padroes_detectados.append(padrao)
-                        
-                except Exception as e:
-                    self.logger.error(f"Erro ao detectar padrão {detector.__name__}: {e}")
-                    continue
-            
         except Exception as e:
             self.logger.error(f"Erro na detecção de padrões: {e}")
+            return []
+        
+        return self.avaliar_padroes(precos, topos, fundos)
+    
+    def avaliar_padroes(self, precos: np.ndarray, topos: List[int], fundos: List[int]) -> List[PadraoDetectado]:
+        """
+        Avalia os modelos de padrão sobre topos e fundos já conhecidos
+        
+        Os modelos usam apenas os três últimos topos e fundos e os preços entre
+        eles, então os índices podem ser de qualquer referencial (janela ou
+        série completa); os padrões retornados usam o mesmo referencial.
+        
+        Args:
+            precos: Array de preços no dtype do detector
+            topos: Índices dos topos, em ordem crescente
+            fundos: Índices dos fundos, em ordem crescente
+            
+        Returns:
+            Padrões com confiança suficiente, ordenados por confiança
+        """
+        if self.modelos is not None:
+            return self.avaliar_janelas(precos, topos, fundos, [len(topos)], [min(len(topos), 3)],
+                                        [len(fundos)], [min(len(fundos), 3)])[0]
+        
+        padroes_detectados = []
+        
+        # Detectar diferentes padrões
+        padroes_detectores = [
+            self.detectar_triangulo_ascendente,
+            self.detectar_duplo_topo,
+            self.detectar_cabeca_ombros,
+            self.detectar_canal
+        ]
+        
+        for detector in padroes_detectores:
+            try:
+                if detector == self.detectar_canal:
+                    padrao = detector(precos, topos, fundos)
+                elif detector == self.detectar_triangulo_ascendente:
+                    padrao = detector(precos, topos, fundos)
+                else:
+                    padrao = detector(precos, topos)
+                
+                if padrao and padrao.confianca >= self.min_confianca:
+                    padroes_detectados.append(padrao)
+                    
+            except Exception as e:
+                self.logger.error(f"Erro ao detectar padrão {detector.__name__}: {e}")
+                continue
         
         # Ordenar por confiança
         padroes_detectados.sort(key=lambda x: x.confianca, reverse=True)
         
         return padroes_detectados
     
+    def avaliar_janelas(self, precos: np.ndarray, topos, fundos, fins_topos, n_topos,
+                        fins_fundos, n_fundos) -> List[List[PadraoDetectado]]:
+        """
+        Avalia várias janelas de pivôs de uma vez
+        
+        A janela w equivale a `avaliar_padroes(precos, topos[fins_topos[w] -
+        n_topos[w]:fins_topos[w]], fundos[...])`. Com `geometrico=True` todas
+        são ajustadas numa única passada de ModelosGeometricos; os detectores
+        clássicos avaliam uma janela por vez.
+        
+        Args:
+            precos: Array de preços no dtype do detector
+            topos: Índices dos topos, em ordem crescente
+            fundos: Índices dos fundos, em ordem crescente
+            fins_topos, n_topos: Fim (exclusivo) e tamanho da fatia de topos de cada janela
+            fins_fundos, n_fundos: Idem para os fundos
+            
+        Returns:
+            Padrões de cada janela, ordenados por confiança
+        """
+        if self.modelos is None:
+            topos, fundos = np.asarray(topos, dtype=np.int64), np.asarray(fundos, dtype=np.int64)
+            return [self.avaliar_padroes(precos, topos[ft - nt:ft].tolist(), fundos[ff - nf:ff].tolist())
+                    for ft, nt, ff, nf in zip(fins_topos, n_topos, fins_fundos, n_fundos)]
+        por_janela = self.modelos.avaliar_janelas(precos, topos, fundos, fins_topos, n_topos,
+                                                  fins_fundos, n_fundos)
+        return [sorted(padroes, key=lambda x: x.confianca, reverse=True) for padroes in por_janela]
+    
     def gerar_relatorio_padroes(self, padroes: List[PadraoDetectado]) -> str:
         """
         Gera relatório dos padrões detectados
@@ -350,6 +418,268 @@ class DetectorPadroes:
         return relatorio
 
 
+class ScannerPadroesIncremental:
+    """
+    Varredura de padrões em janela deslizante sem redetecção completa
+    
+    Equivale a chamar `detectar_todos_padroes(precos[fim - janela:fim])` para
+    cada `fim` crescente, mas mantém a lista de topos e fundos da janela:
+    a cada avanço confirma apenas os pivôs que passaram a ter `janela_pivo`
+    barras à direita dentro da janela e descarta os que saíram pela esquerda.
+    Os modelos só são reavaliados quando os últimos pivôs mudam.
+    
+    Com um detector geométrico, a primeira chamada determina os últimos
+    pivôs de todas as janelas até o fim da série e avalia as janelas
+    distintas num único lote (`DetectorPadroes.avaliar_janelas`); as
+    chamadas seguintes só consultam o resultado.
+    
+    Os padrões retornados usam índices da série completa (não da janela).
+    
+    Exemplo:
+        scanner = ScannerPadroesIncremental(detector, precos, janela=50)
+        for fim in range(50, len(precos)):
+            padroes = scanner.padroes_em(fim)
+    """
+    
+    def __init__(self, detector: DetectorPadroes, precos, janela: int = 50, janela_pivo: int = 5):
+        self.detector = detector
+        self.precos = np.asarray(precos, dtype=detector.dtype)
+        self.janela = janela
+        self.janela_pivo = janela_pivo
+        self.topos: deque = deque()
+        self.fundos: deque = deque()
+        self.reavaliacoes = 0
+        # O status de pivô de cada barra só depende da sua vizinhança
+        self._eh_topo, self._eh_fundo = pivos(self.precos, janela_pivo)
+        self._proximo_candidato = janela_pivo
+        self._fim = None
+        self._chave = None
+        self._padroes: List[PadraoDetectado] = []
+        self._lote = None
+    
+    def padroes_em(self, fim: int) -> List[PadraoDetectado]:
+        """
+        Padrões da janela precos[fim - janela:fim]
+        
+        Args:
+            fim: Fim (exclusivo) da janela; deve ser não decrescente entre chamadas
+        """
+        if self._fim is not None and fim < self._fim:
+            raise ValueError("A janela só pode avançar")
+        self._fim = fim
+        inicio = max(fim - self.janela, 0)
+        if fim - inicio < 20:
+            return []
+        if self.detector.modelos is not None:
+            return self._padroes_do_lote(fim)
+        
+        # Confirmar pivôs com janela_pivo barras à direita dentro da janela
+        ultimo_confirmavel = fim - self.janela_pivo - 1
+        primeiro = max(self._proximo_candidato, inicio + self.janela_pivo)
+        if primeiro <= ultimo_confirmavel:
+            faixa = slice(primeiro, ultimo_confirmavel + 1)
+            self.topos.extend((primeiro + np.flatnonzero(self._eh_topo[faixa])).tolist())
+            self.fundos.extend((primeiro + np.flatnonzero(self._eh_fundo[faixa])).tolist())
+        self._proximo_candidato = max(self._proximo_candidato, ultimo_confirmavel + 1)
+        
+        # Descartar pivôs sem janela_pivo barras à esquerda dentro da janela
+        limite = inicio + self.janela_pivo
+        while self.topos and self.topos[0] < limite:
+            self.topos.popleft()
+        while self.fundos and self.fundos[0] < limite:
+            self.fundos.popleft()
+        
+        ultimos_topos = list(islice(reversed(self.topos), 3))[::-1]
+        ultimos_fundos = list(islice(reversed(self.fundos), 3))[::-1]
+        chave = (tuple(ultimos_topos), tuple(ultimos_fundos))
+        if chave != self._chave:
+            self._chave = chave
+            self._padroes = self.detector.avaliar_padroes(self.precos, ultimos_topos, ultimos_fundos)
+            self.reavaliacoes += 1
+        return list(self._padroes)
+    
+    def _padroes_do_lote(self, fim: int) -> List[PadraoDetectado]:
+        if self._lote is None:
+            self._lote = self._avaliar_lote(fim)
+        primeiro_fim, janela_de, resultados = self._lote
+        chave = int(janela_de[fim - primeiro_fim])
+        if chave != self._chave:
+            self._chave = chave
+            self._padroes = resultados[chave]
+            self.reavaliacoes += 1
+        return list(self._padroes)
+    
+    def _avaliar_lote(self, primeiro_fim: int) -> tuple:
+        """Últimos três topos e fundos de cada janela a partir de `primeiro_fim`, avaliados em lote"""
+        fins = np.arange(primeiro_fim, len(self.precos) + 1)
+        # Pivôs com janela_pivo barras de cada lado dentro da janela
+        primeiros = np.maximum(fins - self.janela, 0) + self.janela_pivo
+        ultimos = fins - self.janela_pivo - 1
+        indices = (np.flatnonzero(self._eh_topo), np.flatnonzero(self._eh_fundo))
+        colunas = []
+        for pivos_serie in indices:
+            fim_fatia = np.searchsorted(pivos_serie, ultimos, side='right')
+            tamanho = np.clip(fim_fatia - np.searchsorted(pivos_serie, primeiros), 0, 3)
+            colunas += [np.where(tamanho > 0, fim_fatia, 0), tamanho]
+        janelas, janela_de = np.unique(np.column_stack(colunas), axis=0, return_inverse=True)
+        resultados = self.detector.avaliar_janelas(self.precos, *indices, *janelas.T)
+        return primeiro_fim, janela_de.ravel(), resultados
+
+
+class PivoConfirmado(NamedTuple):
+    """Topo ou fundo confirmado pelo PivotTracker"""
+    indice: int             # Barra do pivô
+    preco: float
+    tipo: str               # 'topo' ou 'fundo'
+    confirmado_em: int      # Barra em que a confirmação ocorreu
+    latencia: int           # Barras entre o pivô e a confirmação (= janela)
+    instante: object = None               # Timestamp do pivô, se informado
+    instante_confirmacao: object = None   # Timestamp da confirmação, se informado
+
+
+class PivotTracker:
+    """
+    Detecção de topos e fundos preço a preço para uso ao vivo
+    
+    Um pivô com janela `janela` só pode ser confirmado `janela` barras depois,
+    quando toda a vizinhança é conhecida. A cada preço o rastreador avalia
+    apenas a barra que acabou de completar a vizinhança, usando filas
+    monotônicas de máximo/mínimo (O(1) amortizado por preço). A regra é a de
+    `detectar_topos_fundos`: após o preço t, os pivôs confirmados são os de
+    `detectar_topos_fundos(precos[:t+1], janela)`.
+    
+    Os modelos de padrão são reavaliados só quando um pivô novo é emitido e
+    usam os três últimos topos e fundos, como em `detectar_todos_padroes`.
+    Os preços guardados começam no pivô mais antigo ainda usado pelos
+    modelos (limitados a `max_historico`).
+    
+    Exemplo:
+        rastreador = PivotTracker(DetectorPadroes(), janela=5)
+        for preco in feed:
+            for pivo in rastreador.atualizar(preco):
+                ...
+            rastreador.padroes  # Padrões dos últimos pivôs
+    """
+    
+    def __init__(self, detector: Optional[DetectorPadroes] = None, janela: int = 5,
+                 max_pivos: int = 50, max_historico: int = 5000):
+        """
+        Args:
+            detector: Detector com os modelos e a confiança mínima
+            janela: Barras exigidas de cada lado do pivô
+            max_pivos: Pivôs recentes mantidos em `pivos`
+            max_historico: Máximo de preços guardados para os modelos
+        """
+        if janela < 1:
+            raise ValueError("janela deve ser positiva")
+        self.detector = detector or DetectorPadroes()
+        self.janela = janela
+        self.max_historico = max(max_historico, 2 * janela + 1)
+        self.pivos: deque = deque(maxlen=max_pivos)
+        # Índices dos três últimos topos e fundos, os usados pelos modelos
+        self.topos: deque = deque(maxlen=3)
+        self.fundos: deque = deque(maxlen=3)
+        self.padroes: List[PadraoDetectado] = []
+        self.reavaliacoes = 0
+        self.n_precos = 0
+        self._tipo = self.detector.dtype.type
+        self._precos: deque = deque()
+        self._instantes: deque = deque()
+        self._base = 0             # Barra de self._precos[0]
+        self._maximos: deque = deque()  # (barra, preço) com preços decrescentes
+        self._minimos: deque = deque()  # (barra, preço) com preços crescentes
+        self._ultimo_nan = -1
+    
+    def atualizar(self, preco: float, instante=None) -> List[PivoConfirmado]:
+        """
+        Incorpora um novo preço
+        
+        Args:
+            preco: Preço de fechamento mais recente
+            instante: Timestamp da barra (opcional, repassado aos pivôs)
+            
+        Returns:
+            Pivôs confirmados por este preço (no máximo um)
+        """
+        t = self.n_precos
+        preco = self._tipo(preco)
+        self._precos.append(preco)
+        self._instantes.append(instante)
+        self.n_precos += 1
+        
+        largura = 2 * self.janela + 1
+        if np.isnan(preco):
+            self._ultimo_nan = t
+        else:
+            while self._maximos and self._maximos[-1][1] <= preco:
+                self._maximos.pop()
+            self._maximos.append((t, preco))
+            while self._minimos and self._minimos[-1][1] >= preco:
+                self._minimos.pop()
+            self._minimos.append((t, preco))
+        while self._maximos and self._maximos[0][0] <= t - largura:
+            self._maximos.popleft()
+        while self._minimos and self._minimos[0][0] <= t - largura:
+            self._minimos.popleft()
+        
+        candidato = t - self.janela
+        pivo = None
+        if candidato >= self.janela and self._ultimo_nan <= t - largura:
+            preco_candidato = self._precos[candidato - t - 1]
+            if preco_candidato >= self._maximos[0][1]:
+                pivo, destino = 'topo', self.topos
+            elif preco_candidato <= self._minimos[0][1]:
+                pivo, destino = 'fundo', self.fundos
+        
+        if pivo is None:
+            self._aparar()
+            return []
+        
+        confirmado = PivoConfirmado(
+            indice=candidato, preco=float(preco_candidato), tipo=pivo, confirmado_em=t,
+            latencia=t - candidato, instante=self._instantes[candidato - t - 1],
+            instante_confirmacao=instante
+        )
+        destino.append(candidato)
+        self.pivos.append(confirmado)
+        self._aparar()
+        self._reavaliar()
+        return [confirmado]
+    
+    def inicializar(self, precos: Iterable[float]) -> 'PivotTracker':
+        """Semeia o estado a partir de um histórico (mais antigo primeiro)"""
+        for preco in precos:
+            self.atualizar(preco)
+        return self
+    
+    def _aparar(self):
+        """Descarta preços anteriores ao primeiro usado pelos modelos e pela vizinhança"""
+        necessario = self.n_precos - (2 * self.janela + 1)
+        for indices in (self.topos, self.fundos):
+            if indices:
+                necessario = min(necessario, indices[0])
+        necessario = max(necessario, self.n_precos - self.max_historico)
+        while self._base < necessario:
+            self._precos.popleft()
+            self._instantes.popleft()
+            self._base += 1
+        for indices in (self.topos, self.fundos):
+            while indices and indices[0] < self._base:
+                indices.popleft()
+    
+    def _reavaliar(self):
+        precos = np.asarray(self._precos, dtype=self.detector.dtype)
+        base = self._base
+        topos = [i - base for i in self.topos]
+        fundos = [i - base for i in self.fundos]
+        self.padroes = [
+            replace(padrao, inicio=padrao.inicio + base, fim=padrao.fim + base,
+                    pontos_chave=[(i + base, p) for i, p in padrao.pontos_chave])
+            for padrao in self.detector.avaliar_padroes(precos, topos, fundos)
+        ]
+        self.reavaliacoes += 1
+
+
 # Exemplo de uso
 if __name__ == "__main__":
     # Dados de exemplo simulando um duplo topo
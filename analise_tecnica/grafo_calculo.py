@@ -0,0 +1,134 @@
+"""
+Grafo de Cálculo de Indicadores
+Compartilha primitivas intermediárias entre indicadores de uma mesma análise
+"""
+
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+import logging
+
+import numpy as np
+import pandas as pd
+
+from .precisao import resolver_dtype
+from .primitivas import maximo_movel, minimo_movel
+
+
+class GrafoCalculo:
+    """
+    Avaliador de dependências com memoização por requisição
+
+    Cada primitiva (conversão da série, diferenças, ganhos/perdas, médias,
+    desvios e extremos móveis, EMAs, linha do MACD) é um nó identificado por uma chave
+    textual, calculado na primeira solicitação e reutilizado nas seguintes.
+    Uma instância vale para uma única série de preços. Todos os nós são
+    armazenados no `dtype` do grafo (float64 por padrão ou float32).
+    Indicadores servidos pelo cache de indicadores não consultam o grafo e
+    aparecem em `nos_reutilizados` como 'cache(<indicador>)'.
+
+    Exemplo:
+        grafo = GrafoCalculo(precos)
+        analise.analisar_multiplos_indicadores(precos, grafo=grafo)
+        grafo.nos_reutilizados  # {'sma(precos,20)': 1, ...}
+    """
+
+    def __init__(self, precos, dtype=None):
+        self.logger = logging.getLogger(__name__)
+        self.precos_origem = precos
+        self.dtype = resolver_dtype(dtype)
+        self._nos: Dict[str, object] = {}
+        self.nos_calculados: List[str] = []
+        self.nos_reutilizados: Counter = Counter()
+
+    def __len__(self) -> int:
+        return len(self.precos_origem)
+
+    def no(self, chave: str, calcular: Callable[[], object]):
+        """
+        Retorna o valor do nó, calculando-o apenas na primeira solicitação
+
+        Args:
+            chave: Identificador único da primitiva
+            calcular: Função sem argumentos que produz o valor do nó
+        """
+        if chave in self._nos:
+            self.nos_reutilizados[chave] += 1
+            return self._nos[chave]
+        valor = calcular()
+        self._nos[chave] = valor
+        self.nos_calculados.append(chave)
+        return valor
+
+    def registrar_acerto_cache(self, indicador: str):
+        """Registra um indicador servido pelo cache, sem passar pelos nós"""
+        self.nos_reutilizados[f'cache({indicador})'] += 1
+
+    # Primitivas
+
+    def precos(self) -> np.ndarray:
+        return self.no('precos', lambda: np.asarray(self.precos_origem, dtype=self.dtype))
+
+    def datas(self) -> Optional[np.ndarray]:
+        def calcular():
+            origem = self.precos_origem
+            if isinstance(origem, pd.Series) and isinstance(origem.index, pd.DatetimeIndex):
+                return origem.index.values
+            return None
+        return self.no('datas', calcular)
+
+    def deltas(self) -> np.ndarray:
+        return self.no('deltas', lambda: np.diff(self.precos()))
+
+    def ganhos(self) -> np.ndarray:
+        return self.no('ganhos', lambda: np.where(self.deltas() > 0, self.deltas(), 0))
+
+    def perdas(self) -> np.ndarray:
+        return self.no('perdas', lambda: np.where(self.deltas() < 0, -self.deltas(), 0))
+
+    def serie(self, fonte: str = 'precos') -> pd.Series:
+        """Série pandas de uma primitiva 1-D ('precos', 'ganhos', 'perdas' ou outro nó)"""
+        return self.no(f'serie({fonte})', lambda: pd.Series(self._array(fonte)))
+
+    def _array(self, fonte: str) -> np.ndarray:
+        if fonte in ('precos', 'ganhos', 'perdas', 'deltas'):
+            return getattr(self, fonte)()
+        if fonte not in self._nos:
+            raise KeyError(f"Nó desconhecido no grafo: {fonte}")
+        return self._nos[fonte]
+
+    def media_movel(self, periodo: int, fonte: str = 'precos') -> np.ndarray:
+        return self.no(f'sma({fonte},{periodo})',
+                       lambda: self.serie(fonte).rolling(window=periodo).mean().to_numpy(self.dtype))
+
+    def desvio_movel(self, periodo: int, fonte: str = 'precos') -> np.ndarray:
+        return self.no(f'std({fonte},{periodo})',
+                       lambda: self.serie(fonte).rolling(window=periodo).std().to_numpy(self.dtype))
+
+    def ema(self, span: int, fonte: str = 'precos') -> np.ndarray:
+        return self.no(f'ema({fonte},{span})',
+                       lambda: self.serie(fonte).ewm(span=span).mean().to_numpy(self.dtype))
+
+    def maximo_movel(self, periodo: int, fonte: str = 'precos') -> np.ndarray:
+        return self.no(f'max({fonte},{periodo})', lambda: maximo_movel(self._array(fonte), periodo))
+
+    def minimo_movel(self, periodo: int, fonte: str = 'precos') -> np.ndarray:
+        return self.no(f'min({fonte},{periodo})', lambda: minimo_movel(self._array(fonte), periodo))
+
+    def linha_macd(self, periodo_rapido: int, periodo_lento: int) -> np.ndarray:
+        return self.no(f'macd({periodo_rapido},{periodo_lento})',
+                       lambda: self.ema(periodo_rapido) - self.ema(periodo_lento))
+
+    def sinal_macd(self, periodo_rapido: int, periodo_lento: int, periodo_sinal: int) -> np.ndarray:
+        self.linha_macd(periodo_rapido, periodo_lento)
+        return self.ema(periodo_sinal, fonte=f'macd({periodo_rapido},{periodo_lento})')
+
+    def relatorio(self) -> str:
+        """Resumo dos nós calculados e reutilizados"""
+        linhas = [f"Nós calculados: {len(self.nos_calculados)}"]
+        for chave in self.nos_calculados:
+            reusos = self.nos_reutilizados.get(chave, 0)
+            linhas.append(f"  {chave}" + (f" (reutilizado {reusos}x)" if reusos else ""))
+        for chave, reusos in self.nos_reutilizados.items():
+            if chave.startswith('cache('):
+                linhas.append(f"  {chave} (reutilizado {reusos}x)")
+        return "\n".join(linhas)
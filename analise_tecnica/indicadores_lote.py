@@ -0,0 +1,230 @@
+"""
+Indicadores Técnicos em Lote (Múltiplos Ativos)
+Cálculo vetorizado sobre matrizes de preços (ativos x tempo)
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import numpy as np
+
+from .primitivas import (
+    diferenca, ganhos_perdas, media_movel, desvio_movel, media_exponencial, contar_validos,
+    maximo_movel, minimo_movel, desvio_medio_movel
+)
+from .indicadores_tecnicos import (
+    sinais_por_limiares, sinais_cruzamento_zero, sinais_por_bandas, sinais_preco_media
+)
+
+
+@dataclass
+class IndicadorMatriz:
+    """
+    Resultado de um indicador para vários ativos
+
+    `valores` e `sinais` têm o formato da matriz de entrada (ativos x tempo);
+    posições sem valor (aquecimento, preenchimento ou histórico curto) são
+    NaN em `valores` e NEUTRO (0) em `sinais`.
+    """
+    nome: str
+    valores: np.ndarray
+    sinais: np.ndarray
+    parametros: Dict
+
+
+def preparar_matriz(matriz) -> np.ndarray:
+    """Valida e converte a entrada em matriz float (ativos x tempo)"""
+    matriz = np.asarray(matriz, dtype=np.result_type(np.asarray(matriz), np.float32))
+    if matriz.ndim == 1:
+        matriz = matriz[np.newaxis, :]
+    if matriz.ndim != 2:
+        raise ValueError("Matriz de preços deve ter formato (ativos x tempo)")
+    return matriz
+
+
+def _mascarar_curtos(valores: np.ndarray, matriz: np.ndarray, minimo: int) -> np.ndarray:
+    """Anula linhas com histórico menor que o mínimo exigido pelo indicador"""
+    curtos = contar_validos(matriz) < minimo
+    if curtos.any():
+        valores[curtos] = np.nan
+    return valores
+
+
+def rsi_lote(matriz: np.ndarray, periodo: int = 14) -> IndicadorMatriz:
+    """RSI para cada linha da matriz (ver `AnalisisTecnica.calcular_rsi`)"""
+    matriz = preparar_matriz(matriz)
+    ganhos, perdas = ganhos_perdas(diferenca(matriz))
+    avg_ganhos = media_movel(ganhos, periodo)
+    avg_perdas = media_movel(perdas, periodo)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100 - (100 / (1 + avg_ganhos / avg_perdas))
+    rsi = _mascarar_curtos(rsi, matriz, periodo + 1)
+
+    return IndicadorMatriz(
+        nome='RSI',
+        valores=rsi,
+        sinais=sinais_por_limiares(rsi, 30, 70),
+        parametros={'periodo': periodo, 'sobrecompra': 70, 'sobrevenda': 30}
+    )
+
+
+def macd_lote(matriz: np.ndarray,
+              periodo_rapido: int = 12,
+              periodo_lento: int = 26,
+              periodo_sinal: int = 9) -> IndicadorMatriz:
+    """Histograma do MACD para cada linha (ver `AnalisisTecnica.calcular_macd`)"""
+    matriz = preparar_matriz(matriz)
+    macd_line = media_exponencial(matriz, periodo_rapido) - media_exponencial(matriz, periodo_lento)
+    histogram = macd_line - media_exponencial(macd_line, periodo_sinal)
+    histogram = _mascarar_curtos(histogram, matriz, periodo_lento)
+
+    return IndicadorMatriz(
+        nome='MACD',
+        valores=histogram,
+        sinais=sinais_cruzamento_zero(histogram),
+        parametros={
+            'periodo_rapido': periodo_rapido,
+            'periodo_lento': periodo_lento,
+            'periodo_sinal': periodo_sinal
+        }
+    )
+
+
+def bollinger_lote(matriz: np.ndarray,
+                   periodo: int = 20,
+                   desvios: float = 2.0) -> Dict[str, IndicadorMatriz]:
+    """Bandas de Bollinger para cada linha (ver `calcular_bollinger_bands`)"""
+    matriz = preparar_matriz(matriz)
+    sma = _mascarar_curtos(media_movel(matriz, periodo), matriz, periodo)
+    std = desvio_movel(matriz, periodo)
+    banda_superior = sma + std * desvios
+    banda_inferior = sma - std * desvios
+
+    parametros = {'periodo': periodo, 'desvios': desvios}
+    neutros = np.zeros(matriz.shape, dtype=np.int8)
+    return {
+        'media': IndicadorMatriz('BB_Media', sma,
+                                 sinais_por_bandas(matriz, banda_inferior, banda_superior), parametros),
+        'superior': IndicadorMatriz('BB_Superior', banda_superior, neutros, parametros),
+        'inferior': IndicadorMatriz('BB_Inferior', banda_inferior, neutros, parametros)
+    }
+
+
+def media_movel_lote(matriz: np.ndarray, periodo: int = 20, tipo: str = 'SMA') -> IndicadorMatriz:
+    """SMA ou EMA para cada linha (ver `AnalisisTecnica.calcular_media_movel`)"""
+    matriz = preparar_matriz(matriz)
+    if tipo == 'SMA':
+        media = media_movel(matriz, periodo)
+    elif tipo == 'EMA':
+        media = media_exponencial(matriz, periodo)
+    else:
+        raise ValueError("Tipo deve ser 'SMA' ou 'EMA'")
+    media = _mascarar_curtos(media, matriz, periodo)
+
+    return IndicadorMatriz(
+        nome=f'{tipo}_{periodo}',
+        valores=media,
+        sinais=sinais_preco_media(matriz, media),
+        parametros={'periodo': periodo, 'tipo': tipo}
+    )
+
+
+def _maximas_minimas(matriz: np.ndarray, maximas, minimas):
+    """Matrizes de máximas e mínimas (fechamentos quando não informadas)"""
+    maximas = matriz if maximas is None else preparar_matriz(maximas)
+    minimas = matriz if minimas is None else preparar_matriz(minimas)
+    if maximas.shape != matriz.shape or minimas.shape != matriz.shape:
+        raise ValueError("Máximas e mínimas devem ter o formato da matriz de preços")
+    return maximas, minimas
+
+
+def estocastico_lote(matriz: np.ndarray,
+                     maximas: Optional[np.ndarray] = None,
+                     minimas: Optional[np.ndarray] = None,
+                     periodo_k: int = 14,
+                     periodo_d: int = 3) -> Dict[str, IndicadorMatriz]:
+    """Estocástico %K/%D para cada linha (ver `AnalisisTecnica.calcular_estocastico`)"""
+    matriz = preparar_matriz(matriz)
+    maximas, minimas = _maximas_minimas(matriz, maximas, minimas)
+    maxima_periodo = maximo_movel(maximas, periodo_k)
+    minima_periodo = minimo_movel(minimas, periodo_k)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        k = 100 * (matriz - minima_periodo) / (maxima_periodo - minima_periodo)
+    k = _mascarar_curtos(k, matriz, periodo_k)
+    d = media_movel(k, periodo_d)
+
+    parametros = {'periodo_k': periodo_k, 'periodo_d': periodo_d, 'sobrecompra': 80, 'sobrevenda': 20}
+    return {
+        'K': IndicadorMatriz('Stochastic_K', k, sinais_por_limiares(k, 20, 80), parametros),
+        'D': IndicadorMatriz('Stochastic_D', d, sinais_por_limiares(d, 20, 80), parametros)
+    }
+
+
+def williams_r_lote(matriz: np.ndarray,
+                    maximas: Optional[np.ndarray] = None,
+                    minimas: Optional[np.ndarray] = None,
+                    periodo: int = 14) -> IndicadorMatriz:
+    """Williams %R para cada linha (ver `AnalisisTecnica.calcular_williams_r`)"""
+    matriz = preparar_matriz(matriz)
+    maximas, minimas = _maximas_minimas(matriz, maximas, minimas)
+    maxima_periodo = maximo_movel(maximas, periodo)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        williams = -100 * (maxima_periodo - matriz) / (maxima_periodo - minimo_movel(minimas, periodo))
+    williams = _mascarar_curtos(williams, matriz, periodo)
+
+    return IndicadorMatriz(
+        nome='Williams%R',
+        valores=williams,
+        sinais=sinais_por_limiares(williams, -80, -20),
+        parametros={'periodo': periodo, 'sobrecompra': -20, 'sobrevenda': -80}
+    )
+
+
+def cci_lote(matriz: np.ndarray,
+             maximas: Optional[np.ndarray] = None,
+             minimas: Optional[np.ndarray] = None,
+             periodo: int = 20,
+             constante: float = 0.015) -> IndicadorMatriz:
+    """CCI para cada linha (ver `AnalisisTecnica.calcular_cci`)"""
+    matriz = preparar_matriz(matriz)
+    maximas, minimas = _maximas_minimas(matriz, maximas, minimas)
+    preco_tipico = (maximas + minimas + matriz) / 3
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cci = (preco_tipico - media_movel(preco_tipico, periodo)) / \
+              (constante * desvio_medio_movel(preco_tipico, periodo))
+    cci = _mascarar_curtos(cci, matriz, periodo)
+
+    return IndicadorMatriz(
+        nome='CCI',
+        valores=cci,
+        sinais=sinais_por_limiares(cci, -100, 100),
+        parametros={'periodo': periodo, 'constante': constante, 'sobrecompra': 100, 'sobrevenda': -100}
+    )
+
+
+def analisar_matriz(matriz: np.ndarray) -> Dict[str, IndicadorMatriz]:
+    """
+    Executa o conjunto padrão de indicadores sobre todos os ativos de uma vez
+
+    Equivalente a chamar `AnalisisTecnica.analisar_multiplos_indicadores` em
+    cada linha, mas em uma única passada vetorizada no eixo do tempo.
+
+    Args:
+        matriz: Preços de fechamento (ativos x tempo), com NaN no início das
+            linhas cujo histórico é mais curto
+
+    Returns:
+        Dict com uma matriz por indicador, nas mesmas chaves da versão por ativo
+    """
+    matriz = preparar_matriz(matriz)
+    resultados = {'RSI': rsi_lote(matriz)}
+    resultados['MACD'] = macd_lote(matriz)
+    resultados.update(bollinger_lote(matriz))
+    resultados['SMA_20'] = media_movel_lote(matriz, 20, 'SMA')
+    resultados['EMA_20'] = media_movel_lote(matriz, 20, 'EMA')
+    resultados['SMA_50'] = media_movel_lote(matriz, 50, 'SMA')
+    return resultados
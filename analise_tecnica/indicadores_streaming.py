@@ -0,0 +1,570 @@
+"""
+Indicadores Técnicos Incrementais (Streaming)
+Atualização O(1) por preço para uso no loop ao vivo
+"""
+
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Iterable, Optional
+import math
+
+import numpy as np
+import pandas as pd
+
+
+class IndicadorStreaming(ABC):
+    """
+    Base para indicadores incrementais.
+
+    Cada instância mantém o estado de um indicador para um único ativo.
+    `atualizar` consome um novo preço em tempo constante e devolve o valor
+    corrente (None enquanto o indicador aquece); `inicializar` semeia o
+    estado a partir do histórico. Os valores e sinais reproduzem as versões
+    em lote de `AnalisisTecnica`.
+    """
+
+    nome = 'Indicador'
+
+    def __init__(self):
+        self.valor: Optional[float] = None
+        self.sinal: str = 'NEUTRO'
+        self.n_precos = 0
+
+    @property
+    def pronto(self) -> bool:
+        """Indica se o indicador já possui valor válido"""
+        return self.valor is not None
+
+    @abstractmethod
+    def atualizar(self, preco: float) -> Optional[float]:
+        """
+        Incorpora um novo preço ao indicador
+
+        Args:
+            preco: Preço de fechamento mais recente
+
+        Returns:
+            Valor atual do indicador ou None durante o aquecimento
+        """
+        pass
+
+    def inicializar(self, precos: Iterable[float]) -> 'IndicadorStreaming':
+        """
+        Semeia o estado a partir de um histórico de preços
+
+        Args:
+            precos: Histórico de preços de fechamento (mais antigo primeiro)
+
+        Returns:
+            A própria instância, pronta para receber novos preços
+        """
+        for preco in precos:
+            self.atualizar(float(preco))
+        return self
+
+
+class _EMAIncremental:
+    """
+    EMA equivalente a `pd.Series.ewm(span=...).mean()` (adjust=True).
+
+    Mantém numerador e denominador da média ponderada, de modo que cada
+    atualização custa O(1) e o resultado coincide com a versão em lote.
+    """
+
+    def __init__(self, span: int):
+        self.span = span
+        self.decaimento = 1.0 - 2.0 / (span + 1.0)
+        self.numerador = 0.0
+        self.denominador = 0.0
+
+    @property
+    def valor(self) -> Optional[float]:
+        if self.denominador == 0.0:
+            return None
+        return self.numerador / self.denominador
+
+    def atualizar(self, x: float) -> float:
+        self.numerador = x + self.decaimento * self.numerador
+        self.denominador = 1.0 + self.decaimento * self.denominador
+        return self.numerador / self.denominador
+
+    def semear(self, ultimo_valor: float, n_observacoes: int):
+        """Restaura o estado a partir do último valor em lote"""
+        if n_observacoes == 0:
+            self.numerador = self.denominador = 0.0
+            return
+        alpha = 1.0 - self.decaimento
+        self.denominador = (1.0 - self.decaimento ** n_observacoes) / alpha
+        self.numerador = ultimo_valor * self.denominador
+
+
+class _JanelaSoma:
+    """
+    Soma móvel de tamanho fixo com ressincronização periódica.
+
+    A soma corrente é recalculada a cada `tamanho` inserções para evitar o
+    acúmulo de erro de arredondamento, mantendo custo amortizado O(1).
+    """
+
+    def __init__(self, tamanho: int):
+        self.tamanho = tamanho
+        self.valores = deque(maxlen=tamanho)
+        self.soma = 0.0
+        self._desde_ressinc = 0
+
+    @property
+    def cheia(self) -> bool:
+        return len(self.valores) == self.tamanho
+
+    def adicionar(self, x: float):
+        if self.cheia:
+            self.soma -= self.valores[0]
+        self.valores.append(x)
+        self.soma += x
+        self._desde_ressinc += 1
+        if self._desde_ressinc >= self.tamanho:
+            self.soma = math.fsum(self.valores)
+            self._desde_ressinc = 0
+
+    def media(self) -> float:
+        return self.soma / len(self.valores)
+
+
+class RSIStreaming(IndicadorStreaming):
+    """RSI incremental, equivalente a `AnalisisTecnica.calcular_rsi`"""
+
+    nome = 'RSI'
+
+    def __init__(self, periodo: int = 14, sobrecompra: float = 70, sobrevenda: float = 30):
+        super().__init__()
+        self.periodo = periodo
+        self.sobrecompra = sobrecompra
+        self.sobrevenda = sobrevenda
+        self._ganhos = _JanelaSoma(periodo)
+        self._perdas = _JanelaSoma(periodo)
+        self._ultimo_preco: Optional[float] = None
+
+    def atualizar(self, preco: float) -> Optional[float]:
+        self.n_precos += 1
+        if self._ultimo_preco is None:
+            self._ultimo_preco = preco
+            return None
+
+        delta = preco - self._ultimo_preco
+        self._ultimo_preco = preco
+        self._ganhos.adicionar(delta if delta > 0 else 0.0)
+        self._perdas.adicionar(-delta if delta < 0 else 0.0)
+
+        if not self._ganhos.cheia:
+            return None
+
+        media_ganhos = self._ganhos.media()
+        media_perdas = self._perdas.media()
+        if media_perdas == 0:
+            # Janela sem perdas: 100; janela plana: indefinido (descartado no lote)
+            self.valor = 100.0 if media_ganhos > 0 else float('nan')
+        else:
+            rs = media_ganhos / media_perdas
+            self.valor = 100 - (100 / (1 + rs))
+
+        if self.valor >= self.sobrecompra:
+            self.sinal = 'VENDA'
+        elif self.valor <= self.sobrevenda:
+            self.sinal = 'COMPRA'
+        else:
+            self.sinal = 'NEUTRO'
+
+        return self.valor
+
+    def inicializar(self, precos: Iterable[float]) -> 'RSIStreaming':
+        precos = np.asarray(list(precos), dtype=float)
+        # Apenas os últimos `periodo` deltas influenciam o estado
+        cauda = precos[-(self.periodo + 1):]
+        self.n_precos += len(precos) - len(cauda)
+        for preco in cauda:
+            self.atualizar(float(preco))
+        return self
+
+
+class MACDStreaming(IndicadorStreaming):
+    """
+    MACD incremental, equivalente a `AnalisisTecnica.calcular_macd`.
+
+    O valor retornado é o histograma (MACD - sinal), como na versão em lote.
+    """
+
+    nome = 'MACD'
+
+    def __init__(self, periodo_rapido: int = 12, periodo_lento: int = 26, periodo_sinal: int = 9):
+        super().__init__()
+        self.periodo_rapido = periodo_rapido
+        self.periodo_lento = periodo_lento
+        self.periodo_sinal = periodo_sinal
+        self._ema_rapida = _EMAIncremental(periodo_rapido)
+        self._ema_lenta = _EMAIncremental(periodo_lento)
+        self._ema_sinal = _EMAIncremental(periodo_sinal)
+        self.linha_macd: Optional[float] = None
+        self.linha_sinal: Optional[float] = None
+
+    def atualizar(self, preco: float) -> Optional[float]:
+        self.n_precos += 1
+        self.linha_macd = self._ema_rapida.atualizar(preco) - self._ema_lenta.atualizar(preco)
+        self.linha_sinal = self._ema_sinal.atualizar(self.linha_macd)
+        self._registrar(self.linha_macd - self.linha_sinal)
+        return self.valor
+
+    def _registrar(self, histograma: float):
+        anterior = self.valor
+        self.valor = histograma
+        if anterior is not None and histograma > 0 and anterior <= 0:
+            self.sinal = 'COMPRA'  # Cruzamento para cima
+        elif anterior is not None and histograma < 0 and anterior >= 0:
+            self.sinal = 'VENDA'  # Cruzamento para baixo
+        else:
+            self.sinal = 'NEUTRO'
+
+    def inicializar(self, precos: Iterable[float]) -> 'MACDStreaming':
+        precos_series = pd.Series(list(precos), dtype=float)
+        if precos_series.empty:
+            return self
+        if self.n_precos > 0:
+            # Estado já existente: segue pelo caminho incremental
+            for preco in precos_series:
+                self.atualizar(float(preco))
+            return self
+
+        n = len(precos_series)
+        ema_rapida = precos_series.ewm(span=self.periodo_rapido).mean()
+        ema_lenta = precos_series.ewm(span=self.periodo_lento).mean()
+        macd_line = ema_rapida - ema_lenta
+        signal_line = macd_line.ewm(span=self.periodo_sinal).mean()
+        histogram = macd_line - signal_line
+
+        self._ema_rapida.semear(ema_rapida.iloc[-1], n)
+        self._ema_lenta.semear(ema_lenta.iloc[-1], n)
+        self._ema_sinal.semear(signal_line.iloc[-1], n)
+        self.linha_macd = float(macd_line.iloc[-1])
+        self.linha_sinal = float(signal_line.iloc[-1])
+        self.n_precos = n
+
+        if n > 1:
+            self.valor = float(histogram.iloc[-2])
+        self._registrar(float(histogram.iloc[-1]))
+        return self
+
+
+class BollingerStreaming(IndicadorStreaming):
+    """
+    Bandas de Bollinger incrementais, equivalentes a
+    `AnalisisTecnica.calcular_bollinger_bands`.
+
+    O valor retornado é a banda média; `superior` e `inferior` acompanham.
+    A variância da janela é mantida por atualização de Welford com remoção.
+    """
+
+    nome = 'BollingerBands'
+
+    def __init__(self, periodo: int = 20, desvios: float = 2.0):
+        super().__init__()
+        self.periodo = periodo
+        self.desvios = desvios
+        self._janela = deque(maxlen=periodo)
+        self._media = 0.0
+        self._m2 = 0.0
+        self._desde_ressinc = 0
+        self.superior: Optional[float] = None
+        self.inferior: Optional[float] = None
+
+    def _ressincronizar(self):
+        valores = np.fromiter(self._janela, dtype=float)
+        self._media = float(valores.mean())
+        self._m2 = float(((valores - self._media) ** 2).sum())
+        self._desde_ressinc = 0
+
+    def atualizar(self, preco: float) -> Optional[float]:
+        self.n_precos += 1
+        if len(self._janela) == self.periodo:
+            antigo = self._janela[0]
+            self._janela.append(preco)
+            delta = preco - antigo
+            media_anterior = self._media
+            self._media += delta / self.periodo
+            self._m2 += delta * (preco - self._media + antigo - media_anterior)
+        else:
+            self._janela.append(preco)
+            n = len(self._janela)
+            delta = preco - self._media
+            self._media += delta / n
+            self._m2 += delta * (preco - self._media)
+
+        self._desde_ressinc += 1
+        if self._desde_ressinc >= self.periodo:
+            self._ressincronizar()
+
+        if len(self._janela) < self.periodo:
+            return None
+
+        variancia = max(self._m2, 0.0) / (self.periodo - 1) if self.periodo > 1 else float('nan')
+        desvio = math.sqrt(variancia)
+        self.valor = self._media
+        self.superior = self._media + desvio * self.desvios
+        self.inferior = self._media - desvio * self.desvios
+
+        if preco <= self.inferior:
+            self.sinal = 'COMPRA'  # Preço na banda inferior
+        elif preco >= self.superior:
+            self.sinal = 'VENDA'  # Preço na banda superior
+        else:
+            self.sinal = 'NEUTRO'
+
+        return self.valor
+
+    def inicializar(self, precos: Iterable[float]) -> 'BollingerStreaming':
+        precos = np.asarray(list(precos), dtype=float)
+        cauda = precos[-self.periodo:]
+        self.n_precos += len(precos) - len(cauda)
+        for preco in cauda:
+            self.atualizar(float(preco))
+        return self
+
+
+class MediaMovelStreaming(IndicadorStreaming):
+    """Média móvel incremental (SMA ou EMA), equivalente a `calcular_media_movel`"""
+
+    def __init__(self, periodo: int = 20, tipo: str = 'SMA'):
+        super().__init__()
+        if tipo not in ('SMA', 'EMA'):
+            raise ValueError("Tipo deve ser 'SMA' ou 'EMA'")
+        self.periodo = periodo
+        self.tipo = tipo
+        self.nome = f'{tipo}_{periodo}'
+        self._janela = _JanelaSoma(periodo)
+        self._ema = _EMAIncremental(periodo)
+
+    def atualizar(self, preco: float) -> Optional[float]:
+        self.n_precos += 1
+        if self.tipo == 'SMA':
+            self._janela.adicionar(preco)
+            if not self._janela.cheia:
+                return None
+            self.valor = self._janela.media()
+        else:
+            # A EMA em lote não tem aquecimento: há valor desde o primeiro preço
+            self.valor = self._ema.atualizar(preco)
+
+        self._classificar(preco)
+        return self.valor
+
+    def _classificar(self, preco: float):
+        if preco > self.valor:
+            self.sinal = 'COMPRA'  # Preço acima da média
+        elif preco < self.valor:
+            self.sinal = 'VENDA'  # Preço abaixo da média
+        else:
+            self.sinal = 'NEUTRO'
+
+    def inicializar(self, precos: Iterable[float]) -> 'MediaMovelStreaming':
+        precos = np.asarray(list(precos), dtype=float)
+        if len(precos) == 0:
+            return self
+
+        if self.tipo == 'SMA':
+            cauda = precos[-self.periodo:]
+            self.n_precos += len(precos) - len(cauda)
+            for preco in cauda:
+                self.atualizar(float(preco))
+            return self
+
+        if self.n_precos > 0:
+            for preco in precos:
+                self.atualizar(float(preco))
+            return self
+
+        ema = pd.Series(precos).ewm(span=self.periodo).mean()
+        self._ema.semear(float(ema.iloc[-1]), len(precos))
+        self.n_precos = len(precos)
+        self.valor = float(ema.iloc[-1])
+        self._classificar(float(precos[-1]))
+        return self
+
+
+class _ExtremoMovel:
+    """
+    Máximo ou mínimo das últimas `tamanho` observações em O(1) amortizado.
+
+    Deque monotônico de (índice, valor): cada valor entra e sai uma única
+    vez, e o extremo corrente está sempre na frente.
+    """
+
+    def __init__(self, tamanho: int, maximo: bool = True):
+        self.tamanho = tamanho
+        self.maximo = maximo
+        self._fila = deque()
+        self._indice = 0
+
+    @property
+    def valor(self) -> float:
+        return self._fila[0][1]
+
+    @property
+    def cheio(self) -> bool:
+        return self._indice >= self.tamanho
+
+    def adicionar(self, x: float):
+        fila = self._fila
+        if self.maximo:
+            while fila and fila[-1][1] <= x:
+                fila.pop()
+        else:
+            while fila and fila[-1][1] >= x:
+                fila.pop()
+        fila.append((self._indice, x))
+        if fila[0][0] <= self._indice - self.tamanho:
+            fila.popleft()
+        self._indice += 1
+
+
+def _sinal_por_limiares(valor: float, sobrevenda: float, sobrecompra: float) -> str:
+    """Mesma regra de `sinais_por_limiares`; NaN é NEUTRO"""
+    if valor >= sobrecompra:
+        return 'VENDA'
+    if valor <= sobrevenda:
+        return 'COMPRA'
+    return 'NEUTRO'
+
+
+class _OsciladorHLC(IndicadorStreaming):
+    """
+    Base para osciladores de máxima/mínima/fechamento.
+
+    `atualizar` aceita a máxima e a mínima da barra; sem elas, usa o
+    fechamento, como as versões em lote. `_memoria` é o número de barras
+    finais que determina todo o estado.
+    """
+
+    _memoria = 1
+
+    @abstractmethod
+    def atualizar(self, preco: float, maxima: Optional[float] = None,
+                  minima: Optional[float] = None) -> Optional[float]:
+        pass
+
+    def inicializar(self, precos: Iterable[float],
+                    maximas: Optional[Iterable[float]] = None,
+                    minimas: Optional[Iterable[float]] = None) -> '_OsciladorHLC':
+        precos = np.asarray(list(precos), dtype=float)
+        maximas = precos if maximas is None else np.asarray(list(maximas), dtype=float)
+        minimas = precos if minimas is None else np.asarray(list(minimas), dtype=float)
+        inicio = max(len(precos) - self._memoria, 0)
+        self.n_precos += inicio
+        for preco, maxima, minima in zip(precos[inicio:], maximas[inicio:], minimas[inicio:]):
+            self.atualizar(float(preco), float(maxima), float(minima))
+        return self
+
+
+class EstocasticoStreaming(_OsciladorHLC):
+    """
+    Estocástico incremental, equivalente a `AnalisisTecnica.calcular_estocastico`.
+
+    O valor retornado é o %K; `d` acompanha o %D e o sinal segue o %K.
+    """
+
+    nome = 'Stochastic'
+
+    def __init__(self, periodo_k: int = 14, periodo_d: int = 3,
+                 sobrecompra: float = 80, sobrevenda: float = 20):
+        super().__init__()
+        self.periodo_k = periodo_k
+        self.periodo_d = periodo_d
+        self.sobrecompra = sobrecompra
+        self.sobrevenda = sobrevenda
+        self._maxima = _ExtremoMovel(periodo_k, maximo=True)
+        self._minima = _ExtremoMovel(periodo_k, maximo=False)
+        self._ks = deque(maxlen=periodo_d)
+        self._memoria = periodo_k + periodo_d - 1
+        self.d: Optional[float] = None
+
+    def atualizar(self, preco: float, maxima: Optional[float] = None,
+                  minima: Optional[float] = None) -> Optional[float]:
+        self.n_precos += 1
+        self._maxima.adicionar(preco if maxima is None else maxima)
+        self._minima.adicionar(preco if minima is None else minima)
+        if not self._maxima.cheio:
+            return None
+
+        amplitude = self._maxima.valor - self._minima.valor
+        # Amplitude nula: indefinido (descartado no lote)
+        self.valor = 100 * (preco - self._minima.valor) / amplitude if amplitude else float('nan')
+        self._ks.append(self.valor)
+        if len(self._ks) == self.periodo_d:
+            self.d = sum(self._ks) / self.periodo_d
+        self.sinal = _sinal_por_limiares(self.valor, self.sobrevenda, self.sobrecompra)
+        return self.valor
+
+
+class WilliamsRStreaming(_OsciladorHLC):
+    """Williams %R incremental, equivalente a `AnalisisTecnica.calcular_williams_r`"""
+
+    nome = 'Williams%R'
+
+    def __init__(self, periodo: int = 14, sobrecompra: float = -20, sobrevenda: float = -80):
+        super().__init__()
+        self.periodo = periodo
+        self.sobrecompra = sobrecompra
+        self.sobrevenda = sobrevenda
+        self._maxima = _ExtremoMovel(periodo, maximo=True)
+        self._minima = _ExtremoMovel(periodo, maximo=False)
+        self._memoria = periodo
+
+    def atualizar(self, preco: float, maxima: Optional[float] = None,
+                  minima: Optional[float] = None) -> Optional[float]:
+        self.n_precos += 1
+        self._maxima.adicionar(preco if maxima is None else maxima)
+        self._minima.adicionar(preco if minima is None else minima)
+        if not self._maxima.cheio:
+            return None
+
+        amplitude = self._maxima.valor - self._minima.valor
+        self.valor = -100 * (self._maxima.valor - preco) / amplitude if amplitude else float('nan')
+        self.sinal = _sinal_por_limiares(self.valor, self.sobrevenda, self.sobrecompra)
+        return self.valor
+
+
+class CCIStreaming(_OsciladorHLC):
+    """
+    CCI incremental, equivalente a `AnalisisTecnica.calcular_cci`.
+
+    A média do preço típico é mantida em O(1); o desvio médio absoluto
+    depende da média corrente e custa O(periodo) por atualização.
+    """
+
+    nome = 'CCI'
+
+    def __init__(self, periodo: int = 20, constante: float = 0.015,
+                 sobrecompra: float = 100, sobrevenda: float = -100):
+        super().__init__()
+        self.periodo = periodo
+        self.constante = constante
+        self.sobrecompra = sobrecompra
+        self.sobrevenda = sobrevenda
+        self._tipicos = _JanelaSoma(periodo)
+        self._memoria = periodo
+
+    def atualizar(self, preco: float, maxima: Optional[float] = None,
+                  minima: Optional[float] = None) -> Optional[float]:
+        self.n_precos += 1
+        maxima = preco if maxima is None else maxima
+        minima = preco if minima is None else minima
+        tipico = (maxima + minima + preco) / 3
+        self._tipicos.adicionar(tipico)
+        if not self._tipicos.cheia:
+            return None
+
+        media = self._tipicos.media()
+        desvio_medio = sum(abs(x - media) for x in self._tipicos.valores) / self.periodo
+        if desvio_medio:
+            self.valor = (tipico - media) / (self.constante * desvio_medio)
+        else:
+            self.valor = float('nan')
+        self.sinal = _sinal_por_limiares(self.valor, self.sobrevenda, self.sobrecompra)
+        return self.valor
@@ -3,41 +3,289 @@ Sistema de Análise Técnica - Fase 4
 Implementação de indicadores técnicos principais
 """
 
-import pandas as pd
 import numpy as np
-from typing import Dict, List, Tuple, Optional
-from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Tuple, Optional, Sequence, Union
 import logging
 
-@dataclass
+from .cache_indicadores import memoizar
+from .grafo_calculo import GrafoCalculo
+from .precisao import resolver_dtype
+from .primitivas import maximo_movel, minimo_movel, media_movel, desvio_medio_movel
+
+if TYPE_CHECKING:
+    from .indicadores_lote import IndicadorMatriz
+
+# Códigos compactos (int8) dos sinais
+SINAL_VENDA = -1
+SINAL_NEUTRO = 0
+SINAL_COMPRA = 1
+
+NOMES_SINAIS = {SINAL_COMPRA: 'COMPRA', SINAL_VENDA: 'VENDA', SINAL_NEUTRO: 'NEUTRO'}
+CODIGOS_SINAIS = {nome: codigo for codigo, nome in NOMES_SINAIS.items()}
+
+
+def codificar_sinais(sinais: Sequence[str]) -> np.ndarray:
+    """Converte sinais textuais ('COMPRA', 'VENDA', 'NEUTRO') em códigos int8"""
+    if isinstance(sinais, np.ndarray) and sinais.dtype != object and sinais.dtype.kind in 'iub':
+        return sinais.astype(np.int8, copy=False)
+    return np.fromiter(
+        (CODIGOS_SINAIS.get(sinal, SINAL_NEUTRO) for sinal in sinais),
+        dtype=np.int8,
+        count=len(sinais)
+    )
+
+
+def decodificar_sinais(codigos: np.ndarray) -> List[str]:
+    """Converte códigos int8 de volta para sinais textuais"""
+    nomes = np.array(['VENDA', 'NEUTRO', 'COMPRA'], dtype=object)
+    return nomes[np.asarray(codigos, dtype=np.intp) + 1].tolist()
+
+
 class IndicadorResult:
-    """Resultado de um indicador técnico"""
-    nome: str
-    valores: List[float]
-    sinais: List[str]  # 'COMPRA', 'VENDA', 'NEUTRO'
-    timestamp: List[str]
-    parametros: Dict
+    """
+    Resultado de um indicador técnico
+
+    Armazenamento colunar: `valores_array` (float64 ou float32),
+    `codigos_sinais` (int8, ver SINAL_*) e `timestamps` (datetime64, quando a
+    entrada traz datas). Os atributos `valores`, `sinais` e `timestamp`
+    continuam disponíveis como listas, geradas sob demanda e mantidas em cache.
+    """
+
+    __slots__ = ('nome', 'parametros', 'valores_array', 'codigos_sinais', 'timestamps',
+                 '_valores_lista', '_sinais_lista', '_timestamp_lista')
+
+    def __init__(self,
+                 nome: str,
+                 valores: Union[Sequence[float], np.ndarray],
+                 sinais: Union[Sequence[str], np.ndarray],
+                 timestamp: Optional[Union[Sequence[str], np.ndarray]] = None,
+                 parametros: Optional[Dict] = None,
+                 dtype=np.float64):
+        self.nome = nome
+        self.parametros = parametros if parametros is not None else {}
+        self._definir_valores(valores, dtype)
+        self._definir_sinais(sinais)
+        self._definir_timestamp(timestamp)
+
+    def _definir_valores(self, valores, dtype=None):
+        if dtype is None:
+            dtype = getattr(self, 'valores_array', np.empty(0)).dtype
+        self.valores_array = np.asarray(valores, dtype=dtype)
+        self._valores_lista = None
+
+    def _definir_sinais(self, sinais):
+        self.codigos_sinais = codificar_sinais(sinais)
+        self._sinais_lista = None
+
+    def _definir_timestamp(self, timestamp):
+        self._timestamp_lista = None
+        if timestamp is None:
+            self.timestamps = None
+        elif isinstance(timestamp, np.ndarray) and timestamp.dtype.kind == 'M':
+            self.timestamps = timestamp
+        else:
+            # Rótulos legados (ex.: 't0', 't1', ...) são preservados como lista
+            self.timestamps = None
+            self._timestamp_lista = list(timestamp)
+
+    @property
+    def valores(self) -> List[float]:
+        if self._valores_lista is None:
+            self._valores_lista = self.valores_array.tolist()
+        return self._valores_lista
+
+    @valores.setter
+    def valores(self, valores):
+        self._definir_valores(valores)
+
+    @property
+    def sinais(self) -> List[str]:
+        if self._sinais_lista is None:
+            self._sinais_lista = decodificar_sinais(self.codigos_sinais)
+        return self._sinais_lista
+
+    @sinais.setter
+    def sinais(self, sinais):
+        self._definir_sinais(sinais)
+
+    @property
+    def timestamp(self) -> List[str]:
+        if self._timestamp_lista is None:
+            if self.timestamps is not None:
+                self._timestamp_lista = np.datetime_as_string(self.timestamps).tolist()
+            else:
+                self._timestamp_lista = [f"t{i}" for i in range(len(self.valores_array))]
+        return self._timestamp_lista
+
+    @timestamp.setter
+    def timestamp(self, timestamp):
+        self._definir_timestamp(timestamp)
+
+    def __copy__(self) -> 'IndicadorResult':
+        """Novo resultado sobre os mesmos arrays, sem as listas já geradas"""
+        copia = IndicadorResult.__new__(IndicadorResult)
+        copia.nome = self.nome
+        copia.parametros = dict(self.parametros)
+        copia.valores_array = self.valores_array
+        copia.codigos_sinais = self.codigos_sinais
+        copia.timestamps = self.timestamps
+        copia._valores_lista = None
+        copia._sinais_lista = None
+        copia._timestamp_lista = (list(self._timestamp_lista)
+                                  if self.timestamps is None and self._timestamp_lista is not None else None)
+        return copia
+
+    def __len__(self) -> int:
+        return len(self.valores_array)
+
+    def __repr__(self) -> str:
+        return (f"IndicadorResult(nome={self.nome!r}, n={len(self)}, "
+                f"dtype={self.valores_array.dtype}, parametros={self.parametros!r})")
+
+
+def sinais_por_limiares(valores: np.ndarray, sobrevenda: float, sobrecompra: float) -> np.ndarray:
+    """
+    Classifica osciladores por limiares (ex.: RSI)
+
+    Valores >= sobrecompra geram VENDA e valores <= sobrevenda geram COMPRA;
+    opera sobre o último eixo, aceitando séries 1-D ou matrizes.
+    """
+    codigos = np.zeros(np.shape(valores), dtype=np.int8)
+    codigos[valores <= sobrevenda] = SINAL_COMPRA
+    codigos[valores >= sobrecompra] = SINAL_VENDA
+    return codigos
+
+
+def sinais_cruzamento_zero(valores: np.ndarray) -> np.ndarray:
+    """
+    Detecta cruzamentos da linha zero pela mudança de sinal entre barras
+
+    Cruzamento para cima gera COMPRA, para baixo gera VENDA; a primeira barra
+    de cada série é sempre NEUTRO.
+    """
+    valores = np.asarray(valores)
+    codigos = np.zeros(valores.shape, dtype=np.int8)
+    atual, anterior = valores[..., 1:], valores[..., :-1]
+    codigos[..., 1:][(atual > 0) & (anterior <= 0)] = SINAL_COMPRA
+    codigos[..., 1:][(atual < 0) & (anterior >= 0)] = SINAL_VENDA
+    return codigos
+
+
+def sinais_por_bandas(precos: np.ndarray, inferior: np.ndarray, superior: np.ndarray) -> np.ndarray:
+    """Preço na banda inferior gera COMPRA; na banda superior, VENDA"""
+    codigos = np.zeros(np.shape(precos), dtype=np.int8)
+    codigos[precos >= superior] = SINAL_VENDA
+    codigos[precos <= inferior] = SINAL_COMPRA
+    return codigos
+
+
+def sinais_preco_media(precos: np.ndarray, media: np.ndarray) -> np.ndarray:
+    """Preço acima da média gera COMPRA; abaixo, VENDA"""
+    precos, media = np.asarray(precos), np.asarray(media)
+    return ((precos > media).astype(np.int8) - (precos < media).astype(np.int8))
+
+
+def consenso_votos(votos: np.ndarray) -> np.ndarray:
+    """
+    Consenso por maioria simples sobre uma matriz de votos
+
+    Args:
+        votos: Matriz (indicadores x tempo) de códigos de sinal
+
+    Returns:
+        Array int8 com o sinal vencedor em cada instante (NEUTRO em empate)
+    """
+    votos = np.asarray(votos)
+    votos_compra = np.count_nonzero(votos == SINAL_COMPRA, axis=0)
+    votos_venda = np.count_nonzero(votos == SINAL_VENDA, axis=0)
+    votos_neutro = votos.shape[0] - votos_compra - votos_venda
+    
+    consenso = np.zeros(votos.shape[1:], dtype=np.int8)
+    consenso[(votos_compra > votos_venda) & (votos_compra > votos_neutro)] = SINAL_COMPRA
+    consenso[(votos_venda > votos_compra) & (votos_venda > votos_neutro)] = SINAL_VENDA
+    return consenso
+
+
+def _datas_em(datas: Optional[np.ndarray], posicoes: np.ndarray) -> Optional[np.ndarray]:
+    """Seleciona as datas correspondentes às posições válidas do indicador"""
+    if datas is None:
+        return None
+    return datas[posicoes]
+
+
+def _obter_grafo(precos, grafo: Optional[GrafoCalculo], dtype=None) -> GrafoCalculo:
+    """Reutiliza o grafo da requisição ou cria um para a série informada"""
+    if grafo is None:
+        return GrafoCalculo(precos, dtype=dtype)
+    if len(grafo) != len(precos):
+        raise ValueError("Grafo de cálculo construído sobre outra série de preços")
+    return grafo
+
+
+def _extremos_periodo(grafo: GrafoCalculo, maximas, minimas, periodo: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Máxima mais alta e mínima mais baixa das últimas `periodo` barras
+
+    Sem séries de máximas/mínimas, usa os fechamentos (nós compartilhados
+    do grafo, reaproveitados entre Estocástico e Williams %R).
+    """
+    n = len(grafo)
+    if maximas is None and minimas is None:
+        return grafo.maximo_movel(periodo), grafo.minimo_movel(periodo)
+    maximas = grafo.precos() if maximas is None else np.asarray(maximas, dtype=grafo.dtype)
+    minimas = grafo.precos() if minimas is None else np.asarray(minimas, dtype=grafo.dtype)
+    if len(maximas) != n or len(minimas) != n:
+        raise ValueError("Máximas e mínimas devem ter o mesmo tamanho dos preços")
+    return maximo_movel(maximas, periodo), minimo_movel(minimas, periodo)
+
+
+def _resultado_validos(nome: str, valores: np.ndarray, grafo: GrafoCalculo,
+                       sobrevenda: float, sobrecompra: float, parametros: Dict) -> IndicadorResult:
+    """Monta um IndicadorResult de oscilador a partir das posições não-NaN"""
+    validos = np.flatnonzero(~np.isnan(valores))
+    valores = valores[validos]
+    return IndicadorResult(
+        nome=nome,
+        valores=valores,
+        sinais=sinais_por_limiares(valores, sobrevenda, sobrecompra),
+        timestamp=_datas_em(grafo.datas(), validos),
+        parametros=parametros,
+        dtype=grafo.dtype
+    )
 
 class AnalisisTecnica:
     """
     Classe principal para análise técnica
     Implementa indicadores técnicos fundamentais
+    
+    O `dtype` (float64 por padrão, ou float32) vale para todos os cálculos e
+    resultados; float32 reduz pela metade a memória e a banda das séries,
+    com as diferenças em relação a float64 descritas em `precisao`.
+    
+    Os métodos `calcular_*` passam pelo cache global de indicadores
+    (`cache_indicadores.CACHE_GLOBAL`): a mesma série com os mesmos
+    parâmetros devolve o resultado já calculado, compartilhado e somente
+    leitura.
     """
     
-    def __init__(self):
+    def __init__(self, dtype=None):
         self.logger = logging.getLogger(__name__)
+        self.dtype = resolver_dtype(dtype)
         self.indicadores_disponiveis = [
             'RSI', 'MACD', 'BollingerBands', 'MediaMovel', 
             'Stochastic', 'Williams%R', 'CCI'
         ]
     
-    def calcular_rsi(self, precos: List[float], periodo: int = 14) -> IndicadorResult:
+    @memoizar(atributos=('dtype',))
+    def calcular_rsi(self, precos: List[float], periodo: int = 14,
+                     grafo: Optional[GrafoCalculo] = None) -> IndicadorResult:
         """
         Calcula o Relative Strength Index (RSI)
         
         Args:
             precos: Lista de preços de fechamento
             periodo: Período para cálculo (padrão: 14)
+            grafo: Grafo de cálculo compartilhado entre indicadores (opcional)
             
         Returns:
             IndicadorResult com valores e sinais do RSI
@@ -45,49 +293,39 @@ class AnalisisTecnica:
         if len(precos) < periodo + 1:
             raise ValueError(f"Necessários pelo menos {periodo + 1} preços para calcular RSI")
         
-        # Converter para numpy array
-        precos_array = np.array(precos)
-        
-        # Calcular diferenças
-        deltas = np.diff(precos_array)
-        
-        # Separar ganhos e perdas
-        ganhos = np.where(deltas > 0, deltas, 0)
-        perdas = np.where(deltas < 0, -deltas, 0)
+        grafo = _obter_grafo(precos, grafo, self.dtype)
         
-        # Calcular médias móveis dos ganhos e perdas
-        avg_ganhos = pd.Series(ganhos).rolling(window=periodo).mean()
-        avg_perdas = pd.Series(perdas).rolling(window=periodo).mean()
+        # Médias móveis dos ganhos e perdas (diferenças calculadas uma única vez)
+        avg_ganhos = grafo.media_movel(periodo, fonte='ganhos')
+        avg_perdas = grafo.media_movel(periodo, fonte='perdas')
         
         # Calcular RSI
-        rs = avg_ganhos / avg_perdas
-        rsi = 100 - (100 / (1 + rs))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rs = avg_ganhos / avg_perdas
+            rsi_array = 100 - (100 / (1 + rs))
         
-        # Remover valores NaN
-        rsi_values = rsi.dropna().tolist()
-        
-        # Gerar sinais
-        sinais = []
-        for valor in rsi_values:
-            if valor >= 70:
-                sinais.append('VENDA')  # Sobrecomprado
-            elif valor <= 30:
-                sinais.append('COMPRA')  # Sobrevendido
-            else:
-                sinais.append('NEUTRO')
+        # Remover valores NaN (cada delta i corresponde ao preço i + 1)
+        validos = np.flatnonzero(~np.isnan(rsi_array))
+        rsi_values = rsi_array[validos]
+        
+        # Gerar sinais (>= 70 sobrecomprado, <= 30 sobrevendido)
+        sinais = sinais_por_limiares(rsi_values, 30, 70)
         
         return IndicadorResult(
             nome='RSI',
             valores=rsi_values,
             sinais=sinais,
-            timestamp=[f"t{i}" for i in range(len(rsi_values))],
-            parametros={'periodo': periodo, 'sobrecompra': 70, 'sobrevenda': 30}
+            timestamp=_datas_em(grafo.datas(), validos + 1),
+            parametros={'periodo': periodo, 'sobrecompra': 70, 'sobrevenda': 30},
+            dtype=self.dtype
         )
     
+    @memoizar(atributos=('dtype',))
     def calcular_macd(self, precos: List[float], 
                      periodo_rapido: int = 12, 
                      periodo_lento: int = 26, 
-                     periodo_sinal: int = 9) -> IndicadorResult:
+                     periodo_sinal: int = 9,
+                     grafo: Optional[GrafoCalculo] = None) -> IndicadorResult:
         """
         Calcula o MACD (Moving Average Convergence Divergence)
         
@@ -96,6 +334,7 @@ class AnalisisTecnica:
             periodo_rapido: Período da EMA rápida
             periodo_lento: Período da EMA lenta
             periodo_sinal: Período da linha de sinal
+            grafo: Grafo de cálculo compartilhado entre indicadores (opcional)
             
         Returns:
             IndicadorResult com valores e sinais do MACD
@@ -103,48 +342,38 @@ class AnalisisTecnica:
         if len(precos) < periodo_lento:
             raise ValueError(f"Necessários pelo menos {periodo_lento} preços para calcular MACD")
         
-        precos_series = pd.Series(precos)
-        
-        # Calcular EMAs
-        ema_rapida = precos_series.ewm(span=periodo_rapido).mean()
-        ema_lenta = precos_series.ewm(span=periodo_lento).mean()
+        grafo = _obter_grafo(precos, grafo, self.dtype)
         
-        # Calcular MACD
-        macd_line = ema_rapida - ema_lenta
-        signal_line = macd_line.ewm(span=periodo_sinal).mean()
-        histogram = macd_line - signal_line
+        # Calcular MACD a partir das EMAs compartilhadas
+        macd_line = grafo.linha_macd(periodo_rapido, periodo_lento)
+        signal_line = grafo.sinal_macd(periodo_rapido, periodo_lento, periodo_sinal)
+        histogram_array = macd_line - signal_line
         
         # Remover valores NaN
-        macd_values = histogram.dropna().tolist()
-        
-        # Gerar sinais
-        sinais = []
-        for i, valor in enumerate(macd_values):
-            if i > 0:
-                if valor > 0 and macd_values[i-1] <= 0:
-                    sinais.append('COMPRA')  # Cruzamento para cima
-                elif valor < 0 and macd_values[i-1] >= 0:
-                    sinais.append('VENDA')  # Cruzamento para baixo
-                else:
-                    sinais.append('NEUTRO')
-            else:
-                sinais.append('NEUTRO')
+        validos = np.flatnonzero(~np.isnan(histogram_array))
+        macd_values = histogram_array[validos]
+        
+        # Gerar sinais a partir dos cruzamentos do histograma com zero
+        sinais = sinais_cruzamento_zero(macd_values)
         
         return IndicadorResult(
             nome='MACD',
             valores=macd_values,
             sinais=sinais,
-            timestamp=[f"t{i}" for i in range(len(macd_values))],
+            timestamp=_datas_em(grafo.datas(), validos),
             parametros={
                 'periodo_rapido': periodo_rapido,
                 'periodo_lento': periodo_lento,
                 'periodo_sinal': periodo_sinal
-            }
+            },
+            dtype=self.dtype
         )
     
+    @memoizar(atributos=('dtype',))
     def calcular_bollinger_bands(self, precos: List[float], 
                                 periodo: int = 20, 
-                                desvios: float = 2.0) -> Dict[str, IndicadorResult]:
+                                desvios: float = 2.0,
+                                grafo: Optional[GrafoCalculo] = None) -> Dict[str, IndicadorResult]:
         """
         Calcula as Bandas de Bollinger
         
@@ -152,6 +381,7 @@ class AnalisisTecnica:
             precos: Lista de preços de fechamento
             periodo: Período para média móvel
             desvios: Número de desvios padrão
+            grafo: Grafo de cálculo compartilhado entre indicadores (opcional)
             
         Returns:
             Dict com IndicadorResult para banda superior, inferior e média
@@ -159,43 +389,48 @@ class AnalisisTecnica:
         if len(precos) < periodo:
             raise ValueError(f"Necessários pelo menos {periodo} preços para calcular Bollinger Bands")
         
-        precos_series = pd.Series(precos)
+        grafo = _obter_grafo(precos, grafo, self.dtype)
+        precos_array = grafo.precos()
         
-        # Calcular média móvel e desvio padrão
-        sma = precos_series.rolling(window=periodo).mean()
-        std = precos_series.rolling(window=periodo).std()
+        # Média móvel (compartilhada com a SMA de mesmo período) e desvio padrão
+        sma_array = grafo.media_movel(periodo)
+        std = grafo.desvio_movel(periodo)
         
         # Calcular bandas
-        banda_superior = sma + (std * desvios)
-        banda_inferior = sma - (std * desvios)
+        banda_superior = sma_array + (std * desvios)
+        banda_inferior = sma_array - (std * desvios)
         
         # Remover valores NaN
-        sma_values = sma.dropna().tolist()
-        upper_values = banda_superior.dropna().tolist()
-        lower_values = banda_inferior.dropna().tolist()
+        validos = np.flatnonzero(~np.isnan(sma_array))
+        sma_values = sma_array[validos]
+        upper_values = banda_superior[~np.isnan(banda_superior)]
+        lower_values = banda_inferior[~np.isnan(banda_inferior)]
         
         # Gerar sinais para a banda média
-        sinais = []
-        for i, (preco, upper, lower) in enumerate(zip(precos[-len(sma_values):], upper_values, lower_values)):
-            if preco <= lower:
-                sinais.append('COMPRA')  # Preço na banda inferior
-            elif preco >= upper:
-                sinais.append('VENDA')  # Preço na banda superior
-            else:
-                sinais.append('NEUTRO')
+        n_sinais = min(len(sma_values), len(upper_values), len(lower_values))
+        sinais = sinais_por_bandas(
+            precos_array[-len(sma_values):][:n_sinais],
+            lower_values[:n_sinais],
+            upper_values[:n_sinais]
+        )
+        neutros = np.zeros(len(upper_values), dtype=np.int8)
         
         parametros = {'periodo': periodo, 'desvios': desvios}
-        timestamp = [f"t{i}" for i in range(len(sma_values))]
+        timestamp = _datas_em(grafo.datas(), validos)
         
         return {
-            'media': IndicadorResult('BB_Media', sma_values, sinais, timestamp, parametros),
-            'superior': IndicadorResult('BB_Superior', upper_values, ['NEUTRO'] * len(upper_values), timestamp, parametros),
-            'inferior': IndicadorResult('BB_Inferior', lower_values, ['NEUTRO'] * len(lower_values), timestamp, parametros)
+            'media': IndicadorResult('BB_Media', sma_values, sinais, timestamp, parametros, self.dtype),
+            'superior': IndicadorResult('BB_Superior', upper_values, neutros, timestamp, parametros,
+                                        self.dtype),
+            'inferior': IndicadorResult('BB_Inferior', lower_values, neutros[:len(lower_values)], timestamp,
+                                        parametros, self.dtype)
         }
     
+    @memoizar(atributos=('dtype',))
     def calcular_media_movel(self, precos: List[float], 
                            periodo: int = 20, 
-                           tipo: str = 'SMA') -> IndicadorResult:
+                           tipo: str = 'SMA',
+                           grafo: Optional[GrafoCalculo] = None) -> IndicadorResult:
         """
         Calcula média móvel (SMA ou EMA)
         
@@ -203,6 +438,7 @@ class AnalisisTecnica:
             precos: Lista de preços de fechamento
             periodo: Período da média
             tipo: 'SMA' (Simple) ou 'EMA' (Exponential)
+            grafo: Grafo de cálculo compartilhado entre indicadores (opcional)
             
         Returns:
             IndicadorResult com valores e sinais da média móvel
@@ -210,75 +446,203 @@ class AnalisisTecnica:
         if len(precos) < periodo:
             raise ValueError(f"Necessários pelo menos {periodo} preços para calcular média móvel")
         
-        precos_series = pd.Series(precos)
+        grafo = _obter_grafo(precos, grafo, self.dtype)
         
         if tipo == 'SMA':
-            media = precos_series.rolling(window=periodo).mean()
+            media_array = grafo.media_movel(periodo)
         elif tipo == 'EMA':
-            media = precos_series.ewm(span=periodo).mean()
+            media_array = grafo.ema(periodo)
         else:
             raise ValueError("Tipo deve ser 'SMA' ou 'EMA'")
         
-        media_values = media.dropna().tolist()
+        validos = np.flatnonzero(~np.isnan(media_array))
+        media_values = media_array[validos]
         
         # Gerar sinais comparando preço atual com média
-        sinais = []
-        precos_correspondentes = precos[-len(media_values):]
-        
-        for preco, media_val in zip(precos_correspondentes, media_values):
-            if preco > media_val:
-                sinais.append('COMPRA')  # Preço acima da média
-            elif preco < media_val:
-                sinais.append('VENDA')  # Preço abaixo da média
-            else:
-                sinais.append('NEUTRO')
+        precos_correspondentes = grafo.precos()[-len(media_values):]
+        sinais = sinais_preco_media(precos_correspondentes, media_values)
         
         return IndicadorResult(
             nome=f'{tipo}_{periodo}',
             valores=media_values,
             sinais=sinais,
-            timestamp=[f"t{i}" for i in range(len(media_values))],
-            parametros={'periodo': periodo, 'tipo': tipo}
+            timestamp=_datas_em(grafo.datas(), validos),
+            parametros={'periodo': periodo, 'tipo': tipo},
+            dtype=self.dtype
+        )
+    
+    @memoizar(atributos=('dtype',))
+    def calcular_estocastico(self, precos: List[float],
+                             maximas: Optional[List[float]] = None,
+                             minimas: Optional[List[float]] = None,
+                             periodo_k: int = 14,
+                             periodo_d: int = 3,
+                             grafo: Optional[GrafoCalculo] = None) -> Dict[str, IndicadorResult]:
+        """
+        Calcula o Oscilador Estocástico (%K e %D)
+        
+        Args:
+            precos: Lista de preços de fechamento
+            maximas: Máximas de cada barra (opcional; usa fechamentos se ausente)
+            minimas: Mínimas de cada barra (opcional; usa fechamentos se ausente)
+            periodo_k: Janela da máxima/mínima do %K
+            periodo_d: Média móvel do %K que forma o %D
+            grafo: Grafo de cálculo compartilhado entre indicadores (opcional)
+            
+        Returns:
+            Dict com IndicadorResult para 'K' e 'D'
+        """
+        if len(precos) < periodo_k:
+            raise ValueError(f"Necessários pelo menos {periodo_k} preços para calcular Estocástico")
+        
+        grafo = _obter_grafo(precos, grafo, self.dtype)
+        maxima_periodo, minima_periodo = _extremos_periodo(grafo, maximas, minimas, periodo_k)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            k = 100 * (grafo.precos() - minima_periodo) / (maxima_periodo - minima_periodo)
+        d = media_movel(k, periodo_d)
+        
+        parametros = {'periodo_k': periodo_k, 'periodo_d': periodo_d, 'sobrecompra': 80, 'sobrevenda': 20}
+        return {
+            'K': _resultado_validos('Stochastic_K', k, grafo, 20, 80, parametros),
+            'D': _resultado_validos('Stochastic_D', d, grafo, 20, 80, parametros)
+        }
+    
+    @memoizar(atributos=('dtype',))
+    def calcular_williams_r(self, precos: List[float],
+                            maximas: Optional[List[float]] = None,
+                            minimas: Optional[List[float]] = None,
+                            periodo: int = 14,
+                            grafo: Optional[GrafoCalculo] = None) -> IndicadorResult:
+        """
+        Calcula o Williams %R (escala de -100 a 0)
+        
+        Args:
+            precos: Lista de preços de fechamento
+            maximas: Máximas de cada barra (opcional; usa fechamentos se ausente)
+            minimas: Mínimas de cada barra (opcional; usa fechamentos se ausente)
+            periodo: Janela da máxima/mínima
+            grafo: Grafo de cálculo compartilhado entre indicadores (opcional)
+            
+        Returns:
+            IndicadorResult com valores e sinais do Williams %R
+        """
+        if len(precos) < periodo:
+            raise ValueError(f"Necessários pelo menos {periodo} preços para calcular Williams %R")
+        
+        grafo = _obter_grafo(precos, grafo, self.dtype)
+        maxima_periodo, minima_periodo = _extremos_periodo(grafo, maximas, minimas, periodo)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            williams = -100 * (maxima_periodo - grafo.precos()) / (maxima_periodo - minima_periodo)
+        
+        return _resultado_validos(
+            'Williams%R', williams, grafo, -80, -20,
+            {'periodo': periodo, 'sobrecompra': -20, 'sobrevenda': -80}
+        )
+    
+    @memoizar(atributos=('dtype',))
+    def calcular_cci(self, precos: List[float],
+                     maximas: Optional[List[float]] = None,
+                     minimas: Optional[List[float]] = None,
+                     periodo: int = 20,
+                     constante: float = 0.015,
+                     grafo: Optional[GrafoCalculo] = None) -> IndicadorResult:
+        """
+        Calcula o Commodity Channel Index (CCI)
+        
+        Args:
+            precos: Lista de preços de fechamento
+            maximas: Máximas de cada barra (opcional; usa fechamentos se ausente)
+            minimas: Mínimas de cada barra (opcional; usa fechamentos se ausente)
+            periodo: Período da média e do desvio médio do preço típico
+            constante: Constante de Lambert (padrão: 0.015)
+            grafo: Grafo de cálculo compartilhado entre indicadores (opcional)
+            
+        Returns:
+            IndicadorResult com valores e sinais do CCI
+        """
+        if len(precos) < periodo:
+            raise ValueError(f"Necessários pelo menos {periodo} preços para calcular CCI")
+        
+        grafo = _obter_grafo(precos, grafo, self.dtype)
+        fechamentos = grafo.precos()
+        maximas = fechamentos if maximas is None else np.asarray(maximas, dtype=grafo.dtype)
+        minimas = fechamentos if minimas is None else np.asarray(minimas, dtype=grafo.dtype)
+        preco_tipico = (maximas + minimas + fechamentos) / 3
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cci = (preco_tipico - media_movel(preco_tipico, periodo)) / \
+                  (constante * desvio_medio_movel(preco_tipico, periodo))
+        
+        return _resultado_validos(
+            'CCI', cci, grafo, -100, 100,
+            {'periodo': periodo, 'constante': constante, 'sobrecompra': 100, 'sobrevenda': -100}
         )
     
-    def analisar_multiplos_indicadores(self, precos: List[float]) -> Dict[str, IndicadorResult]:
+    def analisar_multiplos_indicadores(self, precos: List[float],
+                                       grafo: Optional[GrafoCalculo] = None) -> Dict[str, IndicadorResult]:
         """
         Executa análise com múltiplos indicadores
         
+        Todos os indicadores compartilham um único GrafoCalculo, de modo que
+        diferenças, médias móveis e EMAs comuns são calculadas uma só vez.
+        
         Args:
             precos: Lista de preços de fechamento
+            grafo: Grafo de cálculo a utilizar; informe-o para inspecionar
+                `nos_calculados` e `nos_reutilizados` após a análise
             
         Returns:
             Dict com resultados de todos os indicadores
         """
         resultados = {}
+        grafo = _obter_grafo(precos, grafo, self.dtype)
         
         try:
             # RSI
-            resultados['RSI'] = self.calcular_rsi(precos)
+            resultados['RSI'] = self.calcular_rsi(precos, grafo=grafo)
             
             # MACD
             if len(precos) >= 26:
-                resultados['MACD'] = self.calcular_macd(precos)
+                resultados['MACD'] = self.calcular_macd(precos, grafo=grafo)
             
             # Bollinger Bands
             if len(precos) >= 20:
-                bb_results = self.calcular_bollinger_bands(precos)
+                bb_results = self.calcular_bollinger_bands(precos, grafo=grafo)
                 resultados.update(bb_results)
             
             # Médias Móveis
             if len(precos) >= 20:
-                resultados['SMA_20'] = self.calcular_media_movel(precos, 20, 'SMA')
-                resultados['EMA_20'] = self.calcular_media_movel(precos, 20, 'EMA')
+                resultados['SMA_20'] = self.calcular_media_movel(precos, 20, 'SMA', grafo=grafo)
+                resultados['EMA_20'] = self.calcular_media_movel(precos, 20, 'EMA', grafo=grafo)
             
             if len(precos) >= 50:
-                resultados['SMA_50'] = self.calcular_media_movel(precos, 50, 'SMA')
+                resultados['SMA_50'] = self.calcular_media_movel(precos, 50, 'SMA', grafo=grafo)
                 
         except Exception as e:
             self.logger.error(f"Erro na análise técnica: {e}")
+        
+        self.logger.debug(f"Nós reutilizados na análise: {dict(grafo.nos_reutilizados)}")
             
         return resultados
     
+    def analisar_multiplos_ativos(self, matriz_precos: np.ndarray) -> Dict[str, 'IndicadorMatriz']:
+        """
+        Executa análise com múltiplos indicadores para vários ativos de uma vez
+        
+        Args:
+            matriz_precos: Matriz (ativos x tempo) de preços de fechamento,
+                alinhada pela última barra e com NaN à esquerda nos ativos
+                de histórico mais curto
+            
+        Returns:
+            Dict com um IndicadorMatriz (valores e sinais em matrizes) por indicador
+        """
+        from .indicadores_lote import analisar_matriz
+        
+        return analisar_matriz(np.asarray(matriz_precos, dtype=self.dtype))
+    
     def gerar_consenso_sinais(self, indicadores: Dict[str, IndicadorResult]) -> List[str]:
         """
         Gera consenso de sinais baseado em múltiplos indicadores
@@ -292,35 +656,28 @@ class AnalisisTecnica:
         if not indicadores:
             return []
         
-        # Encontrar o menor comprimento entre todos os indicadores
-        min_length = min(len(ind.sinais) for ind in indicadores.values())
-        
-        consenso = []
+        return decodificar_sinais(self.gerar_consenso_codigos(indicadores))
+    
+    def gerar_consenso_codigos(self, indicadores: Dict[str, IndicadorResult]) -> np.ndarray:
+        """
+        Versão compacta de `gerar_consenso_sinais`, retornando códigos int8
         
-        for i in range(min_length):
-            votos_compra = 0
-            votos_venda = 0
-            votos_neutro = 0
-            
-            for indicador in indicadores.values():
-                if i < len(indicador.sinais):
-                    sinal = indicador.sinais[i]
-                    if sinal == 'COMPRA':
-                        votos_compra += 1
-                    elif sinal == 'VENDA':
-                        votos_venda += 1
-                    else:
-                        votos_neutro += 1
+        Args:
+            indicadores: Dict com resultados dos indicadores
             
-            # Determinar consenso (maioria simples)
-            if votos_compra > votos_venda and votos_compra > votos_neutro:
-                consenso.append('COMPRA')
-            elif votos_venda > votos_compra and votos_venda > votos_neutro:
-                consenso.append('VENDA')
-            else:
-                consenso.append('NEUTRO')
+        Returns:
+            Array int8 com os sinais de consenso (ver SINAL_*)
+        """
+        if not indicadores:
+            return np.zeros(0, dtype=np.int8)
+        
+        # Encontrar o menor comprimento entre todos os indicadores
+        min_length = min(len(ind.codigos_sinais) for ind in indicadores.values())
+        
+        # Matriz de votos (indicadores x tempo), reduzida no eixo dos indicadores
+        votos = np.stack([ind.codigos_sinais[:min_length] for ind in indicadores.values()])
         
-        return consenso
+        return consenso_votos(votos)
 
 
 # Exemplo de uso
@@ -0,0 +1,422 @@
+"""
+Índice persistente de padrões gráficos (SQLite)
+
+Os padrões são detectados uma vez, barra a barra, pela mesma janela
+deslizante de `BacktestEngine.executar_backtest_padroes`
+(`ScannerPadroesIncremental`), e gravados num banco SQLite consultável por
+tipo, ativo e data. Ao chegarem barras novas, `atualizar` processa apenas as
+janelas que terminam nelas.
+
+Tabelas:
+- padroes: um registro por ocorrência de padrão (tipo, início, fim,
+  confiança, níveis), com a barra em que foi detectado e a última em que
+  continuou visível; índices em (tipo, simbolo, fim) e (simbolo, fim);
+- avaliacoes / avaliacao_padroes: a lista de padrões visível na janela que
+  termina em cada barra, na ordem do detector, para que backtests a
+  reproduzam sem redetecção;
+- progresso: última barra processada por ativo.
+
+Datas são gravadas como inteiros (nanossegundos desde a época).
+
+Exemplo:
+    indice = IndicePadroes('dados/padroes.db')
+    indice.atualizar('PETR4', dados['data'], dados['close'])
+    indice.consultar(TipoPadrao.DUPLO_FUNDO, min_confianca=70,
+                     desde=pd.Timestamp.now() - pd.Timedelta(days=5))
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+import json
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from .detector_padroes import DetectorPadroes, PadraoDetectado, ScannerPadroesIncremental, TipoPadrao
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS configuracao (
+    chave TEXT PRIMARY KEY,
+    valor TEXT
+);
+CREATE TABLE IF NOT EXISTS padroes (
+    id INTEGER PRIMARY KEY,
+    simbolo TEXT NOT NULL,
+    tipo TEXT NOT NULL,
+    inicio INTEGER NOT NULL,
+    fim INTEGER NOT NULL,
+    confianca REAL NOT NULL,
+    sinal TEXT,
+    preco_entrada REAL,
+    stop_loss REAL,
+    take_profit REAL,
+    pontos_chave TEXT,
+    detectado_em INTEGER NOT NULL,
+    visto_ate INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_padroes_tipo ON padroes (tipo, simbolo, fim);
+CREATE INDEX IF NOT EXISTS idx_padroes_simbolo ON padroes (simbolo, fim);
+CREATE TABLE IF NOT EXISTS avaliacoes (
+    id INTEGER PRIMARY KEY,
+    simbolo TEXT NOT NULL,
+    valido_de INTEGER NOT NULL,
+    valido_ate INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_avaliacoes_simbolo ON avaliacoes (simbolo, valido_de);
+CREATE TABLE IF NOT EXISTS avaliacao_padroes (
+    avaliacao_id INTEGER NOT NULL,
+    ordem INTEGER NOT NULL,
+    padrao_id INTEGER NOT NULL,
+    PRIMARY KEY (avaliacao_id, ordem)
+);
+CREATE TABLE IF NOT EXISTS progresso (
+    simbolo TEXT PRIMARY KEY,
+    ultima_barra INTEGER NOT NULL
+);
+"""
+
+COLUNAS_PADRAO = ('id', 'simbolo', 'tipo', 'inicio', 'fim', 'confianca', 'sinal', 'preco_entrada',
+                  'stop_loss', 'take_profit', 'pontos_chave', 'detectado_em', 'visto_ate')
+
+
+def _nanossegundos(datas) -> np.ndarray:
+    """Datas (strings, datetime ou datetime64) como inteiros em nanossegundos"""
+    return pd.DatetimeIndex(pd.to_datetime(np.asarray(datas))).values.astype('datetime64[ns]').view('i8')
+
+
+def _real(valor) -> Optional[float]:
+    return None if valor is None else float(valor)
+
+
+@dataclass
+class PadraoIndexado:
+    """Padrão lido do índice, com datas no lugar de posições"""
+    id: int
+    simbolo: str
+    tipo: TipoPadrao
+    inicio: pd.Timestamp
+    fim: pd.Timestamp
+    confianca: float
+    sinal: str
+    preco_entrada: Optional[float]
+    stop_loss: Optional[float]
+    take_profit: Optional[float]
+    pontos_chave: List[Tuple[pd.Timestamp, float]]
+    detectado_em: pd.Timestamp  # Última barra da primeira janela em que apareceu
+    visto_ate: pd.Timestamp  # Última barra da última janela em que continuou visível
+
+    @classmethod
+    def da_linha(cls, linha: tuple) -> 'PadraoIndexado':
+        valores = dict(zip(COLUNAS_PADRAO, linha))
+        for nome in ('inicio', 'fim', 'detectado_em', 'visto_ate'):
+            valores[nome] = pd.Timestamp(valores[nome])
+        valores['tipo'] = TipoPadrao(valores['tipo'])
+        valores['pontos_chave'] = [(pd.Timestamp(t), p) for t, p in json.loads(valores['pontos_chave'])]
+        return cls(**valores)
+
+    def como_padrao(self, datas_ns: np.ndarray) -> PadraoDetectado:
+        """
+        PadraoDetectado com posições em `datas_ns` (datas das barras em ns)
+
+        Datas ausentes de `datas_ns` ficam na posição da barra seguinte.
+        """
+        def posicao(data: pd.Timestamp) -> int:
+            return int(np.searchsorted(datas_ns, data.value))
+
+        return PadraoDetectado(
+            tipo=self.tipo,
+            inicio=posicao(self.inicio),
+            fim=posicao(self.fim),
+            confianca=self.confianca,
+            pontos_chave=[(posicao(t), p) for t, p in self.pontos_chave],
+            sinal=self.sinal,
+            preco_entrada=self.preco_entrada,
+            stop_loss=self.stop_loss,
+            take_profit=self.take_profit
+        )
+
+
+class IndicePadroes:
+    """
+    Índice SQLite de padrões por ativo, atualizado incrementalmente
+
+    A configuração da detecção (janela, janela de pivô, confiança mínima,
+    dtype e modelos geométricos do detector) fica gravada no banco; abrir o mesmo arquivo com outra
+    configuração gera ValueError, pois os registros deixariam de corresponder.
+    """
+
+    def __init__(self, caminho: Union[str, Path] = ':memory:', detector: Optional[DetectorPadroes] = None,
+                 janela: int = 50, janela_pivo: int = 5):
+        """
+        Args:
+            caminho: Arquivo do banco (':memory:' para um índice temporário)
+            detector: Detector usado nas janelas (padrão: DetectorPadroes())
+            janela: Barras de cada janela deslizante (a do backtest de padrões)
+            janela_pivo: Barras de cada lado exigidas para topos e fundos
+        """
+        self.caminho = str(caminho)
+        self.detector = detector or DetectorPadroes()
+        self.janela = janela
+        self.janela_pivo = janela_pivo
+        self.conn = sqlite3.connect(self.caminho, check_same_thread=False)
+        self._trava = threading.Lock()
+        if self.caminho != ':memory:':
+            # Leitores (ex.: painel) não bloqueiam a gravação de barras novas
+            self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(ESQUEMA)
+        self._verificar_configuracao()
+
+    def _verificar_configuracao(self):
+        configuracao = {
+            'janela': str(self.janela),
+            'janela_pivo': str(self.janela_pivo),
+            'min_confianca': repr(float(self.detector.min_confianca)),
+            'dtype': np.dtype(self.detector.dtype).name,
+            'geometrico': str(int(self.detector.geometrico)),
+        }
+        with self._trava, self.conn:
+            gravada = dict(self.conn.execute("SELECT chave, valor FROM configuracao"))
+            if gravada:
+                gravada.setdefault('geometrico', '0')  # Índices anteriores à opção
+            if not gravada:
+                self.conn.executemany("INSERT INTO configuracao VALUES (?, ?)", configuracao.items())
+            elif gravada != configuracao:
+                raise ValueError(f"Índice criado com outra configuração: {gravada}")
+
+    def fechar(self):
+        self.conn.close()
+
+    def ultima_barra(self, simbolo: str) -> Optional[pd.Timestamp]:
+        """Última barra processada do ativo (None se nunca indexado)"""
+        linha = self.conn.execute("SELECT ultima_barra FROM progresso WHERE simbolo = ?", (simbolo,)).fetchone()
+        return None if linha is None else pd.Timestamp(linha[0])
+
+    def simbolos(self) -> List[str]:
+        return [linha[0] for linha in self.conn.execute("SELECT simbolo FROM progresso ORDER BY simbolo")]
+
+    def atualizar(self, simbolo: str, datas, precos) -> int:
+        """
+        Processa as janelas que terminam nas barras ainda não indexadas
+
+        Args:
+            simbolo: Ativo
+            datas: Datas das barras, crescentes; desde a primeira indexação
+                ou, depois, ao menos `janela` barras antes da última processada
+            precos: Fechamentos correspondentes
+
+        Returns:
+            Número de barras novas processadas
+        """
+        datas_ns = _nanossegundos(datas)
+        precos = np.asarray(precos, dtype=self.detector.dtype)
+        if len(datas_ns) != len(precos):
+            raise ValueError("datas e precos devem ter o mesmo tamanho")
+
+        with self._trava, self.conn:
+            ultima = self.conn.execute("SELECT ultima_barra FROM progresso WHERE simbolo = ?",
+                                       (simbolo,)).fetchone()
+            if ultima is None:
+                primeiro_fim = self.janela
+            else:
+                k = int(np.searchsorted(datas_ns, ultima[0]))
+                if k >= len(datas_ns) or datas_ns[k] != ultima[0] or k + 1 < self.janela:
+                    raise ValueError(f"As barras de {simbolo} não incluem a última indexada e as "
+                                     f"{self.janela} anteriores; use reconstruir()")
+                primeiro_fim = k + 2
+            if primeiro_fim > len(datas_ns):
+                return 0
+            self._processar(simbolo, datas_ns, precos, primeiro_fim)
+            self.conn.execute("INSERT OR REPLACE INTO progresso VALUES (?, ?)", (simbolo, int(datas_ns[-1])))
+            return len(datas_ns) - primeiro_fim + 1
+
+    def reconstruir(self, simbolo: str, datas, precos) -> int:
+        """Apaga o ativo do índice e o indexa de novo (ex.: após barras regravadas)"""
+        self.remover(simbolo)
+        return self.atualizar(simbolo, datas, precos)
+
+    def remover(self, simbolo: str):
+        with self._trava, self.conn:
+            self.conn.execute("""DELETE FROM avaliacao_padroes WHERE avaliacao_id IN
+                                 (SELECT id FROM avaliacoes WHERE simbolo = ?)""", (simbolo,))
+            for tabela in ('avaliacoes', 'padroes', 'progresso'):
+                self.conn.execute(f"DELETE FROM {tabela} WHERE simbolo = ?", (simbolo,))
+
+    def atualizar_do_armazem(self, store, simbolos: Optional[Iterable[str]] = None,
+                             coluna: str = 'close') -> Dict[str, int]:
+        """
+        Atualiza os ativos a partir de um armazém colunar (`read_arrays`)
+
+        Returns:
+            {ativo: barras novas processadas}
+        """
+        processadas = {}
+        for simbolo in (store.symbols() if simbolos is None else simbolos):
+            arrays = store.read_arrays(simbolo, columns=[coluna])
+            processadas[simbolo] = self.atualizar(simbolo, arrays['timestamp'], arrays[coluna])
+        return processadas
+
+    def _processar(self, simbolo: str, datas_ns: np.ndarray, precos: np.ndarray, primeiro_fim: int):
+        # Barras anteriores ao trecho novo bastam para as janelas e os pivôs
+        base = max(primeiro_fim - self.janela, 0)
+        scanner = ScannerPadroesIncremental(self.detector, precos[base:], self.janela, self.janela_pivo)
+        avaliacao, chaves, ids = self._avaliacao_atual(simbolo)
+        fins_avaliacao: Dict[int, int] = {}
+        fins_padrao: Dict[int, int] = {}
+        reavaliacoes = None
+
+        for fim in range(primeiro_fim, len(datas_ns) + 1):
+            padroes = scanner.padroes_em(fim - base)
+            barra = int(datas_ns[fim - 1])
+            if scanner.reavaliacoes != reavaliacoes:
+                reavaliacoes = scanner.reavaliacoes
+                novas = [self._chave(padrao, datas_ns, base) for padrao in padroes]
+                if novas != chaves:
+                    anteriores = dict(zip(chaves, ids))
+                    chaves, ids, avaliacao = novas, [], None
+                    if novas:
+                        avaliacao = self.conn.execute(
+                            "INSERT INTO avaliacoes (simbolo, valido_de, valido_ate) VALUES (?, ?, ?)",
+                            (simbolo, barra, barra)).lastrowid
+                    for ordem, chave in enumerate(novas):
+                        padrao_id = anteriores.get(chave)
+                        if padrao_id is None:
+                            padrao_id = self.conn.execute(
+                                f"INSERT INTO padroes ({', '.join(COLUNAS_PADRAO[1:])}) "
+                                f"VALUES ({', '.join('?' * (len(COLUNAS_PADRAO) - 1))})",
+                                (simbolo,) + chave + (barra, barra)).lastrowid
+                        ids.append(padrao_id)
+                        self.conn.execute("INSERT INTO avaliacao_padroes VALUES (?, ?, ?)",
+                                          (avaliacao, ordem, padrao_id))
+            if avaliacao is not None:
+                fins_avaliacao[avaliacao] = barra
+                fins_padrao.update((padrao_id, barra) for padrao_id in ids)
+
+        self.conn.executemany("UPDATE avaliacoes SET valido_ate = ? WHERE id = ?",
+                              [(barra, i) for i, barra in fins_avaliacao.items()])
+        self.conn.executemany("UPDATE padroes SET visto_ate = ? WHERE id = ?",
+                              [(barra, i) for i, barra in fins_padrao.items()])
+
+    def _avaliacao_atual(self, simbolo: str) -> Tuple[Optional[int], List[tuple], List[int]]:
+        """Avaliação visível na última barra processada (se houver padrões nela)"""
+        linha = self.conn.execute("""
+            SELECT a.id FROM avaliacoes a JOIN progresso p ON p.simbolo = a.simbolo
+            WHERE a.simbolo = ? AND a.valido_ate = p.ultima_barra
+        """, (simbolo,)).fetchone()
+        if linha is None:
+            return None, [], []
+        linhas = self.conn.execute(f"""
+            SELECT {', '.join('p.' + c for c in COLUNAS_PADRAO)} FROM avaliacao_padroes ap
+            JOIN padroes p ON p.id = ap.padrao_id WHERE ap.avaliacao_id = ? ORDER BY ap.ordem
+        """, (linha[0],)).fetchall()
+        return linha[0], [tuple(l[2:11]) for l in linhas], [l[0] for l in linhas]
+
+    @staticmethod
+    def _chave(padrao: PadraoDetectado, datas_ns: np.ndarray, base: int) -> tuple:
+        """Valores gravados do padrão, com posições convertidas em datas"""
+        pontos = [[int(datas_ns[base + i]), float(p)] for i, p in padrao.pontos_chave]
+        return (padrao.tipo.value, int(datas_ns[base + padrao.inicio]), int(datas_ns[base + padrao.fim]),
+                float(padrao.confianca), padrao.sinal, _real(padrao.preco_entrada),
+                _real(padrao.stop_loss), _real(padrao.take_profit), json.dumps(pontos))
+
+    def consultar(self,
+                  tipo: Union[TipoPadrao, str, Sequence, None] = None,
+                  simbolo: Union[str, Sequence[str], None] = None,
+                  min_confianca: Optional[float] = None,
+                  desde=None,
+                  ate=None,
+                  sinal: Optional[str] = None,
+                  limite: Optional[int] = None) -> List[PadraoIndexado]:
+        """
+        Padrões do índice, do mais para o menos confiável
+
+        Args:
+            tipo: TipoPadrao (ou valor/lista deles)
+            simbolo: Ativo ou lista de ativos
+            min_confianca: Confiança mínima (inclusiva)
+            desde: Fim do padrão a partir desta data (inclusiva)
+            ate: Fim do padrão até esta data (inclusiva)
+            sinal: 'COMPRA', 'VENDA' ou 'NEUTRO'
+            limite: Máximo de registros
+
+        Returns:
+            Lista de PadraoIndexado
+        """
+        condicoes, parametros = [], []
+
+        def em(coluna: str, valores):
+            valores = [valores] if isinstance(valores, (str, TipoPadrao)) else list(valores)
+            valores = [v.value if isinstance(v, TipoPadrao) else v for v in valores]
+            condicoes.append(f"{coluna} IN ({', '.join('?' * len(valores))})")
+            parametros.extend(valores)
+
+        if tipo is not None:
+            em('tipo', tipo)
+        if simbolo is not None:
+            em('simbolo', simbolo)
+        if min_confianca is not None:
+            condicoes.append("confianca >= ?")
+            parametros.append(float(min_confianca))
+        if desde is not None:
+            condicoes.append("fim >= ?")
+            parametros.append(int(pd.Timestamp(desde).value))
+        if ate is not None:
+            condicoes.append("fim <= ?")
+            parametros.append(int(pd.Timestamp(ate).value))
+        if sinal is not None:
+            condicoes.append("sinal = ?")
+            parametros.append(sinal)
+
+        consulta = f"SELECT {', '.join(COLUNAS_PADRAO)} FROM padroes"
+        if condicoes:
+            consulta += " WHERE " + " AND ".join(condicoes)
+        consulta += " ORDER BY confianca DESC, fim DESC, id"
+        if limite is not None:
+            consulta += " LIMIT ?"
+            parametros.append(int(limite))
+        return [PadraoIndexado.da_linha(linha) for linha in self.conn.execute(consulta, parametros)]
+
+    def padroes_por_barra(self, simbolo: str, datas) -> List[List[PadraoDetectado]]:
+        """
+        Padrões visíveis na janela que termina em cada barra, sem redetecção
+
+        O elemento k equivale a `ScannerPadroesIncremental.padroes_em(k + 1)`
+        sobre as barras indexadas (mesma ordem); posições são relativas a
+        `datas`, que deve ser um trecho contíguo das barras indexadas. Barras
+        fora do índice recebem lista vazia.
+
+        Args:
+            simbolo: Ativo
+            datas: Datas das barras
+
+        Returns:
+            Lista com uma lista de PadraoDetectado por barra
+        """
+        datas_ns = _nanossegundos(datas)
+        por_barra: List[List[PadraoDetectado]] = [[] for _ in range(len(datas_ns))]
+        if not len(datas_ns):
+            return por_barra
+        linhas = self.conn.execute(f"""
+            SELECT a.id, a.valido_de, a.valido_ate, {', '.join('p.' + c for c in COLUNAS_PADRAO)}
+            FROM avaliacoes a JOIN avaliacao_padroes ap ON ap.avaliacao_id = a.id
+            JOIN padroes p ON p.id = ap.padrao_id
+            WHERE a.simbolo = ? AND a.valido_ate >= ? AND a.valido_de <= ?
+            ORDER BY a.valido_de, ap.ordem
+        """, (simbolo, int(datas_ns[0]), int(datas_ns[-1]))).fetchall()
+
+        convertidos: Dict[int, PadraoDetectado] = {}
+        avaliacoes: Dict[int, tuple] = {}
+        for linha in linhas:
+            avaliacao_id, valido_de, valido_ate, padrao = linha[0], linha[1], linha[2], linha[3:]
+            if padrao[0] not in convertidos:
+                convertidos[padrao[0]] = PadraoIndexado.da_linha(padrao).como_padrao(datas_ns)
+            avaliacoes.setdefault(avaliacao_id, (valido_de, valido_ate, []))[2].append(convertidos[padrao[0]])
+
+        for valido_de, valido_ate, padroes in avaliacoes.values():
+            a = int(np.searchsorted(datas_ns, valido_de))
+            b = int(np.searchsorted(datas_ns, valido_ate, side='right'))
+            for k in range(a, b):
+                por_barra[k] = padroes
+        return por_barra
@@ -0,0 +1,413 @@
+"""
+Modelos Geométricos de Padrões
+Retas de tendência por mínimos quadrados sobre janelas de pivôs em lote
+
+Os detectores de `DetectorPadroes` decidem a direção dos topos e fundos por
+comparações par a par (`all(a < b ...)`) e avaliam só os últimos pivôs. Aqui
+cada janela candidata (os últimos `n_pivos` topos e fundos após cada pivô
+da série) recebe uma reta superior, ajustada aos topos, e uma inferior,
+ajustada aos fundos, todas de uma vez:
+
+- os ajustes são a solução de mínimos quadrados de cada janela, obtida
+  pelas equações normais empilhadas (janelas x pontos), equivalente a
+  `np.linalg.lstsq` por janela, que não aceita pilhas de sistemas;
+- a variação de cada reta ao longo da janela define a direção (alta,
+  plana, baixa) e a distância entre elas no início e no fim define
+  convergência ou paralelismo;
+- a confiança vem do resíduo dos ajustes (pivôs próximos das retas) e do
+  número de pivôs que as sustentam; retas por dois pontos, sem resíduo
+  mensurável, valem menos.
+
+Modelos de retas: triângulos (ascendente, descendente, simétrico), canais
+(alta, baixa) e cunhas (ascendente, descendente). Cabeça e ombros (e o
+invertido) e topo/fundo duplo usam as mesmas janelas de pivôs, com os vales
+(ou picos) entre pivôs consecutivos calculados para a série inteira numa
+única passada.
+
+`DetectorPadroes(geometrico=True)` troca os detectores individuais por estes
+modelos (última janela), e a opção vale para ScannerPadroesIncremental,
+IndicePadroes e PatternScanner, que reúnem as janelas de todas as barras
+(ou de todos os ativos) numa única chamada a `avaliar_janelas`.
+
+Exemplo:
+    modelos = ModelosGeometricos()
+    historico = modelos.detectar(precos)            # todas as janelas
+    atuais = modelos.avaliar(precos, topos, fundos, apenas_ultima=True)
+    scanner = PatternScanner(DetectorPadroes(geometrico=True))
+"""
+
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from .detector_padroes import PadraoDetectado, TipoPadrao
+from .precisao import resolver_dtype
+from .primitivas import pivos
+
+# Direção de cada reta: variação relativa ao longo da janela
+ALTA, PLANA, BAIXA = 1, 0, -1
+
+# (direção superior, direção inferior, convergente) -> (tipo, sinal)
+MODELOS_RETAS = {
+    (PLANA, ALTA, True): (TipoPadrao.TRIANGULO_ASCENDENTE, 'COMPRA'),
+    (BAIXA, PLANA, True): (TipoPadrao.TRIANGULO_DESCENDENTE, 'VENDA'),
+    (BAIXA, ALTA, True): (TipoPadrao.TRIANGULO_SIMETRICO, 'NEUTRO'),
+    (ALTA, ALTA, False): (TipoPadrao.CANAL_ALTA, 'COMPRA'),
+    (BAIXA, BAIXA, False): (TipoPadrao.CANAL_BAIXA, 'VENDA'),
+    (ALTA, ALTA, True): (TipoPadrao.CUNHA_ASCENDENTE, 'VENDA'),
+    (BAIXA, BAIXA, True): (TipoPadrao.CUNHA_DESCENDENTE, 'COMPRA'),
+}
+
+
+def ajustar_retas(x: np.ndarray, y: np.ndarray, pesos: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Retas de mínimos quadrados ponderados para várias janelas
+
+    Args:
+        x: Posições (janelas x pontos)
+        y: Valores (janelas x pontos)
+        pesos: 1 para pontos válidos, 0 para ausentes
+
+    Returns:
+        (inclinacao, intercepto, residuo_rms) por janela; NaN com menos de
+        dois pontos distintos
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    pesos = np.asarray(pesos, dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        n = pesos.sum(axis=-1)
+        media_x = (pesos * x).sum(axis=-1) / n
+        media_y = (pesos * y).sum(axis=-1) / n
+        dx = x - media_x[..., None]
+        sxx = (pesos * dx * dx).sum(axis=-1)
+        inclinacao = (pesos * dx * (y - media_y[..., None])).sum(axis=-1) / sxx
+        inclinacao = np.where(sxx > 0, inclinacao, np.nan)
+        intercepto = media_y - inclinacao * media_x
+        residuos = y - (intercepto[..., None] + inclinacao[..., None] * x)
+        rms = np.sqrt((pesos * residuos * residuos).sum(axis=-1) / n)
+    return inclinacao, intercepto, rms
+
+
+def _janelas_pivos(indices: np.ndarray, fins: np.ndarray, contagens: np.ndarray,
+                   n_pivos: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Últimos `n_pivos` de `indices[fim - contagem:fim]` para cada janela
+
+    Returns:
+        (índices, máscara dos existentes), ambos (janelas x n_pivos)
+    """
+    deslocamentos = np.arange(-n_pivos, 0)
+    validos = deslocamentos >= -np.minimum(contagens, n_pivos)[:, None]
+    if not len(indices):
+        return np.zeros(validos.shape, dtype=np.int64), validos
+    posicoes = np.clip(fins[:, None] + deslocamentos, 0, len(indices) - 1)
+    return indices[posicoes], validos
+
+
+def _extremos_entre(precos: np.ndarray, inicio: np.ndarray, fim: np.ndarray,
+                    maximo: bool) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Posição e valor do menor (ou maior) preço em cada segmento
+
+    O segmento k vai de inicio[k] a fim[k], inclusive; em empates vale a
+    primeira barra, como `np.argmin`.
+    """
+    if not len(inicio):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=precos.dtype)
+    valores = -precos if maximo else precos
+    fim = fim + 1
+    tamanhos = fim - inicio
+    deslocamentos = np.cumsum(tamanhos) - tamanhos
+    barras = np.arange(tamanhos.sum()) + np.repeat(inicio - deslocamentos, tamanhos)
+    trechos = valores[barras]
+    minimos = np.fmin.reduceat(trechos, deslocamentos)
+    # Primeira barra de cada segmento que atinge o mínimo (segmentos só com NaN: a inicial)
+    atinge = trechos == np.repeat(minimos, tamanhos)
+    primeiras = np.minimum.reduceat(np.where(atinge, np.arange(len(barras)), len(barras)), deslocamentos)
+    posicoes = barras[np.where(primeiras < len(barras), primeiras, deslocamentos)]
+    return posicoes, precos[posicoes]
+
+
+class ModelosGeometricos:
+    """
+    Motor vetorizado de modelos geométricos sobre topos e fundos
+
+    Todas as janelas candidatas de uma série são avaliadas em lote; o
+    resultado usa PadraoDetectado, com os mesmos campos dos detectores de
+    DetectorPadroes.
+    """
+
+    def __init__(self,
+                 min_confianca: float = 60.0,
+                 n_pivos: int = 3,
+                 tolerancia_plana: float = 0.02,
+                 tolerancia_residuo: float = 0.02,
+                 tolerancia_paralelo: float = 0.25,
+                 janela_pivo: int = 5,
+                 dtype=None):
+        """
+        Args:
+            min_confianca: Confiança mínima dos padrões retornados
+            n_pivos: Topos e fundos por janela (mínimo de 2 por reta)
+            tolerancia_plana: Variação relativa máxima de uma reta plana ao
+                longo da janela
+            tolerancia_residuo: Resíduo RMS relativo ao preço em que o ajuste
+                deixa de contar para a confiança
+            tolerancia_paralelo: Variação relativa máxima da distância entre
+                as retas para considerá-las paralelas; reduções maiores são
+                convergência
+            janela_pivo: Barras de cada lado exigidas para topos e fundos
+            dtype: float64 (padrão) ou float32
+        """
+        if n_pivos < 2:
+            raise ValueError("n_pivos deve ser ao menos 2")
+        self.min_confianca = min_confianca
+        self.n_pivos = n_pivos
+        self.tolerancia_plana = tolerancia_plana
+        self.tolerancia_residuo = tolerancia_residuo
+        self.tolerancia_paralelo = tolerancia_paralelo
+        self.janela_pivo = janela_pivo
+        self.dtype = resolver_dtype(dtype)
+
+    def detectar(self, precos: Sequence[float], apenas_ultima: bool = False) -> List[PadraoDetectado]:
+        """
+        Detecta topos e fundos (`pivos`) e avalia todas as janelas
+
+        Returns:
+            Padrões de todas as janelas, por fim e confiança decrescente
+        """
+        precos = np.asarray(precos, dtype=self.dtype)
+        topos, fundos = pivos(precos, self.janela_pivo)
+        return self.avaliar(precos, np.flatnonzero(topos), np.flatnonzero(fundos), apenas_ultima)
+
+    def avaliar(self, precos: Sequence[float], topos: Sequence[int], fundos: Sequence[int],
+                apenas_ultima: bool = False) -> List[PadraoDetectado]:
+        """
+        Avalia os modelos sobre topos e fundos já conhecidos
+
+        Args:
+            precos: Série de preços
+            topos: Índices dos topos, em ordem crescente
+            fundos: Índices dos fundos, em ordem crescente
+            apenas_ultima: Avalia só a janela dos últimos pivôs (como
+                DetectorPadroes.avaliar_padroes)
+
+        Returns:
+            Padrões com confiança suficiente, por fim e confiança decrescente
+        """
+        precos = np.asarray(precos, dtype=self.dtype)
+        topos = np.asarray(topos, dtype=np.int64)
+        fundos = np.asarray(fundos, dtype=np.int64)
+
+        # Janelas candidatas: os últimos pivôs até cada topo ou fundo
+        eventos = np.union1d(topos, fundos)
+        if apenas_ultima:
+            eventos = eventos[-1:]
+        fins_topos = np.searchsorted(topos, eventos, side='right')
+        fins_fundos = np.searchsorted(fundos, eventos, side='right')
+        x_sup, v_sup = _janelas_pivos(topos, fins_topos, fins_topos, self.n_pivos)
+        x_inf, v_inf = _janelas_pivos(fundos, fins_fundos, fins_fundos, self.n_pivos)
+        padroes = [padrao for _, padrao in self._modelos_retas(precos, x_sup, v_sup, x_inf, v_inf)]
+
+        for indices, maximo in ((topos, False), (fundos, True)):
+            pares = np.arange(max(len(indices) - 1, 0))
+            trios = np.arange(max(len(indices) - 2, 0))
+            if apenas_ultima:
+                pares, trios = pares[-1:], trios[-1:]
+            duplos, cabecas = self._modelos_extremos(precos, indices, maximo, pares, trios)
+            padroes += [padrao for _, padrao in duplos + cabecas]
+        padroes.sort(key=lambda p: (p.fim, -p.confianca))
+        return padroes
+
+    def avaliar_janelas(self, precos: Sequence[float], topos: Sequence[int], fundos: Sequence[int],
+                        fins_topos: Sequence[int], n_topos: Sequence[int],
+                        fins_fundos: Sequence[int], n_fundos: Sequence[int]) -> List[List[PadraoDetectado]]:
+        """
+        Avalia em lote a última janela de vários conjuntos de pivôs
+
+        A janela w usa `topos[fins_topos[w] - n_topos[w]:fins_topos[w]]` e o
+        equivalente em fundos, e seu resultado é o de `avaliar` sobre esses
+        pivôs com `apenas_ultima=True`. Todas as janelas (de uma série ou de
+        séries concatenadas) são ajustadas numa única passada.
+
+        Returns:
+            Padrões de cada janela, por fim e confiança decrescente
+        """
+        precos = np.asarray(precos, dtype=self.dtype)
+        topos = np.asarray(topos, dtype=np.int64)
+        fundos = np.asarray(fundos, dtype=np.int64)
+        fins_topos, n_topos = np.asarray(fins_topos, dtype=np.int64), np.asarray(n_topos, dtype=np.int64)
+        fins_fundos, n_fundos = np.asarray(fins_fundos, dtype=np.int64), np.asarray(n_fundos, dtype=np.int64)
+        por_janela: List[List[PadraoDetectado]] = [[] for _ in range(len(fins_topos))]
+
+        x_sup, v_sup = _janelas_pivos(topos, fins_topos, n_topos, self.n_pivos)
+        x_inf, v_inf = _janelas_pivos(fundos, fins_fundos, n_fundos, self.n_pivos)
+        for janela, padrao in self._modelos_retas(precos, x_sup, v_sup, x_inf, v_inf):
+            por_janela[janela].append(padrao)
+
+        # Pares e trios finais de cada janela, avaliados uma vez mesmo se compartilhados
+        for indices, fins, contagens, maximo in ((topos, fins_topos, n_topos, False),
+                                                 (fundos, fins_fundos, n_fundos, True)):
+            com_par, com_trio = np.flatnonzero(contagens >= 2), np.flatnonzero(contagens >= 3)
+            pares, trios = fins[com_par] - 2, fins[com_trio] - 3
+            duplos, cabecas = self._modelos_extremos(precos, indices, maximo, np.unique(pares), np.unique(trios))
+            for janelas, inicios, encontrados in ((com_par, pares, duplos), (com_trio, trios, cabecas)):
+                por_inicio = dict(encontrados)
+                for janela, j in zip(janelas.tolist(), inicios.tolist()):
+                    if j in por_inicio:
+                        por_janela[janela].append(por_inicio[j])
+
+        for padroes in por_janela:
+            padroes.sort(key=lambda p: (p.fim, -p.confianca))
+        return por_janela
+
+    def _modelos_retas(self, precos: np.ndarray, x_sup: np.ndarray, v_sup: np.ndarray,
+                       x_inf: np.ndarray, v_inf: np.ndarray) -> List[Tuple[int, PadraoDetectado]]:
+        """Triângulos, canais e cunhas de cada janela, como (janela, padrão)"""
+        candidatas = np.flatnonzero((v_sup.sum(axis=1) >= 2) & (v_inf.sum(axis=1) >= 2))
+        x_sup, v_sup, x_inf, v_inf = x_sup[candidatas], v_sup[candidatas], x_inf[candidatas], v_inf[candidatas]
+        if not len(x_sup):
+            return []
+
+        grande = np.iinfo(np.int64).max
+        inicio = np.minimum(np.where(v_sup, x_sup, grande).min(axis=1), np.where(v_inf, x_inf, grande).min(axis=1))
+        fim = np.maximum(np.where(v_sup, x_sup, -1).max(axis=1), np.where(v_inf, x_inf, -1).max(axis=1))
+        extensao = fim - inicio
+
+        # Retas na posição relativa ao início da janela: o resultado não depende
+        # do referencial dos índices (janela, série ou matriz achatada)
+        y_sup = precos[x_sup].astype(np.float64)
+        y_inf = precos[x_inf].astype(np.float64)
+        a_sup, b_sup, r_sup = ajustar_retas(x_sup - inicio[:, None], y_sup, v_sup)
+        a_inf, b_inf, r_inf = ajustar_retas(x_inf - inicio[:, None], y_inf, v_inf)
+        nivel = ((v_sup * y_sup).sum(axis=1) + (v_inf * y_inf).sum(axis=1)) / (v_sup.sum(axis=1) + v_inf.sum(axis=1))
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            direcao_sup = self._direcao(a_sup * extensao / nivel)
+            direcao_inf = self._direcao(a_inf * extensao / nivel)
+            sup_inicio, sup_fim = b_sup, b_sup + a_sup * extensao
+            inf_inicio, inf_fim = b_inf, b_inf + a_inf * extensao
+            abertura, fechamento = sup_inicio - inf_inicio, sup_fim - inf_fim
+            razao = fechamento / abertura
+            convergente = razao < 1 - self.tolerancia_paralelo
+            paralelo = np.abs(razao - 1) <= self.tolerancia_paralelo
+            validas = (abertura > 0) & (fechamento > 0) & (convergente | paralelo)
+
+            # Qualidade do ajuste de cada reta e suporte pelo número de pivôs
+            qualidade = 1 - np.clip((r_sup + r_inf) / (2 * nivel * self.tolerancia_residuo), 0, 1)
+            suporte = (v_sup.sum(axis=1) + v_inf.sum(axis=1) - 1) / (2 * self.n_pivos - 1)
+            confianca = np.minimum(50.0 + 45.0 * qualidade * suporte, 95.0)
+
+        padroes = []
+        for k in np.flatnonzero(validas & (confianca >= self.min_confianca)):
+            modelo = MODELOS_RETAS.get((int(direcao_sup[k]), int(direcao_inf[k]), bool(convergente[k])))
+            if modelo is None:
+                continue
+            tipo, sinal = modelo
+            superior, inferior, altura = float(sup_fim[k]), float(inf_fim[k]), float(abertura[k])
+            if tipo in (TipoPadrao.CANAL_ALTA, TipoPadrao.CANAL_BAIXA):
+                niveis = ((inferior * 1.01, inferior * 0.98, superior * 1.02) if sinal == 'COMPRA'
+                          else (superior * 0.99, superior * 1.02, inferior * 0.98))
+            elif sinal == 'VENDA':
+                # Rompimento da reta inferior, alvo pela altura inicial
+                niveis = (inferior * 0.99, superior * 1.02, inferior - altura)
+            else:
+                niveis = (superior * 1.01, inferior * 0.98, superior + altura)
+            pontos = [(int(i), float(precos[i])) for i in np.concatenate([x_sup[k][v_sup[k]], x_inf[k][v_inf[k]]])]
+            padroes.append((int(candidatas[k]), PadraoDetectado(
+                tipo=tipo,
+                inicio=int(inicio[k]),
+                fim=int(fim[k]),
+                confianca=float(confianca[k]),
+                pontos_chave=pontos,
+                sinal=sinal,
+                preco_entrada=niveis[0],
+                stop_loss=niveis[1],
+                take_profit=niveis[2]
+            )))
+        return padroes
+
+    def _direcao(self, variacao: np.ndarray) -> np.ndarray:
+        return np.select([variacao > self.tolerancia_plana, variacao < -self.tolerancia_plana],
+                         [ALTA, BAIXA], PLANA)
+
+    def _modelos_extremos(self, precos: np.ndarray, indices: np.ndarray, invertido: bool,
+                          pares: np.ndarray, trios: np.ndarray) -> Tuple[list, list]:
+        """
+        Topo duplo e cabeça e ombros sobre topos (ou os invertidos sobre fundos)
+
+        Os fundos são tratados como topos dos preços negados. O par j usa os
+        pivôs j e j + 1, e o trio j os pivôs j a j + 2.
+
+        Returns:
+            (duplos, cabeças), cada um como lista de (j, padrão)
+        """
+        if len(indices) < 2:
+            return [], []
+        # Vales (ou picos) só dos segmentos usados pelos pares e trios
+        segmentos = np.unique(np.concatenate([pares, trios, trios + 1])).astype(np.int64)
+        vales = np.zeros(len(indices) - 1, dtype=np.int64)
+        precos_vales = np.zeros(len(indices) - 1, dtype=precos.dtype)
+        vales[segmentos], precos_vales[segmentos] = _extremos_entre(
+            precos, indices[segmentos], indices[segmentos + 1], maximo=invertido)
+        sinal = -1.0 if invertido else 1.0
+        y = sinal * precos[indices].astype(np.float64)
+        y_vales = sinal * precos_vales.astype(np.float64)
+        duplos, cabecas = [], []
+
+        # Duplo: pares de pivôs consecutivos
+        p1, p2, vale = y[pares], y[pares + 1], y_vales[pares]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            diferenca = np.abs(p1 - p2) / np.maximum(np.abs(p1), np.abs(p2))
+            correcao = (np.minimum(p1, p2) - vale) / np.abs(np.minimum(p1, p2))
+            confianca = np.minimum(60.0 + 35.0 * (1 - diferenca / 0.03) * np.minimum(correcao / 0.10, 1), 95.0)
+        tipo, direcao = ((TipoPadrao.DUPLO_FUNDO, 'COMPRA') if invertido else (TipoPadrao.DUPLO_TOPO, 'VENDA'))
+        for k in np.flatnonzero((diferenca < 0.03) & (correcao > 0.05) & (confianca >= self.min_confianca)):
+            j = int(pares[k])
+            extremo, suporte = sinal * max(p1[k], p2[k]), sinal * vale[k]
+            duplos.append((j, PadraoDetectado(
+                tipo=tipo,
+                inicio=int(indices[j]),
+                fim=int(indices[j + 1]),
+                confianca=float(confianca[k]),
+                pontos_chave=[(int(indices[j]), float(precos[indices[j]])), (int(vales[j]), float(precos_vales[j])),
+                              (int(indices[j + 1]), float(precos[indices[j + 1]]))],
+                sinal=direcao,
+                preco_entrada=suporte * (1.01 if invertido else 0.99),
+                stop_loss=extremo * (0.98 if invertido else 1.02),
+                take_profit=suporte - (extremo - suporte)
+            )))
+
+        # Cabeça e ombros: trios de pivôs consecutivos
+        o1, cabeca, o2 = y[trios], y[trios + 1], y[trios + 2]
+        x1, xc, x2 = indices[trios], indices[trios + 1], indices[trios + 2]
+        xv1, xv2 = vales[trios], vales[trios + 1]
+        v1, v2 = y_vales[trios], y_vales[trios + 1]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            diferenca = np.abs(o1 - o2) / np.maximum(np.abs(o1), np.abs(o2))
+            # Linha do pescoço pelos dois vales, projetada na cabeça e no segundo ombro
+            inclinacao = (v2 - v1) / (xv2 - xv1)
+            pescoco_cabeca = v1 + inclinacao * (xc - xv1)
+            pescoco_fim = v1 + inclinacao * (x2 - xv1)
+            simetria = 1 - np.abs((xc - x1) - (x2 - xc)) / (x2 - x1)
+            confianca = np.minimum(60.0 + 35.0 * (1 - diferenca / 0.05) * (0.5 + 0.5 * simetria), 95.0)
+        validos = (cabeca > o1) & (cabeca > o2) & (diferenca < 0.05) & (confianca >= self.min_confianca)
+        tipo, direcao = ((TipoPadrao.CABECA_OMBROS_INVERTIDO, 'COMPRA') if invertido
+                         else (TipoPadrao.CABECA_OMBROS, 'VENDA'))
+        for k in np.flatnonzero(validos):
+            j = int(trios[k])
+            pontos = [indices[j], vales[j], indices[j + 1], vales[j + 1], indices[j + 2]]
+            pescoco = sinal * pescoco_fim[k]
+            cabecas.append((j, PadraoDetectado(
+                tipo=tipo,
+                inicio=int(indices[j]),
+                fim=int(indices[j + 2]),
+                confianca=float(confianca[k]),
+                pontos_chave=[(int(i), float(precos[i])) for i in pontos],
+                sinal=direcao,
+                preco_entrada=pescoco * (1.01 if invertido else 0.99),
+                stop_loss=sinal * cabeca[k] * (0.98 if invertido else 1.02),
+                take_profit=pescoco - sinal * (cabeca[k] - pescoco_cabeca[k])
+            )))
+        return duplos, cabecas
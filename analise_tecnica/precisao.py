@@ -0,0 +1,37 @@
+"""
+Política de Precisão Numérica
+Define o tipo de ponto flutuante usado pela camada de análise técnica
+"""
+
+from typing import Dict
+
+import numpy as np
+
+DTYPE_PADRAO = np.dtype(np.float64)
+DTYPES_SUPORTADOS = (np.dtype(np.float32), np.dtype(np.float64))
+
+# Diferença máxima esperada entre um cálculo em float32 e o mesmo cálculo em
+# float64 (usada nos testes de tolerância). Somas acumuladas são feitas em
+# float64 nas primitivas, então o erro é dominado pelo arredondamento dos
+# preços de entrada (~6e-8 relativo) e não cresce com o tamanho da série.
+# Osciladores limitados (RSI, Estocástico, Williams %R) ficam dentro de
+# `atol` em pontos de escala; médias e bandas dentro de `rtol` do preço.
+TOLERANCIAS_FLOAT32: Dict[str, float] = {'rtol': 1e-5, 'atol': 1e-2}
+
+
+def resolver_dtype(dtype=None) -> np.dtype:
+    """
+    Valida e normaliza o dtype configurado
+
+    Args:
+        dtype: np.float32, np.float64, 'float32', 'float64' ou None (padrão)
+
+    Returns:
+        np.dtype correspondente
+    """
+    if dtype is None:
+        return DTYPE_PADRAO
+    dtype = np.dtype(dtype)
+    if dtype not in DTYPES_SUPORTADOS:
+        raise ValueError(f"dtype não suportado: {dtype} (use float32 ou float64)")
+    return dtype
@@ -0,0 +1,196 @@
+"""
+Primitivas Numéricas de Análise Técnica
+Kernels vetorizados sobre o eixo do tempo (último eixo)
+
+Todas as funções aceitam séries 1-D ou matrizes (ativos x tempo). Valores
+NaN representam barras ausentes (ex.: preenchimento de históricos de
+tamanhos diferentes) e propagam-se para as janelas que os contêm, como em
+`pd.Series.rolling(...)` com `min_periods` igual à janela.
+
+A saída preserva o dtype da entrada (float32 ou float64; inteiros viram
+float); somas acumuladas são sempre feitas em float64 para que o erro de
+arredondamento em float32 não cresça com o tamanho da série.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def diferenca(x: np.ndarray) -> np.ndarray:
+    """Diferença entre barras consecutivas; a primeira coluna fica NaN"""
+    x = np.asarray(x)
+    saida = np.full(x.shape, np.nan, dtype=x.dtype if x.dtype.kind == 'f' else np.float64)
+    saida[..., 1:] = x[..., 1:] - x[..., :-1]
+    return saida
+
+
+def ganhos_perdas(deltas: np.ndarray):
+    """Separa deltas em ganhos e perdas (ambos não negativos, NaN preservado)"""
+    return np.maximum(deltas, 0), np.maximum(-deltas, 0)
+
+
+def _somas_janela(x: np.ndarray, periodo: int):
+    """Somas (float64) das janelas de tamanho `periodo` e contagem de válidos"""
+    validos = ~np.isnan(x)
+    preenchido = np.where(validos, x, 0)
+    forma = x.shape[:-1] + (1,)
+    zeros = np.zeros(forma, dtype=np.float64)
+    acumulado = np.concatenate([zeros, np.cumsum(preenchido, axis=-1, dtype=np.float64)], axis=-1)
+    contagem = np.concatenate([zeros.astype(np.int64), np.cumsum(validos, axis=-1)], axis=-1)
+    soma = acumulado[..., periodo:] - acumulado[..., :-periodo]
+    n = contagem[..., periodo:] - contagem[..., :-periodo]
+    return soma, n
+
+
+def media_movel(x: np.ndarray, periodo: int) -> np.ndarray:
+    """
+    Média móvel simples por somas acumuladas, O(n) independente do período
+
+    Args:
+        x: Série ou matriz (ativos x tempo)
+        periodo: Tamanho da janela
+
+    Returns:
+        Array do mesmo formato, NaN onde a janela está incompleta
+    """
+    x = np.asarray(x, dtype=np.result_type(x, np.float32))
+    saida = np.full(x.shape, np.nan, dtype=x.dtype)
+    if x.shape[-1] < periodo:
+        return saida
+    soma, n = _somas_janela(x, periodo)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        saida[..., periodo - 1:] = np.where(n == periodo, soma / periodo, np.nan)
+    return saida
+
+
+def desvio_movel(x: np.ndarray, periodo: int, ddof: int = 1) -> np.ndarray:
+    """
+    Desvio padrão móvel (amostral por padrão, como `rolling().std()`)
+
+    As séries são centradas pela média antes das somas acumuladas para
+    reduzir o cancelamento numérico da fórmula E[x²] - E[x]².
+    """
+    x = np.asarray(x, dtype=np.result_type(x, np.float32))
+    saida = np.full(x.shape, np.nan, dtype=x.dtype)
+    if x.shape[-1] < periodo or periodo - ddof <= 0:
+        return saida
+    with np.errstate(invalid='ignore'):
+        centro = np.nanmean(x, axis=-1, keepdims=True) if x.size else 0
+    centrado = x - np.nan_to_num(centro)
+    soma, n = _somas_janela(centrado, periodo)
+    soma_quadrados, _ = _somas_janela(centrado * centrado, periodo)
+    variancia = (soma_quadrados - soma * soma / periodo) / (periodo - ddof)
+    with np.errstate(invalid='ignore'):
+        saida[..., periodo - 1:] = np.where(n == periodo, np.sqrt(np.maximum(variancia, 0)), np.nan)
+    return saida
+
+
+def media_exponencial(x: np.ndarray, span: int) -> np.ndarray:
+    """
+    Média móvel exponencial equivalente a `ewm(span=span).mean()` (adjust=True)
+
+    Matrizes são processadas em uma única chamada sobre todas as linhas;
+    NaN iniciais são ignorados e a saída permanece NaN onde a entrada é NaN.
+    """
+    x = np.asarray(x)
+    if x.ndim == 1:
+        saida = pd.Series(x).ewm(span=span).mean().to_numpy()
+    else:
+        plano = x.reshape(-1, x.shape[-1])
+        saida = pd.DataFrame(plano.T).ewm(span=span).mean().to_numpy().T.reshape(x.shape)
+    saida = np.array(saida, dtype=np.result_type(x, np.float32))
+    saida[np.isnan(x)] = np.nan
+    return saida
+
+
+def contar_validos(x: np.ndarray) -> np.ndarray:
+    """Número de barras não-NaN por série"""
+    return np.count_nonzero(~np.isnan(x), axis=-1)
+
+
+def _extremo_movel(x: np.ndarray, janela: int, acumular) -> np.ndarray:
+    """
+    Extremo móvel O(n) pelo algoritmo de van Herk/Gil-Werman
+
+    A série é dividida em blocos de tamanho `janela`; acumulados do início
+    (prefixo) e do fim (sufixo) de cada bloco cobrem qualquer janela com no
+    máximo duas consultas, sem laços por elemento. NaN dentro da janela
+    propaga-se para o resultado.
+    """
+    x = np.asarray(x, dtype=np.result_type(x, np.float32))
+    n = x.shape[-1]
+    saida = np.full(x.shape, np.nan, dtype=x.dtype)
+    if janela < 1 or n < janela:
+        return saida
+    if janela == 1:
+        return x.copy()
+
+    n_blocos = -(-n // janela)
+    preenchido = np.full(x.shape[:-1] + (n_blocos * janela,), np.nan, dtype=x.dtype)
+    preenchido[..., :n] = x
+    blocos = preenchido.reshape(x.shape[:-1] + (n_blocos, janela))
+
+    prefixo = acumular.accumulate(blocos, axis=-1).reshape(preenchido.shape)[..., :n]
+    sufixo = acumular.accumulate(blocos[..., ::-1], axis=-1)[..., ::-1].reshape(preenchido.shape)[..., :n]
+
+    # Janela [t - janela + 1, t]: sufixo do primeiro bloco e prefixo do último
+    saida[..., janela - 1:] = acumular(sufixo[..., :n - janela + 1], prefixo[..., janela - 1:])
+    return saida
+
+
+def maximo_movel(x: np.ndarray, janela: int) -> np.ndarray:
+    """Máximo das últimas `janela` barras em cada posição (O(n))"""
+    return _extremo_movel(x, janela, np.maximum)
+
+
+def minimo_movel(x: np.ndarray, janela: int) -> np.ndarray:
+    """Mínimo das últimas `janela` barras em cada posição (O(n))"""
+    return _extremo_movel(x, janela, np.minimum)
+
+
+def desvio_medio_movel(x: np.ndarray, periodo: int) -> np.ndarray:
+    """Desvio absoluto médio em torno da média de cada janela (usado no CCI)"""
+    x = np.asarray(x, dtype=np.result_type(x, np.float32))
+    saida = np.full(x.shape, np.nan, dtype=x.dtype)
+    if x.shape[-1] < periodo:
+        return saida
+    janelas = np.lib.stride_tricks.sliding_window_view(x, periodo, axis=-1)
+    media = janelas.mean(axis=-1, keepdims=True, dtype=np.float64)
+    saida[..., periodo - 1:] = np.abs(janelas - media).mean(axis=-1)
+    return saida
+
+
+def pivos(x: np.ndarray, janela: int, minimas: np.ndarray = None):
+    """
+    Topos e fundos locais pela comparação com o extremo móvel centrado
+
+    Uma barra i é topo quando x[i] >= todas as barras de [i - janela,
+    i + janela]; fundo quando não é topo e x[i] <= todas elas. As `janela`
+    barras de cada borda, sem vizinhança completa, e janelas com NaN não
+    formam pivôs. O(n) pelo `maximo_movel`/`minimo_movel`.
+
+    Args:
+        x: Série ou matriz (ativos x tempo) usada para os topos
+        janela: Barras exigidas de cada lado
+        minimas: Série para os fundos, se diferente de `x` (ex.: máximas
+            para topos e mínimas para fundos)
+
+    Returns:
+        (topos, fundos): máscaras booleanas do formato de `x`
+    """
+    x = np.asarray(x, dtype=np.result_type(x, np.float32))
+    minimas = x if minimas is None else np.asarray(minimas, dtype=np.result_type(minimas, np.float32))
+    topos = np.zeros(x.shape, dtype=bool)
+    fundos = np.zeros(x.shape, dtype=bool)
+    largura = 2 * janela + 1
+    n = x.shape[-1]
+    if janela < 1 or n < largura:
+        return topos, fundos
+
+    # Extremo de [t - 2*janela, t] é o extremo centrado da barra t - janela
+    centro = slice(janela, n - janela)
+    with np.errstate(invalid='ignore'):
+        topos[..., centro] = x[..., centro] >= maximo_movel(x, largura)[..., largura - 1:]
+        fundos[..., centro] = minimas[..., centro] <= minimo_movel(minimas, largura)[..., largura - 1:]
+    fundos &= ~topos
+    return topos, fundos
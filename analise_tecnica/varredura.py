@@ -0,0 +1,126 @@
+"""
+Varredura de Parâmetros de Indicadores
+Calcula um indicador para muitos períodos em uma única passada
+
+Usado na otimização de estratégias (ex.: `periodo_media_curta`,
+`periodo_media_longa` e `periodo_rsi` de EstrategiaExemplo e
+AgenteMediaMovel): as somas acumuladas são construídas uma vez e cada
+período adicional custa O(n), independente do tamanho da janela.
+"""
+
+from typing import Sequence
+
+import numpy as np
+
+from .indicadores_tecnicos import SINAL_COMPRA, SINAL_VENDA
+
+
+class _SomasPrefixadas:
+    """
+    Somas acumuladas de uma série, compartilhadas entre períodos
+
+    Séries de preços são deslocadas pelo primeiro valor antes da acumulação
+    para reduzir o erro de arredondamento em históricos longos. Ganhos e
+    perdas não são deslocados, preservando somas exatamente nulas em janelas
+    sem variação.
+    """
+
+    def __init__(self, valores: np.ndarray, deslocar: bool = True):
+        self.valores = np.asarray(valores, dtype=np.result_type(valores, np.float32))
+        self.deslocamento = self.valores[0] if deslocar and len(self.valores) else 0.0
+        self.prefixo = np.concatenate(
+            [[0.0], np.cumsum(self.valores - self.deslocamento, dtype=np.float64)]
+        )
+
+    def soma_janela(self, periodo: int) -> np.ndarray:
+        """Soma das janelas terminadas em cada posição >= periodo - 1"""
+        return self.prefixo[periodo:] - self.prefixo[:-periodo] + periodo * self.deslocamento
+
+
+def _validar_periodos(periodos: Sequence[int]) -> np.ndarray:
+    periodos = np.asarray(list(periodos), dtype=np.int64)
+    if periodos.ndim != 1 or len(periodos) == 0:
+        raise ValueError("Informe ao menos um período para a varredura")
+    if (periodos < 1).any():
+        raise ValueError("Períodos devem ser inteiros positivos")
+    return periodos
+
+
+def varredura_sma(precos: Sequence[float], periodos: Sequence[int]) -> np.ndarray:
+    """
+    Médias móveis simples para vários períodos
+
+    Args:
+        precos: Série de preços de fechamento
+        periodos: Períodos a avaliar (ex.: range(5, 201))
+
+    Returns:
+        Matriz (períodos x tempo), alinhada com `precos`, com NaN no aquecimento
+    """
+    precos = np.asarray(precos)
+    periodos = _validar_periodos(periodos)
+    somas = _SomasPrefixadas(precos)
+    saida = np.full((len(periodos), len(precos)), np.nan, dtype=somas.valores.dtype)
+
+    for k, periodo in enumerate(periodos):
+        if periodo <= len(precos):
+            saida[k, periodo - 1:] = somas.soma_janela(periodo) / periodo
+    return saida
+
+
+def varredura_rsi(precos: Sequence[float], periodos: Sequence[int]) -> np.ndarray:
+    """
+    RSI (média simples de ganhos e perdas) para vários períodos
+
+    Args:
+        precos: Série de preços de fechamento
+        periodos: Períodos a avaliar
+
+    Returns:
+        Matriz (períodos x tempo), alinhada com `precos`; a coluna t usa os
+        deltas até o preço t. Janelas sem variação ficam NaN, como no lote.
+    """
+    precos = np.asarray(precos)
+    periodos = _validar_periodos(periodos)
+    deltas = np.diff(precos.astype(np.result_type(precos, np.float32)))
+    ganhos = _SomasPrefixadas(np.where(deltas > 0, deltas, 0), deslocar=False)
+    perdas = _SomasPrefixadas(np.where(deltas < 0, -deltas, 0), deslocar=False)
+    saida = np.full((len(periodos), len(precos)), np.nan, dtype=ganhos.valores.dtype)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for k, periodo in enumerate(periodos):
+            if periodo > len(deltas):
+                continue
+            soma_ganhos = ganhos.soma_janela(periodo)
+            soma_perdas = perdas.soma_janela(periodo)
+            saida[k, periodo:] = 100 - (100 / (1 + soma_ganhos / soma_perdas))
+    return saida
+
+
+def varredura_cruzamento_medias(precos: Sequence[float],
+                                periodos_curtos: Sequence[int],
+                                periodos_longos: Sequence[int]) -> np.ndarray:
+    """
+    Sinais de cruzamento de médias para uma grade de períodos curtos x longos
+
+    Reproduz a regra de EstrategiaExemplo/AgenteMediaMovel: COMPRA quando a
+    média curta passa a ficar acima da longa, VENDA no cruzamento inverso.
+
+    Returns:
+        Tensor int8 (curtos x longos x tempo) com códigos de sinal
+    """
+    curtos = _validar_periodos(periodos_curtos)
+    longos = _validar_periodos(periodos_longos)
+    todos = np.unique(np.concatenate([curtos, longos]))
+    medias = varredura_sma(precos, todos)
+    linha = {int(p): i for i, p in enumerate(todos)}
+
+    media_curta = medias[[linha[int(p)] for p in curtos]][:, np.newaxis, :]
+    media_longa = medias[[linha[int(p)] for p in longos]][np.newaxis, :, :]
+    acima = media_curta > media_longa
+    abaixo = media_curta < media_longa
+
+    sinais = np.zeros((len(curtos), len(longos), len(precos)), dtype=np.int8)
+    sinais[..., 1:][acima[..., 1:] & (media_curta[..., :-1] <= media_longa[..., :-1])] = SINAL_COMPRA
+    sinais[..., 1:][abaixo[..., 1:] & (media_curta[..., :-1] >= media_longa[..., :-1])] = SINAL_VENDA
+    return sinais
@@ -1,13 +1,22 @@
-from typing import Dict, List, Optional, Type
+from typing import Dict, List, Optional, Type, Union
 from datetime import datetime, timedelta
 import logging
 from backteste.backtest_engine import BacktestEngine, BacktestResult
+from backteste.parallel import BacktestExecutor, make_executor
 from backteste.strategy_evaluator import StrategyEvaluator
 from backteste.strategy_portfolio import StrategyPortfolio
 
 class AdaptiveLearningSystem:
-    def __init__(self, initial_capital: float = 1000000.0):
+    def __init__(self, initial_capital: float = 1000000.0,
+                 executor: Union[str, BacktestExecutor, None] = None):
+        """
+        Args:
+            initial_capital: Capital do portfólio
+            executor: Como rodar os backtests de cada período ('serial',
+                'thread', 'process' ou um BacktestExecutor)
+        """
         self.backtest_engine = BacktestEngine()
+        self.executor = make_executor(executor)
         self.evaluator = StrategyEvaluator()
         self.portfolio = StrategyPortfolio(initial_capital)
         self.strategies: Dict[str, object] = {}
@@ -46,15 +55,12 @@ class AdaptiveLearningSystem:
         
         try:
             # Executa backtests
-            results = []
-            for start_date, end_date in periods:
-                result = self.backtest_engine.run_backtest(
-                    self.strategies[strategy_id],
-                    symbol,
-                    start_date,
-                    end_date
-                )
-                results.append(result)
+            results = self.executor.run_ordered(
+                self.backtest_engine,
+                self.strategies[strategy_id],
+                symbol,
+                periods
+            )
             
             # Avalia resultados
             score = self.evaluator.evaluate_strategy(results)
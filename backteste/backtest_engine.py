@@ -1,9 +1,18 @@
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 from datetime import datetime, timedelta
-from dataclasses import dataclass
-from enum import Enum
+from dataclasses import dataclass, field
+
+from analise_tecnica.precisao import resolver_dtype
+from utilitarios import metrics
+from utilitarios.first_touch import first_touch, EXIT_NONE, EXIT_REASONS
+from .data_store import OHLCVStore
+from .features import bulk_signals, build_features
+from .parallel import BacktestExecutor, make_executor
+from .regimes import MarketCondition, RegimeLabeler, REGIMES, REGIME_CODES, regime_breakdown
+
+PRICE_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
 
 @dataclass
 class BacktestResult:
@@ -19,40 +28,40 @@ class BacktestResult:
     profit_factor: float
     risk_adjusted_return: float
     market_conditions: Dict
-
-class MarketCondition(Enum):
-    BULL = "bull"
-    BEAR = "bear"
-    SIDEWAYS = "sideways"
-    VOLATILE = "volatile"
-    LOW_VOLATILITY = "low_volatility"
+    regime_breakdown: Dict = field(default_factory=dict)  # MarketCondition -> métricas dos trades
 
 class BacktestEngine:
-    def __init__(self):
+    def __init__(self, dtype=None, store: Optional[OHLCVStore] = None,
+                 regime_labeler: Optional[RegimeLabeler] = None):
+        """
+        Args:
+            dtype: Tipo dos preços OHLCV durante o backtest (float64 por padrão,
+                ou float32 para reduzir memória); P&L e métricas ficam em float64
+            store: Armazém colunar de onde `load_historical_data` lê as barras
+            regime_labeler: Rotulador de regimes por barra (padrão: RegimeLabeler())
+        """
+        self.store = store
+        self.regime_labeler = regime_labeler or RegimeLabeler()
         self.historical_data = {}
         self.results_cache = {}
         self.market_conditions = {}
+        self.dtype = resolver_dtype(dtype)
+    
+    def apply_dtype(self, data: pd.DataFrame) -> pd.DataFrame:
+        """Converte as colunas OHLCV para o dtype configurado"""
+        columns = {c: self.dtype for c in PRICE_COLUMNS if c in data.columns and data[c].dtype != self.dtype}
+        return data.astype(columns) if columns else data
     
     def detect_market_condition(self, data: pd.DataFrame, window: int = 20) -> MarketCondition:
-        """Detecta condição atual do mercado baseado em indicadores"""
-        returns = data['close'].pct_change()
-        volatility = returns.rolling(window).std()
-        trend = data['close'].rolling(window).mean()
-        
-        current_volatility = volatility.iloc[-1]
-        avg_volatility = volatility.mean()
-        price_trend = (trend.iloc[-1] - trend.iloc[-window]) / trend.iloc[-window]
-        
-        if current_volatility > avg_volatility * 1.5:
-            return MarketCondition.VOLATILE
-        elif current_volatility < avg_volatility * 0.5:
-            return MarketCondition.LOW_VOLATILITY
-        elif price_trend > 0.05:
-            return MarketCondition.BULL
-        elif price_trend < -0.05:
-            return MarketCondition.BEAR
-        else:
-            return MarketCondition.SIDEWAYS
+        """
+        Condição de mercado da última barra de `data`
+        
+        Delegada ao RegimeLabeler, com a volatilidade de referência medida
+        sobre toda a janela recebida.
+        """
+        labeler = RegimeLabeler(window, max(len(data), 1), self.regime_labeler.volatile_factor,
+                                self.regime_labeler.calm_factor, self.regime_labeler.trend_threshold)
+        return REGIMES[labeler.label_array(data['close'].to_numpy())[-1]]
     
     def run_backtest(
         self,
@@ -60,62 +69,110 @@ class BacktestEngine:
         symbol: str,
         start_date: datetime,
         end_date: datetime,
-        initial_capital: float = 100000.0
+        initial_capital: float = 100000.0,
+        stop_loss_pct: Optional[float] = None,
+        take_profit_pct: Optional[float] = None,
+        data: Optional[pd.DataFrame] = None
     ) -> BacktestResult:
-        """Executa backtesting de uma estratégia"""
+        """
+        Executa backtesting de uma estratégia
+        
+        Args:
+            stop_loss_pct: Stop em fração do preço de entrada (None desativa)
+            take_profit_pct: Alvo em fração do preço de entrada (None desativa)
+            data: Barras já carregadas do período; se omitido, vêm de
+                `load_historical_data`
+        
+        Estratégias com `generate_signals` têm os sinais calculados de uma vez;
+        com `generate_signal_at`, recebem uma FeatureFrame somente leitura
+        calculada uma única vez; as demais recebem `data.iloc[:i+1]` a cada
+        barra (ver backteste.features).
+        
+        Com stop ou alvo, a saída por toque é resolvida na abertura da posição
+        pelo núcleo `first_touch` sobre máximas/mínimas (empate: stop) e
+        executada no nível tocado, antes do sinal da barra; um stop
+        atravessado por gap sai na abertura.
+        
+        Cada trade leva o regime de mercado da barra de entrada
+        ('market_condition') e o resultado traz o desempenho por regime em
+        `regime_breakdown` (ver backteste.regimes).
+        """
         # Carrega dados históricos
-        data = self.load_historical_data(symbol, start_date, end_date)
+        if data is None:
+            data = self.load_historical_data(symbol, start_date, end_date)
+        data = self.apply_dtype(data)
         
-        # Detecta condições de mercado durante o período
+        # Regime de cada barra (coluna do armazém ou uma passada vetorizada).
+        # 'start', 'middle' e 'end' são os rótulos da 20ª barra, do meio e da
+        # última, com a volatilidade de referência das `lookback` barras
+        # anteriores; não equivalem a detect_market_condition sobre janelas
+        # isoladas de 20 barras
+        regimes = self.regime_labeler.label(data)
+        n_bars = len(regimes)
         market_conditions = {
-            'start': self.detect_market_condition(data.head(20)),
-            'middle': self.detect_market_condition(data.iloc[len(data)//2-10:len(data)//2+10]),
-            'end': self.detect_market_condition(data.tail(20))
-        }
+            'start': REGIMES[regimes[min(19, n_bars - 1)]],
+            'middle': REGIMES[regimes[min(n_bars // 2 + 9, n_bars - 1)]],
+            'end': REGIMES[regimes[-1]]
+        } if n_bars else {}
         
         # Executa a estratégia
         positions = []
         trades = []
         capital = initial_capital
         current_position = None
+        closes = data['close'].to_numpy()
+        times = data.index
+        use_levels = stop_loss_pct is not None or take_profit_pct is not None
+        if use_levels:
+            highs = data['high'].to_numpy() if 'high' in data.columns else closes
+            lows = data['low'].to_numpy() if 'low' in data.columns else closes
+            opens = data['open'].to_numpy() if 'open' in data.columns else None
+        
+        # Sinais em lote ou features pré-calculadas, quando a estratégia suporta
+        signals = bulk_signals(strategy, data)
+        features = build_features(strategy, data) if signals is None else None
         
         for i in range(len(data)):
-            current_bar = data.iloc[i]
-            signal = strategy.generate_signal(data.iloc[:i+1])
+            close = float(closes[i])  # Contabilidade sempre em float64
+            
+            if current_position is not None and current_position.get('touch_idx') == i:
+                # Stop/alvo tocado nesta barra: sai no nível, sem reentrada na mesma barra
+                capital += self._close_position(current_position, times[i],
+                                                current_position['touch_price'],
+                                                current_position['touch_reason'], trades)
+                current_position = None
+                continue
+            
+            if signals is not None:
+                signal = signals[i]
+            elif features is not None:
+                signal = strategy.generate_signal_at(features, i)
+            else:
+                signal = strategy.generate_signal(data.iloc[:i+1])
             
             if signal != 0 and current_position is None:
                 # Abre posição
                 current_position = {
                     'type': 'long' if signal > 0 else 'short',
-                    'entry_price': current_bar['close'],
-                    'entry_time': current_bar.name,
-                    'size': capital * 0.02 / current_bar['close']  # 2% do capital por trade
+                    'entry_price': close,
+                    'entry_time': times[i],
+                    'size': capital * 0.02 / close,  # 2% do capital por trade
+                    'market_condition': REGIMES[regimes[i]]
                 }
                 positions.append(current_position)
+                if use_levels:
+                    self._resolve_touch(current_position, i, highs, lows, opens,
+                                        stop_loss_pct, take_profit_pct)
             
             elif signal == 0 and current_position is not None:
                 # Fecha posição
-                exit_price = current_bar['close']
-                pnl = (exit_price - current_position['entry_price']) * current_position['size']
-                if current_position['type'] == 'short':
-                    pnl *= -1
-                
-                trades.append({
-                    'entry_time': current_position['entry_time'],
-                    'exit_time': current_bar.name,
-                    'entry_price': current_position['entry_price'],
-                    'exit_price': exit_price,
-                    'type': current_position['type'],
-                    'pnl': pnl
-                })
-                
-                capital += pnl
+                capital += self._close_position(current_position, times[i],
+                                                close, 'signal', trades)
                 current_position = None
         
         # Calcula métricas
-        returns = [trade['pnl'] / initial_capital for trade in trades]
-        winning_trades = len([t for t in trades if t['pnl'] > 0])
-        total_trades = len(trades)
+        pnl = np.array([trade['pnl'] for trade in trades], dtype=np.float64)
+        returns = (pnl / initial_capital).tolist()
         
         result = BacktestResult(
             strategy_id=strategy.id,
@@ -125,66 +182,122 @@ class BacktestEngine:
             trades=trades,
             sharpe_ratio=self.calculate_sharpe_ratio(returns),
             max_drawdown=self.calculate_max_drawdown(returns),
-            win_rate=winning_trades / total_trades if total_trades > 0 else 0,
-            profit_factor=self.calculate_profit_factor(trades),
+            win_rate=metrics.win_rate(pnl),
+            profit_factor=metrics.profit_factor(pnl),
             risk_adjusted_return=self.calculate_risk_adjusted_return(returns),
-            market_conditions=market_conditions
+            market_conditions=market_conditions,
+            regime_breakdown=regime_breakdown(
+                pnl, [REGIME_CODES[t['market_condition']] for t in trades], initial_capital)
         )
         
         # Cache o resultado
         self.results_cache[strategy.id] = result
         return result
     
+    def _resolve_touch(self, position: Dict, entry_idx: int, highs: np.ndarray, lows: np.ndarray,
+                       opens: Optional[np.ndarray], stop_loss_pct: Optional[float], take_profit_pct: Optional[float]):
+        """Anota na posição a barra, o preço e o motivo do primeiro toque de stop/alvo"""
+        direction = 1 if position['type'] == 'long' else -1
+        entry = position['entry_price']
+        stop = entry * (1 - direction * stop_loss_pct) if stop_loss_pct is not None else None
+        target = entry * (1 + direction * take_profit_pct) if take_profit_pct is not None else None
+        touch = first_touch(highs, lows, entry_idx, direction, stop, target, open=opens)
+        if touch.reason[0] != EXIT_NONE:
+            position['touch_idx'] = int(touch.exit_idx[0])
+            position['touch_price'] = float(touch.exit_price[0])
+            position['touch_reason'] = EXIT_REASONS[int(touch.reason[0])]
+    
+    def _close_position(self, position: Dict, exit_time, exit_price: float, reason: str,
+                        trades: List[Dict]) -> float:
+        """Registra o trade de fechamento e retorna o P&L"""
+        pnl = (exit_price - position['entry_price']) * position['size']
+        if position['type'] == 'short':
+            pnl *= -1
+        
+        trades.append({
+            'entry_time': position['entry_time'],
+            'exit_time': exit_time,
+            'entry_price': position['entry_price'],
+            'exit_price': exit_price,
+            'type': position['type'],
+            'pnl': pnl,
+            'exit_reason': reason,
+            'market_condition': position['market_condition']
+        })
+        return pnl
+    
     def calculate_sharpe_ratio(self, returns: List[float], risk_free_rate: float = 0.02) -> float:
-        """Calcula o Sharpe Ratio dos retornos"""
-        if not returns:
-            return 0.0
-        returns_array = np.array(returns)
-        excess_returns = returns_array - (risk_free_rate / 252)  # Assume retornos diários
-        if len(returns) > 1:
-            return np.mean(excess_returns) / np.std(excess_returns, ddof=1) * np.sqrt(252)
-        return 0.0
+        """Calcula o Sharpe Ratio anualizado dos retornos (assume retornos diários)"""
+        return metrics.sharpe_ratio(returns, risk_free=risk_free_rate / 252, periods_per_year=252, ddof=1)
     
     def calculate_max_drawdown(self, returns: List[float]) -> float:
         """Calcula o máximo drawdown da série de retornos"""
-        if not returns:
-            return 0.0
-        cumulative = np.cumprod(1 + np.array(returns))
-        running_max = np.maximum.accumulate(cumulative)
-        drawdowns = cumulative / running_max - 1
-        return abs(min(drawdowns))
+        return metrics.max_drawdown(np.cumprod(1 + np.asarray(returns, dtype=np.float64)))
     
     def calculate_profit_factor(self, trades: List[Dict]) -> float:
         """Calcula o fator de lucro (soma dos lucros / soma das perdas)"""
-        profits = sum(t['pnl'] for t in trades if t['pnl'] > 0)
-        losses = sum(abs(t['pnl']) for t in trades if t['pnl'] < 0)
-        return profits / losses if losses != 0 else float('inf')
+        return metrics.profit_factor([t['pnl'] for t in trades])
     
     def calculate_risk_adjusted_return(self, returns: List[float]) -> float:
-        """Calcula retorno ajustado ao risco"""
-        if not returns:
+        """Calcula retorno ajustado ao risco (média sobre desvio; a média se o desvio for nulo)"""
+        if not len(returns):
             return 0.0
-        return np.mean(returns) / (np.std(returns) if np.std(returns) > 0 else 1)
+        return metrics.sharpe_ratio(returns) or float(np.mean(returns))
     
     def load_historical_data(self, symbol: str, start_date: datetime, end_date: datetime) -> pd.DataFrame:
-        """Carrega dados históricos do ativo"""
+        """
+        Carrega dados históricos do ativo
+        
+        Dados registrados em `historical_data` para o mesmo intervalo têm
+        precedência; caso contrário as barras de [start_date, end_date] vêm do
+        armazém colunar (visões mapeadas em memória, sem cópia).
+        
+        A leitura nunca grava no armazém: pode rodar em vários processos e
+        sobre armazéns somente leitura. Os rótulos de regime acompanham as
+        barras quando gravados antes por `prepare_regimes`; sem eles,
+        `run_backtest` rotula só o intervalo carregado.
+        """
         key = f"{symbol}_{start_date}_{end_date}"
-        if key not in self.historical_data:
-            # TODO: Implementar carregamento de dados de fonte externa
-            pass
-        return self.historical_data[key]
+        if key in self.historical_data:
+            return self.historical_data[key]
+        if self.store is None:
+            raise KeyError(f"Sem dados para {key}: registre em historical_data ou configure um OHLCVStore")
+        return self.store.read(symbol, start_date, end_date)
+
+    def prepare_regimes(self, symbols: Optional[List[str]] = None, refresh: bool = False):
+        """
+        Grava no armazém os rótulos de regime do histórico completo dos ativos
+        
+        Passo explícito, a ser executado por um único escritor depois de
+        gravar barras novas e antes de distribuir backtests entre processos.
+        
+        Args:
+            symbols: Ativos (padrão: todos os do armazém)
+            refresh: Regrava os rótulos mesmo se já presentes
+        """
+        if self.store is None:
+            raise ValueError("prepare_regimes requer um OHLCVStore")
+        for symbol in (self.store.symbols() if symbols is None else symbols):
+            self.regime_labeler.ensure(self.store, symbol, refresh=refresh)
 
     def validate_strategy(
         self,
         strategy,
         symbol: str,
-        validation_periods: List[Tuple[datetime, datetime]]
+        validation_periods: List[Tuple[datetime, datetime]],
+        executor: Union[str, BacktestExecutor, None] = None
     ) -> Dict:
-        """Valida estratégia em múltiplos períodos para evitar overfitting"""
-        results = []
-        for start_date, end_date in validation_periods:
-            result = self.run_backtest(strategy, symbol, start_date, end_date)
-            results.append(result)
+        """
+        Valida estratégia em múltiplos períodos para evitar overfitting
+        
+        Args:
+            executor: 'serial' (padrão), 'thread', 'process' ou um
+                BacktestExecutor; os períodos são independentes e podem
+                rodar em paralelo (ver backteste.parallel)
+        """
+        results = make_executor(executor).run_ordered(self, strategy, symbol, validation_periods)
+        if results:
+            self.results_cache[strategy.id] = results[-1]
         
         # Análise de consistência
         sharpe_ratios = [r.sharpe_ratio for r in results]
@@ -0,0 +1,304 @@
+"""
+Armazenamento colunar local de OHLCV
+
+Layout em disco, particionado por ativo e ano:
+
+    raiz/
+      PETR4/
+        2023/
+          v000002/          # versão atual da partição
+            timestamp.npy   # datetime64[ns], ordenado e sem repetições
+            open.npy
+            high.npy
+            ...
+        2024/
+          ...
+
+Cada coluna é um `.npy` tipado lido com memory-map, de modo que vários
+processos de backtest compartilham as mesmas páginas do cache do sistema
+operacional. Arquivos publicados nunca são sobrescritos: cada gravação cria
+uma nova versão da partição num diretório temporário e a publica renomeando-o
+para o próximo número, e os leitores passam a usar a versão mais nova. Assim
+nenhum arquivo mapeado é substituído, o que o Windows não permite.
+
+Consultas por intervalo localizam as bordas no índice de timestamps com
+busca binária; dentro de uma partição o resultado é uma visão (sem cópia) do
+arquivo mapeado, e intervalos que cruzam anos concatenam as fatias de cada
+partição.
+
+Parquet não é usado: memory-map exige o layout contíguo do `.npy`.
+"""
+
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+import os
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+TIMESTAMP = 'timestamp'
+COLUNAS_OHLCV = ('open', 'high', 'low', 'close', 'volume')
+
+Instante = Union[datetime, pd.Timestamp, np.datetime64, str, None]
+
+
+def _instante(valor: Instante) -> Optional[np.datetime64]:
+    if valor is None:
+        return None
+    instante = pd.Timestamp(valor)
+    if instante.tzinfo is not None:
+        instante = instante.tz_convert('UTC').tz_localize(None)
+    return np.datetime64(instante.value, 'ns')
+
+
+def _versoes(diretorio: Path) -> List[Tuple[int, Path]]:
+    """Versões publicadas de uma partição, da mais antiga à mais nova"""
+    if not diretorio.is_dir():
+        return []
+    return sorted((int(p.name[1:]), p) for p in diretorio.iterdir()
+                  if p.name[:1] == 'v' and p.name[1:].isdigit() and p.is_dir())
+
+
+def _vincular(origem: Path, destino: Path):
+    """Reaproveita um arquivo publicado na nova versão (hard link ou cópia)"""
+    try:
+        os.link(origem, destino)
+    except OSError:
+        shutil.copyfile(origem, destino)
+
+
+def _ordem_coluna(nome: str) -> tuple:
+    """Timestamp, colunas OHLCV na ordem usual e demais em ordem alfabética"""
+    if nome == TIMESTAMP:
+        return (0, 0, nome)
+    if nome in COLUNAS_OHLCV:
+        return (1, COLUNAS_OHLCV.index(nome), nome)
+    return (2, 0, nome)
+
+
+class OHLCVStore:
+    """
+    Armazém de barras por ativo/ano em arquivos `.npy` mapeados em memória
+
+    Exemplo:
+        store = OHLCVStore('dados/ohlcv')
+        store.write('PETR4', dados)                      # DatetimeIndex + colunas
+        store.read('PETR4', '2024-01-01', '2024-06-30')  # visão sem cópia
+    """
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+        self._mapas: Dict[Path, tuple] = {}
+        self._trava = threading.Lock()
+
+    def _dir_ativo(self, symbol: str) -> Path:
+        if not symbol or symbol.startswith('.') or os.sep in symbol or (os.altsep and os.altsep in symbol):
+            raise ValueError(f"Símbolo inválido para o armazém: {symbol!r}")
+        return self.root / symbol
+
+    def symbols(self) -> List[str]:
+        """Ativos presentes no armazém"""
+        if not self.root.exists():
+            return []
+        return sorted(p.name for p in self.root.iterdir() if p.is_dir())
+
+    def years(self, symbol: str) -> List[int]:
+        """Anos com partição gravada para o ativo"""
+        diretorio = self._dir_ativo(symbol)
+        if not diretorio.exists():
+            return []
+        return sorted(int(p.name) for p in diretorio.iterdir()
+                      if p.is_dir() and p.name.isdigit() and _versoes(p))
+
+    def _particao(self, symbol: str, ano: int) -> Dict[str, np.ndarray]:
+        """Colunas mapeadas (somente leitura) da versão atual de uma partição"""
+        diretorio = self._dir_ativo(symbol) / str(ano)
+        versoes = _versoes(diretorio)
+        if not versoes:
+            raise KeyError(f"Sem partição {ano} para {symbol}")
+        versao = versoes[-1][1]
+        with self._trava:
+            versao_mapa, mapa = self._mapas.get(diretorio, (None, None))
+            if versao_mapa != versao:
+                arquivos = {arquivo.stem: arquivo for arquivo in versao.glob('*.npy')}
+                mapa = {nome: np.load(arquivos[nome], mmap_mode='r')
+                        for nome in sorted(arquivos, key=_ordem_coluna)}
+                self._mapas[diretorio] = (versao, mapa)
+            return mapa
+
+    def write(self, symbol: str, data: pd.DataFrame):
+        """
+        Grava ou atualiza as barras de um ativo
+
+        Barras com timestamp já existente substituem as gravadas. Cada
+        partição alterada ganha uma nova versão; leitores com a anterior
+        mapeada continuam vendo-a até a próxima consulta. Um único escritor
+        por ativo é suportado.
+
+        Colunas OHLCV ausentes de `data` são completadas com NaN nas barras
+        novas. As demais colunas gravadas que `data` não traz são derivadas
+        das barras (ex.: rótulos de `write_column`) e deixariam de cobri-las:
+        são removidas de todas as partições do ativo, para serem recalculadas.
+
+        Args:
+            symbol: Ativo
+            data: DataFrame com DatetimeIndex e colunas numéricas
+        """
+        if not isinstance(data.index, pd.DatetimeIndex):
+            raise TypeError("data deve ter um DatetimeIndex")
+        indice = data.index
+        if indice.tz is not None:
+            indice = indice.tz_convert('UTC').tz_localize(None)
+        colunas = [c for c in data.columns if pd.api.types.is_numeric_dtype(data[c])]
+        novos = pd.DataFrame({c: data[c].to_numpy() for c in colunas},
+                             index=pd.DatetimeIndex(indice.to_numpy(dtype='datetime64[ns]')))
+        if novos.empty:
+            return
+
+        anos_novos = set(novos.index.year)
+        derivadas = {c for ano in self.years(symbol) for c in self._particao(symbol, ano)
+                     if c != TIMESTAMP and c not in COLUNAS_OHLCV and c not in colunas}
+        for ano in self.years(symbol):
+            # Partições não alteradas só perdem as colunas derivadas
+            if ano not in anos_novos and derivadas & set(self._particao(symbol, ano)):
+                diretorio = self._dir_ativo(symbol) / str(ano)
+                atual = _versoes(diretorio)[-1][1]
+                self._publicar(diretorio, {}, [arquivo for arquivo in atual.glob('*.npy')
+                                               if arquivo.stem not in derivadas])
+
+        for ano, bloco in novos.groupby(novos.index.year, sort=True):
+            diretorio = self._dir_ativo(symbol) / str(ano)
+            if _versoes(diretorio):
+                existente = self._particao(symbol, ano)
+                anteriores = pd.DataFrame(
+                    {c: np.asarray(v) for c, v in existente.items() if c != TIMESTAMP and c not in derivadas},
+                    index=pd.DatetimeIndex(np.asarray(existente[TIMESTAMP]))
+                )
+                bloco = pd.concat([anteriores[~anteriores.index.isin(bloco.index)], bloco])
+            bloco = bloco[~bloco.index.duplicated(keep='last')].sort_index()
+            arrays = {c: bloco[c].to_numpy() for c in bloco.columns}
+            arrays[TIMESTAMP] = bloco.index.to_numpy(dtype='datetime64[ns]')
+            self._publicar(diretorio, arrays)
+
+    def _publicar(self, diretorio: Path, colunas: Dict[str, np.ndarray], reaproveitadas: Sequence[Path] = ()):
+        """
+        Grava uma nova versão da partição e a torna a atual
+
+        A versão é montada num diretório temporário e publicada por rename
+        para o próximo número livre. Versões anteriores à substituída são
+        removidas; a substituída fica para leitores que acabaram de escolhê-la.
+        No Windows, versões ainda mapeadas por outros processos não podem ser
+        removidas e ficam para uma gravação seguinte.
+
+        Args:
+            diretorio: Diretório da partição (ativo/ano)
+            colunas: Arrays gravados na nova versão
+            reaproveitadas: Arquivos da versão atual copiados sem alteração
+        """
+        diretorio.mkdir(parents=True, exist_ok=True)
+        temporario = Path(tempfile.mkdtemp(prefix='.', suffix='.tmp', dir=diretorio))
+        for nome, valores in colunas.items():
+            with open(temporario / f'{nome}.npy', 'wb') as arquivo:
+                np.save(arquivo, np.ascontiguousarray(valores))
+        for origem in reaproveitadas:
+            _vincular(origem, temporario / origem.name)
+
+        while True:
+            versoes = _versoes(diretorio)
+            destino = diretorio / f'v{versoes[-1][0] + 1 if versoes else 1:06d}'
+            try:
+                os.rename(temporario, destino)
+                break
+            except OSError:
+                # Outro escritor publicou o mesmo número: tenta o seguinte
+                if not destino.exists():
+                    raise
+
+        # Libera os mapas desta instância antes de remover versões antigas
+        with self._trava:
+            self._mapas.pop(diretorio, None)
+        for _, antiga in versoes[:-1]:
+            shutil.rmtree(antiga, ignore_errors=True)
+
+    def has_column(self, symbol: str, name: str, dtype=None) -> bool:
+        """Se todas as partições do ativo têm a coluna (e com o dtype, se informado)"""
+        anos = self.years(symbol)
+        for ano in anos:
+            coluna = self._particao(symbol, ano).get(name)
+            if coluna is None or (dtype is not None and coluna.dtype != np.dtype(dtype)):
+                return False
+        return bool(anos)
+
+    def write_column(self, symbol: str, name: str, values: np.ndarray):
+        """
+        Grava uma coluna derivada alinhada a todas as barras do ativo
+
+        O índice de timestamps não é alterado; as demais colunas continuam
+        válidas. Usado para dados calculados a partir das barras (ex.:
+        rótulos de regime).
+
+        Args:
+            symbol: Ativo
+            name: Nome da coluna
+            values: Um valor por barra gravada, em ordem cronológica
+        """
+        if name == TIMESTAMP:
+            raise ValueError("O índice de timestamps não pode ser substituído por write_column")
+        values = np.asarray(values)
+        anos = self.years(symbol)
+        tamanhos = [len(self._particao(symbol, ano)[TIMESTAMP]) for ano in anos]
+        if len(values) != sum(tamanhos):
+            raise ValueError(f"{name} tem {len(values)} valores; o ativo tem {sum(tamanhos)} barras")
+        inicio = 0
+        for ano, tamanho in zip(anos, tamanhos):
+            diretorio = self._dir_ativo(symbol) / str(ano)
+            atual = _versoes(diretorio)[-1][1]
+            reaproveitadas = [arquivo for arquivo in atual.glob('*.npy') if arquivo.stem != name]
+            self._publicar(diretorio, {name: values[inicio:inicio + tamanho]}, reaproveitadas)
+            inicio += tamanho
+
+    def read_arrays(self, symbol: str, start: Instante = None, end: Instante = None,
+                    columns: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        Colunas do intervalo [start, end] (extremos inclusivos)
+
+        Returns:
+            Dict com 'timestamp' e as colunas pedidas. Dentro de uma partição
+            os arrays são visões somente leitura do arquivo mapeado.
+        """
+        inicio, fim = _instante(start), _instante(end)
+        anos = [ano for ano in self.years(symbol)
+                if (inicio is None or ano >= pd.Timestamp(inicio).year)
+                and (fim is None or ano <= pd.Timestamp(fim).year)]
+        if not anos:
+            raise KeyError(f"Sem dados para {symbol} no intervalo {start} - {end}")
+
+        fatias = []
+        for ano in anos:
+            particao = self._particao(symbol, ano)
+            tempos = particao[TIMESTAMP]
+            a = 0 if inicio is None else int(np.searchsorted(tempos, inicio, side='left'))
+            b = len(tempos) if fim is None else int(np.searchsorted(tempos, fim, side='right'))
+            nomes = [TIMESTAMP] + [c for c in (columns or particao) if c != TIMESTAMP]
+            fatias.append({nome: particao[nome][a:b] for nome in nomes})
+
+        fatias = [fatia for fatia in fatias if len(fatia[TIMESTAMP])] or fatias[:1]
+        if len(fatias) == 1:
+            return fatias[0]
+        return {nome: np.concatenate([fatia[nome] for fatia in fatias]) for nome in fatias[0]}
+
+    def read(self, symbol: str, start: Instante = None, end: Instante = None,
+             columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        DataFrame do intervalo [start, end] indexado por timestamp
+
+        As colunas referenciam os arrays de `read_arrays` sem cópia; com o
+        copy-on-write do pandas, alterações no DataFrame não atingem o disco.
+        """
+        arrays = self.read_arrays(symbol, start, end, columns)
+        indice = pd.DatetimeIndex(arrays.pop(TIMESTAMP))
+        return pd.DataFrame(arrays, index=indice, copy=False)
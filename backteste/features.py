@@ -0,0 +1,120 @@
+"""
+Protocolos de estratégia e tabela de features para o backteste
+
+O motor aceita três formas de estratégia, na ordem de preferência:
+
+1. Em lote: `generate_signals(data) -> ndarray` devolve um sinal (-1, 0, 1)
+   por barra de uma só vez. O sinal da barra i deve usar apenas dados até i.
+2. Por barra com features: `generate_signal_at(features, i) -> int` lê
+   valores da barra i em O(1) numa `FeatureFrame` calculada uma única vez
+   (colunas OHLCV mais o que `compute_features(data)` devolver, se existir).
+3. Legada: `generate_signal(data.iloc[:i+1]) -> int`, com uma fatia
+   crescente por barra (custo quadrático).
+"""
+
+from typing import Dict, Iterator, Mapping, Optional, Protocol, runtime_checkable
+
+import numpy as np
+import pandas as pd
+
+BASE_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+
+@runtime_checkable
+class BulkSignalStrategy(Protocol):
+    """Estratégia que gera todos os sinais de uma vez"""
+
+    def generate_signals(self, data: pd.DataFrame) -> np.ndarray: ...
+
+
+@runtime_checkable
+class FeatureSignalStrategy(Protocol):
+    """Estratégia por barra que lê features pré-calculadas"""
+
+    def generate_signal_at(self, features: 'FeatureFrame', i: int) -> int: ...
+
+
+def _read_only(values, n_bars: int, name: str) -> np.ndarray:
+    array = np.asarray(values).view()
+    if array.shape[:1] != (n_bars,):
+        raise ValueError(f"Feature '{name}' tem {len(array)} valores; esperado {n_bars}")
+    array.flags.writeable = False
+    return array
+
+
+class FeatureFrame(Mapping):
+    """
+    Colunas somente leitura alinhadas às barras do backtest
+
+    As colunas são visões dos arrays originais (sem cópia) marcadas como
+    somente leitura, então a mesma tabela pode ser entregue a qualquer
+    estratégia sem risco de alteração.
+
+    Exemplo:
+        features['close'][i], features['sma_20'][i], features.row(i)
+    """
+
+    def __init__(self, columns: Mapping[str, object], index: Optional[pd.Index] = None):
+        lengths = {len(values) for values in columns.values()}
+        n_bars = len(index) if index is not None else (lengths.pop() if lengths else 0)
+        self.index = index
+        self.n_bars = n_bars
+        self._columns: Dict[str, np.ndarray] = {
+            name: _read_only(values, n_bars, name) for name, values in columns.items()
+        }
+
+    @classmethod
+    def from_data(cls, data: pd.DataFrame, extra=None) -> 'FeatureFrame':
+        """
+        Tabela com as colunas OHLCV de `data` e as features adicionais
+
+        Args:
+            data: Barras do backtest
+            extra: Dict de arrays ou DataFrame alinhado a `data`
+        """
+        columns = {name: data[name].to_numpy() for name in BASE_COLUMNS if name in data.columns}
+        if extra is not None:
+            items = extra.items() if not isinstance(extra, pd.DataFrame) else \
+                ((name, extra[name].to_numpy()) for name in extra.columns)
+            for name, values in items:
+                columns[name] = values.to_numpy() if isinstance(values, pd.Series) else values
+        return cls(columns, data.index)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self._columns[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._columns)
+
+    def __len__(self) -> int:
+        return len(self._columns)
+
+    def row(self, i: int) -> Dict[str, object]:
+        """Valores de todas as features na barra i"""
+        return {name: values[i] for name, values in self._columns.items()}
+
+
+def bulk_signals(strategy, data: pd.DataFrame) -> Optional[np.ndarray]:
+    """
+    Sinais em lote da estratégia, se ela implementar `generate_signals`
+
+    Returns:
+        Array int8 com um sinal por barra, ou None para estratégias por barra
+
+    Raises:
+        ValueError: se o número de sinais não corresponder ao de barras
+    """
+    if not isinstance(strategy, BulkSignalStrategy):
+        return None
+    signals = np.asarray(strategy.generate_signals(data))
+    if signals.shape != (len(data),):
+        raise ValueError(f"generate_signals devolveu {signals.shape}; esperado ({len(data)},)")
+    return np.sign(np.nan_to_num(signals)).astype(np.int8)
+
+
+def build_features(strategy, data: pd.DataFrame) -> Optional[FeatureFrame]:
+    """FeatureFrame da estratégia, se ela implementar `generate_signal_at`"""
+    if not isinstance(strategy, FeatureSignalStrategy):
+        return None
+    compute = getattr(strategy, 'compute_features', None)
+    return FeatureFrame.from_data(data, compute(data) if compute is not None else None)
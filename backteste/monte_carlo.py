@@ -0,0 +1,190 @@
+"""
+Robustez por reamostragem Monte Carlo dos trades
+
+A sequência de trades de um BacktestResult é reamostrada milhares de vezes
+para estimar a distribuição do capital final, do máximo drawdown e do Sharpe
+que a mesma estratégia poderia ter produzido. As reamostragens formam uma
+matriz (reamostragens x trades) de índices, e curvas e métricas saem de
+operações vetorizadas sobre essa matriz (utilitarios.metrics), em blocos de
+linhas para limitar a memória.
+
+Métodos:
+- 'bootstrap': trades sorteados com reposição, de forma independente;
+- 'block': blocos circulares de trades consecutivos (moving block
+  bootstrap), preservando sequências de ganhos/perdas e autocorrelação.
+
+As definições seguem as do BacktestEngine: retorno de cada trade é
+pnl / capital inicial, o capital é composto a cada trade, o drawdown é
+medido a partir do capital após o primeiro trade (sem pico inicial) e o
+Sharpe usa taxa livre de risco de 2% a.a. com 252 períodos.
+
+Exemplo:
+    relatorio = monte_carlo(resultado, n_resamples=50_000, method='block')
+    relatorio.percentiles()['max_drawdown'][95]
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Sequence, Union
+
+import numpy as np
+
+from utilitarios import metrics
+
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+RISK_FREE_RATE = 0.02
+PERIODS_PER_YEAR = 252
+
+
+def resample_indices(n_trades: int, n_resamples: int, method: str = 'bootstrap',
+                     block_size: Optional[int] = None,
+                     rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """
+    Matriz (reamostragens x trades) de índices de trades
+
+    Args:
+        n_trades: Número de trades da sequência original
+        n_resamples: Número de reamostragens
+        method: 'bootstrap' ou 'block'
+        block_size: Tamanho dos blocos (padrão: ~sqrt(n_trades))
+        rng: Gerador aleatório
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    if method == 'bootstrap':
+        return rng.integers(0, n_trades, (n_resamples, n_trades))
+    if method != 'block':
+        raise ValueError(f"Método desconhecido: {method} (use 'bootstrap' ou 'block')")
+    block_size = default_block_size(n_trades) if block_size is None else int(block_size)
+    if block_size < 1:
+        raise ValueError("block_size deve ser positivo")
+    n_blocks = -(-n_trades // block_size)
+    starts = rng.integers(0, n_trades, (n_resamples, n_blocks, 1))
+    indices = (starts + np.arange(block_size)) % n_trades  # Blocos circulares
+    return indices.reshape(n_resamples, n_blocks * block_size)[:, :n_trades]
+
+
+def default_block_size(n_trades: int) -> int:
+    """Tamanho de bloco padrão, ~sqrt(n_trades)"""
+    return max(1, int(round(np.sqrt(n_trades))))
+
+
+def _distributions(returns: np.ndarray, initial_capital: float) -> Dict[str, np.ndarray]:
+    """Capital final, drawdown e Sharpe de cada linha de retornos por trade"""
+    equity = np.cumprod(1 + returns, axis=-1)
+    equity *= initial_capital
+    return {
+        'final_equity': equity[:, -1],
+        # Sem pico inicial, como BacktestEngine.calculate_max_drawdown
+        'max_drawdown': np.atleast_1d(metrics.max_drawdown(equity)),
+        'sharpe_ratio': np.atleast_1d(metrics.sharpe_ratio(
+            returns, risk_free=RISK_FREE_RATE / PERIODS_PER_YEAR,
+            periods_per_year=PERIODS_PER_YEAR, ddof=1)),
+    }
+
+
+@dataclass
+class MonteCarloReport:
+    """Distribuições das métricas sobre as reamostragens"""
+    strategy_id: Optional[str]
+    method: str
+    block_size: int
+    initial_capital: float
+    n_trades: int
+    final_equity: np.ndarray
+    max_drawdown: np.ndarray
+    sharpe_ratio: np.ndarray
+    observed: Dict[str, float] = field(default_factory=dict)
+
+    METRICS = ('final_equity', 'max_drawdown', 'sharpe_ratio')
+
+    @property
+    def n_resamples(self) -> int:
+        return len(self.final_equity)
+
+    def percentiles(self, q: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[str, Dict[float, float]]:
+        """Percentis de cada métrica, {métrica: {percentil: valor}}"""
+        return {
+            name: dict(zip(q, np.percentile(getattr(self, name), q).tolist()))
+            for name in self.METRICS
+        }
+
+    def probability_of_loss(self) -> float:
+        """Fração das reamostragens que terminam abaixo do capital inicial"""
+        return float(np.mean(self.final_equity < self.initial_capital)) if self.n_resamples else 0.0
+
+    def summary(self, q: Sequence[float] = DEFAULT_PERCENTILES) -> Dict:
+        """
+        Resumo do relatório
+
+        Returns:
+            Dict com percentis, média de cada métrica, probabilidade de
+            prejuízo e os valores observados na sequência original
+        """
+        return {
+            'n_resamples': self.n_resamples,
+            'n_trades': self.n_trades,
+            'method': self.method,
+            'percentiles': self.percentiles(q),
+            'mean': {name: float(np.mean(getattr(self, name))) if self.n_resamples else 0.0
+                     for name in self.METRICS},
+            'probability_of_loss': self.probability_of_loss(),
+            'observed': dict(self.observed),
+        }
+
+
+def monte_carlo(trades: Union[object, Sequence[float], np.ndarray],
+                n_resamples: int = 10_000,
+                method: str = 'bootstrap',
+                block_size: Optional[int] = None,
+                initial_capital: float = 100000.0,
+                seed: Optional[int] = None,
+                max_cells: int = 1 << 20) -> MonteCarloReport:
+    """
+    Reamostra os trades e mede a distribuição das métricas
+
+    Args:
+        trades: BacktestResult, lista de trades (dicts com 'pnl') ou array
+            de P&L por trade
+        n_resamples: Número de reamostragens (10k a 100k usuais)
+        method: 'bootstrap' ou 'block'
+        block_size: Tamanho dos blocos para 'block' (padrão: ~sqrt(trades))
+        initial_capital: Capital inicial usado no backtest
+        seed: Semente para reprodutibilidade
+        max_cells: Limite de células (reamostragens x trades) por bloco de linhas
+
+    Returns:
+        MonteCarloReport com uma amostra de cada métrica por reamostragem
+    """
+    strategy_id = getattr(trades, 'strategy_id', None)
+    if hasattr(trades, 'trades'):
+        trades = trades.trades
+    pnl = np.array([t['pnl'] if isinstance(t, dict) else t for t in trades], dtype=np.float64)
+    returns = pnl / initial_capital
+    n_trades = len(returns)
+    block = default_block_size(n_trades) if method == 'block' and block_size is None else (block_size or 1)
+
+    if n_trades == 0:
+        empty = np.full(n_resamples, float(initial_capital))
+        return MonteCarloReport(strategy_id, method, block, initial_capital, 0, empty,
+                                np.zeros(n_resamples), np.zeros(n_resamples),
+                                {'final_equity': float(initial_capital), 'max_drawdown': 0.0,
+                                 'sharpe_ratio': 0.0})
+
+    rng = np.random.default_rng(seed)
+    observed = {name: float(values[0]) for name, values in _distributions(returns[None, :], initial_capital).items()}
+    parts = {name: [] for name in MonteCarloReport.METRICS}
+    rows_per_chunk = max(max_cells // n_trades, 1)
+    for start in range(0, n_resamples, rows_per_chunk):
+        rows = min(rows_per_chunk, n_resamples - start)
+        indices = resample_indices(n_trades, rows, method, block, rng)
+        for name, values in _distributions(returns[indices], initial_capital).items():
+            parts[name].append(values)
+
+    return MonteCarloReport(
+        strategy_id=strategy_id,
+        method=method,
+        block_size=block,
+        initial_capital=initial_capital,
+        n_trades=n_trades,
+        observed=observed,
+        **{name: np.concatenate(values) for name, values in parts.items()}
+    )
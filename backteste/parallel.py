@@ -0,0 +1,332 @@
+"""
+Execução de backtests independentes em série, threads ou processos
+
+Backtests de períodos diferentes não dependem uns dos outros e são limitados
+por CPU, então threads pouco ajudam (GIL). O executor de processos evita
+reenviar dados a cada tarefa:
+
+- a estratégia e a configuração do motor são serializadas uma única vez e
+  desserializadas uma vez por processo, no inicializador do pool;
+- os preços vêm do armazém colunar (cada processo reabre os `.npy` mapeados
+  em memória e compartilha as páginas do cache do sistema) ou, para dados
+  registrados em `historical_data`, de um bloco de memória compartilhada
+  montado uma vez pelo processo principal;
+- cada tarefa envia apenas (posição, início, fim) e devolve o BacktestResult.
+
+Os resultados são entregues à medida que terminam, como pares
+(posição do período, resultado). `map` expõe o mesmo mecanismo para tarefas
+arbitrárias (ex.: folds do walk-forward) e aceita um prazo, após o qual a
+iteração termina só com os resultados já prontos.
+
+Exemplo:
+    executor = make_executor('process', max_workers=8)
+    for i, resultado in executor.run(engine, estrategia, 'PETR4', periodos):
+        ...
+"""
+
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError, as_completed
+from datetime import datetime
+from multiprocessing import shared_memory
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+import os
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+
+from .data_store import OHLCVStore
+
+Period = Tuple[datetime, datetime]
+
+_ALIGNMENT = 64
+
+
+class EngineContext:
+    """
+    Motor, estratégia e argumentos comuns às tarefas de um executor
+
+    Ao ser serializado para um processo do pool, o motor é reduzido à sua
+    classe, dtype, raiz do armazém e rotulador de regimes (sem
+    `historical_data` nem cache); os dados compartilhados chegam depois por
+    `bind`.
+    """
+
+    def __init__(self, engine, strategy=None, symbol: Optional[str] = None,
+                 kwargs: Optional[Dict] = None):
+        self.engine = engine
+        self.strategy = strategy
+        self.symbol = symbol
+        self.kwargs = kwargs or {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        engine = state.pop('engine')
+        store_root = str(engine.store.root) if engine.store is not None else None
+        state['_engine_config'] = (type(engine), engine.dtype, store_root, engine.regime_labeler)
+        return state
+
+    def __setstate__(self, state):
+        engine_class, dtype, store_root, regime_labeler = state.pop('_engine_config')
+        self.__dict__.update(state)
+        store = OHLCVStore(store_root) if store_root is not None else None
+        self.engine = engine_class(dtype=dtype, store=store, regime_labeler=regime_labeler)
+
+    def bind(self, shared: Dict[str, object]):
+        """Recebe, no processo do pool, os dados anexados à memória compartilhada"""
+        self.engine.historical_data.update(shared)
+
+
+def _run_period(context: EngineContext, period: Period):
+    start_date, end_date = period
+    return context.engine.run_backtest(context.strategy, context.symbol, start_date, end_date,
+                                       **context.kwargs)
+
+
+class BacktestExecutor(ABC):
+    """Interface comum: executa tarefas independentes e entrega os resultados"""
+
+    @abstractmethod
+    def map(self, function, tasks: Sequence, context, shared: Optional[Dict] = None,
+            deadline: Optional[float] = None) -> Iterator[Tuple[int, object]]:
+        """
+        Aplica `function(context, task)` a cada tarefa
+
+        Args:
+            function: Função de nível de módulo (serializável com pickle)
+            tasks: Tarefas pequenas; são as únicas enviadas a cada chamada
+            context: Estado comum, enviado uma vez por processo
+            shared: DataFrames/arrays grandes que `context.bind` recebe nos
+                processos do pool via memória compartilhada; nos executores
+                em série e de threads o contexto já deve contê-los
+            deadline: Instante de `time.monotonic()` após o qual a iteração
+                termina sem erro; tarefas não entregues são canceladas ou
+                abandonadas (a tarefa em andamento no executor em série
+                termina antes)
+
+        Returns:
+            Iterador de (posição da tarefa, resultado) na ordem de término
+        """
+        pass
+
+    def run(self, engine, strategy, symbol: str, periods: Sequence[Period],
+            **kwargs) -> Iterator[Tuple[int, object]]:
+        """
+        Executa `engine.run_backtest` para cada período
+
+        Args:
+            engine: BacktestEngine com os dados (historical_data ou store)
+            strategy: Estratégia a testar
+            symbol: Ativo
+            periods: Lista de (início, fim)
+            **kwargs: Repassados a run_backtest (initial_capital, stop_loss_pct, ...)
+
+        Returns:
+            Iterador de (posição do período, BacktestResult) na ordem de término
+        """
+        keys = {f"{symbol}_{start_date}_{end_date}" for start_date, end_date in periods}
+        registered = {key: engine.historical_data[key] for key in keys if key in engine.historical_data}
+        context = EngineContext(engine, strategy, symbol, kwargs)
+        return self.map(_run_period, list(periods), context, registered)
+
+    def run_ordered(self, engine, strategy, symbol: str, periods: Sequence[Period],
+                    **kwargs) -> List[object]:
+        """Resultados de `run` na ordem dos períodos"""
+        results = [None] * len(periods)
+        for i, result in self.run(engine, strategy, symbol, periods, **kwargs):
+            results[i] = result
+        return results
+
+
+def _remaining(deadline: Optional[float]) -> Optional[float]:
+    """Segundos até o prazo (None sem prazo, 0 se já passou)"""
+    if deadline is None:
+        return None
+    return max(deadline - time.monotonic(), 0.0)
+
+
+class SerialExecutor(BacktestExecutor):
+    """Executa as tarefas uma após a outra no processo atual"""
+
+    def map(self, function, tasks, context, shared=None, deadline=None):
+        for i, task in enumerate(tasks):
+            if _remaining(deadline) == 0:
+                return
+            yield i, function(context, task)
+
+
+class ThreadExecutor(BacktestExecutor):
+    """
+    Pool de threads compartilhando motor e estratégia
+
+    Útil quando a estratégia libera o GIL (numpy em lotes grandes, E/S);
+    para laços em Python puro use ProcessExecutor.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers
+
+    def map(self, function, tasks, context, shared=None, deadline=None):
+        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        expired = False
+        try:
+            futures = {pool.submit(function, context, task): i for i, task in enumerate(tasks)}
+            for future in as_completed(futures, timeout=_remaining(deadline)):
+                yield futures[future], future.result()
+        except TimeoutError:
+            expired = True
+        finally:
+            # Após o prazo, threads em andamento terminam sem bloquear o chamador
+            pool.shutdown(wait=not expired, cancel_futures=True)
+
+
+class SharedFrames:
+    """
+    DataFrames e arrays numéricos copiados uma vez para memória compartilhada
+
+    O processo que cria o bloco é responsável por `close()`, que também o
+    remove do sistema. Processos filhos reconstroem os objetos sem cópia com
+    `attach(spec)`.
+    """
+
+    def __init__(self, frames: Dict[str, Union[pd.DataFrame, np.ndarray]]):
+        layout, arrays, size = [], [], 0
+        for key, frame in frames.items():
+            columns, other = [], {}
+            if isinstance(frame, pd.DataFrame):
+                named = [('__index__', frame.index.to_numpy())] + \
+                    [(name, frame[name].to_numpy()) for name in frame.columns]
+                meta = (frame.index.name, list(frame.columns))
+            else:
+                named, meta = [('__array__', np.asarray(frame))], None
+            for name, values in named:
+                if values.dtype == object:
+                    other[name] = values  # Serializado junto da especificação
+                    continue
+                values = np.ascontiguousarray(values)
+                columns.append((name, values.dtype.str, values.shape, size))
+                arrays.append((size, values))
+                size += -(-values.nbytes // _ALIGNMENT) * _ALIGNMENT
+            layout.append((key, meta, columns, other))
+
+        self._memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        for offset, values in arrays:
+            np.ndarray(values.shape, values.dtype, self._memory.buf, offset)[...] = values
+        self.spec = (self._memory.name, layout)
+
+    @staticmethod
+    def attach(spec) -> Tuple[shared_memory.SharedMemory, Dict[str, object]]:
+        """
+        Reconstrói os DataFrames e arrays sobre o bloco compartilhado (somente leitura)
+
+        Returns:
+            (bloco, objetos); o bloco deve ser mantido vivo enquanto os
+            objetos forem usados
+        """
+        name, layout = spec
+        # Filhos do pool compartilham o resource_tracker do processo principal,
+        # que remove o bloco em `close()`
+        memory = shared_memory.SharedMemory(name=name)
+        frames = {}
+        for key, meta, columns, other in layout:
+            values = dict(other)
+            for column, dtype, shape, offset in columns:
+                array = np.ndarray(shape, np.dtype(dtype), memory.buf, offset)
+                array.flags.writeable = False
+                values[column] = array
+            if meta is None:
+                frames[key] = values['__array__']
+                continue
+            index_name, order = meta
+            index = pd.Index(values.pop('__index__'), name=index_name, copy=False)
+            frames[key] = pd.DataFrame({c: values[c] for c in order}, index=index, copy=False)
+        return memory, frames
+
+    def close(self):
+        self._memory.close()
+        self._memory.unlink()
+
+
+# Estado de cada processo do pool, preenchido pelo inicializador
+_worker: Dict[str, object] = {}
+
+
+def _init_worker(payload: bytes, shared_spec):
+    context = pickle.loads(payload)
+    if shared_spec is not None:
+        memory, shared = SharedFrames.attach(shared_spec)
+        context.bind(shared)
+        _worker['memory'] = memory
+    _worker['context'] = context
+
+
+def _call_in_worker(function, task):
+    return function(_worker['context'], task)
+
+
+class ProcessExecutor(BacktestExecutor):
+    """
+    Pool de processos com contexto e dados enviados uma vez por processo
+
+    O contexto (estratégia e classe do motor) precisa ser serializável com
+    pickle. Com o armazém configurado, cada processo reabre os arquivos
+    mapeados; dados de `historical_data` dos períodos pedidos vão para
+    memória compartilhada.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, mp_context=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.mp_context = mp_context
+
+    def map(self, function, tasks, context, shared=None, deadline=None):
+        tasks = list(tasks)
+        if not tasks:
+            return
+        payload = pickle.dumps(context)
+        block = SharedFrames(shared) if shared else None
+
+        pool = ProcessPoolExecutor(
+            max_workers=min(self.max_workers, len(tasks)),
+            mp_context=self.mp_context,
+            initializer=_init_worker,
+            initargs=(payload, block.spec if block is not None else None)
+        )
+        expired = False
+        try:
+            futures = {pool.submit(_call_in_worker, function, task): i for i, task in enumerate(tasks)}
+            for future in as_completed(futures, timeout=_remaining(deadline)):
+                yield futures[future], future.result()
+        except TimeoutError:
+            expired = True
+        finally:
+            # Após o prazo, processos ocupados terminam a tarefa atual em segundo
+            # plano; o bloco compartilhado pode ser removido antes, pois quem já
+            # o mapeou mantém o acesso até fechá-lo
+            pool.shutdown(wait=not expired, cancel_futures=True)
+            if block is not None:
+                block.close()
+
+
+EXECUTORS = {
+    'serial': SerialExecutor,
+    'thread': ThreadExecutor,
+    'process': ProcessExecutor,
+}
+
+
+def make_executor(kind: Union[str, BacktestExecutor, None] = 'serial',
+                  max_workers: Optional[int] = None) -> BacktestExecutor:
+    """
+    Executor pelo nome ('serial', 'thread' ou 'process')
+
+    Instâncias de BacktestExecutor são devolvidas sem alteração e None
+    equivale a 'serial'.
+    """
+    if isinstance(kind, BacktestExecutor):
+        return kind
+    if kind is None or kind == 'serial':
+        return SerialExecutor()
+    if kind not in EXECUTORS:
+        raise ValueError(f"Executor desconhecido: {kind} (use {', '.join(EXECUTORS)})")
+    return EXECUTORS[kind](max_workers=max_workers)
@@ -0,0 +1,361 @@
+"""
+Varredura de padrões gráficos em todo o universo de ativos
+
+`DetectorPadroes.detectar_todos_padroes` analisa uma série por vez. O
+`PatternScanner` divide os ativos em lotes e os distribui pelos executores
+de backteste.parallel:
+
+- os preços vão uma única vez para memória compartilhada, numa matriz
+  (ativos x barras) alinhada pela última barra, ou, na varredura do
+  armazém, cada processo lê os próprios ativos dos `.npy` mapeados;
+- dentro de um lote, topos e fundos de todos os ativos saem de uma única
+  chamada vetorizada a `pivos`, e a última janela de pivôs de cada ativo
+  vai numa única chamada a `DetectorPadroes.avaliar_janelas` (um só ajuste
+  em lote com o detector geométrico; um ativo por vez no clássico);
+- os lotes são entregues à medida que terminam e mesclados num ranking por
+  confiança (`stream`); com prazo (`timeout`), a varredura devolve o que
+  ficou pronto e lista os ativos pendentes.
+
+O resultado de cada ativo é o mesmo de `detectar_todos_padroes` sobre as
+suas barras (ou as `lookback` últimas).
+
+Exemplo:
+    scanner = PatternScanner(executor='process', lookback=500)
+    resultado = scanner.scan_store(store, timeout=2.0)
+    for match in resultado.top(20):
+        print(match.symbol, match.pattern.tipo.value, match.confianca)
+"""
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, replace
+from heapq import merge
+from typing import Dict, Iterator, List, Mapping, NamedTuple, Optional, Sequence, Union
+import time
+
+import numpy as np
+import pandas as pd
+
+from analise_tecnica.detector_padroes import DetectorPadroes, PadraoDetectado, TipoPadrao
+from analise_tecnica.primitivas import pivos
+from .data_store import OHLCVStore
+from .parallel import BacktestExecutor, make_executor
+
+# Barras mínimas para a detecção (as mesmas de detectar_todos_padroes)
+MIN_BARS = 20
+
+Universe = Union[Mapping[str, Sequence[float]], pd.DataFrame, np.ndarray]
+
+
+class PatternMatch(NamedTuple):
+    """Padrão detectado num ativo"""
+    symbol: str
+    pattern: PadraoDetectado
+
+    @property
+    def confianca(self) -> float:
+        return self.pattern.confianca
+
+
+def _rank_key(match: PatternMatch) -> tuple:
+    # Maior confiança primeiro; empates por ativo e tipo, para uma ordem estável
+    return -match.pattern.confianca, match.symbol, match.pattern.tipo.value
+
+
+class ScanUpdate(NamedTuple):
+    """Lote concluído durante uma varredura"""
+    symbols: List[str]
+    matches: List[PatternMatch]  # Padrões do lote, ordenados
+    ranking: List[PatternMatch]  # Todos os padrões até aqui, ordenados
+    completed: int  # Ativos varridos até aqui
+    total: int
+
+
+@dataclass
+class ScanResult:
+    """Padrões de uma varredura, ordenados por confiança"""
+    matches: List[PatternMatch]
+    scanned: List[str]
+    pending: List[str]
+    timed_out: bool
+    elapsed: float
+
+    @property
+    def complete(self) -> bool:
+        return not self.pending
+
+    def top(self, n: int) -> List[PatternMatch]:
+        return self.matches[:n]
+
+    def by_type(self, tipo: TipoPadrao) -> List[PatternMatch]:
+        return [match for match in self.matches if match.pattern.tipo == tipo]
+
+
+class _ScanContext(ABC):
+    """Detector e preços comuns aos lotes"""
+
+    def __init__(self, detector: DetectorPadroes, symbols: List[str], pivot_window: int,
+                 lookback: Optional[int]):
+        self.detector = detector
+        self.symbols = symbols
+        self.pivot_window = pivot_window
+        self.lookback = lookback
+
+    def bind(self, shared: Dict[str, object]):
+        pass
+
+    @abstractmethod
+    def series(self, rows: Sequence[int]) -> List[np.ndarray]:
+        """Preços de cada ativo pedido, da barra mais antiga à mais recente"""
+        pass
+
+
+class _MatrixContext(_ScanContext):
+    """Preços numa matriz (ativos x barras) alinhada pela última barra"""
+
+    def __init__(self, detector, symbols, pivot_window, lookback,
+                 prices: np.ndarray, starts: np.ndarray):
+        super().__init__(detector, symbols, pivot_window, lookback)
+        self.prices = prices
+        self.starts = starts
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # A matriz chega por memória compartilhada (bind)
+        state['prices'] = state['starts'] = None
+        return state
+
+    def bind(self, shared):
+        self.prices = shared['prices']
+        self.starts = shared['starts']
+
+    def series(self, rows):
+        return [self.prices[row, self.starts[row]:] for row in rows]
+
+
+class _StoreContext(_ScanContext):
+    """Preços lidos do armazém por quem executa o lote"""
+
+    def __init__(self, detector, symbols, pivot_window, lookback,
+                 store: OHLCVStore, column: str, start, end):
+        super().__init__(detector, symbols, pivot_window, lookback)
+        self.store = store
+        self.column = column
+        self.start = start
+        self.end = end
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['store'] = str(self.store.root)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.store = OHLCVStore(self.store)  # Cada processo reabre os arquivos mapeados
+
+    def series(self, rows):
+        series = []
+        for row in rows:
+            try:
+                values = self.store.read_arrays(self.symbols[row], self.start, self.end,
+                                                columns=[self.column])[self.column]
+            except KeyError:
+                values = np.empty(0)  # Ativo sem barras no intervalo
+            series.append(values[-self.lookback:] if self.lookback else values)
+        return series
+
+
+def _scan_chunk(context: _ScanContext, rows: Sequence[int]) -> List[PatternMatch]:
+    detector = context.detector
+    series = [np.asarray(values, dtype=detector.dtype) for values in context.series(rows)]
+    rows = [row for row, values in zip(rows, series) if len(values) >= MIN_BARS]
+    series = [values for values in series if len(values) >= MIN_BARS]
+    if not series:
+        return []
+
+    # Lote alinhado pela última barra; o preenchimento com NaN não forma pivôs
+    # e as `janela` barras de cada borda ficam sem pivô, como em cada série
+    n = max(len(values) for values in series)
+    prices = np.full((len(series), n), np.nan, dtype=detector.dtype)
+    for k, values in enumerate(series):
+        prices[k, n - len(values):] = values
+    tops, bottoms = pivos(prices, context.pivot_window)
+
+    # Matriz achatada: a janela de cada ativo são os seus três últimos pivôs
+    row_starts = np.arange(len(series)) * n
+    windows = []
+    flat_pivots = []
+    for mask in (tops, bottoms):
+        flat = np.flatnonzero(mask.ravel())
+        ends = np.searchsorted(flat, row_starts + n)
+        windows += [ends, np.minimum(ends - np.searchsorted(flat, row_starts), 3)]
+        flat_pivots.append(flat)
+    results = detector.avaliar_janelas(prices.ravel(), *flat_pivots, *windows)
+
+    matches = []
+    for k, (row, patterns) in enumerate(zip(rows, results)):
+        shift = row_starts[k] + n - len(series[k])
+        matches.extend(PatternMatch(context.symbols[row], _shift(pattern, shift)) for pattern in patterns)
+    matches.sort(key=_rank_key)
+    return matches
+
+
+def _shift(pattern: PadraoDetectado, shift: int) -> PadraoDetectado:
+    """Padrão com posições da matriz achatada convertidas para as da série"""
+    return replace(pattern, inicio=pattern.inicio - shift, fim=pattern.fim - shift,
+                   pontos_chave=[(int(i - shift), p) for i, p in pattern.pontos_chave])
+
+
+def _align(series: List[np.ndarray]) -> tuple:
+    """Matriz float alinhada pela última barra e início das barras de cada ativo"""
+    n = max((len(values) for values in series), default=0)
+    prices = np.full((len(series), n), np.nan)
+    starts = np.empty(len(series), dtype=np.int64)
+    for k, values in enumerate(series):
+        starts[k] = n - len(values)
+        prices[k, starts[k]:] = values
+    return prices, starts
+
+
+def _trim(values: np.ndarray) -> np.ndarray:
+    """Remove os NaN antes da primeira e depois da última barra válida"""
+    valid = np.flatnonzero(~np.isnan(values))
+    return values[valid[0]:valid[-1] + 1] if len(valid) else values[:0]
+
+
+class PatternScanner:
+    """Varredura paralela de padrões gráficos com ranking por confiança"""
+
+    def __init__(self,
+                 detector: Optional[DetectorPadroes] = None,
+                 executor: Union[str, BacktestExecutor, None] = 'process',
+                 max_workers: Optional[int] = None,
+                 chunk_size: int = 100,
+                 lookback: Optional[int] = None,
+                 pivot_window: int = 5):
+        """
+        Args:
+            detector: Detector com a confiança mínima, o dtype e a opção de
+                modelos geométricos (padrão: DetectorPadroes())
+            executor: 'serial', 'thread', 'process' ou um BacktestExecutor
+            max_workers: Processos/threads do executor
+            chunk_size: Ativos por lote; lotes menores entregam resultados
+                mais cedo e perdem menos trabalho no prazo
+            lookback: Últimas barras de cada ativo a analisar (None: todas)
+            pivot_window: Barras de cada lado exigidas para topos e fundos
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size deve ser positivo")
+        self.detector = detector or DetectorPadroes()
+        self.executor = make_executor(executor, max_workers)
+        self.chunk_size = chunk_size
+        self.lookback = lookback
+        self.pivot_window = pivot_window
+
+    def _chunks(self, n_symbols: int) -> List[range]:
+        return [range(i, min(i + self.chunk_size, n_symbols)) for i in range(0, n_symbols, self.chunk_size)]
+
+    def _universe_context(self, universe: Universe, symbols: Optional[Sequence[str]]) -> _MatrixContext:
+        if isinstance(universe, pd.DataFrame):
+            names = [str(name) for name in universe.columns]
+            series = [_trim(universe[name].to_numpy(dtype=np.float64)) for name in universe.columns]
+        elif isinstance(universe, Mapping):
+            names = [str(name) for name in universe]
+            series = [np.asarray(values, dtype=np.float64) for values in universe.values()]
+        else:
+            matrix = np.atleast_2d(np.asarray(universe, dtype=np.float64))
+            if matrix.ndim != 2:
+                raise ValueError("A matriz do universo deve ter formato (ativos x barras)")
+            names = [str(i) for i in range(len(matrix))] if symbols is None else [str(s) for s in symbols]
+            if len(names) != len(matrix):
+                raise ValueError("symbols deve ter um nome por linha da matriz")
+            series = [_trim(row) for row in matrix]
+        if self.lookback:
+            series = [values[-self.lookback:] for values in series]
+        prices, starts = _align(series)
+        return _MatrixContext(self.detector, names, self.pivot_window, self.lookback, prices, starts)
+
+    def stream(self, universe: Universe, symbols: Optional[Sequence[str]] = None,
+               timeout: Optional[float] = None) -> Iterator[ScanUpdate]:
+        """
+        Varre o universo entregando cada lote ao terminar
+
+        Args:
+            universe: {ativo: preços}, DataFrame (barras x ativos, NaN fora do
+                histórico de cada ativo) ou matriz (ativos x barras)
+            symbols: Nomes das linhas, quando `universe` é uma matriz
+            timeout: Prazo da varredura em segundos; ao expirar, a iteração
+                termina com os lotes já entregues
+
+        Returns:
+            Iterador de ScanUpdate na ordem de término dos lotes
+        """
+        context = self._universe_context(universe, symbols)
+        shared = {'prices': context.prices, 'starts': context.starts}
+        return self._stream(context, shared, timeout)
+
+    def stream_store(self, store: OHLCVStore, symbols: Optional[Sequence[str]] = None,
+                     start=None, end=None, column: str = 'close',
+                     timeout: Optional[float] = None) -> Iterator[ScanUpdate]:
+        """
+        Varre ativos do armazém; cada lote lê as suas barras dos arquivos mapeados
+
+        Args:
+            store: Armazém colunar
+            symbols: Ativos a varrer (padrão: todos do armazém)
+            start: Início do intervalo (inclusivo)
+            end: Fim do intervalo (inclusivo)
+            column: Coluna de preços analisada
+            timeout: Prazo da varredura em segundos
+        """
+        names = list(store.symbols() if symbols is None else symbols)
+        context = _StoreContext(self.detector, names, self.pivot_window, self.lookback,
+                                store, column, start, end)
+        return self._stream(context, None, timeout)
+
+    def _stream(self, context: _ScanContext, shared: Optional[Dict],
+                timeout: Optional[float]) -> Iterator[ScanUpdate]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        chunks = self._chunks(len(context.symbols))
+        ranking, completed = [], 0
+        for i, matches in self.executor.map(_scan_chunk, chunks, context, shared, deadline=deadline):
+            ranking = list(merge(ranking, matches, key=_rank_key))
+            completed += len(chunks[i])
+            yield ScanUpdate([context.symbols[row] for row in chunks[i]], matches, ranking,
+                             completed, len(context.symbols))
+
+    def scan(self, universe: Universe, symbols: Optional[Sequence[str]] = None,
+             timeout: Optional[float] = None) -> ScanResult:
+        """
+        Varre o universo e devolve o ranking (parcial, se o prazo expirar)
+
+        Args: os mesmos de `stream`
+
+        Returns:
+            ScanResult com os padrões de todos os ativos varridos
+        """
+        started = time.perf_counter()
+        context = self._universe_context(universe, symbols)
+        shared = {'prices': context.prices, 'starts': context.starts}
+        return self._collect(self._stream(context, shared, timeout), context.symbols, started)
+
+    def scan_store(self, store: OHLCVStore, symbols: Optional[Sequence[str]] = None,
+                   start=None, end=None, column: str = 'close',
+                   timeout: Optional[float] = None) -> ScanResult:
+        """Varre ativos do armazém (argumentos de `stream_store`)"""
+        started = time.perf_counter()
+        names = list(store.symbols() if symbols is None else symbols)
+        return self._collect(self.stream_store(store, names, start, end, column, timeout), names, started)
+
+    @staticmethod
+    def _collect(updates: Iterator[ScanUpdate], names: List[str], started: float) -> ScanResult:
+        ranking, scanned = [], set()
+        for update in updates:
+            ranking = update.ranking
+            scanned.update(update.symbols)
+        return ScanResult(
+            matches=ranking,
+            scanned=[name for name in names if name in scanned],
+            pending=[name for name in names if name not in scanned],
+            timed_out=len(scanned) < len(set(names)),
+            elapsed=time.perf_counter() - started
+        )
@@ -0,0 +1,185 @@
+"""
+Rótulos de regime de mercado por barra
+
+`RegimeLabeler` atribui uma MarketCondition a cada barra numa única passada
+vetorizada (médias e desvios móveis por somas acumuladas), avaliada em todas
+as barras e só com dados até a barra:
+
+- volatilidade: desvio dos retornos na janela `window`, comparado à média
+  das volatilidades das últimas `lookback` barras (> 1.5x: VOLATILE,
+  < 0.5x: LOW_VOLATILITY);
+- tendência: variação da média móvel de `window` barras ao longo da janela
+  (> 5%: BULL, < -5%: BEAR; caso contrário SIDEWAYS).
+
+Barras de aquecimento ficam SIDEWAYS. Os rótulos são códigos int8 (índice em
+REGIMES) e podem ser gravados como coluna do OHLCVStore
+(`regime_<window>_<lookback>`) por `ensure`, passo explícito após a gravação
+das barras (ver BacktestEngine.prepare_regimes); backtests lidos do armazém
+recebem então os rótulos junto com as barras, sem recálculo.
+"""
+
+from enum import Enum
+from typing import Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from analise_tecnica.primitivas import desvio_movel, media_movel
+from utilitarios import metrics
+
+
+class MarketCondition(Enum):
+    BULL = "bull"
+    BEAR = "bear"
+    SIDEWAYS = "sideways"
+    VOLATILE = "volatile"
+    LOW_VOLATILITY = "low_volatility"
+
+
+REGIMES = tuple(MarketCondition)
+REGIME_CODES = {condition: np.int8(code) for code, condition in enumerate(REGIMES)}
+
+
+def _media_movel_valida(x: np.ndarray, periodo: int) -> np.ndarray:
+    """Média dos valores não-NaN das últimas `periodo` barras (NaN sem nenhum)"""
+    validos = ~np.isnan(x)
+    forma = x.shape[:-1] + (1,)
+    soma = np.concatenate([np.zeros(forma), np.cumsum(np.where(validos, x, 0), axis=-1, dtype=np.float64)],
+                          axis=-1)
+    contagem = np.concatenate([np.zeros(forma, dtype=np.int64), np.cumsum(validos, axis=-1)], axis=-1)
+    inicio = np.maximum(np.arange(1, x.shape[-1] + 1) - periodo, 0)
+    total = soma[..., 1:] - soma[..., inicio]
+    n = contagem[..., 1:] - contagem[..., inicio]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(n > 0, total / n, np.nan)
+
+
+class RegimeLabeler:
+    """
+    Rotulador vetorizado de regimes
+
+    Exemplo:
+        labeler = RegimeLabeler()
+        codigos = labeler.label_array(fechamentos)     # série ou (ativos x tempo)
+        labeler.ensure(store, 'PETR4')                 # grava a coluna no armazém
+    """
+
+    def __init__(self, window: int = 20, lookback: int = 252, volatile_factor: float = 1.5,
+                 calm_factor: float = 0.5, trend_threshold: float = 0.05):
+        """
+        Args:
+            window: Janela da volatilidade e da média de tendência
+            lookback: Barras usadas na volatilidade média de referência
+            volatile_factor: Razão de volatilidade acima da qual é VOLATILE
+            calm_factor: Razão de volatilidade abaixo da qual é LOW_VOLATILITY
+            trend_threshold: Variação da média acima da qual há tendência
+        """
+        self.window = window
+        self.lookback = lookback
+        self.volatile_factor = volatile_factor
+        self.calm_factor = calm_factor
+        self.trend_threshold = trend_threshold
+
+    @property
+    def column(self) -> str:
+        """Nome da coluna dos rótulos no armazém"""
+        return f'regime_{self.window}_{self.lookback}'
+
+    def label_array(self, close: np.ndarray) -> np.ndarray:
+        """
+        Códigos de regime de cada barra
+
+        Args:
+            close: Fechamentos, série ou matriz (ativos x tempo)
+
+        Returns:
+            Array int8 do mesmo formato com índices em REGIMES
+        """
+        close = np.asarray(close, dtype=np.float64)
+        returns = np.full(close.shape, np.nan)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            returns[..., 1:] = close[..., 1:] / close[..., :-1] - 1
+        volatility = desvio_movel(returns, self.window)
+        reference = _media_movel_valida(volatility, self.lookback)
+        trend = media_movel(close, self.window)
+        previous = np.full(close.shape, np.nan)
+        previous[..., self.window - 1:] = trend[..., :close.shape[-1] - self.window + 1]
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            price_trend = (trend - previous) / previous
+            conditions = [
+                volatility > reference * self.volatile_factor,
+                volatility < reference * self.calm_factor,
+                price_trend > self.trend_threshold,
+                price_trend < -self.trend_threshold,
+            ]
+        choices = [REGIME_CODES[c] for c in (MarketCondition.VOLATILE, MarketCondition.LOW_VOLATILITY,
+                                             MarketCondition.BULL, MarketCondition.BEAR)]
+        return np.select(conditions, choices, REGIME_CODES[MarketCondition.SIDEWAYS]).astype(np.int8)
+
+    def label(self, data: pd.DataFrame) -> np.ndarray:
+        """
+        Códigos de regime das barras de `data`
+
+        Usa a coluna `column` quando presente (ex.: lida do armazém) e só
+        rotula a partir dos fechamentos caso contrário.
+        """
+        if self.column in data.columns:
+            codes = data[self.column].to_numpy()
+            if codes.dtype == np.int8:
+                return codes
+        return self.label_array(data['close'].to_numpy())
+
+    def is_cached(self, store, symbol: str) -> bool:
+        """Se todas as partições do ativo têm a coluna de rótulos"""
+        return store.has_column(symbol, self.column, np.int8)
+
+    def ensure(self, store, symbol: str, refresh: bool = False):
+        """
+        Grava os rótulos do histórico completo do ativo no armazém, se faltarem
+
+        Barras gravadas depois sem a coluna a removem do armazém
+        (`OHLCVStore.write`) e os rótulos são refeitos na próxima chamada;
+        refresh=True força o recálculo.
+        """
+        if not refresh and self.is_cached(store, symbol):
+            return
+        close = store.read_arrays(symbol, columns=['close'])['close']
+        store.write_column(symbol, self.column, self.label_array(close))
+
+
+def conditions_of(codes: np.ndarray) -> List[MarketCondition]:
+    """MarketCondition de cada código"""
+    return [REGIMES[int(code)] for code in codes]
+
+
+def regime_breakdown(pnl: Sequence[float], codes: Sequence[int],
+                     initial_capital: float = 100000.0) -> Dict[MarketCondition, Dict[str, float]]:
+    """
+    Desempenho dos trades agrupado pelo regime da barra de entrada
+
+    Args:
+        pnl: Resultado de cada trade
+        codes: Código de regime da entrada de cada trade
+        initial_capital: Capital inicial (retornos = pnl / capital)
+
+    Returns:
+        {MarketCondition: métricas} para os regimes com trades: n_trades,
+        total_pnl, win_rate, profit_factor, mean_return e sharpe_ratio
+        (mesma fórmula de BacktestEngine.calculate_sharpe_ratio)
+    """
+    pnl = np.asarray(pnl, dtype=np.float64)
+    codes = np.asarray(codes, dtype=np.int8)
+    breakdown = {}
+    for code in np.unique(codes):
+        group = pnl[codes == code]
+        returns = group / initial_capital
+        breakdown[REGIMES[int(code)]] = {
+            'n_trades': int(len(group)),
+            'total_pnl': float(group.sum()),
+            'win_rate': metrics.win_rate(group),
+            'profit_factor': metrics.profit_factor(group),
+            'mean_return': float(returns.mean()),
+            'sharpe_ratio': metrics.sharpe_ratio(returns, risk_free=0.02 / 252, periods_per_year=252, ddof=1),
+        }
+    return breakdown
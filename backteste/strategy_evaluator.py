@@ -69,10 +69,20 @@ class StrategyEvaluator:
         return score
     
     def _analyze_market_adaptability(self, backtest_results: List[BacktestResult]) -> Dict[MarketCondition, float]:
-        """Analisa como a estratégia se adapta a diferentes condições de mercado"""
+        """
+        Analisa como a estratégia se adapta a diferentes condições de mercado
+        
+        Usa o Sharpe dos trades de cada regime (regime_breakdown, rótulos por
+        barra de entrada); resultados sem detalhamento recorrem ao Sharpe do
+        período para as condições de início, meio e fim.
+        """
         condition_results = {condition: [] for condition in MarketCondition}
         
         for result in backtest_results:
+            if result.regime_breakdown:
+                for condition, stats in result.regime_breakdown.items():
+                    condition_results[condition].append(stats['sharpe_ratio'])
+                continue
             for condition in result.market_conditions.values():
                 if isinstance(condition, MarketCondition):
                     # Usa Sharpe ratio como métrica de performance
@@ -0,0 +1,345 @@
+"""
+Otimização walk-forward
+
+A série é dividida em folds consecutivos de dentro da amostra (treino) e
+fora da amostra (teste). Em cada fold, todos os parâmetros da grade são
+testados no treino, o melhor segundo o objetivo é escolhido e avaliado no
+teste seguinte. As janelas podem ser móveis (treino de tamanho fixo) ou
+ancoradas (treino sempre a partir da primeira barra).
+
+Os sinais de cada combinação de parâmetros são calculados uma única vez
+sobre a série inteira e fatiados por fold: como o sinal da barra i só usa
+dados até i, a fatia é idêntica ao cálculo dentro da janela, exceto pelo
+aquecimento, que passa a usar as barras anteriores ao fold. Estratégias que
+implementam `precompute`/`signals_for` compartilham ainda as varreduras de
+indicadores (analise_tecnica.varredura) entre todas as combinações.
+
+Os folds são independentes e rodam pelo executor de backteste.parallel;
+sinais e barras vão uma vez para memória compartilhada.
+
+Exemplo:
+    otimizador = WalkForwardOptimizer(engine, executor='process')
+    resultado = otimizador.run(MovingAverageCrossSweep(), 'PETR4', inicio, fim,
+                               {'short': [5, 10, 20], 'long': [50, 100]},
+                               train_size=500, test_size=100)
+    resultado.summary()
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import product
+from typing import Dict, List, Mapping, NamedTuple, Optional, Protocol, Sequence, Union, runtime_checkable
+
+import numpy as np
+import pandas as pd
+
+from analise_tecnica.varredura import varredura_sma
+from .backtest_engine import BacktestEngine, BacktestResult
+from .features import bulk_signals
+from .parallel import BacktestExecutor, EngineContext, make_executor
+
+# Mínimo de barras por fold (janela padrão dos regimes de mercado)
+MIN_FOLD_BARS = 20
+
+ParamGrid = Union[Mapping[str, Sequence], Sequence[Dict]]
+
+# Campos escalares de BacktestResult aceitos como objetivo: 1 maximiza, -1 minimiza
+OBJECTIVES = {
+    'sharpe_ratio': 1,
+    'win_rate': 1,
+    'profit_factor': 1,
+    'risk_adjusted_return': 1,
+    'max_drawdown': -1,
+}
+
+
+@runtime_checkable
+class SweepStrategy(Protocol):
+    """Estratégia parametrizada com indicadores pré-calculados para toda a grade"""
+
+    id: str
+
+    def precompute(self, data: pd.DataFrame, grid: List[Dict]) -> object: ...
+
+    def signals_for(self, cache: object, **params) -> np.ndarray: ...
+
+
+class Fold(NamedTuple):
+    """Barras de treino [train_start, train_end) e teste [test_start, test_end)"""
+    train_start: int
+    train_end: int
+    test_start: int
+    test_end: int
+
+
+@dataclass
+class WalkForwardFold:
+    """Resultado de um fold"""
+    fold: int
+    train_start: datetime
+    train_end: datetime
+    test_start: datetime
+    test_end: datetime
+    best_params: Dict
+    in_sample_score: float
+    in_sample_scores: np.ndarray  # Objetivo de cada combinação da grade (sem sinal)
+    out_of_sample: BacktestResult
+
+
+@dataclass
+class WalkForwardResult:
+    """Folds de uma otimização walk-forward"""
+    strategy_id: str
+    symbol: str
+    objective: str
+    grid: List[Dict]
+    folds: List[WalkForwardFold]
+
+    @property
+    def out_of_sample_results(self) -> List[BacktestResult]:
+        return [fold.out_of_sample for fold in self.folds]
+
+    def summary(self) -> Dict:
+        """
+        Desempenho agregado fora da amostra
+
+        Returns:
+            Dict com média do objetivo dentro e fora da amostra, eficiência
+            walk-forward (fora / dentro; dentro / fora para objetivos
+            minimizados, como max_drawdown), retornos concatenados dos
+            testes, consistência entre folds e parâmetros escolhidos por fold
+        """
+        in_sample = np.array([fold.in_sample_score for fold in self.folds], dtype=np.float64)
+        out_sample = np.array([float(getattr(fold.out_of_sample, self.objective)) for fold in self.folds],
+                              dtype=np.float64)
+        mean_in = float(in_sample.mean()) if len(in_sample) else 0.0
+        mean_out = float(out_sample.mean()) if len(out_sample) else 0.0
+        if OBJECTIVES[self.objective] > 0:
+            efficiency = mean_out / mean_in if mean_in > 0 else 0.0
+        else:
+            efficiency = mean_in / mean_out if mean_out > 0 else 1.0
+        return {
+            'mean_in_sample': mean_in,
+            'mean_out_of_sample': mean_out,
+            'walk_forward_efficiency': efficiency,
+            'out_of_sample_returns': [r for result in self.out_of_sample_results for r in result.returns],
+            'consistency_score': BacktestEngine().calculate_consistency_score(self.out_of_sample_results),
+            'chosen_params': [fold.best_params for fold in self.folds]
+        }
+
+
+def walk_forward_splits(n_bars: int, train_size: int, test_size: int,
+                        step: Optional[int] = None, anchored: bool = False) -> List[Fold]:
+    """
+    Folds de treino/teste consecutivos
+
+    Args:
+        n_bars: Número de barras da série
+        train_size: Barras de treino (o primeiro treino, se ancorado)
+        test_size: Barras de teste de cada fold
+        step: Avanço entre folds (padrão: test_size, testes sem sobreposição)
+        anchored: Se True, o treino sempre começa na barra 0 e cresce
+
+    Returns:
+        Folds em ordem; o último teste termina em no máximo n_bars
+    """
+    step = test_size if step is None else step
+    if train_size < 1 or test_size < 1 or step < 1:
+        raise ValueError("train_size, test_size e step devem ser positivos")
+    folds = []
+    train_end = train_size
+    while train_end + test_size <= n_bars:
+        train_start = 0 if anchored else train_end - train_size
+        folds.append(Fold(train_start, train_end, train_end, train_end + test_size))
+        train_end += step
+    return folds
+
+
+def expand_grid(grid: ParamGrid) -> List[Dict]:
+    """Lista de combinações a partir de {nome: valores} (ou a própria lista de dicts)"""
+    if isinstance(grid, Mapping):
+        names = list(grid)
+        return [dict(zip(names, values)) for values in product(*(grid[name] for name in names))]
+    return [dict(params) for params in grid]
+
+
+class MovingAverageCrossSweep:
+    """
+    Comprado enquanto a média curta está acima da longa
+
+    Todas as médias da grade saem de uma única varredura (`varredura_sma`).
+    """
+    id = 'ma_cross_sweep'
+
+    def precompute(self, data: pd.DataFrame, grid: List[Dict]) -> Dict:
+        periods = sorted({int(params[name]) for params in grid for name in ('short', 'long')})
+        means = varredura_sma(data['close'].to_numpy(), periods)
+        return {period: means[k] for k, period in enumerate(periods)}
+
+    def signals_for(self, cache: Dict, short: int, long: int) -> np.ndarray:
+        return (cache[int(short)] > cache[int(long)]).astype(np.int8)
+
+
+class _SignalSlice:
+    """Estratégia em lote que devolve uma fatia de sinais pré-calculados"""
+
+    def __init__(self, strategy_id: str, signals: np.ndarray, offset: int):
+        self.id = strategy_id
+        self._signals = signals
+        self._offset = offset
+
+    def generate_signals(self, data: pd.DataFrame) -> np.ndarray:
+        return self._signals[self._offset:self._offset + len(data)]
+
+
+class _WalkForwardContext(EngineContext):
+    """Motor, barras e matriz de sinais (combinações x barras) comuns aos folds"""
+
+    def __init__(self, engine, strategy_id: str, symbol: str, grid: List[Dict], objective: str,
+                 kwargs: Dict, data: pd.DataFrame, signals: np.ndarray):
+        super().__init__(engine, symbol=symbol, kwargs=kwargs)
+        self.strategy_id = strategy_id
+        self.grid = grid
+        self.objective = objective
+        self.data = data
+        self.signals = signals
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        # Barras e sinais chegam por memória compartilhada (bind)
+        state['data'] = state['signals'] = None
+        return state
+
+    def bind(self, shared: Dict[str, object]):
+        self.data = shared['data']
+        self.signals = shared['signals']
+
+    def backtest(self, row: int, start: int, end: int) -> BacktestResult:
+        data = self.data.iloc[start:end]
+        return self.engine.run_backtest(
+            _SignalSlice(self.strategy_id, self.signals[row], start), self.symbol,
+            data.index[0].to_pydatetime(), data.index[-1].to_pydatetime(), data=data, **self.kwargs
+        )
+
+
+def _run_fold(context: _WalkForwardContext, fold: Fold) -> tuple:
+    scores = np.array([
+        float(getattr(context.backtest(row, fold.train_start, fold.train_end), context.objective))
+        for row in range(len(context.grid))
+    ])
+    best = int(np.argmax(OBJECTIVES[context.objective] * scores))  # Empate: primeira combinação da grade
+    out_of_sample = context.backtest(best, fold.test_start, fold.test_end)
+    return best, scores, out_of_sample
+
+
+class WalkForwardOptimizer:
+    """Otimização walk-forward sobre o BacktestEngine"""
+
+    def __init__(self, engine: BacktestEngine,
+                 executor: Union[str, BacktestExecutor, None] = None):
+        """
+        Args:
+            engine: Motor de onde as barras são carregadas
+            executor: Como rodar os folds ('serial', 'thread', 'process' ou
+                um BacktestExecutor)
+        """
+        self.engine = engine
+        self.executor = make_executor(executor)
+
+    def signal_matrix(self, strategy, data: pd.DataFrame, grid: List[Dict]) -> np.ndarray:
+        """
+        Sinais de cada combinação sobre a série inteira
+
+        Args:
+            strategy: SweepStrategy, ou fábrica `strategy(**params)` que devolve
+                estratégias em lote (`generate_signals`)
+
+        Returns:
+            Matriz int8 (combinações x barras)
+        """
+        if isinstance(strategy, SweepStrategy):
+            cache = strategy.precompute(data, grid)
+            rows = [strategy.signals_for(cache, **params) for params in grid]
+            return np.vstack([np.sign(np.nan_to_num(np.asarray(row))) for row in rows]).astype(np.int8)
+
+        rows = []
+        for params in grid:
+            signals = bulk_signals(strategy(**params), data)
+            if signals is None:
+                raise TypeError("O walk-forward requer estratégias com generate_signals ou precompute/signals_for")
+            rows.append(signals)
+        return np.vstack(rows)
+
+    def run(self,
+            strategy,
+            symbol: str,
+            start_date: datetime,
+            end_date: datetime,
+            param_grid: ParamGrid,
+            train_size: int,
+            test_size: int,
+            step: Optional[int] = None,
+            anchored: bool = False,
+            objective: str = 'sharpe_ratio',
+            **kwargs) -> WalkForwardResult:
+        """
+        Executa a otimização walk-forward
+
+        Args:
+            strategy: SweepStrategy ou fábrica de estratégias em lote
+            symbol: Ativo
+            start_date: Início da série
+            end_date: Fim da série
+            param_grid: {nome: valores} ou lista de dicts de parâmetros
+            train_size: Barras de treino (mínimo de 20)
+            test_size: Barras de teste (mínimo de 20)
+            step: Avanço entre folds (padrão: test_size)
+            anchored: Treino ancorado na primeira barra
+            objective: Métrica otimizada no treino, uma das chaves de
+                OBJECTIVES (max_drawdown é minimizado, as demais maximizadas)
+            **kwargs: Repassados a run_backtest (initial_capital, stop_loss_pct, ...)
+
+        Returns:
+            WalkForwardResult com um WalkForwardFold por fold, em ordem
+        """
+        if min(train_size, test_size) < MIN_FOLD_BARS:
+            raise ValueError(f"train_size e test_size devem ter ao menos {MIN_FOLD_BARS} barras")
+        if objective not in OBJECTIVES:
+            raise ValueError(f"Objetivo desconhecido: {objective} (use um de {sorted(OBJECTIVES)})")
+        grid = expand_grid(param_grid)
+        if not grid:
+            raise ValueError("A grade de parâmetros está vazia")
+
+        data = self.engine.load_historical_data(symbol, start_date, end_date)
+        labeler = self.engine.regime_labeler
+        if labeler.column not in data.columns:
+            # Regimes rotulados uma vez na série inteira, como as fatias de sinais
+            data = data.assign(**{labeler.column: labeler.label(data)})
+        folds = walk_forward_splits(len(data), train_size, test_size, step, anchored)
+        signals = self.signal_matrix(strategy, data, grid)
+        strategy_id = getattr(strategy, 'id', getattr(strategy, '__name__', 'walk_forward'))
+
+        context = _WalkForwardContext(BacktestEngine(dtype=self.engine.dtype,
+                                                     regime_labeler=self.engine.regime_labeler),
+                                      strategy_id, symbol,
+                                      grid, objective, kwargs, data, signals)
+        shared = {'data': data, 'signals': signals}
+        outcomes = [None] * len(folds)
+        for i, outcome in self.executor.map(_run_fold, folds, context, shared):
+            outcomes[i] = outcome
+
+        index = data.index
+        results = []
+        for i, (fold, (best, scores, out_of_sample)) in enumerate(zip(folds, outcomes)):
+            results.append(WalkForwardFold(
+                fold=i,
+                train_start=index[fold.train_start].to_pydatetime(),
+                train_end=index[fold.train_end - 1].to_pydatetime(),
+                test_start=index[fold.test_start].to_pydatetime(),
+                test_end=index[fold.test_end - 1].to_pydatetime(),
+                best_params=grid[best],
+                in_sample_score=float(scores[best]),
+                in_sample_scores=scores,
+                out_of_sample=out_of_sample
+            ))
+        return WalkForwardResult(strategy_id, symbol, objective, grid, results)
@@ -0,0 +1,3 @@
+"""
+Benchmarks de desempenho do Sistema Neural Trading
+"""
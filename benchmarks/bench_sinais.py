@@ -0,0 +1,150 @@
+"""
+Benchmark da classificação de sinais e do consenso em indicadores_tecnicos
+
+Compara os laços Python originais com os caminhos vetorizados em NumPy.
+
+Uso:
+    python -m benchmarks.bench_sinais [n_pontos]
+"""
+
+import sys
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from analise_tecnica.indicadores_tecnicos import (
+    sinais_por_limiares,
+    sinais_cruzamento_zero,
+    sinais_por_bandas,
+    sinais_preco_media,
+    consenso_votos,
+    decodificar_sinais,
+)
+
+
+# Implementações de referência (laços por elemento, como antes da vetorização)
+
+def _rsi_laco(valores) -> List[str]:
+    sinais = []
+    for valor in valores:
+        if valor >= 70:
+            sinais.append('VENDA')
+        elif valor <= 30:
+            sinais.append('COMPRA')
+        else:
+            sinais.append('NEUTRO')
+    return sinais
+
+
+def _macd_laco(valores) -> List[str]:
+    sinais = []
+    for i, valor in enumerate(valores):
+        if i > 0 and valor > 0 and valores[i-1] <= 0:
+            sinais.append('COMPRA')
+        elif i > 0 and valor < 0 and valores[i-1] >= 0:
+            sinais.append('VENDA')
+        else:
+            sinais.append('NEUTRO')
+    return sinais
+
+
+def _bandas_laco(precos, inferior, superior) -> List[str]:
+    sinais = []
+    for preco, upper, lower in zip(precos, superior, inferior):
+        if preco <= lower:
+            sinais.append('COMPRA')
+        elif preco >= upper:
+            sinais.append('VENDA')
+        else:
+            sinais.append('NEUTRO')
+    return sinais
+
+
+def _media_laco(precos, media) -> List[str]:
+    sinais = []
+    for preco, media_val in zip(precos, media):
+        if preco > media_val:
+            sinais.append('COMPRA')
+        elif preco < media_val:
+            sinais.append('VENDA')
+        else:
+            sinais.append('NEUTRO')
+    return sinais
+
+
+def _consenso_laco(listas: List[List[str]]) -> List[str]:
+    consenso = []
+    for i in range(min(len(lista) for lista in listas)):
+        compra = sum(1 for lista in listas if lista[i] == 'COMPRA')
+        venda = sum(1 for lista in listas if lista[i] == 'VENDA')
+        neutro = len(listas) - compra - venda
+        if compra > venda and compra > neutro:
+            consenso.append('COMPRA')
+        elif venda > compra and venda > neutro:
+            consenso.append('VENDA')
+        else:
+            consenso.append('NEUTRO')
+    return consenso
+
+
+def _cronometrar(funcao: Callable, repeticoes: int = 3) -> float:
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def executar(n_pontos: int = 1_000_000, seed: int = 42) -> Dict[str, Dict[str, float]]:
+    """
+    Executa o benchmark e retorna tempos (s) e speedup por etapa
+
+    Args:
+        n_pontos: Tamanho das séries sintéticas
+        seed: Semente do gerador aleatório
+    """
+    rng = np.random.default_rng(seed)
+    precos = 100 + rng.normal(0, 1, n_pontos).cumsum()
+    rsi = rng.uniform(0, 100, n_pontos)
+    histograma = rng.normal(0, 1, n_pontos)
+    media = precos + rng.normal(0, 0.5, n_pontos)
+    superior, inferior = media + 1.0, media - 1.0
+
+    listas = [_rsi_laco(rsi), _macd_laco(histograma), _media_laco(precos, media)]
+    votos = np.stack([sinais_por_limiares(rsi, 30, 70),
+                      sinais_cruzamento_zero(histograma),
+                      sinais_preco_media(precos, media)])
+
+    etapas = {
+        'rsi': (lambda: _rsi_laco(rsi.tolist()),
+                lambda: sinais_por_limiares(rsi, 30, 70)),
+        'macd': (lambda: _macd_laco(histograma.tolist()),
+                 lambda: sinais_cruzamento_zero(histograma)),
+        'bollinger': (lambda: _bandas_laco(precos.tolist(), inferior.tolist(), superior.tolist()),
+                      lambda: sinais_por_bandas(precos, inferior, superior)),
+        'media_movel': (lambda: _media_laco(precos.tolist(), media.tolist()),
+                        lambda: sinais_preco_media(precos, media)),
+        'consenso': (lambda: _consenso_laco(listas),
+                     lambda: decodificar_sinais(consenso_votos(votos))),
+    }
+
+    resultados = {}
+    for nome, (laco, vetorizado) in etapas.items():
+        tempo_laco = _cronometrar(laco, repeticoes=1)
+        tempo_vetorizado = _cronometrar(vetorizado)
+        resultados[nome] = {
+            'laco_s': tempo_laco,
+            'vetorizado_s': tempo_vetorizado,
+            'speedup': tempo_laco / tempo_vetorizado if tempo_vetorizado > 0 else float('inf'),
+        }
+    return resultados
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print(f"=== BENCHMARK DE SINAIS ({n:,} pontos) ===")
+    for nome, r in executar(n).items():
+        print(f"{nome:12s} laço: {r['laco_s']*1000:9.1f} ms   "
+              f"vetorizado: {r['vetorizado_s']*1000:7.2f} ms   speedup: {r['speedup']:6.1f}x")
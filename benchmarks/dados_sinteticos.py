@@ -0,0 +1,117 @@
+"""
+Gerador de OHLCV sintético para benchmarks
+
+Movimento browniano geométrico com saltos (Merton): retornos log-normais
+com deriva e volatilidade constantes, acrescidos de saltos cuja quantidade
+por barra segue uma Poisson. Aberturas, máximas, mínimas e volume são
+derivados do fechamento de forma consistente (low <= open, close <= high).
+
+Todas as séries são reprodutíveis a partir da semente.
+"""
+
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+BARRAS_POR_ANO = 252 * 390  # Barras de 1 minuto em um ano de pregão
+
+
+def _log_retornos(rng: np.random.Generator, forma, deriva: float, volatilidade: float,
+                  intensidade_saltos: float, media_salto: float, desvio_salto: float) -> np.ndarray:
+    dt = 1.0 / BARRAS_POR_ANO
+    retornos = rng.standard_normal(forma, dtype=np.float64)
+    retornos *= volatilidade * np.sqrt(dt)
+    retornos += (deriva - 0.5 * volatilidade ** 2) * dt
+
+    n_saltos = rng.poisson(intensidade_saltos * dt, forma)
+    com_salto = n_saltos > 0
+    if com_salto.any():
+        k = n_saltos[com_salto]
+        retornos[com_salto] += rng.normal(k * media_salto, np.sqrt(k) * desvio_salto)
+    return retornos
+
+
+def gerar_matriz_ohlcv(n_barras: int,
+                       n_ativos: int = 1,
+                       seed: int = 42,
+                       preco_inicial: float = 100.0,
+                       deriva: float = 0.05,
+                       volatilidade: float = 0.25,
+                       intensidade_saltos: float = 25.0,
+                       media_salto: float = -0.002,
+                       desvio_salto: float = 0.01,
+                       dtype=np.float64) -> Dict[str, np.ndarray]:
+    """
+    Gera OHLCV para vários ativos em matrizes (ativos x tempo)
+
+    Args:
+        n_barras: Número de barras por ativo
+        n_ativos: Número de ativos
+        seed: Semente do gerador
+        preco_inicial: Preço de abertura da primeira barra
+        deriva: Deriva anual do GBM
+        volatilidade: Volatilidade anual do GBM
+        intensidade_saltos: Saltos esperados por ano
+        media_salto: Média do log-retorno de cada salto
+        desvio_salto: Desvio do log-retorno de cada salto
+        dtype: Tipo de ponto flutuante das matrizes
+
+    Returns:
+        Dict com 'open', 'high', 'low', 'close' e 'volume'
+    """
+    rng = np.random.default_rng(seed)
+    forma = (n_ativos, n_barras)
+    retornos = _log_retornos(rng, forma, deriva, volatilidade, intensidade_saltos,
+                             media_salto, desvio_salto)
+
+    close = np.cumsum(retornos, axis=1)
+    np.exp(close, out=close)
+    close *= preco_inicial
+
+    # Abertura próxima ao fechamento anterior (pequeno gap)
+    abertura = np.empty_like(close)
+    abertura[:, 0] = preco_inicial
+    abertura[:, 1:] = close[:, :-1]
+    abertura *= np.exp(rng.normal(0, volatilidade * 1e-4, forma))
+
+    # Pavios proporcionais à volatilidade da barra
+    amplitude = volatilidade / np.sqrt(BARRAS_POR_ANO)
+    maxima = np.maximum(abertura, close) * np.exp(np.abs(rng.normal(0, amplitude, forma)))
+    minima = np.minimum(abertura, close) * np.exp(-np.abs(rng.normal(0, amplitude, forma)))
+
+    # Volume log-normal, maior em barras de retorno absoluto alto
+    volume = rng.lognormal(8.0, 0.5, forma) * (1 + np.abs(retornos) / amplitude)
+
+    return {
+        'open': abertura.astype(dtype, copy=False),
+        'high': maxima.astype(dtype, copy=False),
+        'low': minima.astype(dtype, copy=False),
+        'close': close.astype(dtype, copy=False),
+        'volume': np.round(volume).astype(dtype, copy=False),
+    }
+
+
+def gerar_ohlcv(n_barras: int,
+                seed: int = 42,
+                inicio: str = '2020-01-01',
+                freq: str = 'min',
+                **parametros) -> pd.DataFrame:
+    """
+    Gera OHLCV de um único ativo em DataFrame
+
+    O índice é um DatetimeIndex (usado pelo backteste) e a coluna 'data'
+    repete as datas (formato de analise_tecnica.BacktestEngine).
+
+    Args:
+        n_barras: Número de barras
+        seed: Semente do gerador
+        inicio: Data da primeira barra
+        freq: Frequência das barras (pandas)
+        **parametros: Parâmetros do processo (ver `gerar_matriz_ohlcv`)
+    """
+    matriz = gerar_matriz_ohlcv(n_barras, 1, seed, **parametros)
+    indice = pd.date_range(inicio, periods=n_barras, freq=freq)
+    dados = pd.DataFrame({coluna: valores[0] for coluna, valores in matriz.items()}, index=indice)
+    dados.insert(0, 'data', indice)
+    return dados
@@ -0,0 +1,324 @@
+"""
+Suíte de benchmarks da análise técnica, do detector de padrões e dos backtests
+
+Cada caso é executado sobre OHLCV sintético (GBM com saltos, semente fixa)
+em uma grade de tamanhos (barras x ativos). Casos com custo ainda
+proporcional a laços Python por barra têm um limite de barras; acima dele o
+resultado é registrado como 'pulado', para que a grade permaneça comparável
+entre commits à medida que os limites forem elevados.
+
+Uso:
+    python -m benchmarks.suite
+    python -m benchmarks.suite --barras 1000 100000 10000000 --ativos 1 100 3000
+    python -m benchmarks.suite --saida atual.json --comparar base.json
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from analise_tecnica.indicadores_tecnicos import AnalisisTecnica
+from analise_tecnica.indicadores_lote import analisar_matriz
+from analise_tecnica.detector_padroes import DetectorPadroes, ScannerPadroesIncremental
+from analise_tecnica.modelos_geometricos import ModelosGeometricos
+from analise_tecnica.backtest_engine import BacktestEngine as BacktestEngineIndicadores
+from analise_tecnica.cache_indicadores import CACHE_GLOBAL
+from backteste.backtest_engine import BacktestEngine
+from backteste.pattern_scanner import PatternScanner
+from benchmarks.dados_sinteticos import gerar_ohlcv, gerar_matriz_ohlcv
+
+BARRAS_PADRAO = (1_000, 100_000, 10_000_000)
+ATIVOS_PADRAO = (1, 100, 3000)
+MAX_CELULAS_PADRAO = 10_000_000  # Ativos x barras por matriz no escopo 'universo'
+
+
+@dataclass
+class Caso:
+    """
+    Um benchmark da suíte
+
+    `executar` recebe o contexto de dados do escopo: DataFrame OHLCV de um
+    ativo ('ativo') ou dict de matrizes (ativos x tempo) ('universo').
+    """
+    nome: str
+    escopo: str
+    executar: Callable
+    limite_barras: Optional[int] = None
+
+
+class _EstrategiaCruzamento:
+    """Estratégia mínima para o backteste: sinal do preço contra a média de 20"""
+
+    id = 'benchmark_cruzamento'
+
+    def generate_signal(self, data: pd.DataFrame) -> int:
+        fechamentos = data['close'].to_numpy()[-20:]
+        if len(fechamentos) < 20:
+            return 0
+        return int(np.sign(fechamentos[-1] - fechamentos.mean()))
+
+
+class _EstrategiaCruzamentoLote(_EstrategiaCruzamento):
+    """Mesma estratégia pelo protocolo em lote (generate_signals)"""
+
+    def generate_signals(self, data: pd.DataFrame) -> np.ndarray:
+        fechamentos = data['close'].to_numpy()
+        media = data['close'].rolling(20).mean().to_numpy()
+        return np.nan_to_num(np.sign(fechamentos - media)).astype(np.int8)
+
+
+def _backteste(dados: pd.DataFrame, estrategia=None):
+    engine = BacktestEngine()
+    inicio, fim = dados.index[0], dados.index[-1]
+    engine.historical_data[f"benchmark_{inicio}_{fim}"] = dados
+    return engine.run_backtest(estrategia or _EstrategiaCruzamento(), 'benchmark', inicio, fim)
+
+
+def _analise_completa(dados: pd.DataFrame):
+    CACHE_GLOBAL.limpar()
+    return AnalisisTecnica().analisar_multiplos_indicadores(dados['close'].to_numpy())
+
+
+def _varredura_incremental(geometrico: bool) -> Callable:
+    def varrer(dados: pd.DataFrame):
+        precos = dados['close'].to_numpy()
+        scanner = ScannerPadroesIncremental(DetectorPadroes(geometrico=geometrico), precos, janela=50)
+        return [scanner.padroes_em(fim) for fim in range(50, len(precos) + 1)]
+    return varrer
+
+
+def _por_ativo(matrizes: Dict[str, np.ndarray]):
+    analise = AnalisisTecnica()
+    CACHE_GLOBAL.limpar()
+    return [analise.analisar_multiplos_indicadores(linha) for linha in matrizes['close']]
+
+
+def _casos() -> List[Caso]:
+    analise = AnalisisTecnica()
+
+    def indicador(metodo: str, **kwargs) -> Callable:
+        # Chama a implementação sem o cache para medir o cálculo em si
+        funcao = getattr(AnalisisTecnica, metodo).sem_cache
+        return lambda dados: funcao(analise, dados['close'].to_numpy(), **kwargs)
+
+    def oscilador(metodo: str) -> Callable:
+        funcao = getattr(AnalisisTecnica, metodo).sem_cache
+        return lambda dados: funcao(analise, dados['close'].to_numpy(),
+                                    dados['high'].to_numpy(), dados['low'].to_numpy())
+
+    return [
+        Caso('AnalisisTecnica.calcular_rsi', 'ativo', indicador('calcular_rsi')),
+        Caso('AnalisisTecnica.calcular_macd', 'ativo', indicador('calcular_macd')),
+        Caso('AnalisisTecnica.calcular_bollinger_bands', 'ativo', indicador('calcular_bollinger_bands')),
+        Caso('AnalisisTecnica.calcular_media_movel[SMA]', 'ativo', indicador('calcular_media_movel', tipo='SMA')),
+        Caso('AnalisisTecnica.calcular_media_movel[EMA]', 'ativo', indicador('calcular_media_movel', tipo='EMA')),
+        Caso('AnalisisTecnica.calcular_estocastico', 'ativo', oscilador('calcular_estocastico')),
+        Caso('AnalisisTecnica.calcular_williams_r', 'ativo', oscilador('calcular_williams_r')),
+        Caso('AnalisisTecnica.calcular_cci', 'ativo', oscilador('calcular_cci')),
+        Caso('AnalisisTecnica.analisar_multiplos_indicadores', 'ativo', _analise_completa),
+        Caso('DetectorPadroes.detectar_todos_padroes', 'ativo',
+             lambda dados: DetectorPadroes().detectar_todos_padroes(dados['close'].to_numpy()),
+             limite_barras=1_000_000),
+        Caso('ModelosGeometricos.detectar', 'ativo',
+             lambda dados: ModelosGeometricos().detectar(dados['close'].to_numpy()), limite_barras=1_000_000),
+        Caso('ScannerPadroesIncremental.padroes_em', 'ativo', _varredura_incremental(False),
+             limite_barras=100_000),
+        Caso('ScannerPadroesIncremental.padroes_em[geometrico]', 'ativo', _varredura_incremental(True),
+             limite_barras=100_000),
+        Caso('analise_tecnica.BacktestEngine.executar_backtest_indicador[RSI]', 'ativo',
+             lambda dados: BacktestEngineIndicadores().executar_backtest_indicador(dados, 'RSI', {'periodo': 14}),
+             limite_barras=100_000),
+        Caso('analise_tecnica.BacktestEngine.executar_backtest_padroes', 'ativo',
+             lambda dados: BacktestEngineIndicadores().executar_backtest_padroes(dados),
+             limite_barras=100_000),
+        Caso('backteste.BacktestEngine.run_backtest', 'ativo', _backteste, limite_barras=100_000),
+        Caso('backteste.BacktestEngine.run_backtest[generate_signals]', 'ativo',
+             lambda dados: _backteste(dados, _EstrategiaCruzamentoLote()), limite_barras=1_000_000),
+        Caso('indicadores_lote.analisar_matriz', 'universo', lambda matrizes: analisar_matriz(matrizes['close'])),
+        Caso('PatternScanner.scan', 'universo',
+             lambda matrizes: PatternScanner(executor='process').scan(matrizes['close'])),
+        Caso('AnalisisTecnica.analisar_multiplos_indicadores[por ativo]', 'universo', _por_ativo,
+             limite_barras=100_000),
+    ]
+
+
+def _cronometrar(funcao: Callable, repeticoes: int, orcamento_s: float) -> List[float]:
+    """Executa até `repeticoes` vezes, parando antes se o orçamento de tempo acabar"""
+    tempos = []
+    inicio_total = time.perf_counter()
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+        if time.perf_counter() - inicio_total > orcamento_s:
+            break
+    return tempos
+
+
+def _commit_atual() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def executar(barras: Sequence[int] = BARRAS_PADRAO,
+             ativos: Sequence[int] = ATIVOS_PADRAO,
+             seed: int = 42,
+             repeticoes: int = 3,
+             orcamento_s: float = 5.0,
+             max_celulas: int = MAX_CELULAS_PADRAO,
+             sem_limites: bool = False,
+             filtro: Optional[str] = None) -> Dict:
+    """
+    Executa a suíte sobre a grade barras x ativos
+
+    Casos de escopo 'ativo' rodam apenas com um ativo; os de escopo
+    'universo' rodam para cada quantidade de ativos.
+
+    Args:
+        barras: Tamanhos de série
+        ativos: Quantidades de ativos
+        seed: Semente do gerador sintético
+        repeticoes: Repetições máximas por caso (registra melhor e mediana)
+        orcamento_s: Tempo após o qual um caso para de repetir
+        max_celulas: Limite de ativos x barras das matrizes do universo
+        sem_limites: Ignora `limite_barras` e `max_celulas`
+        filtro: Executa apenas casos cujo nome contém este texto
+
+    Returns:
+        Dict serializável em JSON com 'metadados' e 'resultados'
+    """
+    casos = [caso for caso in _casos() if filtro is None or filtro in caso.nome]
+    resultados = []
+
+    for n_barras in barras:
+        for n_ativos in ativos:
+            for escopo in ('ativo', 'universo'):
+                selecionados = [caso for caso in casos if caso.escopo == escopo]
+                if not selecionados or (escopo == 'ativo' and n_ativos != 1):
+                    continue
+
+                dados = None
+                for caso in selecionados:
+                    registro = {'caso': caso.nome, 'escopo': escopo, 'barras': n_barras, 'ativos': n_ativos}
+                    motivo = None
+                    if not sem_limites and caso.limite_barras and n_barras > caso.limite_barras:
+                        motivo = f"acima do limite de {caso.limite_barras:,} barras"
+                    elif not sem_limites and escopo == 'universo' and n_barras * n_ativos > max_celulas:
+                        motivo = f"matriz acima de {max_celulas:,} células"
+                    if motivo:
+                        resultados.append({**registro, 'status': 'pulado', 'motivo': motivo})
+                        continue
+
+                    if dados is None:
+                        if escopo == 'ativo':
+                            dados = gerar_ohlcv(n_barras, seed=seed)
+                        else:
+                            dados = gerar_matriz_ohlcv(n_barras, n_ativos, seed=seed)
+
+                    tempos = _cronometrar(lambda: caso.executar(dados), repeticoes, orcamento_s)
+                    melhor = min(tempos)
+                    resultados.append({
+                        **registro,
+                        'status': 'ok',
+                        'repeticoes': len(tempos),
+                        'melhor_s': melhor,
+                        'mediana_s': float(np.median(tempos)),
+                        'barras_por_s': n_barras * n_ativos / melhor if melhor > 0 else None,
+                    })
+
+    return {
+        'metadados': {
+            'commit': _commit_atual(),
+            'data': datetime.now().isoformat(timespec='seconds'),
+            'seed': seed,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'plataforma': platform.platform(),
+        },
+        'resultados': resultados,
+    }
+
+
+def comparar(base: Dict, atual: Dict, tolerancia: float = 1.10) -> List[Dict]:
+    """
+    Compara dois relatórios e lista os casos que ficaram mais lentos
+
+    Args:
+        base: Relatório de referência (ex.: commit anterior)
+        atual: Relatório novo
+        tolerancia: Razão atual/base acima da qual o caso é uma regressão
+
+    Returns:
+        Lista de dicts com 'caso', 'barras', 'ativos' e 'razao'
+    """
+    def indexar(relatorio):
+        return {(r['caso'], r['barras'], r['ativos']): r for r in relatorio['resultados']
+                if r['status'] == 'ok'}
+
+    anteriores = indexar(base)
+    regressoes = []
+    for chave, resultado in indexar(atual).items():
+        anterior = anteriores.get(chave)
+        if anterior and anterior['melhor_s'] > 0:
+            razao = resultado['melhor_s'] / anterior['melhor_s']
+            if razao > tolerancia:
+                regressoes.append({'caso': chave[0], 'barras': chave[1], 'ativos': chave[2], 'razao': razao})
+    return sorted(regressoes, key=lambda r: r['razao'], reverse=True)
+
+
+def _imprimir(relatorio: Dict):
+    print(f"=== BENCHMARKS ({relatorio['metadados']['commit'] or 'sem commit'}) ===")
+    for r in relatorio['resultados']:
+        tamanho = f"{r['barras']:>10,} x {r['ativos']:<5}"
+        if r['status'] == 'ok':
+            print(f"{r['caso']:70s} {tamanho} {r['melhor_s']*1000:12.2f} ms")
+        else:
+            print(f"{r['caso']:70s} {tamanho} {'pulado':>15s} ({r['motivo']})")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--barras', type=int, nargs='+', default=list(BARRAS_PADRAO))
+    parser.add_argument('--ativos', type=int, nargs='+', default=list(ATIVOS_PADRAO))
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--max-celulas', type=int, default=MAX_CELULAS_PADRAO)
+    parser.add_argument('--sem-limites', action='store_true')
+    parser.add_argument('--filtro', help='Executa apenas casos cujo nome contém o texto')
+    parser.add_argument('--saida', help='Arquivo JSON para gravar os resultados')
+    parser.add_argument('--comparar', help='Relatório JSON de referência para detectar regressões')
+    parser.add_argument('--tolerancia', type=float, default=1.10)
+    args = parser.parse_args(argv)
+
+    relatorio = executar(args.barras, args.ativos, seed=args.seed, repeticoes=args.repeticoes,
+                         max_celulas=args.max_celulas, sem_limites=args.sem_limites, filtro=args.filtro)
+    _imprimir(relatorio)
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as arquivo:
+            regressoes = comparar(json.load(arquivo), relatorio, args.tolerancia)
+        for r in regressoes:
+            print(f"REGRESSÃO {r['caso']} ({r['barras']:,} x {r['ativos']}): {r['razao']:.2f}x")
+        return 1 if regressoes else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,6 +5,8 @@ import pandas as pd
 import numpy as np
 from enum import Enum
 
+from analise_tecnica.primitivas import pivos
+
 class MarketEventType(Enum):
     BREAKOUT = "breakout"
     PULLBACK = "pullback"
@@ -106,32 +108,15 @@ class MarketLevelsAnalyzer:
     
     def _find_pivot_points(self, data: pd.DataFrame, window: int = 20) -> List[Tuple[float, float]]:
         """Encontra pontos de pivô (suporte/resistência)"""
+        highs = data['high'].to_numpy()
+        lows = data['low'].to_numpy()
+        pivot_highs, pivot_lows = pivos(highs, window, minimas=lows)
         pivots = []
-        for i in range(window, len(data) - window):
-            if self._is_pivot_high(data, i, window):
-                strength = self._calculate_level_strength(data, data.iloc[i]['high'], window)
-                pivots.append((data.iloc[i]['high'], strength))
-            elif self._is_pivot_low(data, i, window):
-                strength = self._calculate_level_strength(data, data.iloc[i]['low'], window)
-                pivots.append((data.iloc[i]['low'], strength))
+        for i in np.flatnonzero(pivot_highs | pivot_lows):
+            price = highs[i] if pivot_highs[i] else lows[i]
+            pivots.append((price, self._calculate_level_strength(data, price, window)))
         return pivots
     
-    def _is_pivot_high(self, data: pd.DataFrame, idx: int, window: int) -> bool:
-        """Verifica se é um pivô de alta"""
-        current_high = data.iloc[idx]['high']
-        left_window = data.iloc[idx-window:idx]['high']
-        right_window = data.iloc[idx+1:idx+window+1]['high']
-        return all(current_high >= price for price in left_window) and \
-               all(current_high >= price for price in right_window)
-    
-    def _is_pivot_low(self, data: pd.DataFrame, idx: int, window: int) -> bool:
-        """Verifica se é um pivô de baixa"""
-        current_low = data.iloc[idx]['low']
-        left_window = data.iloc[idx-window:idx]['low']
-        right_window = data.iloc[idx+1:idx+window+1]['low']
-        return all(current_low <= price for price in left_window) and \
-               all(current_low <= price for price in right_window)
-    
     def _calculate_level_strength(self, data: pd.DataFrame, price: float, window: int) -> float:
         """Calcula força de um nível baseado em volume e número de testes"""
         price_range = 0.001 * price  # 0.1% do preço
@@ -8,6 +8,7 @@ import numpy as np
 import pandas as pd
 from datetime import datetime
 
+from analise_tecnica.cache_indicadores import memoizar
 from estrategias.estrategia_base import (
     EstrategiaBase,
     ConfiguracaoEstrategia,
@@ -237,6 +238,7 @@ class EstrategiaExemplo(EstrategiaBase):
         # Retorna confiança média ponderada
         return min(1.0, max(0.0, confianca_total / peso_total if peso_total > 0 else 0.0))
     
+    @memoizar('rsi_media_simples')
     def _calcular_rsi(self, precos: pd.Series, periodo: int) -> pd.Series:
         """
         Calcula o RSI (Relative Strength Index).
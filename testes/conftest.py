@@ -0,0 +1,25 @@
+"""
+Configuração compartilhada do pytest
+
+Benchmarks ficam fora da execução padrão: rodam com `-m benchmark` (ou
+qualquer outra expressão -m que os selecione) ou com NEURAL_BENCHMARK=1.
+"""
+
+import os
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "benchmark: benchmarks de desempenho (selecione com -m benchmark; "
+        "a grade completa exige NEURAL_BENCHMARK_COMPLETO=1)"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('markexpr') or os.environ.get('NEURAL_BENCHMARK') == '1':
+        return
+    selecionados = [item for item in items if item.get_closest_marker('benchmark') is None]
+    if len(selecionados) < len(items):
+        config.hook.pytest_deselected(items=[item for item in items if item not in selecionados])
+        items[:] = selecionados
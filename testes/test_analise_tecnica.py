@@ -8,13 +8,29 @@ import pandas as pd
 from unittest.mock import patch
 import sys
 import os
+import tempfile
 
 # Adicionar o diretório pai ao path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from analise_tecnica.indicadores_tecnicos import AnalisisTecnica
-from analise_tecnica.detector_padroes import DetectorPadroes
+from analise_tecnica.indicadores_tecnicos import (
+    AnalisisTecnica, IndicadorResult, SINAL_COMPRA, SINAL_VENDA, SINAL_NEUTRO,
+    sinais_cruzamento_zero, consenso_votos
+)
+from analise_tecnica.detector_padroes import DetectorPadroes, ScannerPadroesIncremental, PivotTracker, TipoPadrao
+from analise_tecnica.indice_padroes import IndicePadroes
+from analise_tecnica.modelos_geometricos import ModelosGeometricos, ajustar_retas
+from analise_tecnica.grafo_calculo import GrafoCalculo
+from analise_tecnica.cache_indicadores import CacheIndicadores, CACHE_GLOBAL, memoizar, impressao_digital
+from analise_tecnica.varredura import varredura_sma, varredura_rsi, varredura_cruzamento_medias
 from analise_tecnica.backtest_engine import BacktestEngine
+from analise_tecnica.indicadores_streaming import (
+    RSIStreaming, MACDStreaming, BollingerStreaming, MediaMovelStreaming,
+    EstocasticoStreaming, WilliamsRStreaming, CCIStreaming
+)
+from analise_tecnica.indicadores_lote import estocastico_lote, williams_r_lote, cci_lote
+from analise_tecnica.primitivas import maximo_movel, minimo_movel, pivos
+from analise_tecnica.precisao import resolver_dtype, TOLERANCIAS_FLOAT32
 
 class TestIndicadoresTecnicos(unittest.TestCase):
     """Testes para indicadores técnicos"""
@@ -82,6 +98,29 @@ class TestIndicadoresTecnicos(unittest.TestCase):
         self.assertIn('RSI', resultados)
         self.assertTrue(len(resultados) > 1)
         
+    def test_grafo_compartilha_intermediarios(self):
+        """Análise múltipla reutiliza primitivas comuns entre indicadores"""
+        precos = [100 + i + np.sin(i * 0.3) * 5 for i in range(60)]
+        grafo = GrafoCalculo(precos)
+        CACHE_GLOBAL.limpar()  # Acertos no cache não consultam os nós do grafo
+        
+        resultados = self.analise.analisar_multiplos_indicadores(precos, grafo=grafo)
+        
+        # SMA(20) das Bandas de Bollinger é a mesma da média móvel de 20
+        self.assertIn('sma(precos,20)', grafo.nos_reutilizados)
+        self.assertEqual(grafo.nos_calculados.count('deltas'), 1)
+        self.assertEqual(resultados['SMA_20'].valores, resultados['media'].valores)
+        self.assertEqual(
+            resultados['MACD'].valores,
+            self.analise.calcular_macd(precos).valores
+        )
+        
+        # Repetida, a análise é servida pelo cache e o novo grafo registra os acertos
+        grafo = GrafoCalculo(precos)
+        self.analise.analisar_multiplos_indicadores(precos, grafo=grafo)
+        self.assertFalse(grafo.nos_calculados)
+        self.assertIn('cache(AnalisisTecnica.calcular_rsi)', grafo.nos_reutilizados)
+    
     def test_gerar_consenso_sinais(self):
         """Testa geração de consenso de sinais"""
         resultados = self.analise.analisar_multiplos_indicadores(self.precos_teste)
@@ -90,6 +129,465 @@ class TestIndicadoresTecnicos(unittest.TestCase):
         self.assertIsInstance(consenso, list)
         self.assertTrue(all(sinal in ['COMPRA', 'VENDA', 'NEUTRO'] for sinal in consenso))
 
+class TestIndicadorResultColunar(unittest.TestCase):
+    """Testes para o armazenamento colunar de IndicadorResult"""
+    
+    def test_armazenamento_em_arrays(self):
+        """Valores, sinais e timestamps ficam em arrays NumPy compactos"""
+        datas = pd.date_range('2024-01-01', periods=60, freq='min')
+        precos = pd.Series(100 + np.sin(np.arange(60) * 0.3) * 5, index=datas)
+        
+        resultado = AnalisisTecnica().calcular_rsi(precos, periodo=14)
+        
+        self.assertEqual(resultado.valores_array.dtype, np.float64)
+        self.assertEqual(resultado.codigos_sinais.dtype, np.int8)
+        self.assertEqual(resultado.timestamps.dtype.kind, 'M')
+        self.assertEqual(resultado.timestamps[-1], datas.values[-1])
+        self.assertEqual(resultado.timestamp[-1], np.datetime_as_string(datas.values[-1]))
+        self.assertEqual(len(resultado.timestamps), len(resultado))
+    
+    def test_visoes_de_compatibilidade(self):
+        """Listas legadas continuam disponíveis e coerentes com os arrays"""
+        resultado = IndicadorResult(
+            'Teste', [1.0, 2.0, 3.0], ['COMPRA', 'NEUTRO', 'VENDA'],
+            ['t0', 't1', 't2'], {}, dtype=np.float32
+        )
+        
+        self.assertEqual(resultado.valores_array.dtype, np.float32)
+        self.assertEqual(resultado.valores, [1.0, 2.0, 3.0])
+        self.assertEqual(resultado.sinais, ['COMPRA', 'NEUTRO', 'VENDA'])
+        self.assertEqual(resultado.codigos_sinais.tolist(), [SINAL_COMPRA, SINAL_NEUTRO, SINAL_VENDA])
+        self.assertEqual(resultado.timestamp, ['t0', 't1', 't2'])
+        
+        resultado.sinais = ['VENDA', 'VENDA', 'COMPRA']
+        self.assertEqual(resultado.codigos_sinais.tolist(), [SINAL_VENDA, SINAL_VENDA, SINAL_COMPRA])
+    
+    def test_timestamps_sinteticos_sem_datas(self):
+        """Sem índice temporal, os rótulos sintéticos são gerados sob demanda"""
+        resultado = AnalisisTecnica().calcular_macd(list(range(1, 41)))
+        
+        self.assertIsNone(resultado.timestamps)
+        self.assertEqual(resultado.timestamp[:2], ['t0', 't1'])
+
+class TestSinaisVetorizados(unittest.TestCase):
+    """Testes para a classificação vetorizada de sinais"""
+    
+    def test_cruzamento_zero(self):
+        """Cruzamentos do histograma incluindo toques exatos em zero"""
+        valores = np.array([-1.0, 0.0, 2.0, 1.0, -0.5, 0.0, -1.0, 3.0])
+        esperado = [SINAL_NEUTRO, SINAL_NEUTRO, SINAL_COMPRA, SINAL_NEUTRO,
+                    SINAL_VENDA, SINAL_NEUTRO, SINAL_VENDA, SINAL_COMPRA]
+        
+        self.assertEqual(sinais_cruzamento_zero(valores).tolist(), esperado)
+    
+    def test_consenso_votos(self):
+        """Maioria simples com neutros contando como voto e empates neutros"""
+        votos = np.array([
+            [1, 1, -1, 1, 0],
+            [1, -1, -1, 0, 0],
+            [0, 0, 0, -1, 1],
+        ], dtype=np.int8)
+        
+        esperado = [SINAL_COMPRA, SINAL_NEUTRO, SINAL_VENDA, SINAL_NEUTRO, SINAL_NEUTRO]
+        self.assertEqual(consenso_votos(votos).tolist(), esperado)
+    
+    def test_consenso_alinhado_pelo_inicio(self):
+        """Consenso usa o menor comprimento, alinhando sinais pelo início"""
+        analise = AnalisisTecnica()
+        indicadores = {
+            'a': IndicadorResult('a', [0, 0, 0], ['COMPRA', 'VENDA', 'COMPRA']),
+            'b': IndicadorResult('b', [0, 0], ['COMPRA', 'VENDA']),
+        }
+        
+        self.assertEqual(analise.gerar_consenso_sinais(indicadores), ['COMPRA', 'VENDA'])
+
+class TestIndicadoresLote(unittest.TestCase):
+    """Testes para a API em lote sobre matrizes (ativos x tempo)"""
+    
+    def test_equivalente_a_analise_por_ativo(self):
+        """Cada linha da matriz reproduz a análise individual do ativo"""
+        analise = AnalisisTecnica()
+        rng = np.random.default_rng(7)
+        n_barras = 200
+        matriz = 100 + rng.normal(0, 1, (4, n_barras)).cumsum(axis=1)
+        historicos = [200, 120, 40, 22]
+        for linha, tamanho in enumerate(historicos):
+            matriz[linha, :n_barras - tamanho] = np.nan  # Preenchimento à esquerda
+        
+        lote = analise.analisar_multiplos_ativos(matriz)
+        
+        for linha, tamanho in enumerate(historicos):
+            individual = analise.analisar_multiplos_indicadores(matriz[linha, -tamanho:].tolist())
+            for nome, resultado in lote.items():
+                valores = resultado.valores[linha]
+                if nome not in individual:
+                    self.assertTrue(np.isnan(valores).all())
+                    continue
+                np.testing.assert_allclose(valores[~np.isnan(valores)], individual[nome].valores, rtol=1e-9)
+                n = len(individual[nome].codigos_sinais)
+                np.testing.assert_array_equal(resultado.sinais[linha, -n:], individual[nome].codigos_sinais)
+
+class TestVarreduraParametros(unittest.TestCase):
+    """Testes para as varreduras de períodos"""
+    
+    def setUp(self):
+        self.analise = AnalisisTecnica()
+        rng = np.random.default_rng(11)
+        self.precos = 100 + rng.normal(0, 1, 400).cumsum()
+        self.precos[50:70] = self.precos[50]  # Trecho sem variação
+        self.periodos = [2, 5, 9, 14, 21, 50]
+    
+    def test_varredura_sma(self):
+        """Cada linha reproduz calcular_media_movel do período"""
+        matriz = varredura_sma(self.precos, self.periodos)
+        
+        self.assertEqual(matriz.shape, (len(self.periodos), len(self.precos)))
+        for linha, periodo in zip(matriz, self.periodos):
+            esperado = self.analise.calcular_media_movel(self.precos.tolist(), periodo).valores
+            np.testing.assert_allclose(linha[~np.isnan(linha)], esperado, rtol=1e-10)
+    
+    def test_varredura_rsi(self):
+        """Cada linha reproduz calcular_rsi do período, inclusive janelas planas"""
+        matriz = varredura_rsi(self.precos, self.periodos)
+        
+        for linha, periodo in zip(matriz, self.periodos):
+            esperado = self.analise.calcular_rsi(self.precos.tolist(), periodo).valores
+            np.testing.assert_allclose(linha[~np.isnan(linha)], esperado, rtol=1e-9)
+    
+    def test_varredura_cruzamento_medias(self):
+        """Cruzamentos da grade coincidem com o cálculo direto do par"""
+        sinais = varredura_cruzamento_medias(self.precos, [5, 9], [21, 50])
+        
+        curta = pd.Series(self.precos).rolling(9).mean().to_numpy()
+        longa = pd.Series(self.precos).rolling(21).mean().to_numpy()
+        compra = (curta[1:] > longa[1:]) & (curta[:-1] <= longa[:-1])
+        venda = (curta[1:] < longa[1:]) & (curta[:-1] >= longa[:-1])
+        
+        self.assertEqual(sinais.shape, (2, 2, len(self.precos)))
+        np.testing.assert_array_equal(np.flatnonzero(sinais[1, 0] == SINAL_COMPRA), np.flatnonzero(compra) + 1)
+        np.testing.assert_array_equal(np.flatnonzero(sinais[1, 0] == SINAL_VENDA), np.flatnonzero(venda) + 1)
+
+class TestIndicadoresStreaming(unittest.TestCase):
+    """Testes para indicadores incrementais"""
+    
+    def setUp(self):
+        self.analise = AnalisisTecnica()
+        rng = np.random.default_rng(42)
+        self.precos = (100 + rng.normal(0, 1, 300).cumsum()).tolist()
+    
+    def _executar(self, indicador, precos):
+        valores, sinais = [], []
+        for preco in precos:
+            valor = indicador.atualizar(preco)
+            if valor is not None:
+                valores.append(valor)
+                sinais.append(indicador.sinal)
+        return valores, sinais
+    
+    def test_rsi_igual_ao_lote(self):
+        """RSI incremental reproduz a versão em lote"""
+        lote = self.analise.calcular_rsi(self.precos, periodo=14)
+        valores, sinais = self._executar(RSIStreaming(14), self.precos)
+        
+        np.testing.assert_allclose(valores, lote.valores, rtol=1e-9)
+        self.assertEqual(sinais, lote.sinais)
+    
+    def test_macd_igual_ao_lote(self):
+        """MACD incremental reproduz a versão em lote"""
+        lote = self.analise.calcular_macd(self.precos)
+        valores, sinais = self._executar(MACDStreaming(), self.precos)
+        
+        np.testing.assert_allclose(valores, lote.valores, rtol=1e-9, atol=1e-12)
+        self.assertEqual(sinais, lote.sinais)
+    
+    def test_bollinger_igual_ao_lote(self):
+        """Bandas de Bollinger incrementais reproduzem a versão em lote"""
+        lote = self.analise.calcular_bollinger_bands(self.precos, periodo=20)
+        bb = BollingerStreaming(20)
+        superiores, inferiores = [], []
+        valores, sinais = [], []
+        for preco in self.precos:
+            if bb.atualizar(preco) is not None:
+                valores.append(bb.valor)
+                sinais.append(bb.sinal)
+                superiores.append(bb.superior)
+                inferiores.append(bb.inferior)
+        
+        np.testing.assert_allclose(valores, lote['media'].valores, rtol=1e-9)
+        np.testing.assert_allclose(superiores, lote['superior'].valores, rtol=1e-9)
+        np.testing.assert_allclose(inferiores, lote['inferior'].valores, rtol=1e-9)
+        self.assertEqual(sinais, lote['media'].sinais)
+    
+    def test_medias_moveis_iguais_ao_lote(self):
+        """SMA e EMA incrementais reproduzem a versão em lote"""
+        for tipo in ('SMA', 'EMA'):
+            lote = self.analise.calcular_media_movel(self.precos, 20, tipo)
+            valores, sinais = self._executar(MediaMovelStreaming(20, tipo), self.precos)
+            
+            np.testing.assert_allclose(valores, lote.valores, rtol=1e-9)
+            self.assertEqual(sinais, lote.sinais)
+    
+    def test_inicializar_com_historico(self):
+        """Semear com histórico equivale a consumir preço a preço"""
+        historico, novos = self.precos[:200], self.precos[200:]
+        fabricas = [
+            lambda: RSIStreaming(14),
+            lambda: MACDStreaming(),
+            lambda: BollingerStreaming(20),
+            lambda: MediaMovelStreaming(20, 'SMA'),
+            lambda: MediaMovelStreaming(20, 'EMA'),
+        ]
+        for fabrica in fabricas:
+            semeado = fabrica().inicializar(historico)
+            sequencial = fabrica()
+            self._executar(sequencial, historico)
+            
+            self.assertEqual(semeado.n_precos, sequencial.n_precos)
+            for preco in novos:
+                self.assertAlmostEqual(semeado.atualizar(preco), sequencial.atualizar(preco), places=9)
+                self.assertEqual(semeado.sinal, sequencial.sinal)
+
+
+class TestOsciladores(unittest.TestCase):
+    """Testes para Estocástico, Williams %R e CCI"""
+    
+    def setUp(self):
+        self.analise = AnalisisTecnica()
+        rng = np.random.default_rng(7)
+        self.fechamentos = 100 + rng.normal(0, 1, 300).cumsum()
+        self.maximas = self.fechamentos + rng.random(300)
+        self.minimas = self.fechamentos - rng.random(300)
+        maxima = pd.Series(self.maximas).rolling(14).max()
+        minima = pd.Series(self.minimas).rolling(14).min()
+        self.k_ref = 100 * (self.fechamentos - minima) / (maxima - minima)
+        self.williams_ref = -100 * (maxima - self.fechamentos) / (maxima - minima)
+    
+    def test_extremos_moveis(self):
+        """Máximo/mínimo móveis O(n) coincidem com pandas, inclusive com NaN"""
+        serie = self.fechamentos.copy()
+        serie[[5, 120]] = np.nan
+        for janela in (1, 2, 7, 14, 50):
+            np.testing.assert_array_equal(
+                maximo_movel(serie, janela), pd.Series(serie).rolling(janela).max().to_numpy())
+            np.testing.assert_array_equal(
+                minimo_movel(serie, janela), pd.Series(serie).rolling(janela).min().to_numpy())
+    
+    def test_estocastico(self):
+        """%K e %D seguem as definições com máximas e mínimas"""
+        resultado = self.analise.calcular_estocastico(
+            self.fechamentos.tolist(), self.maximas, self.minimas)
+        
+        np.testing.assert_allclose(resultado['K'].valores, self.k_ref.dropna())
+        np.testing.assert_allclose(resultado['D'].valores, self.k_ref.rolling(3).mean().dropna())
+        self.assertTrue(all(s in ['COMPRA', 'VENDA', 'NEUTRO'] for s in resultado['K'].sinais))
+        self.assertTrue(all(v <= 20 for v, s in zip(resultado['K'].valores, resultado['K'].sinais)
+                            if s == 'COMPRA'))
+    
+    def test_williams_r(self):
+        """Williams %R fica entre -100 e 0"""
+        resultado = self.analise.calcular_williams_r(
+            self.fechamentos.tolist(), self.maximas, self.minimas)
+        
+        np.testing.assert_allclose(resultado.valores, self.williams_ref.dropna())
+        self.assertTrue(all(-100 <= v <= 0 for v in resultado.valores))
+    
+    def test_cci(self):
+        """CCI usa o desvio médio absoluto do preço típico"""
+        resultado = self.analise.calcular_cci(self.fechamentos.tolist(), self.maximas, self.minimas)
+        tipico = pd.Series((self.maximas + self.minimas + self.fechamentos) / 3)
+        desvio = tipico.rolling(20).apply(lambda x: np.abs(x - x.mean()).mean(), raw=True)
+        referencia = (tipico - tipico.rolling(20).mean()) / (0.015 * desvio)
+        
+        np.testing.assert_allclose(resultado.valores, referencia.dropna())
+    
+    def test_lote_igual_ao_por_ativo(self):
+        """Versões em lote reproduzem o cálculo por ativo em cada linha"""
+        matriz = np.vstack([self.fechamentos, self.fechamentos[::-1]])
+        estocastico = estocastico_lote(matriz)
+        williams = williams_r_lote(matriz)
+        cci = cci_lote(matriz)
+        
+        for linha in range(2):
+            precos = matriz[linha].tolist()
+            por_ativo = self.analise.calcular_estocastico(precos)
+            np.testing.assert_allclose(estocastico['K'].valores[linha, 13:], por_ativo['K'].valores)
+            np.testing.assert_allclose(estocastico['D'].valores[linha, 15:], por_ativo['D'].valores)
+            np.testing.assert_allclose(williams.valores[linha, 13:],
+                                       self.analise.calcular_williams_r(precos).valores)
+            np.testing.assert_allclose(cci.valores[linha, 19:], self.analise.calcular_cci(precos).valores)
+    
+    def test_streaming_igual_ao_lote(self):
+        """Osciladores incrementais reproduzem a versão em lote após semeadura"""
+        historico, novos = slice(0, 200), slice(200, 300)
+        precos = self.fechamentos.tolist()
+        lote = {
+            'K': self.analise.calcular_estocastico(precos, self.maximas, self.minimas)['K'],
+            'W': self.analise.calcular_williams_r(precos, self.maximas, self.minimas),
+            'C': self.analise.calcular_cci(precos, self.maximas, self.minimas)
+        }
+        indicadores = {'K': EstocasticoStreaming(), 'W': WilliamsRStreaming(), 'C': CCIStreaming()}
+        
+        for chave, indicador in indicadores.items():
+            indicador.inicializar(self.fechamentos[historico], self.maximas[historico],
+                                  self.minimas[historico])
+            valores, sinais = [], []
+            for fechamento, maxima, minima in zip(self.fechamentos[novos], self.maximas[novos],
+                                                  self.minimas[novos]):
+                valores.append(indicador.atualizar(fechamento, maxima, minima))
+                sinais.append(indicador.sinal)
+            
+            self.assertEqual(indicador.n_precos, 300)
+            np.testing.assert_allclose(valores, lote[chave].valores[-100:], rtol=1e-9)
+            self.assertEqual(sinais, lote[chave].sinais[-100:])
+
+class TestPrecisaoFloat32(unittest.TestCase):
+    """Testes de tolerância do modo float32 contra float64"""
+    
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.precos = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 2000)))
+        self.maximas = self.precos * (1 + rng.random(2000) * 0.01)
+        self.minimas = self.precos * (1 - rng.random(2000) * 0.01)
+        self.analise64 = AnalisisTecnica()
+        self.analise32 = AnalisisTecnica(dtype=np.float32)
+    
+    def _comparar(self, r64, r32):
+        self.assertEqual(r32.valores_array.dtype, np.float32)
+        np.testing.assert_allclose(r32.valores_array, r64.valores_array, **TOLERANCIAS_FLOAT32)
+        # Sinais só podem divergir em valores colados aos limiares
+        self.assertGreaterEqual(np.mean(r32.codigos_sinais == r64.codigos_sinais), 0.99)
+    
+    def test_resolver_dtype(self):
+        """Apenas float32 e float64 são aceitos"""
+        self.assertEqual(resolver_dtype(None), np.float64)
+        self.assertEqual(resolver_dtype('float32'), np.float32)
+        with self.assertRaises(ValueError):
+            resolver_dtype(np.int32)
+    
+    def test_indicadores_dentro_da_tolerancia(self):
+        """Indicadores em float32 ficam dentro da tolerância documentada"""
+        r64 = self.analise64.analisar_multiplos_indicadores(self.precos)
+        r32 = self.analise32.analisar_multiplos_indicadores(self.precos)
+        
+        self.assertEqual(set(r64), set(r32))
+        for nome in r64:
+            self._comparar(r64[nome], r32[nome])
+        
+        for calcular in (
+            lambda a: a.calcular_estocastico(self.precos, self.maximas, self.minimas)['D'],
+            lambda a: a.calcular_williams_r(self.precos, self.maximas, self.minimas),
+            lambda a: a.calcular_cci(self.precos, self.maximas, self.minimas)
+        ):
+            self._comparar(calcular(self.analise64), calcular(self.analise32))
+    
+    def test_lote_float32(self):
+        """A análise em lote preserva float32 e a tolerância"""
+        matriz = np.vstack([self.precos, self.precos[::-1] * 3])
+        m64 = self.analise64.analisar_multiplos_ativos(matriz)
+        m32 = self.analise32.analisar_multiplos_ativos(matriz)
+        
+        for nome in m64:
+            self.assertEqual(m32[nome].valores.dtype, np.float32)
+            np.testing.assert_allclose(m32[nome].valores, m64[nome].valores, **TOLERANCIAS_FLOAT32)
+    
+    def test_padroes_e_backtest_float32(self):
+        """Detector e backtest em float32 produzem as mesmas decisões"""
+        precos = [100 + i * 0.5 + np.sin(i * 0.3) * 2 for i in range(40)]
+        padroes64 = DetectorPadroes(50.0).detectar_todos_padroes(precos)
+        padroes32 = DetectorPadroes(50.0, dtype=np.float32).detectar_todos_padroes(precos)
+        self.assertEqual([p.tipo for p in padroes64], [p.tipo for p in padroes32])
+        for p64, p32 in zip(padroes64, padroes32):
+            self.assertAlmostEqual(p64.confianca, p32.confianca, places=3)
+        
+        dados = pd.DataFrame({'data': [f"d{i}" for i in range(300)], 'close': self.precos[:300]})
+        h64 = BacktestEngine(dtype=np.float64).executar_backtest_indicador(dados, 'RSI', {'periodo': 14})
+        h32 = BacktestEngine(dtype=np.float32).executar_backtest_indicador(dados, 'RSI', {'periodo': 14})
+        self.assertEqual(h64.total_trades, h32.total_trades)
+        self.assertAlmostEqual(h64.capital_final, h32.capital_final, places=6)
+
+class TestCacheIndicadores(unittest.TestCase):
+    """Testes para o cache de indicadores por conteúdo"""
+    
+    def setUp(self):
+        self.cache = CacheIndicadores(limite_bytes=10_000)
+        self.chamadas = 0
+        
+        @memoizar('soma_movel', cache=self.cache)
+        def soma_movel(precos, periodo=3):
+            self.chamadas += 1
+            return np.convolve(np.asarray(precos, dtype=float), np.ones(periodo), 'valid')
+        
+        self.soma_movel = soma_movel
+    
+    def test_acerto_por_conteudo(self):
+        """Buffers iguais compartilham o resultado; parâmetros diferentes não"""
+        precos = np.arange(100, dtype=float)
+        primeiro = self.soma_movel(precos)
+        segundo = self.soma_movel(precos.copy())
+        self.soma_movel(precos, periodo=5)
+        self.soma_movel(precos.tolist())
+        
+        self.assertIs(primeiro, segundo)
+        self.assertFalse(primeiro.flags.writeable)
+        self.assertEqual(self.chamadas, 3)
+        estatisticas = self.cache.estatisticas()
+        self.assertEqual((estatisticas['acertos'], estatisticas['falhas']), (1, 3))
+    
+    def test_despejo_lru_por_memoria(self):
+        """Entradas menos usadas saem quando o limite de bytes é excedido"""
+        series = [np.random.default_rng(i).random(400) for i in range(5)]  # ~3,2 KB por resultado
+        for serie in series:
+            self.soma_movel(serie)
+        self.soma_movel(series[-1])
+        
+        estatisticas = self.cache.estatisticas()
+        self.assertLessEqual(estatisticas['bytes_em_uso'], 10_000)
+        self.assertEqual(estatisticas['despejos'], 2)
+        self.assertEqual(estatisticas['acertos'], 1)
+    
+    def test_impressao_digital(self):
+        """A impressão digital distingue dtype, índice e conteúdo"""
+        valores = np.arange(10, dtype=float)
+        self.assertEqual(impressao_digital(valores), impressao_digital(valores.copy()))
+        self.assertNotEqual(impressao_digital(valores), impressao_digital(valores.astype(np.float32)))
+        self.assertNotEqual(impressao_digital(pd.Series(valores)),
+                            impressao_digital(pd.Series(valores, index=range(1, 11))))
+    
+    def test_analise_tecnica_memoizada(self):
+        """calcular_* reaproveita resultados e separa por dtype"""
+        precos = [100 + np.sin(i * 0.2) * 5 for i in range(80)]
+        CACHE_GLOBAL.limpar()
+        rsi = AnalisisTecnica().calcular_rsi(precos)
+        
+        self.assertIs(AnalisisTecnica().calcular_rsi(list(precos)).valores_array, rsi.valores_array)
+        self.assertIsNot(AnalisisTecnica(dtype=np.float32).calcular_rsi(precos).valores_array, rsi.valores_array)
+        self.assertEqual(CACHE_GLOBAL.estatisticas()['acertos'], 1)
+    
+    def test_acerto_nao_expoe_mutacoes(self):
+        """Alterar um resultado entregue não afeta os acertos seguintes"""
+        precos = [100 + np.cos(i * 0.3) * 4 for i in range(60)]
+        CACHE_GLOBAL.limpar()
+        rsi = AnalisisTecnica().calcular_rsi(precos)
+        originais = list(rsi.sinais)
+        rsi.sinais[0] = 'XXX'
+        rsi.parametros['periodo'] = -1
+        
+        novo = AnalisisTecnica().calcular_rsi(precos)
+        self.assertIsNot(novo, rsi)
+        self.assertEqual(novo.sinais, originais)
+        self.assertEqual(novo.parametros['periodo'], 14)
+        self.assertEqual(CACHE_GLOBAL.estatisticas()['acertos'], 1)
+        
+        @memoizar('quadro', cache=self.cache)
+        def quadro(precos):
+            return {'serie': pd.Series(np.asarray(precos) * 2), 'nivel': [1.0, 2.0]}
+        
+        entregue = quadro(precos)
+        entregue['serie'].iloc[0] = -1.0
+        entregue['nivel'].append(3.0)
+        self.assertEqual(quadro(precos)['serie'].iloc[0], precos[0] * 2)
+        self.assertEqual(quadro(precos)['nivel'], [1.0, 2.0])
+
 class TestDetectorPadroes(unittest.TestCase):
     """Testes para detector de padrões"""
     
@@ -117,6 +615,25 @@ class TestDetectorPadroes(unittest.TestCase):
         self.assertTrue(len(topos) > 0)
         self.assertTrue(len(fundos) > 0)
     
+    def test_pivos_igual_ao_laco(self):
+        """Núcleo vetorizado reproduz a comparação com os vizinhos, com empates e NaN"""
+        rng = np.random.default_rng(8)
+        for tamanho, janela in ((300, 5), (300, 1), (40, 12), (9, 5)):
+            precos = np.round(np.cumsum(rng.normal(0, 1, tamanho)), 0)  # Muitos empates
+            precos[tamanho // 3] = np.nan
+            topos, fundos = [], []
+            for i in range(janela, tamanho - janela):
+                vizinhos = np.r_[precos[i - janela:i], precos[i + 1:i + janela + 1]]
+                if all(precos[i] >= v for v in vizinhos):
+                    topos.append(i)
+                elif all(precos[i] <= v for v in vizinhos):
+                    fundos.append(i)
+            
+            self.assertEqual(self.detector.detectar_topos_fundos(precos, janela), (topos, fundos))
+            matriz = pivos(np.vstack([precos, precos]), janela)
+            self.assertEqual(np.flatnonzero(matriz[0][1]).tolist(), topos)
+            self.assertEqual(np.flatnonzero(matriz[1][1]).tolist(), fundos)
+    
     def test_detectar_duplo_topo(self):
         """Testa detecção de duplo topo"""
         topos, _ = self.detector.detectar_topos_fundos(self.precos_duplo_topo)
@@ -146,6 +663,59 @@ class TestDetectorPadroes(unittest.TestCase):
         self.assertIsInstance(relatorio, str)
         self.assertTrue(len(relatorio) > 0)
 
+    def test_scanner_incremental_igual_a_redeteccao(self):
+        """Testa que o scanner incremental reproduz a detecção por janela"""
+        rng = np.random.default_rng(3)
+        t = np.arange(400)
+        precos = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, 400))) * (1 + 0.08 * np.sin(t / 7))
+        scanner = ScannerPadroesIncremental(self.detector, precos, janela=50)
+
+        for fim in range(50, len(precos)):
+            esperados = self.detector.detectar_todos_padroes(precos[fim - 50:fim])
+            obtidos = scanner.padroes_em(fim)
+            deslocamento = fim - 50
+            self.assertEqual(
+                [(p.tipo, p.inicio + deslocamento, p.fim + deslocamento, p.confianca, p.preco_entrada)
+                 for p in esperados],
+                [(p.tipo, p.inicio, p.fim, p.confianca, p.preco_entrada) for p in obtidos]
+            )
+
+        # Modelos só são reavaliados quando os últimos pivôs mudam
+        self.assertLess(scanner.reavaliacoes, len(precos) - 50)
+        with self.assertRaises(ValueError):
+            scanner.padroes_em(100)
+
+    def test_pivot_tracker_igual_ao_lote(self):
+        """Pivôs confirmados preço a preço e padrões reavaliados só a cada pivô novo"""
+        rng = np.random.default_rng(5)
+        t = np.arange(600)
+        precos = np.round(100 * np.exp(np.cumsum(rng.normal(0, 0.02, 600))) * (1 + 0.08 * np.sin(t / 7)), 1)
+        rastreador = PivotTracker(self.detector, janela=3, max_pivos=10)
+        instantes = pd.date_range('2024-01-01', periods=600, freq='min')
+
+        emitidos = []
+        for i, preco in enumerate(precos):
+            novos = rastreador.atualizar(preco, instantes[i])
+            emitidos.extend(novos)
+            if not novos:
+                continue
+            topos, fundos = self.detector.detectar_topos_fundos(precos[:i + 1], 3)
+            pivo = novos[0]
+            self.assertEqual(pivo.indice, (topos if pivo.tipo == 'topo' else fundos)[-1])
+            self.assertEqual((pivo.confirmado_em, pivo.latencia), (i, 3))
+            self.assertEqual(pivo.instante_confirmacao - pivo.instante, pd.Timedelta(minutes=3))
+            esperados = self.detector.avaliar_padroes(precos[:i + 1], topos, fundos)
+            self.assertEqual(
+                [(p.tipo, p.inicio, p.fim, p.confianca, p.pontos_chave) for p in esperados],
+                [(p.tipo, p.inicio, p.fim, p.confianca, p.pontos_chave) for p in rastreador.padroes]
+            )
+
+        topos, fundos = self.detector.detectar_topos_fundos(precos, 3)
+        self.assertEqual(len(emitidos), len(topos) + len(fundos))
+        self.assertEqual(rastreador.reavaliacoes, len(emitidos))
+        self.assertEqual(len(rastreador.pivos), 10)
+        self.assertLess(len(rastreador._precos), 200)  # Só a faixa usada pelos modelos
+
 class TestBacktestEngine(unittest.TestCase):
     """Testes para engine de backtesting"""
     
@@ -208,6 +778,233 @@ class TestBacktestEngine(unittest.TestCase):
         self.assertIn('Capital Inicial', relatorio)
         self.assertIn('Capital Final', relatorio)
 
+    def test_backtest_vetorizado_igual_ao_laco(self):
+        """Testa que a simulação vetorizada reproduz o histórico do laço"""
+        rng = np.random.default_rng(7)
+        dados = pd.DataFrame({
+            'data': pd.date_range('2024-01-01', periods=600, freq='h'),
+            'close': 100 * np.exp(np.cumsum(rng.normal(0, 0.003, 600)))
+        })
+        casos = [('RSI', {'periodo': 14}), ('MACD', {}), ('SMA', {'periodo': 20})]
+
+        for indicador, parametros in casos:
+            for stop, alvo in [(0.02, 0.04), (0.002, 0.004), (0.0, 0.0)]:
+                vetorizado = BacktestEngine().executar_backtest_indicador(
+                    dados, indicador, parametros, stop, alvo)
+                laco = BacktestEngine().executar_backtest_indicador(
+                    dados, indicador, parametros, stop, alvo, vetorizado=False)
+                self.assertEqual(vetorizado, laco, f"{indicador} stop={stop} alvo={alvo}")
+
+    def test_backtest_padroes_incremental_igual_a_janela(self):
+        """Testa que a varredura incremental reproduz o backtest por janela"""
+        rng = np.random.default_rng(11)
+        t = np.arange(500)
+        dados = pd.DataFrame({
+            'data': pd.date_range('2024-01-01', periods=500, freq='D'),
+            'close': 100 * np.exp(np.cumsum(rng.normal(0, 0.02, 500))) * (1 + 0.08 * np.sin(t / 7))
+        })
+
+        incremental = BacktestEngine().executar_backtest_padroes(dados, 60.0)
+        janela = BacktestEngine().executar_backtest_padroes(dados, 60.0, incremental=False)
+
+        self.assertGreater(len(janela.posicoes), 0)
+        self.assertEqual(incremental, janela)
+
+class TestIndicePadroes(unittest.TestCase):
+    """Testes para o índice persistente de padrões"""
+
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        t = np.arange(500)
+        self.dados = pd.DataFrame({
+            'data': pd.date_range('2024-01-01', periods=500, freq='D'),
+            'close': 100 * np.exp(np.cumsum(rng.normal(0, 0.02, 500))) * (1 + 0.08 * np.sin(t / 7))
+        })
+        self.diretorio = tempfile.TemporaryDirectory()
+        self.caminho = os.path.join(self.diretorio.name, 'padroes.db')
+
+    def tearDown(self):
+        self.diretorio.cleanup()
+
+    def _resumo(self, indice):
+        return [(p.tipo, p.inicio, p.fim, p.confianca, p.detectado_em, p.visto_ate)
+                for p in indice.consultar()]
+
+    def test_incremental_igual_a_indexacao_completa(self):
+        """Atualizações por trechos gravam o mesmo índice e as mesmas janelas do scanner"""
+        indice = IndicePadroes(self.caminho)
+        datas, precos = self.dados['data'], self.dados['close']
+        self.assertEqual(indice.atualizar('TESTE', datas[:200], precos[:200]), 151)
+        self.assertEqual(indice.atualizar('TESTE', datas[100:350], precos[100:350]), 150)
+        self.assertEqual(indice.atualizar('TESTE', datas, precos), 150)
+        self.assertEqual(indice.atualizar('TESTE', datas, precos), 0)
+        with self.assertRaises(ValueError):
+            indice.atualizar('TESTE', datas[480:], precos[480:])
+
+        completo = IndicePadroes()
+        completo.atualizar('TESTE', datas, precos)
+        self.assertGreater(len(self._resumo(completo)), 0)
+        self.assertEqual(self._resumo(indice), self._resumo(completo))
+
+        scanner = ScannerPadroesIncremental(DetectorPadroes(), precos.to_numpy(), 50)
+        por_barra = indice.padroes_por_barra('TESTE', datas)
+        for fim in range(50, 501):
+            self.assertEqual(por_barra[fim - 1], scanner.padroes_em(fim))
+
+    def test_backtest_le_do_indice(self):
+        """O backtest de padrões lido do índice reproduz a detecção por barra"""
+        indice = IndicePadroes(self.caminho)
+        indice.atualizar('TESTE', self.dados['data'], self.dados['close'])
+        indice.fechar()
+
+        reaberto = IndicePadroes(self.caminho)
+        esperado = BacktestEngine().executar_backtest_padroes(self.dados, 60.0)
+        resultado = BacktestEngine().executar_backtest_padroes(self.dados, 60.0, indice=reaberto)
+        self.assertGreater(len(esperado.posicoes), 0)
+        self.assertEqual(resultado, esperado)
+
+        with self.assertRaises(ValueError):
+            IndicePadroes(self.caminho, janela=30)
+
+    def test_consultas(self):
+        """Filtros por tipo, ativo, confiança e data"""
+        indice = IndicePadroes()
+        indice.atualizar('A', self.dados['data'], self.dados['close'])
+        indice.atualizar('B', self.dados['data'], self.dados['close'][::-1].to_numpy())
+        todos = indice.consultar()
+        self.assertEqual(indice.simbolos(), ['A', 'B'])
+        self.assertEqual([p.confianca for p in todos], sorted((p.confianca for p in todos), reverse=True))
+
+        tipo = todos[0].tipo
+        desde = pd.Timestamp('2024-10-01')
+        filtrados = indice.consultar(tipo, simbolo='B', min_confianca=70, desde=desde)
+        esperados = [p for p in todos if p.tipo == tipo and p.simbolo == 'B'
+                     and p.confianca >= 70 and p.fim >= desde]
+        self.assertEqual([p.id for p in filtrados], [p.id for p in esperados])
+        self.assertEqual(len(indice.consultar(limite=3)), 3)
+        self.assertEqual(indice.consultar(TipoPadrao.BANDEIRA), [])
+
+class TestModelosGeometricos(unittest.TestCase):
+    """Testes para os modelos geométricos em lote"""
+
+    @staticmethod
+    def _zigue_zague(pontos, passo=8):
+        """Série linear por partes pelos pivôs dados, `passo` barras entre eles"""
+        x = np.arange(len(pontos)) * passo
+        return np.interp(np.arange(x[-1] + 1), x, np.asarray(pontos, dtype=float))
+
+    def test_ajuste_igual_a_lstsq(self):
+        """Cada janela reproduz np.linalg.lstsq, inclusive com pontos ausentes"""
+        rng = np.random.default_rng(5)
+        x = np.sort(rng.choice(200, (40, 4)), axis=1) + np.arange(4) * 200
+        y = rng.normal(100, 5, (40, 4))
+        pesos = np.ones((40, 4))
+        pesos[::3, 0] = 0
+
+        inclinacao, intercepto, rms = ajustar_retas(x, y, pesos)
+        for k in range(40):
+            validos = pesos[k] > 0
+            solucao, residuo, _, _ = np.linalg.lstsq(
+                np.column_stack([x[k][validos], np.ones(validos.sum())]), y[k][validos], rcond=None)
+            np.testing.assert_allclose([inclinacao[k], intercepto[k]], solucao, rtol=1e-9)
+            np.testing.assert_allclose(rms[k], np.sqrt(residuo[0] / validos.sum()), rtol=1e-9)
+
+    def test_canal_com_ruido(self):
+        """Fundos ascendentes com um recuo pequeno ainda formam canal de alta"""
+        precos = self._zigue_zague([100, 110, 103, 113, 102.9, 116, 109, 120, 112])
+        self.assertIsNone(DetectorPadroes().detectar_canal(
+            precos, *DetectorPadroes().detectar_topos_fundos(precos)))
+
+        padroes = ModelosGeometricos().detectar(precos, apenas_ultima=True)
+        canal = [p for p in padroes if p.tipo == TipoPadrao.CANAL_ALTA]
+        self.assertEqual(len(canal), 1)
+        self.assertEqual(canal[0].sinal, 'COMPRA')
+        self.assertLess(canal[0].stop_loss, canal[0].preco_entrada)
+        self.assertLess(canal[0].preco_entrada, canal[0].take_profit)
+
+    def test_cabeca_ombros_e_invertido(self):
+        """Cabeça e ombros sobre topos e o invertido sobre fundos espelhados"""
+        pontos = [100, 110, 101, 120, 102, 110.5, 100, 95]
+        modelos = ModelosGeometricos()
+        topo = [p for p in modelos.detectar(self._zigue_zague(pontos), apenas_ultima=True)
+                if p.tipo == TipoPadrao.CABECA_OMBROS]
+        fundo = [p for p in modelos.detectar(self._zigue_zague([200 - v for v in pontos]), apenas_ultima=True)
+                 if p.tipo == TipoPadrao.CABECA_OMBROS_INVERTIDO]
+
+        self.assertEqual(len(topo), 1)
+        self.assertEqual(len(fundo), 1)
+        self.assertEqual([i for i, _ in topo[0].pontos_chave], [8, 16, 24, 32, 40])
+        self.assertEqual([i for i, _ in fundo[0].pontos_chave], [8, 16, 24, 32, 40])
+        self.assertAlmostEqual(topo[0].confianca, fundo[0].confianca, delta=1.0)
+        # Pescoço pelos vales (101 e 102) projetado no segundo ombro
+        self.assertAlmostEqual(topo[0].preco_entrada, 102.5 * 0.99)
+        self.assertAlmostEqual(fundo[0].preco_entrada, 97.5 * 1.01)
+        self.assertLess(topo[0].take_profit, topo[0].preco_entrada)
+        self.assertGreater(fundo[0].take_profit, fundo[0].preco_entrada)
+
+    def test_ultima_janela_contida_no_historico(self):
+        """A avaliação só da última janela é parte da avaliação em lote"""
+        rng = np.random.default_rng(2)
+        t = np.arange(3000)
+        precos = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 3000))) * (1 + 0.05 * np.sin(t / 9))
+        modelos = ModelosGeometricos()
+        historico = modelos.detectar(precos)
+        self.assertGreater(len({p.tipo for p in historico}), 6)
+        for fim in (1000, 2000, 3000):
+            for padrao in modelos.detectar(precos[:fim], apenas_ultima=True):
+                self.assertIn(padrao, historico)
+
+    def test_janelas_em_lote_iguais_a_avaliar(self):
+        """avaliar_janelas reproduz avaliar(apenas_ultima=True) sobre os pivôs de cada janela"""
+        rng = np.random.default_rng(6)
+        t = np.arange(1500)
+        precos = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 1500))) * (1 + 0.05 * np.sin(t / 7))
+        topos, fundos = (np.flatnonzero(m) for m in pivos(precos, 5))
+        fins_topos = rng.integers(0, len(topos) + 1, 200)
+        fins_fundos = rng.integers(0, len(fundos) + 1, 200)
+        n_topos = np.minimum(rng.integers(0, 4, 200), fins_topos)
+        n_fundos = np.minimum(rng.integers(0, 4, 200), fins_fundos)
+        modelos = ModelosGeometricos()
+
+        lote = modelos.avaliar_janelas(precos, topos, fundos, fins_topos, n_topos, fins_fundos, n_fundos)
+        self.assertGreater(sum(map(len, lote)), 20)
+        for padroes, ft, nt, ff, nf in zip(lote, fins_topos, n_topos, fins_fundos, n_fundos):
+            esperado = modelos.avaliar(precos, topos[ft - nt:ft], fundos[ff - nf:ff], apenas_ultima=True)
+            self.assertEqual(padroes, esperado)
+
+    def test_detector_geometrico_opcional(self):
+        """DetectorPadroes(geometrico=True) avalia pelos modelos, inclusive no scanner e no índice"""
+        rng = np.random.default_rng(4)
+        t = np.arange(600)
+        precos = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 600))) * (1 + 0.06 * np.sin(t / 8))
+        detector = DetectorPadroes(geometrico=True)
+        modelos = ModelosGeometricos(n_pivos=3)
+
+        tipos = set()
+        scanner = ScannerPadroesIncremental(detector, precos, 80)
+        for fim in range(80, 601, 13):
+            janela = precos[fim - 80:fim]
+            padroes = detector.detectar_todos_padroes(janela)
+            esperado = sorted(modelos.detectar(janela, apenas_ultima=True), key=lambda p: -p.confianca)
+            self.assertEqual(padroes, esperado)
+            self.assertEqual([(p.tipo, p.inicio - (fim - 80), p.fim - (fim - 80)) for p in scanner.padroes_em(fim)],
+                             [(p.tipo, p.inicio, p.fim) for p in padroes])
+            tipos.update(p.tipo for p in padroes)
+        self.assertGreater(len(tipos), 2)
+
+        datas = pd.date_range('2024-01-01', periods=600, freq='D')
+        with tempfile.TemporaryDirectory() as diretorio:
+            caminho = os.path.join(diretorio, 'padroes.db')
+            indice = IndicePadroes(caminho, detector=detector)
+            indice.atualizar('TESTE', datas, precos)
+            por_barra = indice.padroes_por_barra('TESTE', datas)
+            scanner = ScannerPadroesIncremental(detector, precos, 50)
+            for fim in range(50, 601):
+                self.assertEqual(por_barra[fim - 1], scanner.padroes_em(fim))
+            indice.fechar()
+            with self.assertRaises(ValueError):
+                IndicePadroes(caminho)
+
 class TestIntegracao(unittest.TestCase):
     """Testes de integração do sistema completo"""
     
@@ -0,0 +1,792 @@
+"""
+Testes para o Sistema de Backteste
+"""
+
+import unittest
+import numpy as np
+import pandas as pd
+from datetime import datetime
+import sys
+import os
+import tempfile
+
+# Adicionar o diretório pai ao path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backteste.backtest_engine import BacktestEngine
+from backteste.data_store import OHLCVStore
+from backteste.features import FeatureFrame
+from backteste.parallel import make_executor, ProcessExecutor, SharedFrames
+from backteste.walk_forward import (WalkForwardOptimizer, MovingAverageCrossSweep,
+                                    walk_forward_splits, expand_grid)
+from backteste.monte_carlo import monte_carlo, resample_indices
+from backteste.regimes import RegimeLabeler, REGIMES, MarketCondition
+from backteste.pattern_scanner import PatternScanner
+from analise_tecnica.detector_padroes import DetectorPadroes
+from utilitarios import metrics
+from utilitarios.first_touch import first_touch, EXIT_NONE, EXIT_STOP, EXIT_TARGET
+
+
+def _primeiro_toque_laco(high, low, entrada, direcao, stop, alvo, fim):
+    """Referência barra a barra (empate na mesma barra: stop)"""
+    for j in range(entrada + 1, fim):
+        if direcao > 0:
+            toca_stop, toca_alvo = low[j] <= stop, high[j] >= alvo
+        else:
+            toca_stop, toca_alvo = high[j] >= stop, low[j] <= alvo
+        if toca_stop:
+            return j, stop, EXIT_STOP
+        if toca_alvo:
+            return j, alvo, EXIT_TARGET
+    return fim - 1, None, EXIT_NONE
+
+
+class EstrategiaSempreComprada:
+    """Compra na primeira barra e mantém o sinal"""
+    id = 'sempre_comprada'
+
+    def generate_signal(self, data):
+        return 1
+
+
+class EstrategiaMedia:
+    """Comprado acima da média de 10, nas três formas do protocolo"""
+    id = 'media'
+
+    def generate_signal(self, data):
+        fechamentos = data['close'].to_numpy()[-10:]
+        if len(fechamentos) < 10:
+            return 0
+        return int(fechamentos[-1] > fechamentos.mean())
+
+
+class EstrategiaMediaLote(EstrategiaMedia):
+    def generate_signals(self, data):
+        media = data['close'].rolling(10).mean().to_numpy()
+        return (data['close'].to_numpy() > media).astype(int)
+
+
+class EstrategiaMediaFeatures(EstrategiaMedia):
+    def compute_features(self, data):
+        return {'media': data['close'].rolling(10).mean()}
+
+    def generate_signal_at(self, features, i):
+        media = features['media'][i]
+        return int(features['close'][i] > media)
+
+
+class EstrategiaCruzamento:
+    """Cruzamento de médias calculado diretamente, como referência da varredura"""
+
+    def __init__(self, short, long):
+        self.id = f'cruzamento_{short}_{long}'
+        self.short, self.long = short, long
+
+    def generate_signals(self, data):
+        curta = data['close'].rolling(self.short).mean()
+        longa = data['close'].rolling(self.long).mean()
+        return (curta > longa).to_numpy().astype(int)
+
+
+class _SinaisFixos:
+    """Sinais já calculados, entregues em lote"""
+    id = 'fixos'
+
+    def __init__(self, sinais):
+        self.sinais = sinais
+
+    def generate_signals(self, data):
+        return self.sinais
+
+
+class TestFirstTouch(unittest.TestCase):
+    """Testes para o núcleo vetorizado de stop/take"""
+
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        self.close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 2000)))
+        self.high = self.close * (1 + np.abs(rng.normal(0, 0.004, 2000)))
+        self.low = self.close * (1 - np.abs(rng.normal(0, 0.004, 2000)))
+
+    def test_igual_ao_laco(self):
+        """Lote de posições resolve as mesmas saídas que o laço"""
+        rng = np.random.default_rng(1)
+        entradas = rng.integers(0, 1990, 300)
+        direcoes = rng.choice([-1, 1], 300)
+        stops = self.close[entradas] * (1 - direcoes * rng.uniform(0.005, 0.05, 300))
+        alvos = self.close[entradas] * (1 + direcoes * rng.uniform(0.005, 0.05, 300))
+        fins = np.minimum(entradas + rng.integers(2, 400, 300), 2000)
+
+        saida = first_touch(self.high, self.low, entradas, direcoes, stops, alvos,
+                            end_idx=fins, close=self.close, block=8)
+
+        for k in range(300):
+            j, preco, motivo = _primeiro_toque_laco(
+                self.high, self.low, entradas[k], direcoes[k], stops[k], alvos[k], fins[k])
+            self.assertEqual(saida.exit_idx[k], j)
+            self.assertEqual(saida.reason[k], motivo)
+            self.assertEqual(saida.exit_price[k], self.close[j] if preco is None else preco)
+
+    def test_empate_na_mesma_barra_prevalece_stop(self):
+        """Stop e alvo dentro da mesma barra: saída pelo stop"""
+        high = np.array([100.0, 101.0, 110.0])
+        low = np.array([100.0, 99.0, 90.0])
+
+        comprado = first_touch(high, low, 0, 1, stop=95.0, target=105.0)
+        vendido = first_touch(high, low, 0, -1, stop=105.0, target=95.0)
+
+        self.assertEqual(comprado.exit_idx[0], 2)
+        self.assertEqual(comprado.reason[0], EXIT_STOP)
+        self.assertEqual(comprado.exit_price[0], 95.0)
+        self.assertEqual(vendido.reason[0], EXIT_STOP)
+        self.assertEqual(vendido.exit_price[0], 105.0)
+
+    def test_gap_alem_do_stop_sai_na_abertura(self):
+        """Barra que abre além do stop sai na abertura, não no nível"""
+        open_ = np.array([100.0, 80.0, 120.0, 96.0])
+        high = np.array([100.0, 82.0, 121.0, 99.0])
+        low = np.array([100.0, 78.0, 118.0, 94.0])
+
+        comprado = first_touch(high, low, 0, 1, stop=95.0, target=105.0, open=open_)
+        vendido = first_touch(high, low, 1, -1, stop=85.0, target=70.0, open=open_)
+        sem_gap = first_touch(high, low, 2, 1, stop=95.0, open=open_)
+
+        self.assertEqual((comprado.exit_idx[0], comprado.reason[0]), (1, EXIT_STOP))
+        self.assertEqual(comprado.exit_price[0], 80.0)
+        self.assertEqual((vendido.exit_idx[0], vendido.reason[0]), (2, EXIT_STOP))
+        self.assertEqual(vendido.exit_price[0], 120.0)
+        self.assertEqual(sem_gap.exit_price[0], 95.0)
+        # Sem aberturas, o stop continua no nível
+        self.assertEqual(first_touch(high, low, 0, 1, stop=95.0).exit_price[0], 95.0)
+
+    def test_niveis_desativados_e_sem_toque(self):
+        """None/0 desativam o nível; sem toque sai no fim do horizonte"""
+        precos = np.linspace(100, 120, 50)
+        saida = first_touch(precos, precos, [0, 10], [1, 1], stop=[None, 0.0],
+                            target=[None, 200.0], end_idx=[30, 50], close=precos)
+
+        self.assertEqual(saida.reason.tolist(), [EXIT_NONE, EXIT_NONE])
+        self.assertEqual(saida.exit_idx.tolist(), [29, 49])
+        np.testing.assert_array_equal(saida.exit_price, precos[[29, 49]])
+
+    def test_preenchimento_no_fechamento(self):
+        """fill='close' sai no fechamento da barra do toque"""
+        saida = first_touch(self.high, self.low, 10, 1, stop=self.close[10] * 0.99,
+                            target=self.close[10] * 1.01, close=self.close, fill='close')
+        self.assertNotEqual(saida.reason[0], EXIT_NONE)
+        self.assertEqual(saida.exit_price[0], self.close[saida.exit_idx[0]])
+
+        with self.assertRaises(ValueError):
+            first_touch(self.high, self.low, 10, 1, fill='close')
+
+
+class TestMetrics(unittest.TestCase):
+    """Testes para as métricas vetorizadas"""
+
+    def setUp(self):
+        rng = np.random.default_rng(9)
+        self.retornos = rng.normal(0.0005, 0.01, (50, 300))
+        self.equity = 1000.0 * np.cumprod(1 + self.retornos, axis=1)
+
+    def test_drawdown_igual_ao_laco(self):
+        """Máximo drawdown e duração conferem com o cálculo barra a barra"""
+        for linha, curva in zip(metrics.max_drawdown(self.equity, initial=1000.0), self.equity):
+            pico, pior, duracao, maior_duracao = 1000.0, 0.0, 0, 0
+            for capital in curva:
+                pico = max(pico, capital)
+                pior = max(pior, (pico - capital) / pico)
+                duracao = duracao + 1 if capital < pico else 0
+                maior_duracao = max(maior_duracao, duracao)
+            self.assertAlmostEqual(linha, pior, places=12)
+            self.assertEqual(metrics.drawdown_duration(curva, initial=1000.0), maior_duracao)
+
+    def test_matriz_igual_a_linhas(self):
+        """Uma chamada sobre a matriz equivale a uma chamada por execução"""
+        resumo = metrics.summarize(self.equity, initial=1000.0)
+        for i in (0, 17, 49):
+            linha = metrics.summarize(self.equity[i], initial=1000.0)
+            for nome, valor in linha.items():
+                self.assertAlmostEqual(resumo[nome][i], valor, places=9)
+        np.testing.assert_allclose(
+            metrics.sharpe_ratio(self.retornos, ddof=1),
+            self.retornos.mean(axis=1) / self.retornos.std(axis=1, ddof=1)
+        )
+
+    def test_casos_degenerados(self):
+        """Séries vazias, sem perdas ou sem variação não geram divisões inválidas"""
+        self.assertEqual(metrics.max_drawdown([]), 0.0)
+        self.assertEqual(metrics.sharpe_ratio([0.01, 0.01]), 0.0)
+        self.assertEqual(metrics.sortino_ratio([0.01, 0.02]), 0.0)
+        self.assertEqual(metrics.profit_factor([1.0, 2.0]), float('inf'))
+        trades = metrics.pad_rows([[1.0, -2.0, 3.0], [5.0], []])
+        np.testing.assert_array_equal(metrics.profit_factor(trades), [2.0, np.inf, np.inf])
+        np.testing.assert_allclose(metrics.win_rate(trades), [2 / 3, 1.0, 0.0])
+
+    def test_curvas_completadas_com_nan(self):
+        """Curvas de tamanhos diferentes empilhadas com pad_rows equivalem às curvas isoladas"""
+        curvas = [self.equity[0], self.equity[1, :120], self.equity[2, :1]]
+        resumo = metrics.summarize(metrics.pad_rows(curvas), initial=1000.0)
+        for i, curva in enumerate(curvas):
+            linha = metrics.summarize(curva, initial=1000.0)
+            for nome, valor in linha.items():
+                self.assertAlmostEqual(resumo[nome][i], valor, places=9, msg=nome)
+        np.testing.assert_allclose(metrics.max_drawdown(metrics.pad_rows(curvas)),
+                                   [metrics.max_drawdown(c) for c in curvas])
+
+
+class TestMonteCarlo(unittest.TestCase):
+    """Testes para a reamostragem Monte Carlo de trades"""
+
+    def setUp(self):
+        self.pnl = np.random.default_rng(4).normal(30, 800, 120)
+
+    def test_distribuicoes_iguais_ao_calculo_por_linha(self):
+        """Métricas da matriz de reamostragens conferem com o cálculo linha a linha"""
+        relatorio = monte_carlo(self.pnl, n_resamples=500, seed=3, max_cells=5000)
+        indices = resample_indices(120, 500, rng=np.random.default_rng(3))
+
+        for k in (0, 99, 499):
+            retornos = self.pnl[indices[k]] / 100000.0
+            curva = 100000.0 * np.cumprod(1 + retornos)
+            self.assertAlmostEqual(relatorio.final_equity[k], curva[-1], places=6)
+            self.assertAlmostEqual(relatorio.max_drawdown[k],
+                                   BacktestEngine().calculate_max_drawdown(retornos.tolist()), places=12)
+            self.assertAlmostEqual(relatorio.sharpe_ratio[k],
+                                   BacktestEngine().calculate_sharpe_ratio(retornos.tolist()), places=9)
+
+        percentis = relatorio.percentiles((5, 50, 95))['final_equity']
+        self.assertLessEqual(percentis[5], percentis[50])
+        self.assertLessEqual(percentis[50], percentis[95])
+        self.assertEqual(relatorio.summary()['n_resamples'], 500)
+
+    def test_blocos_circulares_e_semente(self):
+        """Blocos reamostram trades consecutivos; a mesma semente repete o resultado"""
+        indices = resample_indices(10, 50, 'block', block_size=4, rng=np.random.default_rng(0))
+        self.assertEqual(indices.shape, (50, 10))
+        for linha in indices:
+            for inicio in (0, 4):
+                np.testing.assert_array_equal(linha[inicio:inicio + 4], (linha[inicio] + np.arange(4)) % 10)
+
+        a = monte_carlo(self.pnl, 200, method='block', seed=8)
+        b = monte_carlo(self.pnl, 200, method='block', seed=8)
+        np.testing.assert_array_equal(a.max_drawdown, b.max_drawdown)
+        with self.assertRaises(ValueError):
+            monte_carlo(self.pnl, 10, method='jackknife')
+
+    def test_resultado_de_backtest_e_sem_trades(self):
+        """Aceita BacktestResult; sem trades, o capital permanece o inicial"""
+        engine = BacktestEngine()
+        rng = np.random.default_rng(2)
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 200)))
+        dados = pd.DataFrame({'open': close, 'close': close, 'high': close * 1.002,
+                              'low': close * 0.998, 'volume': np.full(200, 1000.0)},
+                             index=pd.date_range('2024-01-01', periods=200, freq='D'))
+        resultado = engine.run_backtest(EstrategiaMediaLote(), 'TESTE', None, None, data=dados)
+
+        relatorio = monte_carlo(resultado, 300, seed=1)
+        self.assertEqual(relatorio.strategy_id, 'media')
+        self.assertEqual(relatorio.n_trades, len(resultado.trades))
+        self.assertAlmostEqual(relatorio.observed['sharpe_ratio'], resultado.sharpe_ratio, places=9)
+
+        vazio = monte_carlo([], 100)
+        self.assertEqual(vazio.probability_of_loss(), 0.0)
+        self.assertTrue((vazio.final_equity == 100000.0).all())
+
+    def test_observado_igual_ao_engine(self):
+        """Métricas observadas são as do BacktestEngine para os mesmos trades"""
+        engine = BacktestEngine()
+        for pnl in ([-5000.0, 1000.0, 2000.0, -500.0], self.pnl.tolist()):
+            retornos = [valor / 100000.0 for valor in pnl]
+            observado = monte_carlo(pnl, 10, seed=0).observed
+            self.assertAlmostEqual(observado['max_drawdown'], engine.calculate_max_drawdown(retornos), places=12)
+            self.assertAlmostEqual(observado['sharpe_ratio'], engine.calculate_sharpe_ratio(retornos), places=12)
+        self.assertAlmostEqual(monte_carlo([-5000.0, 1000.0, 2000.0, -500.0], 10).observed['max_drawdown'],
+                               0.005, places=3)
+
+
+class TestRegimes(unittest.TestCase):
+    """Testes para os rótulos de regime por barra"""
+
+    def setUp(self):
+        rng = np.random.default_rng(6)
+        escala = np.r_[np.ones(200), np.full(100, 3.0), np.full(100, 0.3)]
+        close = 100 * np.exp(np.cumsum(rng.normal(0.001, 0.01, 400) * escala))
+        self.dados = pd.DataFrame({
+            'open': close, 'close': close,
+            'high': close * 1.002, 'low': close * 0.998,
+            'volume': np.full(400, 1000.0)
+        }, index=pd.date_range('2022-01-01', periods=400, freq='D'))
+
+    @staticmethod
+    def condicao_referencia(data, window=20):
+        """Regra por janela com pandas, referência para os rótulos vetorizados"""
+        volatility = data['close'].pct_change().rolling(window).std()
+        trend = data['close'].rolling(window).mean()
+        price_trend = (trend.iloc[-1] - trend.iloc[-window]) / trend.iloc[-window]
+        if volatility.iloc[-1] > volatility.mean() * 1.5:
+            return MarketCondition.VOLATILE
+        if volatility.iloc[-1] < volatility.mean() * 0.5:
+            return MarketCondition.LOW_VOLATILITY
+        if price_trend > 0.05:
+            return MarketCondition.BULL
+        if price_trend < -0.05:
+            return MarketCondition.BEAR
+        return MarketCondition.SIDEWAYS
+
+    def test_igual_a_regra_por_janela(self):
+        """O rótulo da última barra reproduz a regra por janela com pandas"""
+        engine = BacktestEngine()
+        rotulador = RegimeLabeler(lookback=1000)
+        vistos = set()
+        for fim in range(30, 400, 7):
+            janela = self.dados.iloc[max(fim - 80, 0):fim]
+            esperado = self.condicao_referencia(janela)
+            self.assertEqual(REGIMES[rotulador.label_array(janela['close'].to_numpy())[-1]], esperado)
+            self.assertEqual(engine.detect_market_condition(janela), esperado)
+            vistos.add(esperado)
+        self.assertGreater(len(vistos), 2)
+
+    def test_matriz_igual_a_series(self):
+        """Uma chamada sobre (ativos x tempo) equivale a uma por ativo"""
+        rotulador = RegimeLabeler()
+        matriz = np.vstack([self.dados['close'].to_numpy(), self.dados['close'].to_numpy()[::-1]])
+        codigos = rotulador.label_array(matriz)
+        self.assertEqual(codigos.dtype, np.int8)
+        for linha, serie in zip(codigos, matriz):
+            np.testing.assert_array_equal(linha, rotulador.label_array(serie))
+
+    def test_rotulos_no_armazem_e_por_trade(self):
+        """Rótulos gravados no armazém chegam ao backtest e detalham os trades por regime"""
+        with tempfile.TemporaryDirectory() as diretorio:
+            store = OHLCVStore(diretorio)
+            store.write('TESTE', self.dados.iloc[:300])
+            engine = BacktestEngine(store=store)
+            rotulador = engine.regime_labeler
+
+            # A leitura não grava rótulos; prepare_regimes é o passo explícito
+            engine.load_historical_data('TESTE', None, None)
+            self.assertFalse(rotulador.is_cached(store, 'TESTE'))
+            engine.prepare_regimes()
+            self.assertTrue(rotulador.is_cached(store, 'TESTE'))
+            dados = engine.load_historical_data('TESTE', datetime(2022, 6, 1), datetime(2022, 10, 27))
+            completo = rotulador.label_array(self.dados['close'].to_numpy()[:300])
+            np.testing.assert_array_equal(dados[rotulador.column].to_numpy(), completo[151:300])
+
+            # Barras novas invalidam a coluna, que é refeita no próximo prepare_regimes
+            store.write('TESTE', self.dados.iloc[300:])
+            self.assertFalse(rotulador.is_cached(store, 'TESTE'))
+            engine.prepare_regimes(['TESTE'])
+            dados = engine.load_historical_data('TESTE', None, None)
+            np.testing.assert_array_equal(dados[rotulador.column].to_numpy(),
+                                          rotulador.label_array(self.dados['close'].to_numpy()))
+
+            resultado = engine.run_backtest(EstrategiaMediaLote(), 'TESTE', None, None)
+
+        self.assertGreater(len(resultado.trades), 0)
+        detalhamento = resultado.regime_breakdown
+        self.assertEqual(sum(d['n_trades'] for d in detalhamento.values()), len(resultado.trades))
+        for regime, d in detalhamento.items():
+            pnl = [t['pnl'] for t in resultado.trades if t['market_condition'] is regime]
+            self.assertAlmostEqual(d['total_pnl'], sum(pnl), places=9)
+        self.assertIsInstance(resultado.market_conditions['end'], MarketCondition)
+
+    def test_barras_novas_removem_rotulos(self):
+        """Barras acrescentadas após ensure removem a coluna em vez de completá-la com NaN"""
+        with tempfile.TemporaryDirectory() as diretorio:
+            store = OHLCVStore(diretorio)
+            rotulador = RegimeLabeler()
+            store.write('TESTE', self.dados.iloc[:300])
+            rotulador.ensure(store, 'TESTE')
+            self.assertTrue(rotulador.is_cached(store, 'TESTE'))
+
+            store.write('TESTE', self.dados.iloc[300:])
+            self.assertFalse(rotulador.is_cached(store, 'TESTE'))
+            lido = store.read('TESTE')
+            self.assertNotIn(rotulador.column, lido.columns)
+            self.assertEqual(len(lido), len(self.dados))
+
+            rotulador.ensure(store, 'TESTE')
+            lido = store.read('TESTE')
+            self.assertEqual(lido[rotulador.column].dtype, np.int8)
+            np.testing.assert_array_equal(lido[rotulador.column].to_numpy(),
+                                          rotulador.label_array(self.dados['close'].to_numpy()))
+
+
+class TestOHLCVStore(unittest.TestCase):
+    """Testes para o armazém colunar de OHLCV"""
+
+    def setUp(self):
+        self.diretorio = tempfile.TemporaryDirectory()
+        self.store = OHLCVStore(self.diretorio.name)
+        indice = pd.date_range('2023-12-30', periods=96, freq='h')
+        self.dados = pd.DataFrame({
+            'open': np.arange(96.0), 'high': np.arange(96.0) + 1,
+            'low': np.arange(96.0) - 1, 'close': np.arange(96.0) + 0.5,
+            'volume': np.arange(96, dtype=np.int64)
+        }, index=indice)
+        self.store.write('TESTE', self.dados)
+
+    def tearDown(self):
+        self.diretorio.cleanup()
+
+    def test_particoes_e_intervalo(self):
+        """Particiona por ano e consulta intervalos inclusivos entre partições"""
+        self.assertEqual(self.store.symbols(), ['TESTE'])
+        self.assertEqual(self.store.years('TESTE'), [2023, 2024])
+
+        lido = self.store.read('TESTE', '2023-12-31 20:00', '2024-01-01 03:00')
+        esperado = self.dados.loc['2023-12-31 20:00':'2024-01-01 03:00']
+        esperado.index = pd.DatetimeIndex(esperado.index.to_numpy(dtype='datetime64[ns]'))  # Índice gravado em nanossegundos
+        pd.testing.assert_frame_equal(lido, esperado, check_freq=False)
+        self.assertEqual(lido['volume'].dtype, np.int64)
+
+    def test_leitura_sem_copia(self):
+        """Dentro de uma partição, as colunas são visões do arquivo mapeado"""
+        lido = self.store.read('TESTE', '2024-01-01 05:00', '2024-01-01 10:00')
+        mapeado = self.store.read_arrays('TESTE', '2024-01-01', '2024-12-31')['close']
+
+        self.assertTrue(np.shares_memory(lido['close'].to_numpy(), mapeado))
+        self.assertFalse(lido['close'].to_numpy().flags.writeable)
+
+    def test_atualizacao_substitui_barras(self):
+        """Barras regravadas substituem as existentes e novas são intercaladas"""
+        atualizacao = self.dados.iloc[[10, 50]].copy()
+        atualizacao['close'] = -1.0
+        self.store.write('TESTE', atualizacao)
+
+        lido = self.store.read('TESTE')
+        self.assertEqual(len(lido), len(self.dados))
+        self.assertEqual(lido['close'].iloc[10], -1.0)
+        self.assertEqual(lido['close'].iloc[50], -1.0)
+        self.assertTrue(lido.index.is_monotonic_increasing)
+
+    def test_gravacao_publica_nova_versao(self):
+        """Gravações criam versões novas; arrays já mapeados não são alterados"""
+        anterior = self.store.read_arrays('TESTE', '2024-01-01', '2024-12-31')['close']
+        particao = os.path.join(self.diretorio.name, 'TESTE', '2024')
+        for valor in (-1.0, -2.0, -3.0):
+            atualizacao = self.dados.iloc[[50]].copy()
+            atualizacao['close'] = valor
+            self.store.write('TESTE', atualizacao)
+        self.store.write_column('TESTE', 'rotulo', np.arange(96, dtype=np.int8))
+
+        self.assertEqual(anterior[2], 50.5)
+        self.assertEqual(sorted(os.listdir(particao)), ['v000004', 'v000005'])
+        lido = self.store.read('TESTE')
+        self.assertEqual(lido['close'].iloc[50], -3.0)
+        np.testing.assert_array_equal(lido['rotulo'], np.arange(96))
+        self.assertTrue(self.store.has_column('TESTE', 'rotulo', np.int8))
+
+    def test_engine_carrega_do_armazem(self):
+        """load_historical_data lê do armazém quando não há dados registrados"""
+        engine = BacktestEngine(store=self.store)
+        dados = engine.load_historical_data('TESTE', datetime(2024, 1, 1), datetime(2024, 1, 2))
+        self.assertEqual(len(dados), 25)
+
+        with self.assertRaises(KeyError):
+            BacktestEngine().load_historical_data('TESTE', datetime(2024, 1, 1), datetime(2024, 1, 2))
+
+
+class TestBacktestEngine(unittest.TestCase):
+    """Testes para o backteste de estratégias"""
+
+    def setUp(self):
+        self.engine = BacktestEngine()
+        rng = np.random.default_rng(2)
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 200)))
+        self.dados = pd.DataFrame({
+            'open': close, 'close': close,
+            'high': close * 1.002, 'low': close * 0.998,
+            'volume': np.full(200, 1000.0)
+        }, index=pd.date_range('2024-01-01', periods=200, freq='D'))
+        self.inicio, self.fim = datetime(2024, 1, 1), datetime(2024, 7, 18)
+        self.engine.historical_data[f"TESTE_{self.inicio}_{self.fim}"] = self.dados
+
+    def test_stop_e_alvo_com_primeiro_toque(self):
+        """Posições saem no primeiro toque de stop/alvo sobre máximas e mínimas"""
+        resultado = self.engine.run_backtest(EstrategiaSempreComprada(), 'TESTE', self.inicio, self.fim,
+                                             stop_loss_pct=0.02, take_profit_pct=0.02)
+
+        self.assertGreater(len(resultado.trades), 1)
+        for trade in resultado.trades:
+            self.assertIn(trade['exit_reason'], ('stop', 'target'))
+            barras = self.dados.loc[trade['entry_time']:trade['exit_time']].iloc[1:]
+            if trade['exit_reason'] == 'stop':
+                # No nível, ou na abertura se a barra abriu abaixo dele
+                stop = trade['entry_price'] * 0.98
+                self.assertAlmostEqual(trade['exit_price'], min(barras['open'].iloc[-1], stop))
+                self.assertLessEqual(barras['low'].iloc[-1], stop)
+                self.assertTrue((barras['low'].iloc[:-1] > stop).all())
+            else:
+                self.assertAlmostEqual(trade['exit_price'] / trade['entry_price'] - 1, 0.02)
+                self.assertGreaterEqual(barras['high'].iloc[-1], trade['exit_price'])
+                self.assertTrue((barras['high'].iloc[:-1] < trade['exit_price']).all())
+
+    def test_protocolos_de_sinal_equivalentes(self):
+        """Sinais em lote e por features reproduzem os trades da estratégia por barra"""
+        legado = self.engine.run_backtest(EstrategiaMedia(), 'TESTE', self.inicio, self.fim)
+        lote = self.engine.run_backtest(EstrategiaMediaLote(), 'TESTE', self.inicio, self.fim)
+        features = self.engine.run_backtest(EstrategiaMediaFeatures(), 'TESTE', self.inicio, self.fim)
+
+        self.assertGreater(len(legado.trades), 0)
+        for resultado in (lote, features):
+            self.assertEqual(len(resultado.trades), len(legado.trades))
+            for trade, esperado in zip(resultado.trades, legado.trades):
+                self.assertEqual(trade['entry_time'], esperado['entry_time'])
+                self.assertEqual(trade['exit_time'], esperado['exit_time'])
+                self.assertAlmostEqual(trade['pnl'], esperado['pnl'], places=9)
+
+    def test_feature_frame_somente_leitura(self):
+        """Colunas da FeatureFrame são visões somente leitura, sem cópia"""
+        features = FeatureFrame.from_data(self.dados, {'dobro': self.dados['close'] * 2})
+
+        self.assertIn('close', features)
+        self.assertEqual(features.row(3)['dobro'], self.dados['close'].iloc[3] * 2)
+        with self.assertRaises(ValueError):
+            features['close'][0] = 0.0
+        with self.assertRaises(ValueError):
+            FeatureFrame.from_data(self.dados, {'curta': np.zeros(3)})
+
+    def test_sem_niveis_mantem_saida_por_sinal(self):
+        """Sem stop/alvo, a posição só fecha com sinal neutro"""
+        resultado = self.engine.run_backtest(EstrategiaSempreComprada(), 'TESTE', self.inicio, self.fim)
+        self.assertEqual(resultado.trades, [])
+
+
+class TestExecutores(unittest.TestCase):
+    """Testes para a execução paralela de backtests por período"""
+
+    def setUp(self):
+        self.diretorio = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(3)
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 400)))
+        self.dados = pd.DataFrame({
+            'open': close, 'close': close,
+            'high': close * 1.002, 'low': close * 0.998,
+            'volume': np.full(400, 1000.0)
+        }, index=pd.date_range('2024-01-01', periods=400, freq='D'))
+        self.periodos = [(datetime(2024, 1, 1), datetime(2024, 4, 30)),
+                         (datetime(2024, 3, 1), datetime(2024, 8, 31)),
+                         (datetime(2024, 6, 1), datetime(2025, 1, 31))]
+
+    def tearDown(self):
+        self.diretorio.cleanup()
+
+    def _resumo(self, resultados):
+        return [[(t['entry_time'], t['exit_time'], round(t['pnl'], 9)) for t in r.trades]
+                for r in resultados]
+
+    def test_backends_equivalentes(self):
+        """Série, threads e processos produzem os mesmos resultados por período"""
+        engine = BacktestEngine()
+        for inicio, fim in self.periodos:
+            engine.historical_data[f"TESTE_{inicio}_{fim}"] = self.dados.loc[inicio:fim]
+        estrategia = EstrategiaMediaLote()
+
+        serie = make_executor('serial').run_ordered(engine, estrategia, 'TESTE', self.periodos)
+        self.assertGreater(sum(len(r.trades) for r in serie), 0)
+        for tipo in ('thread', 'process'):
+            resultados = make_executor(tipo, max_workers=2).run_ordered(
+                engine, estrategia, 'TESTE', self.periodos, stop_loss_pct=None)
+            self.assertEqual(self._resumo(resultados), self._resumo(serie))
+
+    def test_processos_leem_do_armazem(self):
+        """Sem dados registrados, os processos reabrem o armazém mapeado"""
+        store = OHLCVStore(self.diretorio.name)
+        store.write('TESTE', self.dados)
+        engine = BacktestEngine(store=store)
+
+        entregues = list(ProcessExecutor(max_workers=2).run(
+            engine, EstrategiaMediaLote(), 'TESTE', self.periodos))
+        validacao = engine.validate_strategy(EstrategiaMediaLote(), 'TESTE', self.periodos)
+
+        self.assertEqual(sorted(i for i, _ in entregues), [0, 1, 2])
+        serie = [engine.run_backtest(EstrategiaMediaLote(), 'TESTE', *p) for p in self.periodos]
+        paralelo = [r for _, r in sorted(entregues, key=lambda par: par[0])]
+        self.assertEqual(self._resumo(paralelo), self._resumo(serie))
+        self.assertAlmostEqual(validacao['mean_win_rate'], np.mean([r.win_rate for r in serie]))
+
+    def test_memoria_compartilhada_sem_copia(self):
+        """DataFrames anexados ao bloco compartilhado são visões somente leitura"""
+        compartilhado = SharedFrames({'a': self.dados})
+        try:
+            bloco, frames = SharedFrames.attach(compartilhado.spec)
+            pd.testing.assert_frame_equal(frames['a'], self.dados, check_freq=False)
+            self.assertFalse(frames['a']['close'].to_numpy().flags.writeable)
+            del frames
+            bloco.close()
+        finally:
+            compartilhado.close()
+
+        with self.assertRaises(ValueError):
+            make_executor('gpu')
+
+
+class TestWalkForward(unittest.TestCase):
+    """Testes para a otimização walk-forward"""
+
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        close = 100 * np.exp(np.cumsum(rng.normal(0.0002, 0.01, 600)))
+        self.dados = pd.DataFrame({
+            'open': close, 'close': close,
+            'high': close * 1.002, 'low': close * 0.998,
+            'volume': np.full(600, 1000.0)
+        }, index=pd.date_range('2022-01-01', periods=600, freq='D'))
+        self.engine = BacktestEngine()
+        self.inicio, self.fim = datetime(2022, 1, 1), datetime(2023, 8, 23)
+        self.engine.historical_data[f"TESTE_{self.inicio}_{self.fim}"] = self.dados
+        self.grade = {'short': [5, 10], 'long': [20, 40]}
+
+    def test_divisoes_moveis_e_ancoradas(self):
+        """Treino móvel tem tamanho fixo; ancorado cresce a partir da barra 0"""
+        moveis = walk_forward_splits(100, 40, 20)
+        ancoradas = walk_forward_splits(100, 40, 20, anchored=True)
+
+        self.assertEqual([tuple(f) for f in moveis], [(0, 40, 40, 60), (20, 60, 60, 80), (40, 80, 80, 100)])
+        self.assertEqual([f.train_start for f in ancoradas], [0, 0, 0])
+        self.assertEqual([f.train_end for f in ancoradas], [40, 60, 80])
+        self.assertEqual(len(walk_forward_splits(100, 40, 20, step=10)), 5)
+        self.assertEqual(len(expand_grid(self.grade)), 4)
+
+    def test_escolhe_melhor_no_treino_e_avalia_no_teste(self):
+        """Cada fold usa o melhor parâmetro do treino no teste seguinte"""
+        resultado = WalkForwardOptimizer(self.engine).run(
+            MovingAverageCrossSweep(), 'TESTE', self.inicio, self.fim, self.grade,
+            train_size=200, test_size=100)
+
+        self.assertEqual(len(resultado.folds), 4)
+        for fold in resultado.folds:
+            treino = self.dados.loc[fold.train_start:fold.train_end]
+            teste = self.dados.loc[fold.test_start:fold.test_end]
+            anterior = self.dados.loc[:fold.test_end]  # Aquecimento com barras anteriores ao fold
+            sharpes = []
+            for params in expand_grid(self.grade):
+                sinais = EstrategiaCruzamento(**params).generate_signals(self.dados.loc[:fold.train_end])
+                lote = _SinaisFixos(sinais[-len(treino):])
+                sharpes.append(self.engine.run_backtest(lote, 'TESTE', None, None, data=treino).sharpe_ratio)
+            np.testing.assert_allclose(fold.in_sample_scores, sharpes)
+            self.assertEqual(fold.best_params, expand_grid(self.grade)[int(np.argmax(sharpes))])
+
+            sinais = EstrategiaCruzamento(**fold.best_params).generate_signals(anterior)
+            esperado = self.engine.run_backtest(_SinaisFixos(sinais[-len(teste):]), 'TESTE',
+                                                None, None, data=teste)
+            self.assertEqual([t['pnl'] for t in fold.out_of_sample.trades],
+                             [t['pnl'] for t in esperado.trades])
+
+        resumo = resultado.summary()
+        self.assertEqual(len(resumo['chosen_params']), 4)
+
+    def test_objetivo_minimizado_e_invalidos(self):
+        """max_drawdown é minimizado; campos não escalares são rejeitados"""
+        resultado = WalkForwardOptimizer(self.engine).run(
+            MovingAverageCrossSweep(), 'TESTE', self.inicio, self.fim, self.grade,
+            train_size=200, test_size=100, objective='max_drawdown')
+        for fold in resultado.folds:
+            self.assertEqual(fold.best_params, expand_grid(self.grade)[int(np.argmin(fold.in_sample_scores))])
+            self.assertEqual(fold.in_sample_score, min(fold.in_sample_scores))
+
+        for objetivo in ('returns', 'trades', 'strategy_id', 'market_conditions'):
+            with self.assertRaises(ValueError):
+                WalkForwardOptimizer(self.engine).run(MovingAverageCrossSweep(), 'TESTE', self.inicio, self.fim,
+                                                      self.grade, train_size=200, test_size=100, objective=objetivo)
+
+    def test_processos_e_fabrica_equivalentes(self):
+        """Folds em processos e fábrica de estratégias em lote reproduzem a varredura"""
+        serie = WalkForwardOptimizer(self.engine).run(
+            MovingAverageCrossSweep(), 'TESTE', self.inicio, self.fim, self.grade,
+            train_size=150, test_size=50, anchored=True)
+        processos = WalkForwardOptimizer(self.engine, executor=ProcessExecutor(max_workers=2)).run(
+            MovingAverageCrossSweep(), 'TESTE', self.inicio, self.fim, self.grade,
+            train_size=150, test_size=50, anchored=True)
+        fabrica = WalkForwardOptimizer(self.engine).run(
+            EstrategiaCruzamento, 'TESTE', self.inicio, self.fim, self.grade,
+            train_size=150, test_size=50, anchored=True)
+
+        for outro in (processos, fabrica):
+            self.assertEqual(len(outro.folds), len(serie.folds))
+            for fold, esperado in zip(outro.folds, serie.folds):
+                self.assertEqual(fold.best_params, esperado.best_params)
+                self.assertEqual(fold.out_of_sample.returns, esperado.out_of_sample.returns)
+
+        with self.assertRaises(ValueError):
+            WalkForwardOptimizer(self.engine).run(MovingAverageCrossSweep(), 'TESTE', self.inicio,
+                                                  self.fim, self.grade, train_size=10, test_size=50)
+
+
+class TestPatternScanner(unittest.TestCase):
+    """Testes para a varredura de padrões no universo de ativos"""
+
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        passos = rng.normal(0, 0.02, (40, 300))
+        self.universo = {f'ATIVO{i}': 100 * np.exp(np.cumsum(passos[i, :300 - 5 * i]))
+                         for i in range(40)}
+
+    def _esperado(self, universo, detector=None):
+        detector = detector or DetectorPadroes()
+        return sorted((nome, p.tipo.value, p.inicio, p.fim, p.confianca)
+                      for nome, precos in universo.items()
+                      for p in detector.detectar_todos_padroes(precos))
+
+    def _resumo(self, matches):
+        return sorted((m.symbol, m.pattern.tipo.value, m.pattern.inicio, m.pattern.fim, m.confianca)
+                      for m in matches)
+
+    def test_igual_ao_detector_por_ativo(self):
+        """Lotes em série e em processos reproduzem detectar_todos_padroes por ativo"""
+        esperado = self._esperado(self.universo)
+        self.assertGreater(len(esperado), 0)
+        for executor in ('serial', ProcessExecutor(max_workers=2)):
+            resultado = PatternScanner(executor=executor, chunk_size=7).scan(self.universo)
+            self.assertTrue(resultado.complete)
+            self.assertFalse(resultado.timed_out)
+            self.assertEqual(self._resumo(resultado.matches), esperado)
+            confiancas = [m.confianca for m in resultado.matches]
+            self.assertEqual(confiancas, sorted(confiancas, reverse=True))
+
+    def test_detector_geometrico(self):
+        """O scanner respeita a opção de modelos geométricos do detector"""
+        detector = DetectorPadroes(geometrico=True)
+        esperado = self._esperado(self.universo, detector)
+        self.assertGreater(len(esperado), 0)
+        self.assertNotEqual(esperado, self._esperado(self.universo))
+        resultado = PatternScanner(detector, executor=ProcessExecutor(max_workers=2), chunk_size=7).scan(self.universo)
+        self.assertEqual(self._resumo(resultado.matches), esperado)
+
+    def test_stream_ranking_parcial(self):
+        """Cada lote entregue amplia o ranking mesclado"""
+        atualizacoes = list(PatternScanner(executor='serial', chunk_size=10).stream(self.universo))
+        self.assertEqual([a.completed for a in atualizacoes], [10, 20, 30, 40])
+        for anterior, atual in zip(atualizacoes, atualizacoes[1:]):
+            self.assertEqual(len(atual.ranking), len(anterior.ranking) + len(atual.matches))
+        self.assertEqual(self._resumo(atualizacoes[-1].ranking), self._esperado(self.universo))
+
+    def test_prazo_devolve_resultado_parcial(self):
+        """Com o prazo esgotado, os ativos não varridos ficam pendentes"""
+        resultado = PatternScanner(executor='thread', max_workers=2, chunk_size=5).scan(
+            self.universo, timeout=0)
+        self.assertTrue(resultado.timed_out)
+        self.assertEqual(len(resultado.scanned) + len(resultado.pending), 40)
+        self.assertLess(len(resultado.scanned), 40)
+
+        resultado = PatternScanner(executor='serial', chunk_size=5).scan(self.universo, timeout=0)
+        self.assertEqual(resultado.matches, [])
+        self.assertEqual(resultado.pending, list(self.universo))
+
+    def test_armazem_e_lookback(self):
+        """Varredura do armazém com as últimas barras equivale ao universo recortado"""
+        with tempfile.TemporaryDirectory() as raiz:
+            store = OHLCVStore(raiz)
+            for nome, precos in self.universo.items():
+                store.write(nome, pd.DataFrame({'close': precos},
+                                               index=pd.date_range('2024-01-01', periods=len(precos))))
+            scanner = PatternScanner(executor=ProcessExecutor(max_workers=2), chunk_size=8, lookback=120)
+            resultado = scanner.scan_store(store)
+            recortado = {nome: precos[-120:] for nome, precos in self.universo.items()}
+            self.assertEqual(self._resumo(resultado.matches), self._esperado(recortado))
+            self.assertEqual(resultado.scanned, sorted(self.universo))
+
+
+if __name__ == '__main__':
+    unittest.main()
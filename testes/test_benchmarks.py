@@ -0,0 +1,59 @@
+"""
+Benchmarks de desempenho (pytest -m benchmark ou NEURAL_BENCHMARK=1; fora
+da execução padrão, ver conftest)
+
+A grade pequena roda como teste de fumaça; a grade completa (até 10M barras
+e 3000 ativos) só é executada com NEURAL_BENCHMARK_COMPLETO=1 e grava o
+relatório JSON em NEURAL_BENCHMARK_SAIDA, quando definido.
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.dados_sinteticos import gerar_ohlcv, gerar_matriz_ohlcv
+from benchmarks.suite import executar, comparar, BARRAS_PADRAO, ATIVOS_PADRAO
+
+GRADE_COMPLETA = os.environ.get('NEURAL_BENCHMARK_COMPLETO') == '1'
+
+pytestmark = pytest.mark.benchmark
+
+
+def test_gerador_reprodutivel_e_consistente():
+    """Mesma semente gera a mesma série, com OHLC coerente"""
+    dados = gerar_ohlcv(5_000, seed=7)
+    np.testing.assert_array_equal(dados['close'], gerar_ohlcv(5_000, seed=7)['close'])
+    assert (dados['low'] <= dados[['open', 'close']].min(axis=1)).all()
+    assert (dados['high'] >= dados[['open', 'close']].max(axis=1)).all()
+    assert (dados['volume'] > 0).all()
+
+    matrizes = gerar_matriz_ohlcv(500, 4, seed=7)
+    assert matrizes['close'].shape == (4, 500)
+    assert len(np.unique(matrizes['close'][:, -1])) == 4
+
+
+def test_suite_fumaca():
+    """Todos os casos executam na grade pequena e o relatório é JSON válido"""
+    relatorio = executar(barras=[1_000], ativos=[1, 100], repeticoes=1)
+    json.dumps(relatorio)
+
+    assert all(r['status'] == 'ok' for r in relatorio['resultados'])
+    assert {r['ativos'] for r in relatorio['resultados']} == {1, 100}
+    assert comparar(relatorio, relatorio) == []
+
+
+@pytest.mark.skipif(not GRADE_COMPLETA, reason="defina NEURAL_BENCHMARK_COMPLETO=1")
+def test_grade_completa():
+    """Grade 1k/100k/10M barras x 1/100/3000 ativos"""
+    relatorio = executar(barras=BARRAS_PADRAO, ativos=ATIVOS_PADRAO)
+    saida = os.environ.get('NEURAL_BENCHMARK_SAIDA')
+    if saida:
+        with open(saida, 'w', encoding='utf-8') as arquivo:
+            json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
+
+    assert any(r['status'] == 'ok' and r['barras'] == max(BARRAS_PADRAO) for r in relatorio['resultados'])
@@ -0,0 +1,174 @@
+"""
+Resolução vetorizada de stop/take ("primeiro toque")
+
+Para um lote de posições, encontra a primeira barra em que a mínima/máxima
+atinge o stop ou o alvo, sem iterar linha a linha: as barras de cada posição
+são reunidas numa matriz (posições x barras) e a primeira barra tocada sai de
+um argmax mascarado. A busca avança em blocos de largura crescente, de modo
+que posições curtas não varrem o restante da série. Compartilhado pelos
+motores de analise_tecnica e de backteste.
+
+Regra de desempate: sem dados intrabarra não é possível saber se o stop ou o
+alvo foi tocado primeiro quando ambos estão dentro da mesma barra. Nesse caso
+assume-se o stop (premissa conservadora).
+
+Gaps: com `open` informado, um stop atravessado na abertura (a barra já abre
+além do nível) sai na abertura, que é pior que o nível; sem `open` a saída
+fica no nível.
+
+Exemplo:
+    saida = first_touch(high, low, entry_idx, direction, stop, target, close=close)
+    saida.exit_idx, saida.exit_price, saida.reason
+"""
+
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+EXIT_NONE = 0    # Nenhum nível tocado até o fim do horizonte
+EXIT_STOP = 1
+EXIT_TARGET = 2
+
+EXIT_REASONS = {EXIT_NONE: 'end', EXIT_STOP: 'stop', EXIT_TARGET: 'target'}
+
+
+class FirstTouch(NamedTuple):
+    """Saída de cada posição (arrays alinhados com as entradas)"""
+    exit_idx: np.ndarray    # int64
+    exit_price: np.ndarray  # float64
+    reason: np.ndarray      # int8, EXIT_NONE/EXIT_STOP/EXIT_TARGET
+
+
+def _per_position(values, m: int, dtype) -> np.ndarray:
+    """Escalar ou array por posição como array 1-D de tamanho m"""
+    values = np.asarray(values, dtype=dtype)
+    if values.ndim == 0:
+        return np.full(m, values, dtype=dtype)
+    return values.reshape(m)
+
+
+def _levels(values, m: int) -> np.ndarray:
+    """Níveis em float64; None, NaN e 0 desativam o nível"""
+    if values is None:
+        return np.full(m, np.nan)
+    levels = np.asarray(values)
+    if levels.dtype == object:
+        levels = np.where(np.equal(levels, None), np.nan, levels)
+    levels = _per_position(levels, m, np.float64)
+    if not levels.all():
+        levels = np.where(levels == 0, np.nan, levels)
+    return levels
+
+
+def first_touch(high: np.ndarray,
+                low: np.ndarray,
+                entry_idx,
+                direction,
+                stop=None,
+                target=None,
+                end_idx=None,
+                close: Optional[np.ndarray] = None,
+                open: Optional[np.ndarray] = None,
+                fill: str = 'level',
+                include_entry_bar: bool = False,
+                block: int = 64,
+                max_cells: int = 1 << 22) -> FirstTouch:
+    """
+    Primeira barra em que cada posição toca o stop ou o alvo
+
+    Args:
+        high: Máximas da série
+        low: Mínimas da série (para preços só de fechamento, passe o
+            fechamento em ambas)
+        entry_idx: Barra de entrada de cada posição
+        direction: +1 para compra, -1 para venda (escalar ou por posição)
+        stop: Nível de stop por posição (None/NaN/0 desativa)
+        target: Nível de alvo por posição (None/NaN/0 desativa)
+        end_idx: Fim exclusivo do horizonte por posição (padrão: fim da série)
+        close: Fechamentos, usados como preço de saída sem toque ou com
+            fill='close'
+        open: Aberturas; com fill='level', o stop sai no pior entre a
+            abertura e o nível (min para compra, max para venda), exceto na
+            própria barra de entrada
+        fill: 'level' sai no próprio nível tocado; 'close' sai no fechamento
+            da barra do toque
+        include_entry_bar: Se True, a barra de entrada também é verificada
+        block: Largura inicial do bloco de busca
+        max_cells: Limite de células (posições x barras) por bloco avaliado
+
+    Returns:
+        FirstTouch com índice, preço e motivo de saída. Posições sem toque
+        saem na última barra do horizonte (end_idx - 1) com motivo EXIT_NONE
+        e preço de fechamento (NaN se `close` não for informado).
+    """
+    if fill not in ('level', 'close'):
+        raise ValueError(f"fill inválido: {fill} (use 'level' ou 'close')")
+    if fill == 'close' and close is None:
+        raise ValueError("fill='close' requer o array close")
+
+    high = np.asarray(high)
+    low = np.asarray(low)
+    n = len(high)
+    entry_idx = np.asarray(entry_idx, dtype=np.int64).reshape(-1)
+    m = len(entry_idx)
+    is_long = _per_position(direction, m, np.float64) > 0
+    stop = _levels(stop, m)
+    target = _levels(target, m)
+
+    start = entry_idx if include_entry_bar else entry_idx + 1
+    end = np.full(m, n, dtype=np.int64) if end_idx is None else \
+        np.minimum(_per_position(end_idx, m, np.int64), n)
+
+    exit_idx = end - 1
+    reason = np.zeros(m, dtype=np.int8)
+
+    pending = np.flatnonzero(start < end)
+    offset, width = 0, max(int(block), 1)
+    while pending.size:
+        # Limita a matriz do bloco a ~max_cells células
+        rows_per_chunk = max(max_cells // width, 1)
+        still_pending = []
+        for chunk_start in range(0, len(pending), rows_per_chunk):
+            chunk = pending[chunk_start:chunk_start + rows_per_chunk]
+            idx = start[chunk, None] + np.arange(offset, offset + width)
+            valid = idx < end[chunk, None]
+            idx_clip = np.minimum(idx, n - 1)
+            bar_high = high[idx_clip]
+            bar_low = low[idx_clip]
+
+            long_rows = is_long[chunk, None]
+            level_stop = stop[chunk, None]
+            level_target = target[chunk, None]
+            hit_stop = valid & np.where(long_rows, bar_low <= level_stop, bar_high >= level_stop)
+            hit_target = valid & np.where(long_rows, bar_high >= level_target, bar_low <= level_target)
+            hit = hit_stop | hit_target
+
+            touched = hit.any(axis=1)
+            first = np.argmax(hit, axis=1)
+            rows = np.flatnonzero(touched)
+            positions = chunk[rows]
+            exit_idx[positions] = idx[rows, first[rows]]
+            # Empate na mesma barra: stop prevalece
+            reason[positions] = np.where(hit_stop[rows, first[rows]], EXIT_STOP, EXIT_TARGET)
+
+            still_pending.append(chunk[~touched & valid[:, -1]])
+        pending = np.concatenate(still_pending)
+        offset += width
+        width *= 2
+
+    exit_price = np.full(m, np.nan)
+    if close is not None:
+        close = np.asarray(close)
+        has_bar = exit_idx >= 0
+        exit_price[has_bar] = close[exit_idx[has_bar]]
+    if fill == 'level':
+        stop_fill = stop
+        if open is not None:
+            # Gap além do stop: a primeira cotação disponível é a abertura
+            bar_open = np.asarray(open, dtype=np.float64)[np.maximum(exit_idx, 0)]
+            gapped = np.where(is_long, np.fmin(bar_open, stop), np.fmax(bar_open, stop))
+            stop_fill = np.where(exit_idx > entry_idx, gapped, stop)
+        exit_price = np.where(reason == EXIT_STOP, stop_fill, exit_price)
+        exit_price = np.where(reason == EXIT_TARGET, target, exit_price)
+
+    return FirstTouch(exit_idx, exit_price, reason)
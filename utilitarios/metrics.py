@@ -0,0 +1,255 @@
+"""
+Métricas de desempenho vetorizadas
+
+Todas as funções aceitam uma série 1-D (um backtest) ou uma matriz
+(execuções x tempo) e reduzem ao longo do último eixo, de modo que milhares
+de backtests são avaliados numa única chamada. Para uma série 1-D o retorno
+é um float; para uma matriz, um array com uma métrica por execução.
+Compartilhadas pelos motores de analise_tecnica e de backteste.
+
+Séries de trades com tamanhos diferentes podem ser empilhadas com NaN
+completando as linhas mais curtas (ver `pad_rows`); retornos e resultados
+NaN são ignorados, e nas curvas de capital cada linha termina no seu último
+valor não-NaN.
+
+Exemplo:
+    equity = np.vstack([curva_1, curva_2, ...])       # (execuções x tempo)
+    summarize(equity, initial=100000.0, periods_per_year=252)
+"""
+
+from typing import Dict, Optional, Sequence, Union
+
+import numpy as np
+
+ArrayOrFloat = Union[float, np.ndarray]
+
+
+def _as_matrix(values) -> tuple:
+    """Matriz float64 (execuções x tempo) e se a entrada era 1-D"""
+    matrix = np.asarray(values, dtype=np.float64)
+    single = matrix.ndim == 1
+    return np.atleast_2d(matrix), single
+
+
+def _result(values: np.ndarray, single: bool) -> ArrayOrFloat:
+    return values[0].item() if single else values
+
+
+def pad_rows(rows: Sequence[Sequence[float]]) -> np.ndarray:
+    """Empilha séries de tamanhos diferentes numa matriz completada com NaN"""
+    width = max((len(row) for row in rows), default=0)
+    matrix = np.full((len(rows), width), np.nan)
+    for i, row in enumerate(rows):
+        matrix[i, :len(row)] = row
+    return matrix
+
+
+def _last_valid(matrix: np.ndarray) -> tuple:
+    """Último valor não-NaN de cada linha e o número de barras até ele"""
+    valid = ~np.isnan(matrix)
+    length = matrix.shape[-1] - np.argmax(valid[:, ::-1], axis=-1)
+    length[~valid.any(axis=-1)] = 0
+    last = matrix[np.arange(len(matrix)), np.maximum(length - 1, 0)]
+    return np.where(length > 0, last, np.nan), length
+
+
+def running_peak(equity, initial: Optional[float] = None) -> np.ndarray:
+    """
+    Máximo acumulado da curva de capital
+
+    Args:
+        equity: Curva(s) de capital
+        initial: Capital inicial, tratado como pico anterior à primeira barra
+    """
+    matrix, single = _as_matrix(equity)
+    # fmax: o NaN de linhas completadas não se propaga ao pico
+    peak = np.fmax.accumulate(matrix, axis=-1)
+    if initial is not None:
+        np.maximum(peak, initial, out=peak)
+    return peak[0] if single else peak
+
+
+def drawdown(equity, initial: Optional[float] = None) -> np.ndarray:
+    """Queda relativa ao pico em cada barra, (pico - capital) / pico"""
+    matrix, single = _as_matrix(equity)
+    peak = running_peak(matrix, initial)
+    series = (peak - matrix) / peak
+    return series[0] if single else series
+
+
+def max_drawdown(equity, initial: Optional[float] = None) -> ArrayOrFloat:
+    """Máximo drawdown em fração (0 para curvas vazias)"""
+    matrix, single = _as_matrix(equity)
+    if matrix.shape[-1] == 0:
+        return _result(np.zeros(len(matrix)), single)
+    # 1 - min(capital / pico): uma passada a menos que drawdown()
+    # fmin/fmax ignoram o NaN das linhas completadas (linhas só com NaN: 0)
+    worst = np.fmax(1.0 - np.fmin.reduce(matrix / running_peak(matrix, initial), axis=-1), 0.0)
+    return _result(worst, single)
+
+
+def drawdown_duration(equity, initial: Optional[float] = None) -> ArrayOrFloat:
+    """
+    Maior número de barras consecutivas abaixo do pico anterior
+
+    Args:
+        equity: Curva(s) de capital
+        initial: Capital inicial, tratado como pico anterior à primeira barra
+    """
+    matrix, single = _as_matrix(equity)
+    if matrix.shape[-1] == 0:
+        return _result(np.zeros(len(matrix), dtype=np.int64), single)
+    underwater = matrix < running_peak(matrix, initial)
+    bars = np.arange(matrix.shape[-1])
+    # Última barra no pico (ou -1) antes de cada barra
+    last_peak = np.maximum.accumulate(np.where(underwater, -1, bars), axis=-1)
+    longest = (bars - last_peak).max(axis=-1)
+    return _result(longest.astype(np.int64), single)
+
+
+def returns_from_equity(equity, initial: Optional[float] = None) -> np.ndarray:
+    """Retornos simples por barra; com `initial`, inclui o retorno da primeira barra"""
+    matrix, single = _as_matrix(equity)
+    if initial is not None:
+        matrix = np.concatenate([np.full((len(matrix), 1), float(initial)), matrix], axis=-1)
+    returns = np.diff(matrix, axis=-1) / matrix[:, :-1]
+    return returns[0] if single else returns
+
+
+def sharpe_ratio(returns, risk_free: float = 0.0, periods_per_year: Optional[int] = None,
+                 ddof: int = 0) -> ArrayOrFloat:
+    """
+    Média do excesso de retorno sobre seu desvio padrão
+
+    Args:
+        returns: Retornos por período (NaN ignorados)
+        risk_free: Taxa livre de risco por período
+        periods_per_year: Se informado, anualiza por sqrt(periods_per_year)
+        ddof: Graus de liberdade do desvio padrão
+
+    Returns:
+        Sharpe; 0 quando há menos de ddof + 1 retornos ou desvio nulo
+    """
+    matrix, single = _as_matrix(returns)
+    excess = matrix - risk_free
+    missing = np.isnan(excess)
+    ratio = np.zeros(len(matrix))
+    if not missing.any():
+        # Sem NaN: reduções comuns, bem mais rápidas que as nan*
+        if excess.shape[-1] > ddof:
+            mean = excess.mean(axis=-1)
+            std = excess.std(axis=-1, ddof=ddof)
+            np.divide(mean, std, out=ratio, where=std > 0)
+    else:
+        count = np.sum(~missing, axis=-1)
+        valid = count > ddof
+        if valid.any():
+            mean = np.nanmean(excess[valid], axis=-1)
+            std = np.nanstd(excess[valid], axis=-1, ddof=ddof)
+            ratio[valid] = np.divide(mean, std, out=np.zeros_like(mean), where=std > 0)
+    if periods_per_year:
+        ratio *= np.sqrt(periods_per_year)
+    return _result(ratio, single)
+
+
+def sortino_ratio(returns, risk_free: float = 0.0, periods_per_year: Optional[int] = None) -> ArrayOrFloat:
+    """
+    Média do excesso de retorno sobre o desvio negativo (semidesvio)
+
+    O semidesvio é sqrt(média(min(excesso, 0)²)) sobre todos os períodos.
+    Retorna 0 quando não há períodos negativos.
+    """
+    matrix, single = _as_matrix(returns)
+    excess = matrix - risk_free
+    ratio = np.zeros(len(matrix))
+    valid = np.any(~np.isnan(excess), axis=-1)
+    if valid.any():
+        mean = np.nanmean(excess[valid], axis=-1)
+        downside = np.sqrt(np.nanmean(np.minimum(excess[valid], 0.0) ** 2, axis=-1))
+        ratio[valid] = np.divide(mean, downside, out=np.zeros_like(mean), where=downside > 0)
+    if periods_per_year:
+        ratio *= np.sqrt(periods_per_year)
+    return _result(ratio, single)
+
+
+def calmar_ratio(equity, periods_per_year: int = 252, initial: Optional[float] = None) -> ArrayOrFloat:
+    """
+    Retorno anualizado (CAGR) sobre o máximo drawdown
+
+    Args:
+        equity: Curva(s) de capital
+        periods_per_year: Barras por ano da curva
+        initial: Capital inicial (padrão: primeira barra)
+
+    Returns:
+        Calmar; 0 sem drawdown
+    """
+    matrix, single = _as_matrix(equity)
+    if matrix.shape[-1] == 0:
+        return _result(np.zeros(len(matrix)), single)
+    start = matrix[:, 0] if initial is None else np.full(len(matrix), float(initial))
+    end, length = _last_valid(matrix)
+    periods = length - (1 if initial is None else 0)
+    growth = end / start
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cagr = growth ** (periods_per_year / np.maximum(periods, 1)) - 1
+    worst = np.atleast_1d(max_drawdown(matrix, initial))
+    ratio = np.divide(cagr, worst, out=np.zeros_like(cagr), where=worst > 0)
+    return _result(ratio, single)
+
+
+def profit_factor(pnl) -> ArrayOrFloat:
+    """
+    Soma dos lucros sobre a soma das perdas (inf quando não há perdas)
+
+    Args:
+        pnl: Resultado de cada trade, ou matriz (execuções x trades) com NaN
+            completando execuções com menos trades
+    """
+    matrix, single = _as_matrix(pnl)
+    profits = np.where(matrix > 0, matrix, 0.0).sum(axis=-1)
+    losses = np.where(matrix < 0, -matrix, 0.0).sum(axis=-1)
+    factor = np.full(len(matrix), np.inf)
+    np.divide(profits, losses, out=factor, where=losses != 0)
+    return _result(factor, single)
+
+
+def win_rate(pnl) -> ArrayOrFloat:
+    """Fração de trades com resultado positivo (0 sem trades)"""
+    matrix, single = _as_matrix(pnl)
+    count = np.sum(~np.isnan(matrix), axis=-1)
+    wins = np.sum(matrix > 0, axis=-1)
+    rate = np.divide(wins, count, out=np.zeros(len(matrix)), where=count > 0)
+    return _result(rate, single)
+
+
+def summarize(equity, initial: Optional[float] = None, periods_per_year: int = 252,
+              risk_free: float = 0.0) -> Dict[str, ArrayOrFloat]:
+    """
+    Métricas principais de uma ou várias curvas de capital
+
+    Args:
+        equity: Curva(s) de capital (execuções x tempo)
+        initial: Capital inicial comum às execuções
+        periods_per_year: Barras por ano, para anualização
+        risk_free: Taxa livre de risco por período
+
+    Returns:
+        Dict com total_return, max_drawdown, drawdown_duration, sharpe,
+        sortino e calmar
+    """
+    matrix, single = _as_matrix(equity)
+    returns = returns_from_equity(matrix, initial)
+    start = matrix[:, 0] if initial is None else float(initial)
+    total = _last_valid(matrix)[0] / start - 1 if matrix.shape[-1] else np.zeros(len(matrix))
+    metrics = {
+        'total_return': total,
+        'max_drawdown': max_drawdown(matrix, initial),
+        'drawdown_duration': drawdown_duration(matrix, initial),
+        'sharpe': sharpe_ratio(returns, risk_free, periods_per_year),
+        'sortino': sortino_ratio(returns, risk_free, periods_per_year),
+        'calmar': calmar_ratio(matrix, periods_per_year, initial),
+    }
+    if single:
+        return {name: np.asarray(value)[0].item() for name, value in metrics.items()}
+    return metrics